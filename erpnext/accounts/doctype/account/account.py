@@ -544,7 +544,18 @@ def update_account_number(name, account_name, account_number=None, from_descenda
 @frappe.whitelist()
 def merge_account(old, new):
 	_ensure_idle_system()
-	# Validate properties before merging
+	old_account, new_account = validate_account_merge(old, new)
+
+	if old_account.is_group and new_account.parent_account == old:
+		new_account.db_set("parent_account", frappe.get_cached_value("Account", old, "parent_account"))
+
+	frappe.rename_doc("Account", old, new, merge=1, force=1)
+
+	return new
+
+
+def validate_account_merge(old, new):
+	"""Validate properties before merging, returns the old and the new account"""
 	new_account = frappe.get_cached_doc("Account", new)
 	old_account = frappe.get_cached_doc("Account", old)
 
@@ -570,12 +581,7 @@ def merge_account(old, new):
 			exc=InvalidAccountMergeError,
 		)
 
-	if old_account.is_group and new_account.parent_account == old:
-		new_account.db_set("parent_account", frappe.get_cached_value("Account", old, "parent_account"))
-
-	frappe.rename_doc("Account", old, new, merge=1, force=1)
-
-	return new
+	return old_account, new_account
 
 
 @frappe.whitelist()
@@ -12,6 +12,11 @@ from frappe.query_builder.functions import Sum
 from frappe.utils import cint, create_batch, flt
 
 from erpnext import get_default_cost_center
+from erpnext.accounts.doctype.bank_reconciliation_tool.voucher_matcher import (
+	drop_cleared_vouchers,
+	get_voucher_matcher,
+	uses_default_matching_queries,
+)
 from erpnext.accounts.doctype.bank_transaction.bank_transaction import get_total_allocated_amount
 from erpnext.accounts.party import get_party_account
 from erpnext.accounts.report.bank_reconciliation_statement.bank_reconciliation_statement import (
@@ -405,17 +410,36 @@ def start_auto_reconcile(
 ):
 	frappe.flags.auto_reconcile_vouchers = True
 
+	# the vouchers of every bank account are loaded once and matched in memory, unless other apps
+	# add their own matching queries
+	matchers = {} if uses_default_matching_queries() else None
+
 	reconciled, partially_reconciled = set(), set()
 	for transaction in bank_transactions:
-		linked_payments = get_linked_payments(
-			transaction.name,
-			["payment_entry", "journal_entry"],
-			from_date,
-			to_date,
-			filter_by_reference_date,
-			from_reference_date,
-			to_reference_date,
-		)
+		if matchers is None:
+			linked_payments = get_linked_payments(
+				transaction.name,
+				["payment_entry", "journal_entry"],
+				from_date,
+				to_date,
+				filter_by_reference_date,
+				from_reference_date,
+				to_reference_date,
+			)
+		else:
+			gl_account = frappe.get_cached_value("Bank Account", transaction.bank_account, "account")
+			if transaction.bank_account not in matchers:
+				matchers[transaction.bank_account] = get_voucher_matcher(
+					gl_account,
+					from_date,
+					to_date,
+					filter_by_reference_date,
+					from_reference_date,
+					to_reference_date,
+				)
+
+			matcher = matchers[transaction.bank_account]
+			linked_payments = subtract_allocations(gl_account, matcher.get_matching_vouchers(transaction))
 
 		if not linked_payments:
 			continue
@@ -432,6 +456,8 @@ def start_auto_reconcile(
 		)
 
 		updated_transaction = reconcile_vouchers(transaction.name, json.dumps(vouchers))
+		if matchers is not None:
+			drop_cleared_vouchers(matcher, vouchers)
 
 		if updated_transaction.status == "Reconciled":
 			reconciled.add(updated_transaction.name)
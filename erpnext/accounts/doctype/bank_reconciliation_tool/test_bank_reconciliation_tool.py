@@ -10,7 +10,9 @@ from frappe.utils import add_days, today
 from erpnext.accounts.doctype.bank_reconciliation_tool.bank_reconciliation_tool import (
 	auto_reconcile_vouchers,
 	get_bank_transactions,
+	get_linked_payments,
 )
+from erpnext.accounts.doctype.bank_reconciliation_tool.voucher_matcher import get_voucher_matcher
 from erpnext.accounts.doctype.payment_entry.test_payment_entry import create_payment_entry
 from erpnext.accounts.test.accounts_mixin import AccountsTestMixin
 
@@ -98,3 +100,70 @@ class TestBankReconciliationTool(AccountsTestMixin, IntegrationTestCase):
 		# assert API output post reconciliation
 		transactions = get_bank_transactions(self.bank_account, from_date, to_date)
 		self.assertEqual(len(transactions), 0)
+
+	def test_voucher_matcher(self):
+		from_date = add_days(today(), -1)
+		to_date = today()
+
+		payments = []
+		for reference_no, amount in (("123", 100), ("123", 60), ("456", 100)):
+			payment = create_payment_entry(
+				company=self.company,
+				posting_date=from_date,
+				payment_type="Receive",
+				party_type="Customer",
+				party=self.customer,
+				paid_from=self.debit_to,
+				paid_to=self.bank,
+				paid_amount=amount,
+			)
+			payment.reference_no = reference_no
+			payment.save().submit()
+			payments.append(payment)
+
+		# like a payment with taxes, the amount after tax is proposed but the paid amount is ranked
+		frappe.db.set_value("Payment Entry", payments[1].name, "base_paid_amount_after_tax", 75)
+
+		# same matches as the queries of auto reconciliation, without a query per transaction
+		for deposit, reference_number in ((100, "123"), (75, "123"), (80, "123")):
+			bank_transaction = (
+				frappe.get_doc(
+					{
+						"doctype": "Bank Transaction",
+						"date": to_date,
+						"deposit": deposit,
+						"bank_account": self.bank_account,
+						"reference_number": reference_number,
+						"party_type": "Customer",
+						"party": self.customer,
+						"currency": "INR",
+					}
+				)
+				.save()
+				.submit()
+			)
+
+			frappe.flags.auto_reconcile_vouchers = True
+			try:
+				expected = get_linked_payments(
+					bank_transaction.name, ["payment_entry", "journal_entry"], from_date, to_date
+				)
+			finally:
+				frappe.flags.auto_reconcile_vouchers = False
+
+			transaction = next(
+				d for d in get_bank_transactions(self.bank_account) if d.name == bank_transaction.name
+			)
+			matches = get_voucher_matcher(self.bank, from_date, to_date).get_matching_vouchers(transaction)
+
+			with self.subTest(deposit=deposit):
+				self.assertEqual(len(matches), 2)
+				self.assertEqual(get_ranked_matches(matches), get_ranked_matches(expected))
+
+		# no amount matches the last line, both are proposed with their amount after tax
+		self.assertEqual({d.paid_amount for d in matches}, {100, 75})
+		self.assertEqual({d.rank for d in matches}, {3})
+
+
+def get_ranked_matches(matches):
+	return sorted(((d.rank, d.doctype, d.name, d.paid_amount) for d in matches), key=lambda d: (-d[0], d[2]))
@@ -0,0 +1,229 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+In memory matching of bank transactions for auto reconciliation.
+
+Auto reconciliation matches a bank transaction to the unreconciled payment and journal entries of its
+bank account that have its reference number. Instead of querying them for every transaction,
+`VoucherMatcher` loads the unreconciled entries of the bank account once, indexes them by direction
+(deposit or withdrawal) and reference number, and ranks the candidates of every transaction by
+amount and party in memory, the way `get_pe_matching_query` and `get_je_matching_query` do.
+"""
+
+import frappe
+from frappe.query_builder.custom import ConstantColumn
+from frappe.query_builder.functions import Sum
+from frappe.utils import cint, cstr, flt
+
+DEFAULT_MATCHING_QUERIES = (
+	"erpnext.accounts.doctype.bank_reconciliation_tool.bank_reconciliation_tool.get_matching_queries"
+)
+
+
+def uses_default_matching_queries():
+	"""The matcher only knows the vouchers of the default matching queries"""
+	return frappe.get_hooks("get_matching_queries") == [DEFAULT_MATCHING_QUERIES]
+
+
+class VoucherMatcher:
+	"""
+	Index of the unreconciled vouchers of a bank account, by direction and reference number.
+
+	:param vouchers: dicts with the doctype, name, direction ("deposit" or "withdrawal"),
+	        paid_amount, reference_no, reference_date, party_type, party, posting_date and currency of
+	        the vouchers, the ones of the same rank in the order they are to be proposed in. The amount
+	        rank compares the `rank_amount` of a voucher if set, else its paid_amount
+	"""
+
+	def __init__(self, vouchers):
+		self.index = {}
+		self.keys = {}
+
+		for voucher in vouchers:
+			self.add_voucher(voucher)
+
+	def add_voucher(self, voucher):
+		if not voucher.get("reference_no"):
+			return
+
+		key = (voucher["direction"], get_reference_key(voucher["reference_no"]))
+		self.index.setdefault(key, []).append(voucher)
+		self.keys.setdefault((voucher["doctype"], voucher["name"]), set()).add(key)
+
+	def remove_voucher(self, doctype, name):
+		for key in self.keys.pop((doctype, name), ()):
+			self.index[key] = [
+				voucher
+				for voucher in self.index[key]
+				if (voucher["doctype"], voucher["name"]) != (doctype, name)
+			]
+
+	def get_matching_vouchers(self, transaction):
+		"""Returns the vouchers with the reference number of `transaction`, best ranked first"""
+		if not transaction.get("reference_number"):
+			return []
+
+		direction = "deposit" if flt(transaction.get("deposit")) > 0.0 else "withdrawal"
+		candidates = self.index.get((direction, get_reference_key(transaction.reference_number)), [])
+
+		matches = []
+		for voucher in candidates:
+			# every candidate has the reference number of the transaction
+			rank = 2
+			rank_amount = voucher.get("rank_amount", voucher["paid_amount"])
+			if flt(rank_amount) == flt(transaction.unallocated_amount):
+				rank += 1
+
+			if (
+				voucher["doctype"] == "Payment Entry"
+				and voucher.get("party")
+				and voucher.get("party_type") == transaction.get("party_type")
+				and voucher.get("party") == transaction.get("party")
+			):
+				rank += 1
+
+			match = frappe._dict(voucher, rank=rank)
+			del match["direction"]
+			match.pop("rank_amount", None)
+			matches.append(match)
+
+		return sorted(matches, key=lambda x: x["rank"], reverse=True)
+
+
+def get_reference_key(reference_no):
+	if frappe.db.db_type == "postgres":
+		# compared as is, like by postgres
+		return cstr(reference_no)
+
+	# like the collation of MariaDB, ignoring case and trailing spaces
+	return cstr(reference_no).rstrip().casefold()
+
+
+def get_voucher_matcher(
+	gl_account,
+	from_date=None,
+	to_date=None,
+	filter_by_reference_date=None,
+	from_reference_date=None,
+	to_reference_date=None,
+):
+	"""Returns a `VoucherMatcher` of the unreconciled payment and journal entries of `gl_account`"""
+	args = (gl_account, from_date, to_date, filter_by_reference_date, from_reference_date, to_reference_date)
+	return VoucherMatcher(get_payment_entry_vouchers(*args) + get_journal_entry_vouchers(*args))
+
+
+def get_payment_entry_vouchers(
+	gl_account, from_date, to_date, filter_by_reference_date, from_reference_date, to_reference_date
+):
+	pe = frappe.qb.DocType("Payment Entry")
+
+	filter_by_date = pe.posting_date.between(from_date, to_date)
+	if cint(filter_by_reference_date):
+		filter_by_date = pe.reference_date.between(from_reference_date, to_reference_date)
+
+	vouchers = []
+	for direction, payment_type, account_field, to_from in (
+		("deposit", "Receive", "paid_to", "to"),
+		("withdrawal", "Pay", "paid_from", "from"),
+	):
+		query = (
+			frappe.qb.from_(pe)
+			.select(
+				ConstantColumn("Payment Entry").as_("doctype"),
+				ConstantColumn(direction).as_("direction"),
+				pe.name,
+				pe.base_paid_amount_after_tax.as_("paid_amount"),
+				# the matching query ranks the amount on the paid amount, before taxes
+				pe.paid_amount.as_("rank_amount"),
+				pe.reference_no,
+				pe.reference_date,
+				pe.party,
+				pe.party_type,
+				pe.posting_date,
+				pe[f"paid_{to_from}_account_currency"].as_("currency"),
+			)
+			.where(pe.docstatus == 1)
+			.where(pe.payment_type.isin([payment_type, "Internal Transfer"]))
+			.where(pe.clearance_date.isnull())
+			.where(pe[account_field] == gl_account)
+			.where(pe.paid_amount > 0.0)
+			.where(pe.reference_no.isnotnull())
+			.where(filter_by_date)
+			.orderby(pe.reference_date if cint(filter_by_reference_date) else pe.posting_date)
+		)
+		vouchers.extend(query.run(as_dict=True))
+
+	return vouchers
+
+
+def get_journal_entry_vouchers(
+	gl_account, from_date, to_date, filter_by_reference_date, from_reference_date, to_reference_date
+):
+	je = frappe.qb.DocType("Journal Entry")
+	jea = frappe.qb.DocType("Journal Entry Account")
+
+	filter_by_date = je.posting_date.between(from_date, to_date)
+	if cint(filter_by_reference_date):
+		filter_by_date = je.cheque_date.between(from_reference_date, to_reference_date)
+
+	rows = (
+		frappe.qb.from_(jea)
+		.join(je)
+		.on(jea.parent == je.name)
+		.select(
+			Sum(jea.debit_in_account_currency).as_("debit"),
+			Sum(jea.credit_in_account_currency).as_("credit"),
+			je.name,
+			je.cheque_no.as_("reference_no"),
+			je.cheque_date.as_("reference_date"),
+			je.pay_to_recd_from.as_("party"),
+			jea.party_type,
+			je.posting_date,
+			jea.account_currency.as_("currency"),
+		)
+		.where(je.docstatus == 1)
+		.where(je.voucher_type != "Opening Entry")
+		.where(je.clearance_date.isnull())
+		.where(jea.account == gl_account)
+		.where(je.cheque_no.isnotnull())
+		.where(filter_by_date)
+		.groupby(je.name)
+		.orderby(je.cheque_date if cint(filter_by_reference_date) else je.posting_date)
+	).run(as_dict=True)
+
+	vouchers = []
+	for direction, amount_field in (("deposit", "debit"), ("withdrawal", "credit")):
+		for row in rows:
+			if flt(row[amount_field]) > 0.0:
+				vouchers.append(
+					frappe._dict(
+						doctype="Journal Entry",
+						direction=direction,
+						name=row.name,
+						paid_amount=row[amount_field],
+						reference_no=row.reference_no,
+						reference_date=row.reference_date,
+						party=row.party,
+						party_type=row.party_type,
+						posting_date=row.posting_date,
+						currency=row.currency,
+					)
+				)
+
+	return vouchers
+
+
+def drop_cleared_vouchers(matcher, vouchers):
+	"""Removes the `vouchers` cleared by a reconciliation from the `matcher`"""
+	names = {}
+	for voucher in vouchers:
+		names.setdefault(voucher["payment_doctype"], []).append(voucher["payment_name"])
+
+	for doctype, voucher_names in names.items():
+		for name in frappe.get_all(
+			doctype,
+			filters={"name": ["in", voucher_names], "clearance_date": ["is", "set"]},
+			pluck="name",
+		):
+			matcher.remove_voucher(doctype, name)
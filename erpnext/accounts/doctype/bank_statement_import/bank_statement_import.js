@@ -70,7 +70,7 @@ frappe.ui.form.on("Bank Statement Import", {
 
 		frm.get_field("import_file").df.options = {
 			restrictions: {
-				allowed_file_types: [".csv", ".xls", ".xlsx", ".TXT", ".txt"],
+				allowed_file_types: [".csv", ".xls", ".xlsx", ".TXT", ".txt", ".xml"],
 			},
 		};
 
@@ -198,6 +198,10 @@ frappe.ui.form.on("Bank Statement Import", {
 		frm.save();
 	},
 
+	stream_import(frm) {
+		frm.save();
+	},
+
 	toggle_mt940_note(frm) {
 		if (!frm.doc.import_mt940_fromat) {
 			frm.set_df_property("custom_delimiters", "hidden", 0);
@@ -303,6 +307,14 @@ frappe.ui.form.on("Bank Statement Import", {
 			frm.trigger("update_primary_action");
 		}
 
+		// MT940 and CAMT.053 files are read as they are by the fast import
+		if (frm.doc.stream_import && /\.(txt|xml)$/i.test(frm.doc.import_file || "")) {
+			frm.get_field("import_preview").$wrapper.html(
+				`<span class="text-muted">${__("Preview is not available for Fast Import of this file")}</span>`
+			);
+			return;
+		}
+
 		// load import preview
 		frm.get_field("import_preview").$wrapper.empty();
 		$('<span class="text-muted">')
@@ -6,7 +6,6 @@ import csv
 import io
 import json
 import re
-from datetime import date, datetime
 
 import frappe
 import mt940
@@ -20,6 +19,8 @@ from frappe.utils.xlsxutils import ILLEGAL_CHARACTERS_RE, handle_html
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 
+from erpnext.accounts.doctype.bank_statement_import.statement_importer import get_mt940_transaction
+
 INVALID_VALUES = ("", None)
 
 
@@ -45,6 +46,7 @@ class BankStatementImport(DataImport):
 		reference_doctype: DF.Link
 		show_failed_logs: DF.Check
 		status: DF.Literal["Pending", "Success", "Partial Success", "Error"]
+		stream_import: DF.Check
 		submit_after_import: DF.Check
 		template_options: DF.Code | None
 		template_warnings: DF.Code | None
@@ -71,11 +73,14 @@ class BankStatementImport(DataImport):
 
 			self.template_warnings = ""
 
-		if self.import_file and not self.import_file.lower().endswith(".txt"):
+		if self.import_file and not self.import_file.lower().endswith((".txt", ".xml")):
 			self.validate_import_file()
 			self.validate_google_sheets_url()
 
 	def start_import(self):
+		if self.stream_import:
+			return self.start_stream_import()
+
 		preview = frappe.get_doc("Bank Statement Import", self.name).get_preview_from_template(
 			self.import_file, self.google_sheets_url
 		)
@@ -110,6 +115,36 @@ class BankStatementImport(DataImport):
 
 		return None
 
+	def start_stream_import(self):
+		"""Enqueues the import of the statement file in chunks, see `statement_importer`"""
+		if not self.import_file:
+			frappe.throw(_("Please attach a CSV, MT940 or CAMT.053 file to use Fast Import"))
+
+		if self.import_file.lower().endswith((".xls", ".xlsx")):
+			frappe.throw(_("Fast Import supports CSV, MT940 and CAMT.053 files only"))
+
+		from frappe.utils.background_jobs import is_job_enqueued
+		from frappe.utils.scheduler import is_scheduler_inactive
+
+		run_now = frappe.in_test or frappe.conf.developer_mode
+		if is_scheduler_inactive() and not run_now:
+			frappe.throw(_("Scheduler is inactive. Cannot import data."), title=_("Scheduler Inactive"))
+
+		job_id = f"bank_statement_import::{self.name}"
+		if not is_job_enqueued(job_id):
+			enqueue(
+				"erpnext.accounts.doctype.bank_statement_import.statement_importer.import_statement",
+				queue="long",
+				timeout=4 * 60 * 60,
+				event="data_import",
+				job_id=job_id,
+				data_import=self.name,
+				now=run_now,
+			)
+			return job_id
+
+		return None
+
 
 @frappe.whitelist()
 def convert_mt940_to_csv(data_import, mt940_file_path):
@@ -139,27 +174,18 @@ def convert_mt940_to_csv(data_import, mt940_file_path):
 	writer.writerow(headers)
 
 	for txn in transactions:
-		txn_date = getattr(txn, "date", None)
-		raw_date = txn.data.get("date", "")
-
-		if txn_date:
-			date_str = txn_date.strftime("%Y-%m-%d")
-		elif isinstance(raw_date, date | datetime):
-			date_str = raw_date.strftime("%Y-%m-%d")
-		else:
-			date_str = str(raw_date)
-
-		raw_amount = str(txn.data.get("amount", ""))
-		parts = raw_amount.strip().split()
-		amount_value = float(parts[0]) if parts else 0.0
-
-		deposit = amount_value if amount_value > 0 else ""
-		withdrawal = abs(amount_value) if amount_value < 0 else ""
-		description = txn.data.get("extra_details") or ""
-		reference = txn.data.get("transaction_reference") or ""
-		currency = txn.data.get("currency", "")
-
-		writer.writerow([date_str, deposit, withdrawal, description, reference, doc.bank_account, currency])
+		row = get_mt940_transaction(txn)
+		writer.writerow(
+			[
+				row["date"],
+				row["deposit"] or "",
+				row["withdrawal"] or "",
+				row["description"],
+				row["reference_number"],
+				doc.bank_account,
+				row["currency"],
+			]
+		)
 
 	# Prepare in-memory CSV for upload
 	csv_content = csv_buffer.getvalue().encode("utf-8")
@@ -331,6 +357,9 @@ def get_import_status(docname):
 	data_import = frappe.get_doc("Bank Statement Import", docname)
 	import_status["status"] = data_import.status
 
+	if data_import.stream_import:
+		return get_stream_import_status(docname, import_status)
+
 	logs = frappe.get_all(
 		"Data Import Log",
 		fields=["count(*) as count", "success"],
@@ -352,6 +381,21 @@ def get_import_status(docname):
 	return import_status
 
 
+def get_stream_import_status(docname, import_status):
+	"""A log of a fast import is for a chunk of rows, so the rows are counted from the logs"""
+	import_status.update(success=0, failed=0)
+
+	for log in frappe.get_all(
+		"Data Import Log", fields=["success", "row_indexes"], filters={"data_import": docname}
+	):
+		count = len(json.loads(log.row_indexes or "[]"))
+		import_status["success" if log.success else "failed"] += count
+
+	import_status["total_records"] = import_status["success"] + import_status["failed"]
+
+	return import_status
+
+
 @frappe.whitelist()
 def get_import_logs(docname: str):
 	frappe.has_permission("Bank Statement Import", throw=True)
@@ -0,0 +1,668 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Streaming import of large bank statements, enabled by "Fast Import" in Bank Statement Import.
+
+CSV, MT940 and CAMT.053 statements are read line by line and processed in chunks of
+IMPORT_CHUNK_SIZE transactions, so that the file is never loaded whole. For every chunk:
+
+1. the transactions of the bank account on the dates of the chunk are loaded once into a hash index
+   counting them by date, amounts, references and description, so that lines imported before are
+   skipped (and a failed import can be resumed) while lines repeated in the statement are still
+   imported as many times as they occur in it, unless their transaction ID is used already, in which
+   case they fail like a duplicate Bank Transaction,
+2. the parties are matched with one query per chunk instead of one per transaction,
+3. the new Bank Transactions are named from a block of the naming series and inserted as drafts
+   with multi row inserts,
+4. with "Submit After Import", they are submitted one by one through the controller, which sets their
+   status and runs the submit hooks of the apps.
+
+Only the insert of the drafts skips the controller. A new draft only needs its unallocated amount,
+set from its deposit and withdrawal like `before_validate` does, and the currency of the bank account,
+checked for every line like `validate_currency` does. The insert hooks of other apps are not run.
+"""
+
+import csv
+import json
+from collections import Counter
+from datetime import date, datetime
+from itertools import islice
+from xml.etree import ElementTree
+
+import frappe
+import mt940
+from frappe import _
+from frappe.utils import cint, cstr, flt, getdate, now
+from pypika import Order
+
+from erpnext.accounts.doctype.bank_transaction.auto_match_party import AutoMatchbyPartyNameDescription
+from erpnext.utilities.naming import reserve_names
+
+# transactions processed, and committed, at a time
+IMPORT_CHUNK_SIZE = 5000
+
+# rows of a multi row insert
+INSERT_BATCH_SIZE = 1000
+
+BANK_TRANSACTION_FIELDS = (
+	"date",
+	"deposit",
+	"withdrawal",
+	"currency",
+	"description",
+	"reference_number",
+	"transaction_id",
+	"transaction_type",
+	"bank_party_name",
+	"bank_party_account_number",
+	"bank_party_iban",
+	"party_type",
+	"party",
+)
+
+
+def import_statement(data_import):
+	"""Imports the statement of the Bank Statement Import `data_import`. Runs in a background job."""
+	data_import = frappe.get_doc("Bank Statement Import", data_import)
+	frappe.flags.in_import = True
+
+	try:
+		importer = StatementImporter(data_import)
+		importer.run()
+	except Exception:
+		frappe.db.rollback()
+		data_import.db_set("status", "Error")
+		data_import.log_error("Bank Statement Import failed")
+	finally:
+		frappe.flags.in_import = False
+
+	frappe.publish_realtime("data_import_refresh", {"data_import": data_import.name})
+
+
+class StatementImporter:
+	def __init__(self, data_import):
+		self.data_import = data_import
+		self.bank_account = data_import.bank_account
+		self.company = (
+			frappe.get_cached_value("Bank Account", self.bank_account, "company") or data_import.company
+		)
+		self.account_currency = get_bank_account_currency(self.bank_account)
+		self.submit = cint(data_import.submit_after_import)
+
+		self.column_to_field_map = json.loads(data_import.template_options or "{}").get(
+			"column_to_field_map", {}
+		)
+		self.party_matcher = PartyMatcher() if self.submit and get_party_matching_enabled() else None
+
+		# count of the transactions of the bank account, by key
+		self.existing = Counter()
+		self.loaded_dates = set()
+
+		self.log_index = frappe.db.count("Data Import Log", {"data_import": data_import.name})
+		self.imported = self.skipped = self.failed = 0
+
+	def run(self):
+		file_path = frappe.get_doc("File", {"file_url": self.data_import.import_file}).get_full_path()
+		delimiters = self.data_import.delimiter_options if self.data_import.custom_delimiters else None
+		rows = read_statement(file_path, self.column_to_field_map, delimiters)
+
+		while chunk := list(islice(rows, IMPORT_CHUNK_SIZE)):
+			self.import_chunk(chunk)
+
+			if not frappe.in_test:
+				frappe.db.commit()
+
+		if self.failed:
+			status = "Partial Success" if self.imported or self.skipped else "Error"
+		else:
+			status = "Success"
+
+		self.data_import.db_set("status", status)
+
+	def import_chunk(self, rows):
+		transactions, failed_rows = [], []
+		for row in rows:
+			try:
+				transactions.append(self.get_transaction(row))
+			except frappe.ValidationError as e:
+				failed_rows.append((row.row_index, cstr(e)))
+
+		transactions = self.drop_imported_transactions(transactions, failed_rows)
+
+		if self.party_matcher:
+			self.party_matcher.set_parties(transactions)
+
+		self.insert_transactions(transactions)
+		if self.submit:
+			transactions = self.submit_transactions(transactions, failed_rows)
+
+		self.log_chunk(transactions, failed_rows)
+
+	def get_transaction(self, row):
+		if not row.get("date"):
+			frappe.throw(_("Row {0}: Date is mandatory").format(row.row_index))
+
+		try:
+			transaction_date = getdate(row.date)
+		except Exception:
+			frappe.throw(_("Row {0}: {1} is not a valid date").format(row.row_index, frappe.bold(row.date)))
+
+		transaction = frappe._dict({fieldname: row.get(fieldname) for fieldname in BANK_TRANSACTION_FIELDS})
+		transaction.update(
+			{
+				"row_index": row.row_index,
+				"date": transaction_date,
+				"deposit": abs(flt(row.deposit)),
+				"withdrawal": abs(flt(row.withdrawal)),
+				"currency": row.currency or self.account_currency,
+			}
+		)
+
+		if self.account_currency and transaction.currency != self.account_currency:
+			frappe.throw(
+				_(
+					"Row {0}: Transaction currency: {1} cannot be different from Bank Account currency: {2}"
+				).format(row.row_index, frappe.bold(transaction.currency), frappe.bold(self.account_currency))
+			)
+
+		return transaction
+
+	def drop_imported_transactions(self, transactions, failed_rows):
+		"""
+		Returns the transactions, without the ones already imported for the bank account. The ones
+		whose transaction ID is used by another Bank Transaction, or an earlier line, are added to
+		`failed_rows`, as their insert fails on the unique transaction ID.
+		"""
+		self.load_existing_transactions({transaction.date for transaction in transactions})
+		used_transaction_ids = self.get_used_transaction_ids(transactions)
+
+		new_transactions = []
+		for transaction in transactions:
+			key = get_transaction_key(transaction)
+			if self.existing[key] > 0:
+				self.existing[key] -= 1
+				self.skipped += 1
+				continue
+
+			if transaction_id := get_transaction_id_key(transaction.transaction_id):
+				if transaction_id in used_transaction_ids:
+					failed_rows.append(
+						(
+							transaction.row_index,
+							_("Row {0}: Transaction ID {1} already exists").format(
+								transaction.row_index, frappe.bold(transaction.transaction_id)
+							),
+						)
+					)
+					continue
+
+				used_transaction_ids.add(transaction_id)
+
+			new_transactions.append(transaction)
+
+		return new_transactions
+
+	def get_used_transaction_ids(self, transactions):
+		transaction_ids = list(
+			{cstr(transaction.transaction_id).strip() for transaction in transactions} - {""}
+		)
+
+		used_transaction_ids = set()
+		for i in range(0, len(transaction_ids), INSERT_BATCH_SIZE):
+			used_transaction_ids.update(
+				get_transaction_id_key(transaction_id)
+				for transaction_id in frappe.get_all(
+					"Bank Transaction",
+					filters={"transaction_id": ("in", transaction_ids[i : i + INSERT_BATCH_SIZE])},
+					pluck="transaction_id",
+					order_by=None,
+				)
+			)
+
+		return used_transaction_ids
+
+	def load_existing_transactions(self, dates):
+		"""
+		Counts the transactions of the bank account on the `dates` not loaded yet. The dates are
+		loaded before the transactions of the chunk on them are inserted, so that the count is the
+		one before the import.
+		"""
+		dates = list(dates - self.loaded_dates)
+		if not dates:
+			return
+
+		bt = frappe.qb.DocType("Bank Transaction")
+		for i in range(0, len(dates), INSERT_BATCH_SIZE):
+			existing_transactions = (
+				frappe.qb.from_(bt)
+				.select(
+					bt.date,
+					bt.deposit,
+					bt.withdrawal,
+					bt.description,
+					bt.reference_number,
+					bt.transaction_id,
+				)
+				.where(bt.bank_account == self.bank_account)
+				.where(bt.docstatus < 2)
+				.where(bt.date.isin(dates[i : i + INSERT_BATCH_SIZE]))
+			).run(as_dict=True)
+
+			self.existing.update(get_transaction_key(transaction) for transaction in existing_transactions)
+
+		self.loaded_dates.update(dates)
+
+	def insert_transactions(self, transactions):
+		if not transactions:
+			return
+
+		naming_series = get_naming_series()
+		names = reserve_names("Bank Transaction", naming_series, len(transactions))
+		timestamp, user = now(), frappe.session.user
+
+		fields = [
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"docstatus",
+			"naming_series",
+			"status",
+			"bank_account",
+			"company",
+			"allocated_amount",
+			"unallocated_amount",
+			*BANK_TRANSACTION_FIELDS,
+		]
+
+		values = []
+		for name, transaction in zip(names, transactions, strict=True):
+			transaction.name = name
+			unallocated_amount = abs(transaction.withdrawal - transaction.deposit)
+			values.append(
+				(
+					name,
+					timestamp,
+					timestamp,
+					user,
+					user,
+					0,
+					naming_series,
+					"Pending",
+					self.bank_account,
+					self.company,
+					0.0,
+					unallocated_amount,
+					*(transaction.get(fieldname) for fieldname in BANK_TRANSACTION_FIELDS),
+				)
+			)
+
+		for i in range(0, len(values), INSERT_BATCH_SIZE):
+			frappe.db.bulk_insert("Bank Transaction", fields=fields, values=values[i : i + INSERT_BATCH_SIZE])
+
+		self.imported += len(transactions)
+
+	def submit_transactions(self, transactions, failed_rows):
+		"""
+		Submits the inserted drafts through the controller and returns the submitted ones. The ones
+		that fail are left as drafts and added to `failed_rows`.
+		"""
+		submitted = []
+		for transaction in transactions:
+			try:
+				frappe.db.savepoint("submit_bank_transaction")
+				frappe.get_doc("Bank Transaction", transaction.name).submit()
+				submitted.append(transaction)
+			except Exception as e:
+				frappe.db.rollback(save_point="submit_bank_transaction")
+				failed_rows.append(
+					(
+						transaction.row_index,
+						_(
+							"Row {0}: Bank Transaction {1} was imported as a draft, it could not be submitted: {2}"
+						).format(transaction.row_index, transaction.name, cstr(e)),
+					)
+				)
+
+		return submitted
+
+	def log_chunk(self, transactions, failed_rows):
+		if transactions:
+			self.insert_log(
+				success=1,
+				row_indexes=[transaction.row_index for transaction in transactions],
+				messages=[
+					_("{0} Bank Transactions imported: {1} to {2}").format(
+						len(transactions), transactions[0].name, transactions[-1].name
+					)
+				],
+			)
+
+		for row_index, exception in failed_rows:
+			self.insert_log(success=0, row_indexes=[row_index], exception=exception)
+
+		self.failed += len(failed_rows)
+
+	def insert_log(self, success, row_indexes, messages=None, exception=None):
+		self.log_index += 1
+		log = frappe.new_doc("Data Import Log")
+		log.data_import = self.data_import.name
+		log.log_index = self.log_index
+		log.success = success
+		log.row_indexes = json.dumps(row_indexes)
+		log.messages = json.dumps(messages or [])
+		log.exception = exception
+		log.db_insert()
+
+
+class PartyMatcher:
+	"""
+	Sets the party of transactions the way `BankTransaction.auto_set_party` does, matching the bank
+	party account numbers and IBANs of a chunk with one query and reusing the party names for fuzzy
+	matching.
+	"""
+
+	def __init__(self):
+		self.fuzzy_matching = frappe.get_single_value("Accounts Settings", "enable_fuzzy_matching")
+		self.party_names = {}
+
+	def set_parties(self, transactions):
+		transactions = [transaction for transaction in transactions if not transaction.party]
+		accounts = {transaction.bank_party_account_number for transaction in transactions} - {None, ""}
+		ibans = {transaction.bank_party_iban for transaction in transactions} - {None, ""}
+
+		bank_accounts = self.get_bank_account_parties(accounts, ibans)
+		employees = self.get_employee_parties(accounts, ibans)
+
+		for transaction in transactions:
+			result = None
+			try:
+				result = get_first_match(
+					bank_accounts, transaction.bank_party_account_number, transaction.bank_party_iban
+				) or get_first_match(
+					employees, transaction.bank_party_account_number, transaction.bank_party_iban
+				)
+
+				if not result and self.fuzzy_matching:
+					result = AutoMatchbyPartyNameDescription(
+						bank_party_name=transaction.bank_party_name,
+						description=transaction.description,
+						deposit=transaction.deposit,
+						party_names=self.party_names,
+					).match()
+			except Exception:
+				frappe.log_error(title=_("Error in party matching for Bank Transaction"))
+
+			if result:
+				transaction.party_type, transaction.party = result
+
+	def get_bank_account_parties(self, accounts, ibans):
+		if not (accounts or ibans):
+			return {}
+
+		parties = {}
+		ba = frappe.qb.DocType("Bank Account")
+		bank_accounts = (
+			frappe.qb.from_(ba)
+			.select(ba.bank_account_no, ba.iban, ba.party_type, ba.party)
+			.where(ba.party_type.isnotnull() & (ba.party_type != ""))
+			.where(ba.party.isnotnull() & (ba.party != ""))
+			.where(ba.bank_account_no.isin(list(accounts) or [""]) | ba.iban.isin(list(ibans) or [""]))
+			.orderby(ba.creation, order=Order.desc)
+		).run(as_dict=True)
+
+		for position, bank_account in enumerate(bank_accounts):
+			add_match(
+				parties,
+				position,
+				bank_account.bank_account_no,
+				bank_account.iban,
+				bank_account.party_type,
+				bank_account.party,
+			)
+
+		return parties
+
+	def get_employee_parties(self, accounts, ibans):
+		if not (accounts or ibans):
+			return {}
+
+		parties = {}
+		employee = frappe.qb.DocType("Employee")
+		employees = (
+			frappe.qb.from_(employee)
+			.select(employee.name, employee.bank_ac_no, employee.iban)
+			.where(employee.bank_ac_no.isin(list(accounts) or [""]) | employee.iban.isin(list(ibans) or [""]))
+			.orderby(employee.creation, order=Order.desc)
+		).run(as_dict=True)
+
+		for position, row in enumerate(employees):
+			add_match(parties, position, row.bank_ac_no, row.iban, "Employee", row.name)
+
+		return parties
+
+
+def add_match(parties, position, account, iban, party_type, party):
+	"""
+	Indexes a party by its account number and IBAN with its position in the results, which are in the
+	default order of `frappe.get_all` used by `AutoMatchbyAccountIBAN`
+	"""
+	match = (position, (party_type, party))
+	if account:
+		parties.setdefault(("account", account), match)
+	if iban:
+		parties.setdefault(("iban", iban), match)
+
+
+def get_first_match(parties, account, iban):
+	"""The party of the first result matching the account number or the IBAN"""
+	matches = []
+	if account and (match := parties.get(("account", account))):
+		matches.append(match)
+	if iban and (match := parties.get(("iban", iban))):
+		matches.append(match)
+
+	return min(matches)[1] if matches else None
+
+
+def get_party_matching_enabled():
+	return frappe.get_single_value("Accounts Settings", "enable_party_matching")
+
+
+def get_bank_account_currency(bank_account):
+	if account := frappe.get_cached_value("Bank Account", bank_account, "account"):
+		return frappe.get_cached_value("Account", account, "account_currency")
+
+
+def get_transaction_key(transaction):
+	"""The fields identifying a line of a statement, as a key of the hash index of transactions"""
+	return (
+		getdate(transaction.date),
+		flt(transaction.deposit, 2),
+		flt(transaction.withdrawal, 2),
+		cstr(transaction.reference_number).strip(),
+		cstr(transaction.transaction_id).strip(),
+		" ".join(cstr(transaction.description).split()),
+	)
+
+
+def get_transaction_id_key(transaction_id):
+	"""The transaction ID as compared by its unique index, which is case insensitive in MariaDB"""
+	transaction_id = cstr(transaction_id).strip()
+	return transaction_id.casefold() if frappe.db.db_type == "mariadb" else transaction_id
+
+
+def get_naming_series():
+	df = frappe.get_meta("Bank Transaction").get_field("naming_series")
+	return df.default or cstr(df.options).split("\n")[0]
+
+
+def read_statement(file_path, column_to_field_map=None, delimiters=None):
+	"""Yields the transactions of a CSV, MT940 or CAMT.053 statement as dicts of Bank Transaction fields"""
+	with open(file_path, "rb") as f:
+		head = f.read(64 * 1024).decode("utf-8", errors="ignore")
+
+	if head.lstrip().startswith("<"):
+		yield from read_camt_statement(file_path)
+	elif all(tag in head for tag in (":20:", ":61:")):
+		yield from read_mt940_statement(file_path)
+	else:
+		yield from read_csv_statement(file_path, column_to_field_map, delimiters)
+
+
+def read_csv_statement(file_path, column_to_field_map=None, delimiters=None):
+	"""Yields the rows of a CSV statement, mapping its columns like the Data Import preview"""
+	column_to_field_map = column_to_field_map or {}
+	meta = frappe.get_meta("Bank Transaction")
+	fields_by_label = {}
+	for df in meta.fields:
+		fields_by_label.setdefault(cstr(df.label).lower(), df.fieldname)
+		fields_by_label.setdefault(df.fieldname, df.fieldname)
+
+	with open(file_path, encoding="utf-8-sig", newline="") as f:
+		dialect = "excel"
+		if delimiters:
+			dialect = csv.Sniffer().sniff(f.read(64 * 1024), delimiters=delimiters)
+			f.seek(0)
+
+		reader = csv.reader(f, dialect)
+		header = next(reader, None) or []
+
+		columns = []
+		for column in header:
+			fieldname = column_to_field_map.get(column) or fields_by_label.get(column.strip().lower())
+			columns.append(fieldname if fieldname in BANK_TRANSACTION_FIELDS else None)
+
+		for row_index, row in enumerate(reader, start=2):
+			if not any(cstr(value).strip() for value in row):
+				continue
+
+			transaction = frappe._dict(row_index=row_index)
+			for fieldname, value in zip(columns, row, strict=False):
+				if fieldname and cstr(value).strip():
+					transaction[fieldname] = value.strip()
+
+			yield transaction
+
+
+def read_mt940_statement(file_path):
+	"""Yields the transactions of an MT940 file, parsing it one statement (":20:" block) at a time"""
+	row_index = 0
+	for statement in iter_mt940_statements(file_path):
+		for txn in mt940.parse(statement):
+			row_index += 1
+			yield frappe._dict(get_mt940_transaction(txn), row_index=row_index)
+
+
+def iter_mt940_statements(file_path):
+	lines = []
+	with open(file_path, encoding="utf-8", errors="replace") as f:
+		for line in f:
+			if line.startswith(":20:") and any(previous.startswith(":61:") for previous in lines):
+				yield "".join(lines)
+				lines = []
+
+			lines.append(line)
+
+	if lines:
+		yield "".join(lines)
+
+
+def get_mt940_transaction(txn):
+	"""Returns the Bank Transaction fields of a transaction parsed by `mt940`"""
+	txn_date = getattr(txn, "date", None)
+	raw_date = txn.data.get("date", "")
+
+	if txn_date:
+		date_str = txn_date.strftime("%Y-%m-%d")
+	elif isinstance(raw_date, date | datetime):
+		date_str = raw_date.strftime("%Y-%m-%d")
+	else:
+		date_str = str(raw_date)
+
+	raw_amount = str(txn.data.get("amount", ""))
+	parts = raw_amount.strip().split()
+	amount_value = float(parts[0]) if parts else 0.0
+
+	return {
+		"date": date_str,
+		"deposit": amount_value if amount_value > 0 else 0.0,
+		"withdrawal": abs(amount_value) if amount_value < 0 else 0.0,
+		"description": txn.data.get("extra_details") or "",
+		"reference_number": txn.data.get("transaction_reference") or "",
+		"currency": txn.data.get("currency", ""),
+	}
+
+
+def read_camt_statement(file_path):
+	"""Yields the entries (Ntry) of a CAMT.053 statement, releasing each one once read"""
+	row_index = 0
+	for _event, element in ElementTree.iterparse(file_path, events=("end",)):
+		if get_local_name(element.tag) != "Ntry":
+			continue
+
+		row_index += 1
+		yield frappe._dict(get_camt_transaction(element), row_index=row_index)
+		element.clear()
+
+
+def get_camt_transaction(entry):
+	"""Returns the Bank Transaction fields of a CAMT.053 entry"""
+	amount = find(entry, "Amt")
+	is_credit = find_text(entry, "CdtDbtInd") == "CRDT"
+	details = find(entry, "NtryDtls", "TxDtls")
+
+	# the counterparty is the debtor of a credit and the creditor of a debit
+	party_role = "Dbtr" if is_credit else "Cdtr"
+	party = find(details, "RltdPties", party_role)
+	party_account = find(details, "RltdPties", f"{party_role}Acct", "Id")
+
+	transaction_date = find_text(entry, "BookgDt", "Dt") or find_text(entry, "BookgDt", "DtTm")
+	value = flt(amount.text if amount is not None else 0)
+
+	return {
+		"date": cstr(transaction_date)[:10],
+		"deposit": value if is_credit else 0.0,
+		"withdrawal": 0.0 if is_credit else value,
+		"currency": amount.get("Ccy") if amount is not None else None,
+		"description": " ".join(
+			text
+			for text in (
+				find_text(details, "RmtInf", "Ustrd"),
+				find_text(entry, "AddtlNtryInf"),
+			)
+			if text
+		),
+		"reference_number": find_text(details, "Refs", "EndToEndId")
+		or find_text(entry, "AcctSvcrRef")
+		or find_text(details, "Refs", "AcctSvcrRef"),
+		"transaction_id": find_text(details, "Refs", "TxId") or find_text(entry, "NtryRef"),
+		"transaction_type": find_text(entry, "BkTxCd", "Prtry", "Cd"),
+		"bank_party_name": find_text(party, "Nm") or find_text(party, "Pty", "Nm"),
+		"bank_party_iban": find_text(party_account, "IBAN"),
+		"bank_party_account_number": find_text(party_account, "Othr", "Id"),
+	}
+
+
+def get_local_name(tag):
+	"""Returns the tag without its namespace, as CAMT versions use different namespaces"""
+	return tag.rsplit("}", 1)[-1]
+
+
+def find(element, *path):
+	"""Returns the first descendant of `element` along the `path` of local names"""
+	for name in path:
+		if element is None:
+			return None
+
+		element = next((child for child in element if get_local_name(child.tag) == name), None)
+
+	return element
+
+
+def find_text(element, *path):
+	element = find(element, *path)
+	if element is not None and element.text:
+		return element.text.strip()
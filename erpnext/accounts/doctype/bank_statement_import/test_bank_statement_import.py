@@ -1,10 +1,180 @@
 # Copyright (c) 2020, Frappe Technologies and Contributors
 # See license.txt
-# import frappe
-import unittest
+import os
+import tempfile
 
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import getdate
+from frappe.utils.file_manager import save_file
+
+from erpnext.accounts.doctype.bank_statement_import.statement_importer import (
+	import_statement,
+	read_statement,
+)
+from erpnext.accounts.doctype.bank_transaction.test_bank_transaction import (
+	create_bank_account,
+	create_gl_account,
+)
+
+CAMT_STATEMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.02">
+<BkToCstmrStmt><Stmt>
+<Ntry>
+	<Amt Ccy="INR">1500.00</Amt>
+	<CdtDbtInd>CRDT</CdtDbtInd>
+	<BookgDt><Dt>2025-01-03</Dt></BookgDt>
+	<AcctSvcrRef>REF-1</AcctSvcrRef>
+	<NtryDtls><TxDtls>
+		<RltdPties>
+			<Dbtr><Nm>Acme Corp</Nm></Dbtr>
+			<DbtrAcct><Id><IBAN>DE89370400440532013000</IBAN></Id></DbtrAcct>
+		</RltdPties>
+		<RmtInf><Ustrd>Invoice 42</Ustrd></RmtInf>
+	</TxDtls></NtryDtls>
+</Ntry>
+<Ntry>
+	<Amt Ccy="INR">250.50</Amt>
+	<CdtDbtInd>DBIT</CdtDbtInd>
+	<BookgDt><Dt>2025-01-04</Dt></BookgDt>
+	<NtryDtls><TxDtls><Refs><EndToEndId>E2E-2</EndToEndId></Refs></TxDtls></NtryDtls>
+</Ntry>
+</Stmt></BkToCstmrStmt>
+</Document>
+"""
 
 
 class TestBankStatementImport(IntegrationTestCase):
-	pass
+	def test_read_camt_statement(self):
+		with tempfile.NamedTemporaryFile("w", suffix=".xml", delete=False) as f:
+			f.write(CAMT_STATEMENT)
+
+		try:
+			rows = list(read_statement(f.name))
+		finally:
+			os.remove(f.name)
+
+		self.assertEqual(len(rows), 2)
+		self.assertEqual(rows[0].date, "2025-01-03")
+		self.assertEqual(rows[0].deposit, 1500.0)
+		self.assertEqual(rows[0].withdrawal, 0.0)
+		self.assertEqual(rows[0].reference_number, "REF-1")
+		self.assertEqual(rows[0].bank_party_name, "Acme Corp")
+		self.assertEqual(rows[0].bank_party_iban, "DE89370400440532013000")
+		self.assertEqual(rows[0].description, "Invoice 42")
+		self.assertEqual(rows[1].withdrawal, 250.5)
+		self.assertEqual(rows[1].reference_number, "E2E-2")
+
+	def test_stream_import_skips_imported_lines(self):
+		uniq_identifier = frappe.generate_hash(length=10)
+		gl_account = create_gl_account("_Test Bank " + uniq_identifier)
+		bank_account = create_bank_account(
+			gl_account=gl_account, bank_account_name="Checking Account " + uniq_identifier
+		)
+
+		lines = [
+			"Date,Deposit,Withdrawal,Description,Reference Number",
+			"2025-01-03,1500,,Invoice 42,REF-1",
+			"2025-01-04,,250.50,Bank charges,REF-2",
+			# the same line twice in a statement are two transactions
+			"2025-01-04,,250.50,Bank charges,REF-2",
+		]
+
+		data_import = frappe.get_doc(
+			{
+				"doctype": "Bank Statement Import",
+				"company": "_Test Company",
+				"bank_account": bank_account,
+				"bank": "Citi Bank",
+				"reference_doctype": "Bank Transaction",
+				"import_type": "Insert New Records",
+				"submit_after_import": 1,
+				"stream_import": 1,
+			}
+		).insert()
+
+		def import_lines(lines):
+			file = save_file(
+				f"statement-{frappe.generate_hash(length=6)}.csv",
+				"\n".join(lines).encode(),
+				data_import.doctype,
+				data_import.name,
+				is_private=True,
+			)
+			data_import.db_set("import_file", file.file_url)
+			import_statement(data_import.name)
+
+			return frappe.get_all(
+				"Bank Transaction",
+				filters={"bank_account": bank_account},
+				fields=["date", "deposit", "withdrawal", "unallocated_amount", "status", "docstatus"],
+				order_by="name",
+			)
+
+		transactions = import_lines(lines)
+		self.assertEqual(len(transactions), 3)
+		self.assertEqual(transactions[0].date, getdate("2025-01-03"))
+		self.assertEqual(transactions[0].deposit, 1500)
+		self.assertEqual(transactions[0].unallocated_amount, 1500)
+		self.assertEqual(transactions[1].withdrawal, 250.5)
+		self.assertEqual({t.status for t in transactions}, {"Unreconciled"})
+		self.assertEqual({t.docstatus for t in transactions}, {1})
+		self.assertEqual(frappe.db.get_value("Bank Statement Import", data_import.name, "status"), "Success")
+
+		# importing an extended statement only imports the new lines
+		transactions = import_lines([*lines, "2025-01-05,300,,Invoice 43,REF-3"])
+		self.assertEqual(len(transactions), 4)
+		self.assertEqual(transactions[3].deposit, 300)
+
+	def test_stream_import_fails_lines_with_used_transaction_id(self):
+		uniq_identifier = frappe.generate_hash(length=10)
+		gl_account = create_gl_account("_Test Bank " + uniq_identifier)
+		bank_account = create_bank_account(
+			gl_account=gl_account, bank_account_name="Checking Account " + uniq_identifier
+		)
+
+		lines = [
+			"Date,Deposit,Withdrawal,Description,Transaction ID",
+			f"2025-01-03,1500,,Invoice 42,{uniq_identifier}-1",
+			# the same transaction ID with another description
+			f"2025-01-03,1500,,Invoice 42 paid,{uniq_identifier}-1",
+			f"2025-01-04,,250.50,Bank charges,{uniq_identifier}-2",
+		]
+
+		data_import = frappe.get_doc(
+			{
+				"doctype": "Bank Statement Import",
+				"company": "_Test Company",
+				"bank_account": bank_account,
+				"bank": "Citi Bank",
+				"reference_doctype": "Bank Transaction",
+				"import_type": "Insert New Records",
+				"stream_import": 1,
+			}
+		).insert()
+
+		file = save_file(
+			f"statement-{frappe.generate_hash(length=6)}.csv",
+			"\n".join(lines).encode(),
+			data_import.doctype,
+			data_import.name,
+			is_private=True,
+		)
+		data_import.db_set("import_file", file.file_url)
+		import_statement(data_import.name)
+
+		transactions = frappe.get_all(
+			"Bank Transaction", filters={"bank_account": bank_account}, pluck="description", order_by="name"
+		)
+		self.assertEqual(transactions, ["Invoice 42", "Bank charges"])
+		self.assertEqual(
+			frappe.db.get_value("Bank Statement Import", data_import.name, "status"), "Partial Success"
+		)
+		self.assertEqual(
+			frappe.get_all(
+				"Data Import Log",
+				filters={"data_import": data_import.name, "success": 0},
+				pluck="row_indexes",
+			),
+			["[3]"],
+		)
@@ -108,9 +108,7 @@ class AutoMatchbyPartyNameDescription:
 		parties = get_parties_in_order(self.deposit)
 
 		for party in parties:
-			filters = {"status": "Active"} if party == "Employee" else {"disabled": 0}
-			field = f"{party.lower()}_name"
-			names = frappe.get_all(party, filters=filters, fields=[f"{field} as party_name", "name"])
+			names = self.get_party_names(party)
 
 			for field in ["bank_party_name", "description"]:
 				if not self.get(field):
@@ -127,6 +125,21 @@ class AutoMatchbyPartyNameDescription:
 
 		return result
 
+	def get_party_names(self, party: str) -> list:
+		"""Returns the names of the parties, from `party_names` if passed to match many transactions"""
+		party_names = self.get("party_names")
+		if party_names is not None and party in party_names:
+			return party_names[party]
+
+		filters = {"status": "Active"} if party == "Employee" else {"disabled": 0}
+		field = f"{party.lower()}_name"
+		names = frappe.get_all(party, filters=filters, fields=[f"{field} as party_name", "name"])
+
+		if party_names is not None:
+			party_names[party] = names
+
+		return names
+
 	def fuzzy_search_and_return_result(self, party, names, field) -> tuple | None:
 		skip = False
 		result = process.extract(
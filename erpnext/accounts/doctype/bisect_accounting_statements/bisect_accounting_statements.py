@@ -3,13 +3,16 @@
 
 import datetime
 from collections import deque
+from itertools import accumulate
 from math import floor
 
 import frappe
 from dateutil.relativedelta import relativedelta
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import getdate
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Sum
+from frappe.utils import flt, getdate
 from frappe.utils.data import guess_date_format
 
 
@@ -51,6 +54,7 @@ class BisectAccountingStatements(Document):
 		node.root = None
 		node.period_from_date = from_date
 		node.period_to_date = to_date
+		self.set_node_summary(node)
 		node.insert()
 
 		period_queue = deque([node])
@@ -66,7 +70,7 @@ class BisectAccountingStatements(Document):
 				left_node.period_from_date = cur_node.period_from_date
 				left_node.period_to_date = next_to_date
 				left_node.root = cur_node.name
-				left_node.generated = False
+				self.set_node_summary(left_node)
 				left_node.insert()
 				cur_node.left_child = left_node.name
 				period_queue.append(left_node)
@@ -76,7 +80,7 @@ class BisectAccountingStatements(Document):
 				right_node.period_from_date = next_from_date
 				right_node.period_to_date = cur_node.period_to_date
 				right_node.root = cur_node.name
-				right_node.generated = False
+				self.set_node_summary(right_node)
 				right_node.insert()
 				cur_node.right_child = right_node.name
 				period_queue.append(right_node)
@@ -89,6 +93,7 @@ class BisectAccountingStatements(Document):
 		node.root = None
 		node.period_from_date = from_date
 		node.period_to_date = to_date
+		self.set_node_summary(node)
 		node.insert()
 
 		period_stack = [node]
@@ -104,7 +109,7 @@ class BisectAccountingStatements(Document):
 				left_node.period_from_date = cur_node.period_from_date
 				left_node.period_to_date = next_to_date
 				left_node.root = cur_node.name
-				left_node.generated = False
+				self.set_node_summary(left_node)
 				left_node.insert()
 				cur_node.left_child = left_node.name
 				period_stack.append(left_node)
@@ -114,7 +119,7 @@ class BisectAccountingStatements(Document):
 				right_node.period_from_date = next_from_date
 				right_node.period_to_date = cur_node.period_to_date
 				right_node.root = cur_node.name
-				right_node.generated = False
+				self.set_node_summary(right_node)
 				right_node.insert()
 				cur_node.right_child = right_node.name
 				period_stack.append(right_node)
@@ -130,6 +135,9 @@ class BisectAccountingStatements(Document):
 		from_date = datetime.datetime.strptime(self.from_date, dt_format)
 		to_date = datetime.datetime.strptime(self.to_date, dt_format)
 
+		# the summaries of all the nodes are computed from one pass over the ledger
+		self.prefix_sums = StatementPrefixSums(self.company, from_date, to_date)
+
 		if self.algorithm == "BFS":
 			self.bfs(from_date, to_date)
 
@@ -145,20 +153,25 @@ class BisectAccountingStatements(Document):
 		self.get_report_summary()
 		self.save()
 
+	def get_prefix_sums(self):
+		if not self.get("prefix_sums"):
+			self.prefix_sums = StatementPrefixSums(self.company, self.from_date, self.to_date)
+
+		return self.prefix_sums
+
 	def get_report_summary(self):
-		filters = {
-			"company": self.company,
-			"filter_based_on": "Date Range",
-			"period_start_date": self.current_from_date,
-			"period_end_date": self.current_to_date,
-			"periodicity": "Yearly",
-		}
-		pl_summary = frappe.get_doc("Report", "Profit and Loss Statement")
-		self.p_l_summary = pl_summary.execute_script_report(filters=filters)[5]
-		bs_summary = frappe.get_doc("Report", "Balance Sheet")
-		self.b_s_summary = bs_summary.execute_script_report(filters=filters)[5]
+		self.p_l_summary, self.b_s_summary = self.get_prefix_sums().get_summary(
+			self.current_from_date, self.current_to_date
+		)
 		self.difference = abs(self.p_l_summary - self.b_s_summary)
 
+	def set_node_summary(self, node):
+		node.profit_loss_summary, node.balance_sheet_summary = self.get_prefix_sums().get_summary(
+			node.period_from_date, node.period_to_date
+		)
+		node.difference = abs(node.profit_loss_summary - node.balance_sheet_summary)
+		node.generated = True
+
 	def update_node(self):
 		current_node = frappe.get_doc("Bisect Nodes", self.current_node)
 		current_node.balance_sheet_summary = self.b_s_summary
@@ -173,8 +186,8 @@ class BisectAccountingStatements(Document):
 
 	def fetch_summary_info_from_current_node(self):
 		current_node = frappe.get_doc("Bisect Nodes", self.current_node)
-		self.p_l_summary = current_node.balance_sheet_summary
-		self.b_s_summary = current_node.profit_loss_summary
+		self.p_l_summary = current_node.profit_loss_summary
+		self.b_s_summary = current_node.balance_sheet_summary
 		self.difference = abs(self.p_l_summary - self.b_s_summary)
 
 	def fetch_or_calculate(self):
@@ -225,3 +238,68 @@ class BisectAccountingStatements(Document):
 				self.save()
 			else:
 				frappe.msgprint(_("Reached Root"))
+
+
+class StatementPrefixSums:
+	"""
+	Running totals, by day, of the net profit of the Profit and Loss Statement and of the summary of
+	the Balance Sheet (assets - liabilities + equity), for the period of the bisection.
+
+	Both reports summarise the movements of the ledger between the dates of a node, so the summaries
+	of any node are the differences of the running totals at its end date and before its start date.
+	"""
+
+	def __init__(self, company, from_date, to_date):
+		self.from_date = getdate(from_date)
+		days = (getdate(to_date) - self.from_date).days + 1
+		profit_loss, balance_sheet = [0.0] * days, [0.0] * days
+
+		for posting_date, root_type, balance, closing_balance in self.get_balances(
+			company, self.from_date, getdate(to_date)
+		):
+			day = (getdate(posting_date) - self.from_date).days
+			if root_type in ("Income", "Expense"):
+				# net profit, without the Period Closing Vouchers
+				profit_loss[day] -= flt(balance) - flt(closing_balance)
+			elif root_type == "Equity":
+				balance_sheet[day] -= flt(balance)
+			else:
+				balance_sheet[day] += flt(balance)
+
+		self.profit_loss = [0.0, *accumulate(profit_loss)]
+		self.balance_sheet = [0.0, *accumulate(balance_sheet)]
+
+	def get_balances(self, company, from_date, to_date):
+		"""Debit - credit of the ledger by day and root type, with the part of the Period Closing Vouchers"""
+		gle = frappe.qb.DocType("GL Entry")
+		account = frappe.qb.DocType("Account")
+		balance = gle.debit - gle.credit
+
+		return (
+			frappe.qb.from_(gle)
+			.join(account)
+			.on(account.name == gle.account)
+			.select(
+				gle.posting_date,
+				account.root_type,
+				Sum(balance),
+				Sum(Case().when(gle.voucher_type == "Period Closing Voucher", balance).else_(0)),
+			)
+			.where(gle.company == company)
+			.where(gle.is_cancelled == 0)
+			.where(gle.posting_date.between(from_date, to_date))
+			.where((gle.finance_book == "") | gle.finance_book.isnull())
+			.groupby(gle.posting_date, account.root_type)
+		).run()
+
+	def get_summary(self, from_date, to_date):
+		"""Returns the net profit and the Balance Sheet summary from `from_date` to `to_date`"""
+		start = max((getdate(from_date) - self.from_date).days, 0)
+		end = min((getdate(to_date) - self.from_date).days + 1, len(self.profit_loss) - 1)
+		if end <= start:
+			return 0.0, 0.0
+
+		return (
+			flt(self.profit_loss[end] - self.profit_loss[start], 3),
+			flt(self.balance_sheet[end] - self.balance_sheet[start], 3),
+		)
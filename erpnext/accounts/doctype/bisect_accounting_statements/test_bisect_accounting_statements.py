@@ -1,9 +1,37 @@
 # Copyright (c) 2023, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate, nowdate
+
+from erpnext.accounts.doctype.bisect_accounting_statements.bisect_accounting_statements import (
+	StatementPrefixSums,
+)
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
 
 
 class TestBisectAccountingStatements(IntegrationTestCase):
-	pass
+	def test_prefix_sums_match_reports(self):
+		create_sales_invoice(posting_date=add_days(nowdate(), -5), rate=400)
+		from_date, to_date = getdate(add_days(nowdate(), -30)), getdate(nowdate())
+		prefix_sums = StatementPrefixSums("_Test Company", from_date, to_date)
+
+		for period_start_date in (from_date, add_days(nowdate(), -5), add_days(nowdate(), -4)):
+			filters = {
+				"company": "_Test Company",
+				"filter_based_on": "Date Range",
+				"period_start_date": period_start_date,
+				"period_end_date": to_date,
+				"periodicity": "Yearly",
+			}
+			p_l_summary = frappe.get_doc("Report", "Profit and Loss Statement").execute_script_report(
+				filters=frappe._dict(filters)
+			)[5]
+			b_s_summary = frappe.get_doc("Report", "Balance Sheet").execute_script_report(
+				filters=frappe._dict(filters)
+			)[5]
+
+			summary = prefix_sums.get_summary(period_start_date, to_date)
+			self.assertAlmostEqual(summary[0], p_l_summary, 2)
+			self.assertAlmostEqual(summary[1], b_s_summary, 2)
@@ -448,6 +448,21 @@ class JournalEntry(AccountsController):
 		if self.voucher_type != "Depreciation Entry":
 			return
 
+		if self.flags.depreciation_schedule_rows:
+			# bulk depreciation entries link all their schedule rows at once
+			depr_schedule = frappe.qb.DocType("Depreciation Schedule")
+			(
+				frappe.qb.update(depr_schedule)
+				.set(depr_schedule.journal_entry, self.name)
+				.where(depr_schedule.name.isin(self.flags.depreciation_schedule_rows))
+				.where(depr_schedule.journal_entry.isnull())
+			).run()
+
+			if frappe.db.count("Depreciation Schedule", {"journal_entry": self.name}) != len(
+				self.flags.depreciation_schedule_rows
+			):
+				frappe.throw(_("Some of the depreciation schedule rows are already linked to another entry"))
+
 		for d in self.get("accounts"):
 			if (
 				d.reference_type == "Asset"
@@ -458,7 +473,8 @@ class JournalEntry(AccountsController):
 				asset = frappe.get_cached_doc("Asset", d.reference_name)
 
 				if asset.calculate_depreciation:
-					self.update_journal_entry_link_on_depr_schedule(asset, d)
+					if not self.flags.depreciation_schedule_rows:
+						self.update_journal_entry_link_on_depr_schedule(asset, d)
 					self.update_value_after_depreciation(asset, d.debit)
 
 				asset.db_set("value_after_depreciation", asset.value_after_depreciation - d.debit)
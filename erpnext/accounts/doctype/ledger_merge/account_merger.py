@@ -0,0 +1,115 @@
+"""
+Merges accounts by moving their links to the target account in bounded batches, committing after each
+batch, instead of renaming them with `frappe.rename_doc` in one transaction per account. The progress
+of every account is checkpointed on its Ledger Merge row so that a failed merge resumes where it stopped.
+The links added while the batches run are found by a plain read of every field and only those rows are
+moved, by name, in the transaction that deletes the account, and the nested set of the accounts is rebuilt once, after all the accounts
+are merged.
+"""
+
+import frappe
+from frappe import _
+from frappe.model.rename_doc import get_link_fields, rename_dynamic_links
+from frappe.utils.nestedset import rebuild_tree
+
+from erpnext.accounts.doctype.account.account import _ensure_idle_system, validate_account_merge
+
+MERGE_BATCH_SIZE = 5000
+
+# links that keep pointing to the merged account, the merge rows record which account was merged
+SKIPPED_LINK_FIELDS = {("Ledger Merge Accounts", "account")}
+
+
+class AccountMerger:
+	def __init__(self, account, batch_size=MERGE_BATCH_SIZE):
+		self.account = account
+		self.batch_size = batch_size
+		self.link_fields = get_account_link_fields()
+		self.tree_changed = False
+
+	def merge(self, row):
+		"""Moves the links of the account of the row to the target account and deletes it"""
+		old, new = row.account, self.account
+
+		_ensure_idle_system()
+		old_account, new_account = validate_account_merge(old, new)
+
+		if old_account.is_group and new_account.parent_account == old:
+			new_account.db_set("parent_account", old_account.parent_account)
+			self.tree_changed = True
+
+		if row.merge_checkpoint:
+			# a previous run may have moved the children of the account
+			self.tree_changed = True
+
+		for key, link in self.get_pending_link_fields(row.merge_checkpoint):
+			self.move_links(link, old, new)
+			row.db_set("merge_checkpoint", key)
+			frappe.db.commit()
+
+		# the batch commits release the lock of the idle check, the links added meanwhile, like drafts
+		# and masters, are moved again in the transaction that deletes the account
+		_ensure_idle_system()
+		for link in self.link_fields.values():
+			self.move_links(link, old, new, batched=False)
+
+		rename_dynamic_links("Account", old, new)
+		frappe.db.set_value("Account", {"old_parent": old}, "old_parent", new, update_modified=False)
+
+		frappe.db.delete("Account", old)
+		frappe.clear_document_cache("Account", old)
+		frappe.clear_document_cache("Account", new)
+		new_account.add_comment("Edit", _("merged {0} into {1}").format(frappe.bold(old), frappe.bold(new)))
+
+	def get_pending_link_fields(self, checkpoint):
+		keys = list(self.link_fields)
+		start = keys.index(checkpoint) + 1 if checkpoint in self.link_fields else 0
+		return [(key, self.link_fields[key]) for key in keys[start:]]
+
+	def move_links(self, link, old, new, batched=True):
+		if link.parent == "Account":
+			# children are moved without updating the nested set, it is rebuilt after the merge
+			self.tree_changed = True
+
+		if link.issingle:
+			frappe.db.sql(
+				"update `tabSingles` set value=%s where doctype=%s and field=%s and value=%s",
+				(new, link.parent, link.fieldname, old),
+			)
+			return
+
+		table = frappe.qb.DocType(link.parent)
+		if not batched:
+			# a plain read does not lock the rows it scans, only the rows left behind are updated by name
+			if names := frappe.get_all(link.parent, filters={link.fieldname: old}, pluck="name"):
+				frappe.qb.update(table).set(table[link.fieldname], new).where(table.name.isin(names)).run()
+			return
+
+		filters = {link.fieldname: old}
+		while names := frappe.get_all(
+			link.parent, filters=filters, pluck="name", limit=self.batch_size, order_by="name"
+		):
+			frappe.qb.update(table).set(table[link.fieldname], new).where(table.name.isin(names)).run()
+			frappe.db.commit()
+
+			# the next batch continues after the last row instead of scanning the table again
+			filters["name"] = (">", names[-1])
+
+	def rebuild_tree(self):
+		if self.tree_changed:
+			rebuild_tree("Account")
+			frappe.db.commit()
+			self.tree_changed = False
+
+
+def get_account_link_fields():
+	"""Returns the fields linking to Account by `Doctype.fieldname`, in the order they are merged"""
+	link_fields = {}
+	for link in get_link_fields("Account"):
+		link = frappe._dict(link)
+		if (link.parent, link.fieldname) in SKIPPED_LINK_FIELDS:
+			continue
+
+		link_fields[f"{link.parent}.{link.fieldname}"] = link
+
+	return dict(sorted(link_fields.items()))
@@ -6,7 +6,7 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils.background_jobs import is_job_enqueued
 
-from erpnext.accounts.doctype.account.account import merge_account
+from erpnext.accounts.doctype.ledger_merge.account_merger import AccountMerger
 
 
 class LedgerMerge(Document):
@@ -60,16 +60,15 @@ def form_start_merge(docname):
 
 
 def start_merge(docname):
+	"""Merges the accounts that are not merged yet, resuming the ones a previous run left halfway"""
 	ledger_merge = frappe.get_doc("Ledger Merge", docname)
-	successful_merges = 0
+	merger = AccountMerger(ledger_merge.account)
+	successful_merges = sum(row.merged for row in ledger_merge.merge_accounts)
 	total = len(ledger_merge.merge_accounts)
 	for row in ledger_merge.merge_accounts:
 		if not row.merged:
 			try:
-				merge_account(
-					row.account,
-					ledger_merge.account,
-				)
+				merger.merge(row)
 				row.db_set("merged", 1)
 				frappe.db.commit()
 				successful_merges += 1
@@ -88,4 +87,5 @@ def start_merge(docname):
 				else:
 					ledger_merge.db_set("status", "Error")
 
+	merger.rebuild_tree()
 	frappe.publish_realtime("ledger_merge_refresh", {"ledger_merge": ledger_merge.name})
@@ -1,10 +1,13 @@
 # Copyright (c) 2021, Wahni Green Technologies Pvt. Ltd. and Contributors
 # See license.txt
 import unittest
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase
 
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.ledger_merge.account_merger import AccountMerger, get_account_link_fields
 from erpnext.accounts.doctype.ledger_merge.ledger_merge import start_merge
 
 
@@ -102,7 +105,46 @@ class TestLedgerMerge(IntegrationTestCase):
 		self.assertFalse(frappe.db.exists("Account", "Indirect Test Income - _TC"))
 		self.assertTrue(frappe.db.exists("Account", "Administrative Test Income - _TC"))
 
+	def test_merge_in_batches(self):
+		for account_name in ("Test Merge Source", "Test Merge Target"):
+			if not frappe.db.exists("Account", f"{account_name} - _TC"):
+				acc = frappe.new_doc("Account")
+				acc.account_name = account_name
+				acc.parent_account = "Expenses - _TC"
+				acc.company = "_Test Company"
+				acc.insert()
+
+		for _i in range(3):
+			make_journal_entry("Test Merge Source - _TC", "_Test Bank - _TC", 100, submit=True)
+
+		doc = frappe.get_doc(
+			{
+				"doctype": "Ledger Merge",
+				"company": "_Test Company",
+				"root_type": "Expense",
+				"account": "Test Merge Target - _TC",
+				"merge_accounts": [
+					{"account": "Test Merge Source - _TC", "account_name": "Test Merge Source"}
+				],
+			}
+		).insert(ignore_permissions=True)
+
+		row = doc.merge_accounts[0]
+		merger = AccountMerger(doc.account, batch_size=2)
+		# the batch commits of the merge are kept inside the test transaction
+		with patch("frappe.db.commit"):
+			merger.merge(row)
+			merger.rebuild_tree()
+
+		self.assertFalse(frappe.db.exists("Account", "Test Merge Source - _TC"))
+		self.assertEqual(frappe.db.count("GL Entry", {"account": "Test Merge Target - _TC"}), 3)
+		self.assertEqual(row.merge_checkpoint, list(get_account_link_fields())[-1])
+		self.assertEqual(
+			frappe.db.get_value("Ledger Merge Accounts", row.name, "account"), "Test Merge Source - _TC"
+		)
+
 	def tearDown(self):
+		frappe.db.rollback()
 		for entry in frappe.db.get_all("Ledger Merge"):
 			frappe.delete_doc("Ledger Merge", entry.name)
 
@@ -111,6 +153,8 @@ class TestLedgerMerge(IntegrationTestCase):
 			"Administrative Test Expenses - _TC",
 			"Indirect Test Income - _TC",
 			"Administrative Test Income - _TC",
+			"Test Merge Source - _TC",
+			"Test Merge Target - _TC",
 		]
 		for account in test_accounts:
 			frappe.delete_doc_if_exists("Account", account)
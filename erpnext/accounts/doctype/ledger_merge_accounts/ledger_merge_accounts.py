@@ -16,6 +16,7 @@ class LedgerMergeAccounts(Document):
 
 		account: DF.Link
 		account_name: DF.Data
+		merge_checkpoint: DF.Data | None
 		merged: DF.Check
 		parent: DF.Data
 		parentfield: DF.Data
@@ -5,7 +5,6 @@
 import frappe
 from frappe import _, bold
 from frappe.model.mapper import map_child_doc, map_doc
-from frappe.query_builder.functions import IfNull, Sum
 from frappe.utils import cint, flt, get_link_to_form, getdate, nowdate
 from frappe.utils.nestedset import get_descendants_of
 
@@ -20,6 +19,10 @@ from erpnext.accounts.party import get_due_date, get_party_account
 from erpnext.controllers.queries import item_query as _item_query
 from erpnext.controllers.sales_and_purchase_return import get_sales_invoice_item_from_consolidated_invoice
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.stock_availability import (
+	get_stock_availability_map,
+	invalidate_stock_availability_for_pos_invoices,
+)
 
 
 class POSInvoice(SalesInvoice):
@@ -238,6 +241,7 @@ class POSInvoice(SalesInvoice):
 			self.apply_loyalty_points()
 		self.check_phone_payments()
 		self.set_status(update=True)
+		invalidate_stock_availability_for_pos_invoices([self])
 		self.make_bundle_for_sales_purchase_return()
 		for table_name in ["items", "packed_items"]:
 			self.make_bundle_using_old_serial_batch_fields(table_name)
@@ -283,6 +287,7 @@ class POSInvoice(SalesInvoice):
 			against_psi_doc.make_loyalty_point_entry()
 
 		self.db_set("status", "Cancelled")
+		invalidate_stock_availability_for_pos_invoices([self])
 
 		if self.coupon_code:
 			from erpnext.accounts.doctype.pricing_rule.utils import update_coupon_code_count
@@ -390,12 +395,22 @@ class POSInvoice(SalesInvoice):
 
 		from erpnext.stock.stock_ledger import is_negative_stock_allowed
 
+		items_by_warehouse = {}
+		for d in self.get("items"):
+			if not d.serial_and_batch_bundle:
+				items_by_warehouse.setdefault(d.warehouse, []).append(d.item_code)
+
+		availability = {
+			warehouse: get_stock_availability_map(item_codes, warehouse)
+			for warehouse, item_codes in items_by_warehouse.items()
+		}
+
 		for d in self.get("items"):
 			if not d.serial_and_batch_bundle:
 				if is_negative_stock_allowed(item_code=d.item_code):
 					return
 
-				available_stock, is_stock_item = get_stock_availability(d.item_code, d.warehouse)
+				available_stock, is_stock_item = availability[d.warehouse][d.item_code]
 
 				item_code, warehouse, _qty = (
 					frappe.bold(d.item_code),
@@ -853,105 +868,7 @@ class POSInvoice(SalesInvoice):
 
 @frappe.whitelist()
 def get_stock_availability(item_code, warehouse):
-	if frappe.db.get_value("Item", item_code, "is_stock_item"):
-		is_stock_item = True
-		bin_qty = get_bin_qty(item_code, warehouse)
-		pos_sales_qty = get_pos_reserved_qty(item_code, warehouse)
-
-		return bin_qty - pos_sales_qty, is_stock_item
-	else:
-		is_stock_item = True
-		if frappe.db.exists("Product Bundle", {"name": item_code, "disabled": 0}):
-			return get_bundle_availability(item_code, warehouse), is_stock_item
-		else:
-			is_stock_item = False
-			# Is a service item or non_stock item
-			return 0, is_stock_item
-
-
-def get_bundle_availability(bundle_item_code, warehouse):
-	product_bundle = frappe.get_doc("Product Bundle", bundle_item_code)
-
-	bundle_bin_qty = 1000000
-	for item in product_bundle.items:
-		item_bin_qty = get_bin_qty(item.item_code, warehouse)
-
-		max_available_bundles = item_bin_qty / item.qty
-		if bundle_bin_qty > max_available_bundles and frappe.get_value(
-			"Item", item.item_code, "is_stock_item"
-		):
-			bundle_bin_qty = max_available_bundles
-
-	pos_sales_qty = get_pos_reserved_qty(bundle_item_code, warehouse)
-	return bundle_bin_qty - pos_sales_qty
-
-
-def get_bin_qty(item_code, warehouse):
-	bin_qty = frappe.db.sql(
-		"""select actual_qty from `tabBin`
-		where item_code = %s and warehouse = %s
-		limit 1""",
-		(item_code, warehouse),
-		as_dict=1,
-	)
-
-	return bin_qty[0].actual_qty or 0 if bin_qty else 0
-
-
-def get_pos_reserved_qty(item_code, warehouse):
-	"""
-	Calculate total quantity reserved for the given item and warehouse.
-
-	Includes:
-	- Direct sales of the item in submitted POS Invoices
-	- Sales of the item as a component of a Product Bundle
-
-	Excludes consolidated invoices (already merged into Sales Invoices via
-	POS Closing Entry). Used to reflect near real-time availability in the
-	POS UI and to prevent overselling while multiple sessions may be active.
-	"""
-	pinv_item_reserved_qty = get_pos_reserved_qty_from_table("POS Invoice Item", item_code, warehouse)
-	packed_item_reserved_qty = get_pos_reserved_qty_from_table("Packed Item", item_code, warehouse)
-
-	reserved_qty = pinv_item_reserved_qty + packed_item_reserved_qty
-
-	return reserved_qty
-
-
-def get_pos_reserved_qty_from_table(child_table, item_code, warehouse):
-	"""
-	Get the total reserved quantity for a given item in POS Invoices
-	from a specific child table.
-
-	Args:
-	  child_table (str): Name of the child table to query
-	                (e.g., "POS Invoice Item", "Packed Item").
-	  item_code (str): The Item Code to filter by.
-	  warehouse (str): The Warehouse to filter by.
-
-	Returns:
-	  float: The total reserved quantity for the item in the given
-	                warehouse from submitted, unconsolidated POS Invoices.
-	"""
-	p_inv = frappe.qb.DocType("POS Invoice")
-	p_item = frappe.qb.DocType(child_table)
-
-	qty_column = "qty" if child_table == "Packed Item" else "stock_qty"
-
-	reserved_qty = (
-		frappe.qb.from_(p_inv)
-		.from_(p_item)
-		.select(Sum(p_item[qty_column]).as_("stock_qty"))
-		.where(
-			(p_inv.name == p_item.parent)
-			& (IfNull(p_inv.consolidated_invoice, "") == "")
-			& (p_item.docstatus == 1)
-			& (p_item.item_code == item_code)
-			& (p_item.warehouse == warehouse)
-		)
-	).run(as_dict=True)
-
-	return flt(reserved_qty[0].stock_qty) if reserved_qty else 0
+	return get_stock_availability_map([item_code], warehouse)[item_code]
 
 
 @frappe.whitelist()
@@ -953,6 +953,42 @@ class TestPOSInvoice(IntegrationTestCase):
 		pos_inv2.delete()
 		se.cancel()
 
+	def test_stock_availability_cache(self):
+		from erpnext.accounts.doctype.pos_invoice.pos_invoice import get_stock_availability
+		from erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log import (
+			consolidate_pos_invoices,
+		)
+		from erpnext.stock.stock_availability import (
+			CACHE_EXPIRY,
+			get_cache_key,
+			get_stock_availability_map,
+		)
+
+		frappe.db.sql("delete from `tabPOS Invoice`")
+		warehouse = "_Test Warehouse - _TC"
+		item = make_item("_Test POS Availability Item", {"is_stock_item": 1}).name
+		make_stock_entry(target=warehouse, item_code=item, qty=10, basic_rate=100)
+
+		self.assertEqual(get_stock_availability(item, warehouse), (10, True))
+		ttl = frappe.cache.ttl(frappe.cache.make_key(get_cache_key(warehouse)))
+		self.assertTrue(0 < ttl <= CACHE_EXPIRY)
+
+		# reserved by a submitted POS Invoice
+		pos_inv = create_pos_invoice(item=item, qty=3, rate=100, do_not_submit=1)
+		pos_inv.append("payments", {"mode_of_payment": "Cash", "amount": 300})
+		pos_inv.submit()
+		self.assertEqual(get_stock_availability(item, warehouse), (7, True))
+
+		# received stock is reflected through the bin
+		make_stock_entry(target=warehouse, item_code=item, qty=5, basic_rate=100)
+		availability = get_stock_availability_map([item, "_Test Non Stock Item"], warehouse)
+		self.assertEqual(availability[item], (12, True))
+		self.assertEqual(availability["_Test Non Stock Item"], (0, False))
+
+		# consolidation moves the reservation into the Sales Invoice's stock ledger entries
+		consolidate_pos_invoices()
+		self.assertEqual(get_stock_availability(item, warehouse), (12, True))
+
 	def test_ignore_pricing_rule(self):
 		from erpnext.accounts.doctype.pricing_rule.test_pricing_rule import make_pricing_rule
 
@@ -9,15 +9,20 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.model.mapper import map_child_doc, map_doc
-from frappe.utils import cint, flt, get_time, getdate, nowdate, nowtime
+from frappe.utils import cint, create_batch, flt, get_time, getdate, nowdate, nowtime
 from frappe.utils.background_jobs import enqueue, is_job_enqueued
 from frappe.utils.scheduler import is_scheduler_inactive
 
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_checks_for_pl_and_bs_accounts,
 )
-from erpnext.controllers.sales_and_purchase_return import get_sales_invoice_item_from_consolidated_invoice
 from erpnext.controllers.taxes_and_totals import ItemWiseTaxDetail
+from erpnext.stock.stock_availability import invalidate_stock_availability_for_pos_invoices
+
+# Maximum number of POS Invoices merged into one Sales Invoice. Larger groups are split into
+# several merge logs, each committed on its own, so that huge closings stay within the job timeout.
+MERGE_LOG_CHUNK_SIZE = 500
+PARALLEL_MERGE_JOBS = 4
 
 
 class POSInvoiceMergeLog(Document):
@@ -207,15 +212,16 @@ class POSInvoiceMergeLog(Document):
 		return return_invoices
 
 	def merge_pos_invoice_into(self, invoice, data):
-		items, payments, taxes = [], [], []
-
-		loyalty_amount_sum, loyalty_points_sum = 0, 0
+		items, payments, taxes = [], {}, {}
+		item_wise_tax_details = {}
 
 		rounding_adjustment, base_rounding_adjustment = 0, 0
 		rounded_total, base_rounded_total = 0, 0
 
 		loyalty_amount_sum, loyalty_points_sum, idx = 0, 0, 1
 
+		sales_invoice_item_map = get_sales_invoice_item_map_for_returns(data)
+
 		for doc in data:
 			map_doc(doc, invoice, table_map={"doctype": invoice.doctype})
 
@@ -238,24 +244,24 @@ class POSInvoiceMergeLog(Document):
 				si_item.pos_invoice = doc.name
 				si_item.pos_invoice_item = item.name
 				if doc.is_return:
-					si_item.sales_invoice_item = get_sales_invoice_item_from_consolidated_invoice(
-						doc.return_against, item.pos_invoice_item
+					si_item.sales_invoice_item = sales_invoice_item_map.get(
+						(doc.return_against, item.pos_invoice_item)
 					)
 				if item.serial_and_batch_bundle:
 					si_item.serial_and_batch_bundle = item.serial_and_batch_bundle
 				items.append(si_item)
 
 			for tax in doc.get("taxes"):
-				found = False
-				for t in taxes:
-					if t.account_head == tax.account_head and t.cost_center == tax.cost_center:
-						t.tax_amount = flt(t.tax_amount) + flt(tax.tax_amount_after_discount_amount)
-						t.base_tax_amount = flt(t.base_tax_amount) + flt(
-							tax.base_tax_amount_after_discount_amount
-						)
-						update_item_wise_tax_detail(t, tax)
-						found = True
-				if not found:
+				key = (tax.account_head, tax.cost_center)
+				if t := taxes.get(key):
+					t.tax_amount = flt(t.tax_amount) + flt(tax.tax_amount_after_discount_amount)
+					t.base_tax_amount = flt(t.base_tax_amount) + flt(
+						tax.base_tax_amount_after_discount_amount
+					)
+					if key not in item_wise_tax_details:
+						item_wise_tax_details[key] = json.loads(t.item_wise_tax_detail or "{}") or {}
+					merge_item_wise_tax_detail(item_wise_tax_details[key], tax)
+				else:
 					tax.charge_type = "Actual"
 					tax.idx = idx
 					tax.row_id = None
@@ -264,31 +270,33 @@ class POSInvoiceMergeLog(Document):
 					tax.tax_amount = tax.tax_amount_after_discount_amount
 					tax.base_tax_amount = tax.base_tax_amount_after_discount_amount
 					tax.item_wise_tax_detail = tax.item_wise_tax_detail
-					taxes.append(tax)
+					taxes[key] = tax
 
 			for payment in doc.get("payments"):
-				found = False
-				for pay in payments:
-					if pay.account == payment.account and pay.mode_of_payment == payment.mode_of_payment:
-						pay.amount = flt(pay.amount) + flt(payment.amount)
-						pay.base_amount = flt(pay.base_amount) + flt(payment.base_amount)
-						found = True
-				if not found:
-					payments.append(payment)
+				key = (payment.account, payment.mode_of_payment)
+				if pay := payments.get(key):
+					pay.amount = flt(pay.amount) + flt(payment.amount)
+					pay.base_amount = flt(pay.base_amount) + flt(payment.base_amount)
+				else:
+					payments[key] = payment
 
 			rounding_adjustment += doc.rounding_adjustment
 			rounded_total += doc.rounded_total
 			base_rounding_adjustment += doc.base_rounding_adjustment
 			base_rounded_total += doc.base_rounded_total
 
+		# item wise tax details are serialised once per tax row instead of once per merged invoice
+		for key, tax_detail in item_wise_tax_details.items():
+			taxes[key].item_wise_tax_detail = json.dumps(tax_detail)
+
 		if loyalty_points_sum:
 			invoice.redeem_loyalty_points = 1
 			invoice.loyalty_points = loyalty_points_sum
 			invoice.loyalty_amount = loyalty_amount_sum
 
 		invoice.set("items", items)
-		invoice.set("payments", payments)
-		invoice.set("taxes", taxes)
+		invoice.set("payments", list(payments.values()))
+		invoice.set("taxes", list(taxes.values()))
 		invoice.set("rounding_adjustment", rounding_adjustment)
 		invoice.set("base_rounding_adjustment", base_rounding_adjustment)
 		invoice.set("rounded_total", rounded_total)
@@ -367,6 +375,9 @@ class POSInvoiceMergeLog(Document):
 			doc.set_status(update=True)
 			doc.save()
 
+		# consolidated invoices no longer reserve stock, the Sales Invoice consumes it instead
+		invalidate_stock_availability_for_pos_invoices(invoice_docs)
+
 	def serial_and_batch_bundle_reference_for_pos_invoice(self):
 		for d in self.pos_invoices:
 			pos_invoice = frappe.get_doc("POS Invoice", d.pos_invoice)
@@ -421,11 +432,19 @@ class POSInvoiceMergeLog(Document):
 
 def update_item_wise_tax_detail(consolidate_tax_row, tax_row):
 	consolidated_tax_detail = json.loads(consolidate_tax_row.item_wise_tax_detail)
-	tax_row_detail = json.loads(tax_row.item_wise_tax_detail)
 
 	if not consolidated_tax_detail:
 		consolidated_tax_detail = {}
 
+	merge_item_wise_tax_detail(consolidated_tax_detail, tax_row)
+
+	consolidate_tax_row.item_wise_tax_detail = json.dumps(consolidated_tax_detail)
+
+
+def merge_item_wise_tax_detail(consolidated_tax_detail, tax_row):
+	"""Adds the item wise tax detail of `tax_row` into the already parsed `consolidated_tax_detail`"""
+	tax_row_detail = json.loads(tax_row.item_wise_tax_detail)
+
 	for item_code, tax_data in tax_row_detail.items():
 		tax_data = ItemWiseTaxDetail(**tax_data)
 		if consolidated_tax_detail.get(item_code):
@@ -434,7 +453,35 @@ def update_item_wise_tax_detail(consolidate_tax_row, tax_row):
 		else:
 			consolidated_tax_detail.update({item_code: tax_data})
 
-	consolidate_tax_row.item_wise_tax_detail = json.dumps(consolidated_tax_detail)
+
+def get_sales_invoice_item_map_for_returns(pos_invoices):
+	"""
+	Returns {(return_against, pos_invoice_item): sales_invoice_item} for all the return invoices
+	in `pos_invoices`, fetched in a single query instead of one query per returned item
+	"""
+	return_against = list({d.return_against for d in pos_invoices if d.is_return and d.return_against})
+	if not return_against:
+		return {}
+
+	SalesInvoice = frappe.qb.DocType("Sales Invoice")
+	SalesInvoiceItem = frappe.qb.DocType("Sales Invoice Item")
+
+	query = (
+		frappe.qb.from_(SalesInvoice)
+		.from_(SalesInvoiceItem)
+		.select(SalesInvoiceItem.name, SalesInvoiceItem.pos_invoice, SalesInvoiceItem.pos_invoice_item)
+		.where(
+			(SalesInvoice.name == SalesInvoiceItem.parent)
+			& (SalesInvoice.is_return == 0)
+			& (SalesInvoiceItem.pos_invoice.isin(return_against))
+		)
+	)
+
+	item_map = {}
+	for row in query.run(as_dict=True):
+		item_map.setdefault((row.pos_invoice, row.pos_invoice_item), row.name)
+
+	return item_map
 
 
 def get_all_unconsolidated_invoices():
@@ -478,12 +525,14 @@ def split_invoices_by_accounting_dimension(pos_invoices):
 	# 	{'dim_field1': 'dim_field1_value1', 'dim_field2': 'dim_field2_value1'}: [],
 	# 	{'dim_field1': 'dim_field1_value2', 'dim_field2': 'dim_field2_value1'}: []
 	# }
+	dimension_fields = [d.fieldname for d in get_checks_for_pl_and_bs_accounts()]
+	invoice_dimensions = get_accounting_dimensions_of_invoices(
+		[d.pos_invoice for d in pos_invoices], [*dimension_fields, "cost_center", "project"]
+	)
+
 	pos_invoice_accounting_dimensions_map = {}
 	for invoice in pos_invoices:
-		dimension_fields = [d.fieldname for d in get_checks_for_pl_and_bs_accounts()]
-		accounting_dimensions = frappe.db.get_value(
-			"POS Invoice", invoice.pos_invoice, [*dimension_fields, "cost_center", "project"], as_dict=1
-		)
+		accounting_dimensions = invoice_dimensions.get(invoice.pos_invoice)
 
 		accounting_dimensions_dic_hash = hashlib.sha256(
 			json.dumps(accounting_dimensions).encode()
@@ -495,20 +544,74 @@ def split_invoices_by_accounting_dimension(pos_invoices):
 	return pos_invoice_accounting_dimensions_map
 
 
+def get_accounting_dimensions_of_invoices(pos_invoices, fields):
+	invoice_dimensions = {}
+	for batch in create_batch(pos_invoices, 1000):
+		for row in frappe.get_all(
+			"POS Invoice", filters={"name": ["in", batch]}, fields=["name", *fields], order_by=None
+		):
+			invoice_dimensions[row.name] = {field: row.get(field) for field in fields}
+
+	return invoice_dimensions
+
+
 def consolidate_pos_invoices(pos_invoices=None, closing_entry=None):
 	invoices = pos_invoices or (closing_entry and closing_entry.get("pos_invoices"))
 	if frappe.in_test and not invoices:
 		invoices = get_all_unconsolidated_invoices()
 
+	if closing_entry and len(invoices) > MERGE_LOG_CHUNK_SIZE:
+		closing_entry.set_status(update=True, status="Queued")
+		enqueue_parallel_merge_jobs(invoices, closing_entry)
+		return
+
 	invoice_by_customer = get_invoice_customer_map(invoices)
 
 	if len(invoices) >= 10 and closing_entry:
 		closing_entry.set_status(update=True, status="Queued")
-		enqueue_job(create_merge_logs, invoice_by_customer=invoice_by_customer, closing_entry=closing_entry)
+		enqueue_job(
+			create_merge_logs,
+			invoice_by_customer=invoice_by_customer,
+			closing_entry=closing_entry,
+			commit_per_merge_log=True,
+		)
 	else:
 		create_merge_logs(invoice_by_customer, closing_entry)
 
 
+def enqueue_parallel_merge_jobs(invoices, closing_entry):
+	"""
+	Splits the sales invoices of a large closing into chunks of `MERGE_LOG_CHUNK_SIZE` and spreads
+	them over `PARALLEL_MERGE_JOBS` background jobs. Returns are held back and consolidated by
+	whichever job finishes last, so that their original invoices are always consolidated first.
+	"""
+	sales = [d for d in invoices if not d.is_return]
+	invoice_by_customer = get_invoice_customer_map(sales)
+
+	jobs = [{} for _ in range(PARALLEL_MERGE_JOBS)]
+	job_idx = 0
+	for customer, invoices_acc_dim in invoice_by_customer.items():
+		for dimension_hash, _invoices in invoices_acc_dim.items():
+			for chunk_idx, chunk in enumerate(create_batch(_invoices, MERGE_LOG_CHUNK_SIZE)):
+				job = jobs[job_idx % PARALLEL_MERGE_JOBS]
+				job.setdefault(customer, {})[f"{dimension_hash}-{chunk_idx}"] = chunk
+				job_idx += 1
+
+	for idx, job in enumerate(jobs):
+		if not job and idx:
+			continue
+
+		enqueue_job(
+			create_merge_logs,
+			job_key=idx,
+			alert=not idx,
+			invoice_by_customer=job,
+			closing_entry=closing_entry,
+			commit_per_merge_log=True,
+			consolidate_remaining=True,
+		)
+
+
 def unconsolidate_pos_invoices(closing_entry):
 	merge_logs = frappe.get_all(
 		"POS Invoice Merge Log", filters={"pos_closing_entry": closing_entry.name}, pluck="name"
@@ -576,24 +679,52 @@ def split_invoices(invoices):
 	return _invoices
 
 
-def create_merge_logs(invoice_by_customer, closing_entry=None):
+def chunk_invoices(invoices):
+	"""
+	Splits a group of invoices into chunks of at most `MERGE_LOG_CHUNK_SIZE` invoices.
+	Sales are placed before returns so that an original invoice is never merged after its return.
+	"""
+	invoices = sorted(invoices, key=lambda d: cint(d.is_return))
+	return create_batch(invoices, MERGE_LOG_CHUNK_SIZE)
+
+
+def get_unconsolidated_pos_invoices(invoices, for_update=False):
+	"""
+	Drops the invoices that were already consolidated, so that a retried job does not merge them again.
+	With `for_update` the invoices stay locked until the next commit, so no other job merges them meanwhile.
+	"""
+	if not invoices:
+		return []
+
+	consolidated = {
+		d.name
+		for d in frappe.get_all(
+			"POS Invoice",
+			filters={"name": ["in", [d.pos_invoice for d in invoices]]},
+			fields=["name", "consolidated_invoice"],
+			order_by=None,
+			for_update=for_update,
+		)
+		if d.consolidated_invoice
+	}
+
+	return [d for d in invoices if d.pos_invoice not in consolidated]
+
+
+def create_merge_logs(
+	invoice_by_customer, closing_entry=None, commit_per_merge_log=False, consolidate_remaining=False
+):
+	pending = False
 	try:
-		for customer, invoices_acc_dim in invoice_by_customer.items():
-			for invoices in invoices_acc_dim.values():
-				for _invoices in split_invoices(invoices):
-					merge_log = frappe.new_doc("POS Invoice Merge Log")
-					merge_log.posting_date = (
-						getdate(closing_entry.get("posting_date")) if closing_entry else nowdate()
-					)
-					merge_log.posting_time = (
-						get_time(closing_entry.get("posting_time")) if closing_entry else nowtime()
-					)
-					merge_log.company = closing_entry.get("company") if closing_entry else None
-					merge_log.customer = customer
-					merge_log.pos_closing_entry = closing_entry.get("name") if closing_entry else None
-					merge_log.set("pos_invoices", _invoices)
-					merge_log.save(ignore_permissions=True)
-					merge_log.submit()
+		_create_merge_logs(invoice_by_customer, closing_entry, commit_per_merge_log)
+
+		if closing_entry and consolidate_remaining:
+			frappe.db.commit()
+			if not consolidate_remaining_invoices(closing_entry):
+				# other chunks of this closing are still being merged by parallel jobs
+				pending = True
+				return
+
 		if closing_entry:
 			closing_entry.set_status(update=True, status="Submitted")
 			closing_entry.db_set("error_message", "")
@@ -613,7 +744,57 @@ def create_merge_logs(invoice_by_customer, closing_entry=None):
 
 	finally:
 		frappe.db.commit()
-		frappe.publish_realtime("closing_process_complete", user=frappe.session.user)
+		# the job that finishes the closing tells the user
+		if not pending:
+			frappe.publish_realtime("closing_process_complete", user=frappe.session.user)
+
+
+def _create_merge_logs(invoice_by_customer, closing_entry=None, commit_per_merge_log=False):
+	for customer, invoices_acc_dim in invoice_by_customer.items():
+		for invoices in invoices_acc_dim.values():
+			for _invoices in split_invoices(invoices):
+				for chunk in chunk_invoices(_invoices):
+					if commit_per_merge_log:
+						# the commit of the previous merge log released the locks, check the chunk again
+						chunk = get_unconsolidated_pos_invoices(chunk, for_update=True)
+						if not chunk:
+							continue
+
+					merge_log = frappe.new_doc("POS Invoice Merge Log")
+					merge_log.posting_date = (
+						getdate(closing_entry.get("posting_date")) if closing_entry else nowdate()
+					)
+					merge_log.posting_time = (
+						get_time(closing_entry.get("posting_time")) if closing_entry else nowtime()
+					)
+					merge_log.company = closing_entry.get("company") if closing_entry else None
+					merge_log.customer = customer
+					merge_log.pos_closing_entry = closing_entry.get("name") if closing_entry else None
+					merge_log.set("pos_invoices", chunk)
+					merge_log.save(ignore_permissions=True)
+					merge_log.submit()
+
+					if commit_per_merge_log:
+						# every merge log is a checkpoint, a retry only picks up the invoices left over
+						frappe.db.commit()
+
+
+def consolidate_remaining_invoices(closing_entry):
+	"""
+	Consolidates the invoices of the closing left over by the parallel jobs (returns).
+	Returns False if sales invoices of the closing are still pending, i.e. some other job is yet to finish.
+	"""
+	# serialise the jobs of a closing entry so that only one of them merges the leftovers, the lock is
+	# released by the commit of its first merge log, the invoices of every chunk are locked and checked
+	# again before they are merged
+	frappe.db.get_value("POS Closing Entry", closing_entry.get("name"), "name", for_update=True)
+
+	pending = get_unconsolidated_pos_invoices(closing_entry.get("pos_invoices"))
+	if any(not d.is_return for d in pending):
+		return False
+
+	_create_merge_logs(get_invoice_customer_map(pending), closing_entry, commit_per_merge_log=True)
+	return True
 
 
 def cancel_merge_logs(merge_logs, closing_entry=None):
@@ -646,12 +827,15 @@ def cancel_merge_logs(merge_logs, closing_entry=None):
 		frappe.publish_realtime("closing_process_complete", user=frappe.session.user)
 
 
-def enqueue_job(job, **kwargs):
+def enqueue_job(job, job_key=None, alert=True, **kwargs):
 	check_scheduler_status()
 
 	closing_entry = kwargs.get("closing_entry") or {}
 
 	job_id = "pos_invoice_merge::" + str(closing_entry.get("name"))
+	if job_key is not None:
+		job_id += f"::{job_key}"
+
 	if not is_job_enqueued(job_id):
 		enqueue(
 			job,
@@ -663,6 +847,9 @@ def enqueue_job(job, **kwargs):
 			now=frappe.conf.developer_mode or frappe.in_test,
 		)
 
+		if not alert:
+			return
+
 		if job == create_merge_logs:
 			msg = _("POS Invoices will be consolidated in a background process")
 		else:
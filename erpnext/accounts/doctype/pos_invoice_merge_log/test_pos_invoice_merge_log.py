@@ -1,6 +1,7 @@
 # Copyright (c) 2020, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 import json
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase
@@ -14,6 +15,7 @@ from erpnext.accounts.doctype.pos_closing_entry.pos_closing_entry import (
 from erpnext.accounts.doctype.pos_closing_entry.test_pos_closing_entry import init_user_and_profile
 from erpnext.accounts.doctype.pos_invoice.pos_invoice import make_sales_return
 from erpnext.accounts.doctype.pos_invoice.test_pos_invoice import create_pos_invoice
+from erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log import create_merge_logs
 from erpnext.accounts.doctype.pos_opening_entry.test_pos_opening_entry import create_opening_entry
 from erpnext.stock.doctype.serial_and_batch_bundle.test_serial_and_batch_bundle import (
 	get_serial_nos_from_bundle,
@@ -514,3 +516,67 @@ class TestPOSInvoiceMergeLog(IntegrationTestCase):
 			"POS Invoice Merge Log", {"pos_closing_entry": closing_entry.name}, "company"
 		)
 		self.assertEqual(pos_merge_log_company, closing_entry.company)
+
+	@patch("erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log.MERGE_LOG_CHUNK_SIZE", 2)
+	def test_chunked_consolidation(self):
+		"""
+		Creating 3 POS Invoices and a return with a merge log chunk size of 2.
+		Check whether the invoices are split over multiple Sales Invoices and the return
+		is consolidated against the Sales Invoice of its original invoice.
+		"""
+		test_user, pos_profile = init_user_and_profile()
+		opening_entry = create_opening_entry(pos_profile, test_user.name)
+
+		pos_invoices = []
+		for rate in (300, 3200, 2300):
+			pos_inv = create_pos_invoice(rate=rate, do_not_submit=1)
+			pos_inv.append("payments", {"mode_of_payment": "Cash", "account": "Cash - _TC", "amount": rate})
+			pos_inv.save()
+			pos_inv.submit()
+			pos_invoices.append(pos_inv)
+
+		pos_inv_cn = make_sales_return(pos_invoices[0].name)
+		pos_inv_cn.set("payments", [])
+		pos_inv_cn.append("payments", {"mode_of_payment": "Cash", "account": "Cash - _TC", "amount": -300})
+		pos_inv_cn.paid_amount = -300
+		pos_inv_cn.submit()
+
+		closing_entry = make_closing_entry_from_opening(opening_entry)
+		closing_entry.insert()
+		closing_entry.submit()
+
+		closing_entry.load_from_db()
+		self.assertEqual(closing_entry.status, "Submitted")
+
+		consolidated_invoices = set()
+		for pos_inv in pos_invoices:
+			pos_inv.load_from_db()
+			self.assertTrue(frappe.db.exists("Sales Invoice", pos_inv.consolidated_invoice))
+			consolidated_invoices.add(pos_inv.consolidated_invoice)
+
+		self.assertEqual(len(consolidated_invoices), 2)
+
+		pos_inv_cn.load_from_db()
+		consolidated_credit_note = frappe.get_doc("Sales Invoice", pos_inv_cn.consolidated_invoice)
+		self.assertEqual(consolidated_credit_note.is_return, 1)
+		self.assertEqual(consolidated_credit_note.return_against, pos_invoices[0].consolidated_invoice)
+
+		# retrying an already consolidated closing must not merge the invoices again
+		merge_logs = frappe.db.count("POS Invoice Merge Log", {"pos_closing_entry": closing_entry.name})
+		closing_entry.retry()
+		self.assertEqual(
+			frappe.db.count("POS Invoice Merge Log", {"pos_closing_entry": closing_entry.name}), merge_logs
+		)
+
+	def test_closing_completion_is_published_by_the_last_job(self):
+		"""A job that leaves sales of the closing to other jobs does not report the closing as complete"""
+		closing_entry = frappe._dict(name="_Test POS Closing Entry")
+		module = "erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log"
+
+		with (
+			patch(f"{module}.consolidate_remaining_invoices", return_value=False),
+			patch("frappe.publish_realtime") as publish_realtime,
+		):
+			create_merge_logs({}, closing_entry, commit_per_merge_log=True, consolidate_remaining=True)
+
+		publish_realtime.assert_not_called()
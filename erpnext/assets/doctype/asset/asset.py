@@ -34,6 +34,7 @@ from erpnext.assets.doctype.asset_depreciation_schedule.asset_depreciation_sched
 	get_asset_depr_schedule_doc,
 	get_depr_schedule,
 )
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_calculator import DepreciationContext
 from erpnext.controllers.accounts_controller import AccountsController
 
 
@@ -139,6 +140,7 @@ class Asset(AccountsController):
 			return
 
 		schedules = []
+		context = DepreciationContext()
 		for row in self.get("finance_books"):
 			self.validate_asset_finance_books(row)
 			if not row.rate_of_depreciation:
@@ -148,7 +150,7 @@ class Asset(AccountsController):
 			if not schedule_doc:
 				schedule_doc = frappe.new_doc("Asset Depreciation Schedule")
 				schedule_doc.asset = self.name
-			schedule_doc.create_depreciation_schedule(row)
+			schedule_doc.create_depreciation_schedule(row, context=context)
 			schedule_doc.save()
 			schedules.append(schedule_doc.name)
 
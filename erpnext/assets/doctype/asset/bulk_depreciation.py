@@ -0,0 +1,250 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Bulk posting of due depreciation, enabled by "Post Depreciation Entries in Bulk" in Accounts Settings.
+
+The due schedule rows of all the assets are read with one query and grouped by company, finance
+book, posting date, cost center and accounts. Every group is posted as Journal Entries of at most
+DEPRECIATION_ENTRY_BATCH_SIZE assets, with a debit and a credit row per asset, and the schedule rows
+of an entry are linked to it with one update.
+
+The assets are split into chunks that are posted by parallel background jobs. All the rows of an
+asset are in the same chunk, so that no two jobs update the same asset. If an entry fails, the
+rows of its assets are posted one asset at a time, so that only the assets that fail are left
+unposted. Rows that got linked to an entry meanwhile are skipped, and an entry fails if any of its
+rows is already linked to another one.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+	get_checks_for_pl_and_bs_accounts,
+)
+from erpnext.assets.doctype.asset.depreciation import (
+	get_acc_frozen_upto,
+	get_credit_and_debit_entry,
+	get_credit_debit_accounts_for_asset,
+	notify_depr_entry_posting_error,
+	set_depr_entry_posting_status_for_failed_assets,
+)
+
+# assets posted by one background job
+DEPRECIATION_CHUNK_SIZE = 5000
+
+# assets in one journal entry
+DEPRECIATION_ENTRY_BATCH_SIZE = 200
+
+
+def book_depreciation_entries_in_bulk(date):
+	"""Enqueues a job per chunk of the assets that have depreciation due on or before `date`"""
+	assets = get_assets_with_due_depreciation(date)
+
+	for i in range(0, len(assets), DEPRECIATION_CHUNK_SIZE):
+		frappe.enqueue(
+			"erpnext.assets.doctype.asset.bulk_depreciation.book_depreciation_entries_for_assets",
+			queue="long",
+			timeout=4 * 60 * 60,
+			date=date,
+			assets=assets[i : i + DEPRECIATION_CHUNK_SIZE],
+			now=frappe.in_test,
+		)
+
+
+def get_assets_with_due_depreciation(date):
+	asset = frappe.qb.DocType("Asset")
+	return get_due_depreciation_query(date).select(asset.name).distinct().orderby(asset.name).run(pluck=True)
+
+
+def book_depreciation_entries_for_assets(date, assets):
+	"""Posts the depreciation due on or before `date` of the `assets`, committing after every entry"""
+	accounting_dimensions = get_checks_for_pl_and_bs_accounts()
+	rows = get_due_depreciation_rows(date, assets, accounting_dimensions)
+
+	failed_assets, error_logs = [], []
+	for batch in get_depreciation_entry_batches(rows):
+		batch = get_unposted_rows(batch)
+		if not batch:
+			continue
+
+		try:
+			make_bulk_depreciation_entry(batch, accounting_dimensions)
+			frappe.db.commit()
+		except Exception:
+			frappe.db.rollback()
+
+			# isolate the assets that fail, posting only their rows of this batch
+			asset_rows = {}
+			for row in batch:
+				asset_rows.setdefault(row.asset, []).append(row)
+
+			for asset_name, rows_of_asset in asset_rows.items():
+				try:
+					make_bulk_depreciation_entry(rows_of_asset, accounting_dimensions)
+					frappe.db.commit()
+				except Exception as e:
+					frappe.db.rollback()
+					if asset_name not in failed_assets:
+						failed_assets.append(asset_name)
+					error_logs.append(frappe.log_error(e).name)
+
+	if failed_assets:
+		set_depr_entry_posting_status_for_failed_assets(failed_assets)
+		notify_depr_entry_posting_error(failed_assets, error_logs)
+
+	frappe.db.commit()
+
+
+def get_due_depreciation_query(date):
+	asset = frappe.qb.DocType("Asset")
+	asset_depr_schedule = frappe.qb.DocType("Asset Depreciation Schedule")
+	depr_schedule = frappe.qb.DocType("Depreciation Schedule")
+
+	query = (
+		frappe.qb.from_(asset_depr_schedule)
+		.join(asset)
+		.on(asset_depr_schedule.asset == asset.name)
+		.join(depr_schedule)
+		.on(asset_depr_schedule.name == depr_schedule.parent)
+		.where(asset.calculate_depreciation == 1)
+		.where(asset.docstatus == 1)
+		.where(asset_depr_schedule.docstatus == 1)
+		.where(asset.status.isin(["Submitted", "Partially Depreciated"]))
+		.where(depr_schedule.journal_entry.isnull())
+		.where(depr_schedule.schedule_date <= date)
+	)
+
+	if acc_frozen_upto := get_acc_frozen_upto():
+		query = query.where(depr_schedule.schedule_date > acc_frozen_upto)
+
+	return query
+
+
+def get_due_depreciation_rows(date, assets, accounting_dimensions):
+	"""Returns the due schedule rows of the `assets` with the asset fields their entries need"""
+	if not assets:
+		return []
+
+	asset = frappe.qb.DocType("Asset")
+	asset_depr_schedule = frappe.qb.DocType("Asset Depreciation Schedule")
+	depr_schedule = frappe.qb.DocType("Depreciation Schedule")
+	dimension_fields = list({d["fieldname"] for d in accounting_dimensions})
+
+	return (
+		get_due_depreciation_query(date)
+		.select(
+			depr_schedule.name,
+			depr_schedule.schedule_date,
+			depr_schedule.depreciation_amount,
+			asset_depr_schedule.name.as_("depr_schedule"),
+			asset_depr_schedule.finance_book,
+			asset.name.as_("asset"),
+			asset.company,
+			asset.asset_category,
+			asset.cost_center,
+			*[asset[fieldname] for fieldname in dimension_fields],
+		)
+		.where(asset.name.isin(assets))
+	).run(as_dict=True)
+
+
+def get_unposted_rows(rows):
+	"""Returns the rows that are still not linked to a journal entry"""
+	unposted = set(
+		frappe.get_all(
+			"Depreciation Schedule",
+			filters={"name": ("in", [row.name for row in rows]), "journal_entry": ("is", "not set")},
+			pluck="name",
+		)
+	)
+	return [row for row in rows if row.name in unposted]
+
+
+def get_depreciation_entry_batches(rows):
+	"""
+	Returns the rows grouped by the journal entry they go in, split in batches of at most
+	DEPRECIATION_ENTRY_BATCH_SIZE assets
+	"""
+	companies, accounts = {}, {}
+	groups = {}
+
+	for row in rows:
+		if row.company not in companies:
+			companies[row.company] = frappe.get_cached_value(
+				"Company", row.company, ["depreciation_cost_center", "series_for_depreciation_entry"]
+			)
+
+		if (row.asset_category, row.company) not in accounts:
+			accounts[(row.asset_category, row.company)] = get_credit_debit_accounts_for_asset(
+				row.asset_category, row.company
+			)
+
+		depr_cost_center, row.depr_series = companies[row.company]
+		row.depr_cost_center = row.cost_center or depr_cost_center
+		row.credit_account, row.debit_account = accounts[(row.asset_category, row.company)]
+
+		key = (
+			row.company,
+			row.finance_book,
+			row.schedule_date,
+			row.depr_cost_center,
+			row.credit_account,
+			row.debit_account,
+			row.depr_series,
+		)
+		groups.setdefault(key, {}).setdefault(row.asset, []).append(row)
+
+	batches = []
+	for assets in groups.values():
+		assets = list(assets.values())
+		for i in range(0, len(assets), DEPRECIATION_ENTRY_BATCH_SIZE):
+			batches.append(
+				[row for asset_rows in assets[i : i + DEPRECIATION_ENTRY_BATCH_SIZE] for row in asset_rows]
+			)
+
+	return batches
+
+
+def make_bulk_depreciation_entry(rows, accounting_dimensions):
+	"""Submits one depreciation entry for the schedule rows of a batch"""
+	first_row = rows[0]
+
+	je = frappe.new_doc("Journal Entry")
+	je.voucher_type = "Depreciation Entry"
+	je.naming_series = first_row.depr_series
+	je.posting_date = first_row.schedule_date
+	je.company = first_row.company
+	je.finance_book = first_row.finance_book
+
+	total_amount = 0.0
+	for row in rows:
+		asset = frappe._dict(row, name=row.asset)
+		credit_entry, debit_entry = get_credit_and_debit_entry(
+			row.credit_account, row, asset, row.depr_cost_center, row.debit_account, accounting_dimensions
+		)
+
+		je.append("accounts", credit_entry)
+		je.append("accounts", debit_entry)
+		total_amount += flt(row.depreciation_amount)
+
+	je.remark = _("Depreciation Entry against {0} assets worth {1}").format(
+		len({row.asset for row in rows}), total_amount
+	)
+
+	je.flags.ignore_permissions = True
+	je.flags.depreciation_schedule_rows = [row.name for row in rows]
+	je.save()
+
+	if not je.meta.get_workflow():
+		je.submit()
+
+	asset = frappe.qb.DocType("Asset")
+	(
+		frappe.qb.update(asset)
+		.set(asset.depr_entry_posting_status, "Successful")
+		.where(asset.name.isin(list({row.asset for row in rows})))
+	).run()
+
+	return je
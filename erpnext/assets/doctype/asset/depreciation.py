@@ -28,9 +28,11 @@ from erpnext.assets.doctype.asset_activity.asset_activity import add_asset_activ
 from erpnext.assets.doctype.asset_depreciation_schedule.asset_depreciation_schedule import (
 	get_asset_depr_schedule_doc,
 	get_asset_depr_schedule_name,
-	get_temp_depr_schedule_doc,
 	reschedule_depreciation,
 )
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_calculator import (
+	get_depreciation_schedules,
+)
 
 
 def post_depreciation_entries(date=None):
@@ -39,6 +41,13 @@ def post_depreciation_entries(date=None):
 		return
 
 	date = date or today()
+
+	if cint(frappe.get_single_value("Accounts Settings", "post_depreciation_entries_in_bulk")):
+		from erpnext.assets.doctype.asset.bulk_depreciation import book_depreciation_entries_in_bulk
+
+		book_depreciation_entries_in_bulk(date)
+		return
+
 	book_depreciation_entries(date)
 
 
@@ -806,11 +815,18 @@ def get_value_after_depreciation_on_disposal_date(asset, disposal_date, finance_
 
 	row = asset_doc.finance_books[idx - 1]
 
-	temp_asset_depreciation_schedule = get_temp_depr_schedule_doc(asset_doc, row, getdate(disposal_date))
+	key = (asset_doc.name, row.finance_book or None)
+	depreciation_schedule = get_depreciation_schedules(
+		[asset_doc.name], getdate(disposal_date), status="Active"
+	).get(key)
+	if depreciation_schedule is None:
+		frappe.throw(
+			_("Asset Depreciation Schedule not found for Asset {0} and Finance Book {1}").format(
+				get_link_to_form("Asset", asset_doc.name), row.finance_book
+			)
+		)
 
-	accumulated_depr_amount = temp_asset_depreciation_schedule.get("depreciation_schedule")[
-		-1
-	].accumulated_depreciation_amount
+	accumulated_depr_amount = depreciation_schedule[-1].accumulated_depreciation_amount
 
 	return flt(
 		flt(asset_doc.gross_purchase_amount) - accumulated_depr_amount,
@@ -1,6 +1,7 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 import unittest
+from unittest.mock import patch
 
 import frappe
 from frappe.tests import IntegrationTestCase
@@ -33,6 +34,9 @@ from erpnext.assets.doctype.asset_depreciation_schedule.asset_depreciation_sched
 	get_asset_depr_schedule_doc,
 	get_depr_schedule,
 )
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_calculator import (
+	DepreciationScheduleCalculator,
+)
 from erpnext.stock.doctype.purchase_receipt.purchase_receipt import (
 	make_purchase_invoice as make_invoice,
 )
@@ -256,12 +260,12 @@ class TestAsset(AssetSetup):
 			asset.precision("gross_purchase_amount"),
 		)
 
-		second_asset_depr_schedule.depreciation_amount = 9006.17
-		second_asset_depr_schedule.asset_doc = asset
-		second_asset_depr_schedule.get_finance_book_row()
-		second_asset_depr_schedule.fetch_asset_details()
+		calculator = DepreciationScheduleCalculator(
+			asset, asset.finance_books[0], second_asset_depr_schedule.depreciation_schedule
+		)
+		calculator.depreciation_amount = 9006.17
 
-		pro_rata_amount, _, _ = second_asset_depr_schedule._get_pro_rata_amt(
+		pro_rata_amount, _, _ = calculator._get_pro_rata_amt(
 			add_days(get_last_day(add_months(purchase_date, 1)), 1),
 			date,
 			original_schedule_date=get_last_day(date),
@@ -1025,15 +1029,14 @@ class TestDepreciationBasics(AssetSetup):
 		)
 		asset.submit()
 
-		asset_depr_schedule_doc = get_asset_depr_schedule_doc(asset.name, "Active")
-		asset_depr_schedule_doc.asset_doc = asset
-		asset_depr_schedule_doc.get_finance_book_row()
-		asset_depr_schedule_doc.fetch_asset_details()
-		asset_depr_schedule_doc.clear()
-		asset_depr_schedule_doc._check_is_pro_rata()
-		asset_depr_schedule_doc.initialize_variables()
+		calculator = DepreciationScheduleCalculator(
+			asset, asset.finance_books[0], get_depr_schedule(asset.name, "Active")
+		)
+		calculator.clear()
+		calculator._check_is_pro_rata()
+		calculator.initialize_variables()
 
-		depreciation_amount = asset_depr_schedule_doc.get_depreciation_amount(0)
+		depreciation_amount = calculator.get_depreciation_amount(0)
 		self.assertEqual(depreciation_amount, 30000)
 
 	def test_make_depr_schedule(self):
@@ -1093,13 +1096,10 @@ class TestDepreciationBasics(AssetSetup):
 		)
 		asset.save()
 
-		depr_schedule_doc = get_asset_depr_schedule_doc(asset.name, "Draft")
-		depr_schedule_doc.asset_doc = asset
-		depr_schedule_doc.get_finance_book_row()
-		depr_schedule_doc.fetch_asset_details()
-		depr_schedule_doc._check_is_pro_rata()
+		calculator = DepreciationScheduleCalculator(asset, asset.finance_books[0])
+		calculator._check_is_pro_rata()
 
-		self.assertFalse(depr_schedule_doc.has_pro_rata)
+		self.assertFalse(calculator.has_pro_rata)
 
 		asset.finance_books = []
 		asset.append(
@@ -1114,13 +1114,10 @@ class TestDepreciationBasics(AssetSetup):
 		)
 		asset.save()
 
-		depr_schedule_doc = get_asset_depr_schedule_doc(asset.name, "Draft")
-		depr_schedule_doc.asset_doc = asset
-		depr_schedule_doc.get_finance_book_row()
-		depr_schedule_doc.fetch_asset_details()
-		depr_schedule_doc._check_is_pro_rata()
+		calculator = DepreciationScheduleCalculator(asset, asset.finance_books[0])
+		calculator._check_is_pro_rata()
 
-		self.assertTrue(depr_schedule_doc.has_pro_rata)
+		self.assertTrue(calculator.has_pro_rata)
 
 	def test_expected_value_after_useful_life_greater_than_purchase_amount(self):
 		"""Tests if an error is raised when expected_value_after_useful_life(110,000) > gross_purchase_amount(100,000)."""
@@ -1270,6 +1267,97 @@ class TestDepreciationBasics(AssetSetup):
 		self.assertFalse(depr_schedule[1].journal_entry)
 		self.assertFalse(depr_schedule[2].journal_entry)
 
+	@IntegrationTestCase.change_settings("Accounts Settings", {"post_depreciation_entries_in_bulk": 1})
+	def test_post_depreciation_entries_in_bulk(self):
+		assets = [
+			create_asset(
+				item_code="Macbook Pro",
+				calculate_depreciation=1,
+				available_for_use_date="2019-12-31",
+				depreciation_start_date="2020-12-31",
+				frequency_of_depreciation=12,
+				total_number_of_depreciations=3,
+				expected_value_after_useful_life=10000,
+				submit=1,
+			)
+			for _i in range(2)
+		]
+
+		post_depreciation_entries(date="2021-06-01")
+
+		journal_entries = set()
+		for asset in assets:
+			asset.load_from_db()
+			depr_schedule = get_depr_schedule(asset.name, "Active")
+
+			self.assertTrue(depr_schedule[0].journal_entry)
+			self.assertFalse(depr_schedule[1].journal_entry)
+			self.assertEqual(asset.depr_entry_posting_status, "Successful")
+			self.assertEqual(
+				asset.finance_books[0].value_after_depreciation,
+				asset.gross_purchase_amount - depr_schedule[0].depreciation_amount,
+			)
+			journal_entries.add(depr_schedule[0].journal_entry)
+
+		# both the assets are depreciated by one entry
+		self.assertEqual(len(journal_entries), 1)
+		je = frappe.get_doc("Journal Entry", journal_entries.pop())
+		self.assertEqual(je.docstatus, 1)
+		self.assertEqual({d.reference_name for d in je.accounts if d.debit}, {asset.name for asset in assets})
+
+	@IntegrationTestCase.change_settings("Accounts Settings", {"post_depreciation_entries_in_bulk": 1})
+	def test_post_depreciation_entries_in_bulk_when_a_batch_fails(self):
+		from erpnext.assets.doctype.asset import bulk_depreciation
+
+		assets = [
+			create_asset(
+				item_code="Macbook Pro",
+				calculate_depreciation=1,
+				available_for_use_date="2019-12-31",
+				depreciation_start_date="2020-12-31",
+				frequency_of_depreciation=12,
+				total_number_of_depreciations=3,
+				expected_value_after_useful_life=10000,
+				submit=1,
+			)
+			for _i in range(2)
+		]
+
+		make_bulk_depreciation_entry = bulk_depreciation.make_bulk_depreciation_entry
+
+		def fail_first_batch(rows, accounting_dimensions):
+			# the entry of the first year of both the assets fails, they are posted one by one
+			if len({row.asset for row in rows}) > 1 and str(rows[0].schedule_date) == "2020-12-31":
+				frappe.throw("Batch failed")
+			return make_bulk_depreciation_entry(rows, accounting_dimensions)
+
+		with patch.object(bulk_depreciation, "make_bulk_depreciation_entry", side_effect=fail_first_batch):
+			post_depreciation_entries(date="2022-06-01")
+
+		for asset in assets:
+			asset.load_from_db()
+			depr_schedule = get_depr_schedule(asset.name, "Active")
+
+			self.assertTrue(depr_schedule[0].journal_entry)
+			self.assertTrue(depr_schedule[1].journal_entry)
+			self.assertFalse(depr_schedule[2].journal_entry)
+			self.assertEqual(asset.depr_entry_posting_status, "Successful")
+
+			# every year is depreciated once
+			self.assertEqual(
+				asset.finance_books[0].value_after_depreciation,
+				asset.gross_purchase_amount
+				- depr_schedule[0].depreciation_amount
+				- depr_schedule[1].depreciation_amount,
+			)
+			self.assertEqual(
+				frappe.db.count(
+					"Journal Entry Account",
+					{"reference_name": asset.name, "debit": (">", 0), "docstatus": 1},
+				),
+				2,
+			)
+
 	def test_depr_entry_posting_when_depr_expense_account_is_an_expense_account(self):
 		"""Tests if the Depreciation Expense Account gets debited and the Accumulated Depreciation Account gets credited when the former's an Expense Account."""
 
@@ -14,6 +14,7 @@ import erpnext
 from erpnext.assets.doctype.asset_depreciation_schedule.deppreciation_schedule_controller import (
 	DepreciationScheduleController,
 )
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_calculator import DepreciationContext
 
 
 class AssetDepreciationSchedule(DepreciationScheduleController):
@@ -192,6 +193,7 @@ def cancel_asset_depr_schedules(asset_doc):
 
 
 def reschedule_depreciation(asset_doc, notes, disposal_date=None):
+	context = DepreciationContext()
 	for row in asset_doc.get("finance_books"):
 		current_schedule = get_asset_depr_schedule_doc(asset_doc.name, None, row.finance_book)
 
@@ -206,7 +208,7 @@ def reschedule_depreciation(asset_doc, notes, disposal_date=None):
 
 		set_modified_depreciation_rate(asset_doc, row, new_schedule)
 
-		new_schedule.create_depreciation_schedule(row, disposal_date)
+		new_schedule.create_depreciation_schedule(row, disposal_date, context=context)
 		new_schedule.notes = notes
 
 		if current_schedule and current_schedule.docstatus == 1:
@@ -1,19 +1,9 @@
-import frappe
-from frappe.model.document import Document
-from frappe.utils import (
-	cint,
-	flt,
-)
+from frappe.utils import flt
 
 import erpnext
-from erpnext.accounts.utils import get_fiscal_year
 
-# from erpnext.assets.doctype.asset_depreciation_schedule.deppreciation_schedule_controller import (
-#     _get_total_days,
-# )
 
-
-class StraightLineMethod(Document):
+class StraightLineMethod:
 	def get_straight_line_depr_amount(self, row_idx):
 		self.depreciable_value = flt(self.fb_row.value_after_depreciation) - flt(
 			self.fb_row.expected_value_after_useful_life
@@ -34,11 +24,13 @@ class StraightLineMethod(Document):
 	def get_daily_prorata_based_depr_amount(self, row_idx):
 		daily_depr_amount = self.get_daily_depr_amount()
 
-		from_date, total_depreciable_days = self._get_total_days(self.fb_row.depreciation_start_date, row_idx)
+		_from_date, total_depreciable_days = self._get_total_days(
+			self.fb_row.depreciation_start_date, row_idx
+		)
 		return daily_depr_amount * total_depreciable_days
 
 	def get_daily_depr_amount(self):
-		if cint(frappe.get_single_value("Accounts Settings", "calculate_depr_using_total_days")):
+		if self.context.calculate_depr_using_total_days:
 			return self.depreciable_value / self.total_pending_days
 		else:
 			yearly_depr_amount = self.depreciable_value / self.total_pending_years
@@ -50,14 +42,12 @@ class StraightLineMethod(Document):
 			pending_periods = flt(self.pending_months) / flt(self.fb_row.frequency_of_depreciation)
 			return self.depreciable_value / pending_periods
 
-		asset_shift_factors_map = self.get_asset_shift_factors_map()
-
-		if self.schedules_before_clearing:
-			shift = (
-				self.schedules_before_clearing[row_idx].shift
-				if len(self.schedules_before_clearing) > row_idx
-				else None
-			)
+		asset_shift_factors_map = self.context.shift_factors
+		shift = (
+			self.schedules_before_clearing[row_idx].shift
+			if len(self.schedules_before_clearing) > row_idx
+			else None
+		)
 
 		shift_factor = asset_shift_factors_map.get(shift, 0)
 		shift_factors_sum = sum(
@@ -70,11 +60,8 @@ class StraightLineMethod(Document):
 
 		return (self.depreciable_value / shift_factors_sum) * shift_factor
 
-	def get_asset_shift_factors_map(self):
-		return dict(frappe.db.get_all("Asset Shift Factor", ["shift_name", "shift_factor"], as_list=True))
-
 
-class WDVMethod(Document):
+class WDVMethod:
 	@erpnext.allow_regional
 	def get_wdv_or_dd_depr_amount(self, row_idx):
 		return WDVMethod.calculate_wdv_or_dd_based_depreciation_amount(self, row_idx)
@@ -100,15 +87,17 @@ class WDVMethod(Document):
 			return self.prev_depreciation_amount
 
 	def is_fiscal_year_changed(self):
-		fy_start_date, fy_end_date = self.get_fiscal_year(self.schedule_date)
-		if fy_start_date != self.get("prev_fy_start_date"):
+		fy_start_date, _fy_end_date = self.get_fiscal_year(self.schedule_date)
+		if fy_start_date != self.prev_fy_start_date:
 			self.prev_fy_start_date = fy_start_date
 			return True
 
 	def get_daily_prorata_based_wdv_depr_amount(self, row_idx):
 		daily_depr_amount = self.get_daily_wdv_depr_amount()
 
-		from_date, total_depreciable_days = self._get_total_days(self.fb_row.depreciation_start_date, row_idx)
+		_from_date, total_depreciable_days = self._get_total_days(
+			self.fb_row.depreciation_start_date, row_idx
+		)
 		return daily_depr_amount * total_depreciable_days
 
 	def get_daily_wdv_depr_amount(self):
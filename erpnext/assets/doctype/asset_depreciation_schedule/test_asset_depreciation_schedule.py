@@ -1,6 +1,8 @@
 # Copyright (c) 2022, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 from frappe.utils import cstr, date_diff, flt, getdate
@@ -14,11 +16,19 @@ from erpnext.assets.doctype.asset_depreciation_schedule.asset_depreciation_sched
 	get_asset_depr_schedule_doc,
 	get_depr_schedule,
 )
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_calculator import (
+	get_depreciation_schedules,
+)
+from erpnext.assets.doctype.asset_depreciation_schedule.depreciation_methods import WDVMethod
 from erpnext.assets.doctype.asset_repair.test_asset_repair import create_asset_repair
 from erpnext.assets.doctype.asset_value_adjustment.test_asset_value_adjustment import (
 	make_asset_value_adjustment,
 )
 
+WDV_DEPRECIATION_AMOUNT = (
+	"erpnext.assets.doctype.asset_depreciation_schedule.depreciation_methods.get_wdv_or_dd_depr_amount"
+)
+
 
 class TestAssetDepreciationSchedule(IntegrationTestCase):
 	def setUp(self):
@@ -1161,3 +1171,195 @@ class TestAssetDepreciationSchedule(IntegrationTestCase):
 			for d in get_depr_schedule(asset.name, "Active")
 		]
 		self.assertEqual(schedules, expected_depreciation_after_repair)
+
+	def test_depreciation_schedules_of_many_assets(self):
+		frappe.db.set_single_value("Accounts Settings", "calculate_depr_using_total_days", 0)
+		straight_line_args = dict(
+			calculate_depreciation=1,
+			available_for_use_date="2030-01-01",
+			purchase_date="2030-01-01",
+			expected_value_after_useful_life=10000,
+			depreciation_start_date="2030-12-31",
+			total_number_of_depreciations=3,
+			frequency_of_depreciation=12,
+		)
+		wdv_args = dict(
+			calculate_depreciation=1,
+			gross_purchase_amount=500,
+			depreciation_method="Written Down Value",
+			available_for_use_date="2021-01-01",
+			depreciation_start_date="2021-12-31",
+			rate_of_depreciation=50,
+			frequency_of_depreciation=12,
+			total_number_of_depreciations=3,
+		)
+
+		# (asset args, expected rows, disposal date, expected rows on disposal)
+		cases = [
+			(
+				dict(straight_line_args, depreciation_method="Straight Line"),
+				[
+					["2030-12-31", 30000.0, 30000.0],
+					["2031-12-31", 30000.0, 60000.0],
+					["2032-12-31", 30000.0, 90000.0],
+				],
+				"2031-04-01",
+				[["2030-12-31", 30000.0, 30000.0], ["2031-04-01", 7479.45, 37479.45]],
+			),
+			(
+				dict(straight_line_args, depreciation_method="Manual"),
+				[
+					["2030-12-31", 30000.0, 30000.0],
+					["2031-12-31", 30000.0, 60000.0],
+					["2032-12-31", 30000.0, 90000.0],
+				],
+				None,
+				None,
+			),
+			(
+				dict(
+					calculate_depreciation=1,
+					available_for_use_date="2030-06-06",
+					opening_number_of_booked_depreciations=2,
+					opening_accumulated_depreciation=47178.08,
+					expected_value_after_useful_life=10000,
+					depreciation_start_date="2032-12-31",
+					total_number_of_depreciations=3,
+					frequency_of_depreciation=12,
+				),
+				[["2032-12-31", 30000.0, 77178.08], ["2033-06-06", 12821.92, 90000.0]],
+				None,
+				None,
+			),
+			(
+				dict(
+					calculate_depreciation=1,
+					available_for_use_date="2023-01-01",
+					purchase_date="2023-01-01",
+					gross_purchase_amount=12000,
+					depreciation_start_date="2023-01-31",
+					total_number_of_depreciations=12,
+					frequency_of_depreciation=1,
+					daily_prorata_based=1,
+				),
+				[
+					["2023-01-31", 1019.18, 1019.18],
+					["2023-02-28", 920.55, 1939.73],
+					["2023-03-31", 1019.18, 2958.91],
+					["2023-04-30", 986.3, 3945.21],
+					["2023-05-31", 1019.18, 4964.39],
+					["2023-06-30", 986.3, 5950.69],
+					["2023-07-31", 1019.18, 6969.87],
+					["2023-08-31", 1019.18, 7989.05],
+					["2023-09-30", 986.3, 8975.35],
+					["2023-10-31", 1019.18, 9994.53],
+					["2023-11-30", 986.3, 10980.83],
+					["2023-12-31", 1019.17, 12000.0],
+				],
+				None,
+				None,
+			),
+			(
+				dict(straight_line_args, depreciation_method="Double Declining Balance"),
+				[
+					["2030-12-31", 66667.0, 66667.0],
+					["2031-12-31", 22222.11, 88889.11],
+					["2032-12-31", 1110.89, 90000.0],
+				],
+				None,
+				None,
+			),
+			(
+				wdv_args,
+				[
+					["2021-12-31", 250.0, 250.0],
+					["2022-12-31", 125.0, 375.0],
+					["2023-12-31", 125.0, 500.0],
+				],
+				"2022-04-01",
+				[["2021-12-31", 250.0, 250.0], ["2022-04-01", 31.16, 281.16]],
+			),
+			(
+				dict(
+					calculate_depreciation=1,
+					depreciation_method="Written Down Value",
+					daily_prorata_based=1,
+					available_for_use_date="2021-02-20",
+					depreciation_start_date="2021-03-31",
+					frequency_of_depreciation=3,
+					total_number_of_depreciations=6,
+					rate_of_depreciation=40,
+				),
+				[
+					["2021-03-31", 4383.56, 4383.56],
+					["2021-06-30", 9972.6, 14356.16],
+					["2021-09-30", 10082.19, 24438.35],
+					["2021-12-31", 10082.19, 34520.54],
+					["2022-03-31", 6458.25, 40978.79],
+					["2022-06-30", 6530.01, 47508.8],
+					["2022-08-20", 52491.2, 100000.0],
+				],
+				None,
+				None,
+			),
+		]
+
+		assets = [create_asset(**args).name for args, *_expected in cases]
+		schedules = get_depreciation_schedules(assets)
+
+		for asset, (args, expected_rows, _disposal_date, _disposal_rows) in zip(assets, cases, strict=True):
+			with self.subTest(args=args):
+				self.assertEqual(get_schedule_rows(schedules[(asset, None)]), expected_rows)
+
+		# disposal cuts the schedule short with a pro rata row
+		for asset, (args, _expected_rows, disposal_date, disposal_rows) in zip(assets, cases, strict=True):
+			if not disposal_date:
+				continue
+
+			with self.subTest(args=args, disposal_date=disposal_date):
+				schedules = get_depreciation_schedules([asset], disposal_date=getdate(disposal_date))
+				self.assertEqual(get_schedule_rows(schedules[(asset, None)]), disposal_rows)
+
+	def test_regional_override_of_wdv_depreciation_amount(self):
+		asset = create_asset(
+			calculate_depreciation=1,
+			available_for_use_date="2023-01-15",
+			depreciation_start_date="2023-03-31",
+			frequency_of_depreciation=3,
+			total_number_of_depreciations=8,
+			depreciation_method="Written Down Value",
+			rate_of_depreciation=40,
+		)
+		get_hooks = frappe.get_hooks
+
+		def get_regional_hooks(hook=None, *args, **kwargs):
+			if hook == "regional_overrides":
+				return {
+					"Test Region": {
+						WDV_DEPRECIATION_AMOUNT: [f"{__name__}.get_wdv_depr_amount_without_pro_rata"]
+					}
+				}
+			return get_hooks(hook, *args, **kwargs)
+
+		depr_schedule_doc = get_asset_depr_schedule_doc(asset.name, "Draft")
+		with (
+			patch("erpnext.get_region", return_value="Test Region"),
+			patch("frappe.get_hooks", side_effect=get_regional_hooks),
+		):
+			depr_schedule_doc.create_depreciation_schedule()
+
+		# the override skips the pro rata amount of the first row
+		self.assertTrue(depr_schedule_doc.flags.wdv_it_act_applied)
+		self.assertEqual(depr_schedule_doc.depreciation_schedule[0].depreciation_amount, 10000)
+
+
+def get_wdv_depr_amount_without_pro_rata(self, row_idx):
+	self.flags.wdv_it_act_applied = True
+	return WDVMethod.calculate_wdv_or_dd_based_depreciation_amount(self, row_idx)
+
+
+def get_schedule_rows(depreciation_schedule):
+	return [
+		[cstr(d.schedule_date), flt(d.depreciation_amount, 2), flt(d.accumulated_depreciation_amount, 2)]
+		for d in depreciation_schedule
+	]
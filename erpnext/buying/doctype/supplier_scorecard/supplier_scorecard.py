@@ -3,6 +3,7 @@
 
 
 import time
+from bisect import bisect_left
 from datetime import timedelta
 
 import frappe
@@ -10,9 +11,10 @@ from frappe import _, throw
 from frappe.model.document import Document
 from frappe.utils import add_days, add_years, get_last_day, getdate, nowdate
 
-from erpnext.buying.doctype.supplier_scorecard_period.supplier_scorecard_period import (
-	make_supplier_scorecard,
-)
+from erpnext.buying.doctype.supplier_scorecard_period.scorecard_evaluator import make_scorecard_periods
+
+# scorecards refreshed at a time
+SCORECARD_CHUNK_SIZE = 500
 
 
 class SupplierScorecard(Document):
@@ -181,81 +183,111 @@ def daterange(start_date, end_date):
 
 
 def refresh_scorecards():
-	scorecards = frappe.db.sql(
-		"""
-		SELECT
-			sc.name
-		FROM
-			`tabSupplier Scorecard` sc""",
-		{},
-		as_dict=1,
-	)
-	for sc in scorecards:
-		# Check to see if any new scorecard periods are created
-		if make_all_scorecards(sc.name) > 0:
+	scorecards = frappe.get_all("Supplier Scorecard", pluck="name", order_by="name")
+
+	for i in range(0, len(scorecards), SCORECARD_CHUNK_SIZE):
+		new_periods = get_new_periods(scorecards[i : i + SCORECARD_CHUNK_SIZE])
+		make_scorecard_periods(new_periods)
+
+		for scorecard, periods in new_periods.items():
 			# Save the scorecard to update the score and standings
-			frappe.get_doc("Supplier Scorecard", sc.name).save()
+			if periods:
+				frappe.get_doc("Supplier Scorecard", scorecard).save()
 
 
 @frappe.whitelist()
 def make_all_scorecards(docname):
 	sc = frappe.get_doc("Supplier Scorecard", docname)
-	supplier = frappe.get_doc("Supplier", sc.supplier)
+	periods = get_new_periods([docname])[docname]
+	make_scorecard_periods({docname: periods})
 
-	start_date = getdate(supplier.creation)
-	end_date = get_scorecard_date(sc.period, start_date)
-	todays = getdate(nowdate())
-
-	scp_count = 0
-	first_start_date = todays
-	last_end_date = todays
-
-	while (start_date < todays) and (end_date <= todays):
-		# check to make sure there is no scorecard period already created
-		scorecards = frappe.db.sql(
-			"""
-			SELECT
-				scp.name
-			FROM
-				`tabSupplier Scorecard Period` scp
-			WHERE
-				scp.scorecard = %(sc)s
-				AND scp.docstatus = 1
-				AND (
-					(scp.start_date > %(end_date)s
-					AND scp.end_date < %(start_date)s)
-				OR
-					(scp.start_date < %(end_date)s
-					AND scp.end_date > %(start_date)s))
-			ORDER BY
-				scp.end_date DESC""",
-			{"sc": docname, "start_date": start_date, "end_date": end_date},
-			as_dict=1,
-		)
-		if len(scorecards) == 0:
-			period_card = make_supplier_scorecard(docname, None)
-			period_card.start_date = start_date
-			period_card.end_date = end_date
-			period_card.insert(ignore_permissions=True)
-			period_card.submit()
-			scp_count = scp_count + 1
-			if start_date < first_start_date:
-				first_start_date = start_date
-			last_end_date = end_date
-
-		start_date = getdate(add_days(end_date, 1))
-		end_date = get_scorecard_date(sc.period, start_date)
+	scp_count = len(periods)
 	if scp_count > 0:
 		frappe.msgprint(
 			_("Created {0} scorecards for {1} between:").format(scp_count, sc.supplier)
 			+ " "
-			+ str(first_start_date)
+			+ str(periods[0][0])
 			+ " - "
-			+ str(last_end_date)
+			+ str(periods[-1][1])
 		)
 	return scp_count
 
 
+def get_new_periods(scorecards):
+	"""
+	Returns the start and end dates of the periods to create for each scorecard, from the creation of
+	its supplier to today, skipping the periods overlapping the submitted ones
+	"""
+	scorecard = frappe.qb.DocType("Supplier Scorecard")
+	supplier = frappe.qb.DocType("Supplier")
+	scorecards = (
+		frappe.qb.from_(scorecard)
+		.join(supplier)
+		.on(supplier.name == scorecard.supplier)
+		.select(scorecard.name, scorecard.period, supplier.creation)
+		.where(scorecard.name.isin(scorecards))
+	).run(as_dict=True)
+
+	submitted_periods = {}
+	for period in frappe.get_all(
+		"Supplier Scorecard Period",
+		filters={"scorecard": ("in", [sc.name for sc in scorecards]), "docstatus": 1},
+		fields=["scorecard", "start_date", "end_date"],
+		order_by="start_date",
+	):
+		submitted_periods.setdefault(period.scorecard, []).append(period)
+
+	todays = getdate(nowdate())
+	new_periods = {}
+	for sc in scorecards:
+		overlaps = OverlapIndex(submitted_periods.get(sc.name, []))
+		new_periods[sc.name] = []
+
+		start_date = getdate(sc.creation)
+		end_date = get_scorecard_date(sc.period, start_date)
+		while (start_date < todays) and (end_date <= todays):
+			# check to make sure there is no scorecard period already created
+			if not overlaps.overlaps(start_date, end_date):
+				new_periods[sc.name].append((start_date, end_date))
+
+			start_date = getdate(add_days(end_date, 1))
+			end_date = get_scorecard_date(sc.period, start_date)
+
+	return new_periods
+
+
+class OverlapIndex:
+	"""Finds whether a period overlaps one of the submitted `periods`, sorted by start date"""
+
+	def __init__(self, periods):
+		self.start_dates = [getdate(period.start_date) for period in periods]
+
+		# latest end date of the periods starting up to each period
+		self.max_end_dates = []
+		for period in periods:
+			end_date = getdate(period.end_date)
+			self.max_end_dates.append(
+				max(end_date, self.max_end_dates[-1]) if self.max_end_dates else end_date
+			)
+
+		# periods ending before they start, matched the other way round
+		self.reversed_periods = [
+			(getdate(period.start_date), getdate(period.end_date))
+			for period in periods
+			if getdate(period.start_date) > getdate(period.end_date)
+		]
+
+	def overlaps(self, start_date, end_date):
+		i = bisect_left(self.start_dates, end_date)
+		if i and self.max_end_dates[i - 1] > start_date:
+			return True
+
+		return any(
+			period_start > end_date and period_end < start_date
+			for period_start, period_end in self.reversed_periods
+		)
+
+
 def get_scorecard_date(period, start_date):
 	if period == "Per Week":
 		end_date = getdate(add_days(start_date, 7))
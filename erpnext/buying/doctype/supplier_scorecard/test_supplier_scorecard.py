@@ -4,6 +4,21 @@
 
 import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, flt, getdate, nowdate
+
+import erpnext.buying.doctype.supplier_scorecard_variable.supplier_scorecard_variable as variable_functions
+from erpnext.buying.doctype.purchase_order.purchase_order import make_purchase_invoice, make_purchase_receipt
+from erpnext.buying.doctype.purchase_order.test_purchase_order import create_purchase_order
+from erpnext.buying.doctype.request_for_quotation.request_for_quotation import (
+	make_supplier_quotation_from_rfq,
+)
+from erpnext.buying.doctype.request_for_quotation.test_request_for_quotation import (
+	make_request_for_quotation,
+)
+from erpnext.buying.doctype.supplier_scorecard_period.scorecard_evaluator import (
+	BATCH_VARIABLES,
+	ScorecardPeriodEvaluator,
+)
 
 
 class TestSupplierScorecard(IntegrationTestCase):
@@ -18,6 +33,96 @@ class TestSupplierScorecard(IntegrationTestCase):
 			d.weight = 0
 		self.assertRaises(frappe.ValidationError, my_doc.insert)
 
+	def test_batch_variables_match_variable_functions(self):
+		today = nowdate()
+		period = frappe._dict(
+			supplier="_Test Supplier",
+			start_date=getdate(add_days(today, -60)),
+			end_date=getdate(add_days(today, -10)),
+			variables=[frappe._dict(path=path) for path in BATCH_VARIABLES],
+		)
+
+		# received late and partly, the rest stays open until the end of the period
+		po = make_dated_purchase_order(add_days(today, -50), add_days(today, -40), qty=10, rate=500)
+		make_dated_purchase_receipt(po, add_days(today, -30), qty=6)
+		pi = make_purchase_invoice(po.name)
+		pi.set_posting_time = 1
+		pi.posting_date = add_days(today, -35)
+		pi.submit()
+
+		# received on time
+		po = make_dated_purchase_order(add_days(today, -45), add_days(today, -20), qty=5, rate=200)
+		make_dated_purchase_receipt(po, add_days(today, -25))
+
+		# outside the period
+		make_dated_purchase_order(add_days(today, -100), add_days(today, -90), qty=4, rate=300)
+		make_dated_purchase_order(add_days(today, -5), today, qty=3, rate=100)
+
+		for rfq_date, sq_date in (
+			(add_days(today, -55), add_days(today, -52)),
+			(add_days(today, -80), today),
+		):
+			rfq = make_request_for_quotation(do_not_submit=True)
+			rfq.transaction_date = rfq_date
+			rfq.submit()
+
+			sq = make_supplier_quotation_from_rfq(rfq.name, for_supplier="_Test Supplier")
+			sq.transaction_date = sq_date
+			sq.submit()
+
+		evaluator = ScorecardPeriodEvaluator({})
+		evaluator.load_amounts([period])
+		for variable in period.variables:
+			expected = getattr(variable_functions, variable.path)(period)
+			self.assertAlmostEqual(
+				flt(evaluator.get_variable_value(variable, period)), flt(expected), 2, msg=variable.path
+			)
+
+		values = {
+			variable.path: evaluator.get_variable_value(variable, period) for variable in period.variables
+		}
+		self.assertTrue(values["get_item_workdays"])
+		self.assertTrue(values["get_total_days_late"])
+		self.assertTrue(values["get_cost_of_on_time_shipments"])
+		self.assertTrue(values["get_rfq_response_days"])
+
+	def test_periods_are_scored_like_documents(self):
+		delete_test_scorecards()
+		frappe.db.set_value("Supplier", "_Test Supplier", "creation", add_days(nowdate(), -40))
+		scorecard = make_supplier_scorecard().insert()
+
+		periods = frappe.get_all(
+			"Supplier Scorecard Period", filters={"scorecard": scorecard.name, "docstatus": 1}, pluck="name"
+		)
+		self.assertTrue(periods)
+
+		period = frappe.get_doc("Supplier Scorecard Period", periods[0])
+		total_score = period.total_score
+		period.calculate_variables()
+		period.calculate_criteria()
+		period.calculate_score()
+		self.assertEqual(flt(period.total_score, 2), flt(total_score, 2))
+
+
+def make_dated_purchase_order(transaction_date, schedule_date, qty, rate):
+	po = create_purchase_order(transaction_date=transaction_date, qty=qty, rate=rate, do_not_save=True)
+	po.schedule_date = schedule_date
+	po.items[0].schedule_date = schedule_date
+	po.insert()
+	po.submit()
+	return po
+
+
+def make_dated_purchase_receipt(po, posting_date, qty=None):
+	pr = make_purchase_receipt(po.name)
+	pr.set_posting_time = 1
+	pr.posting_date = posting_date
+	if qty is not None:
+		pr.items[0].qty = qty
+		pr.items[0].received_qty = qty
+	pr.submit()
+	return pr
+
 
 def make_supplier_scorecard():
 	my_doc = frappe.get_doc(valid_scorecard[0])
@@ -0,0 +1,505 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Batch creation of Supplier Scorecard Periods.
+
+A Scorecard Period used to be created and submitted one at a time, each of its variables running its
+own query for the supplier and the dates of the period. `make_scorecard_periods` creates the periods
+of many scorecards together instead:
+
+1. the standard variables are read with one query per source (Purchase Receipts, Purchase Order
+   Items, RFQs...) for all the suppliers and the whole date range, grouped by supplier and date, and
+   summed over every period with prefix sums,
+2. the criteria formulas are prepared once per criteria and evaluated for every period,
+3. the periods are named from a block of their naming series and inserted with multi row inserts,
+   already submitted.
+
+Variables with a custom path are still evaluated per period, with the period as argument.
+"""
+
+from bisect import bisect_left, bisect_right
+
+import frappe
+from frappe import _
+from frappe.model.naming import make_autoname
+from frappe.utils import cstr, flt, getdate, now
+
+import erpnext.buying.doctype.supplier_scorecard_variable.supplier_scorecard_variable as variable_functions
+from erpnext.buying.doctype.supplier_scorecard_criteria.supplier_scorecard_criteria import get_variables
+from erpnext.buying.doctype.supplier_scorecard_period.supplier_scorecard_period import import_string_path
+from erpnext.utilities.naming import reserve_names
+
+# suppliers read by a variable query at a time
+SUPPLIER_CHUNK_SIZE = 500
+
+# the amounts of the standard variables by supplier and date, with the same conditions as the
+# functions of Supplier Scorecard Variable
+VARIABLE_QUERIES = {
+	"purchase_receipts": """
+		select
+			pr.supplier, pr.posting_date as date,
+			count(pr_item.base_amount) as received_count,
+			sum(pr_item.received_qty * pr_item.base_rate) as received_amount,
+			sum(pr_item.received_qty) as received_items,
+			sum(pr_item.rejected_qty * pr_item.base_rate) as rejected_amount,
+			sum(pr_item.rejected_qty) as rejected_items,
+			sum(pr_item.qty * pr_item.base_rate) as accepted_amount,
+			sum(pr_item.qty) as accepted_items
+		from `tabPurchase Receipt Item` pr_item, `tabPurchase Receipt` pr
+		where pr.supplier in %(suppliers)s
+			and pr.posting_date between %(from_date)s and %(to_date)s
+			and pr_item.docstatus = 1
+			and pr_item.parent = pr.name
+		group by pr.supplier, pr.posting_date""",
+	"order_items": """
+		select
+			po.supplier, po_item.schedule_date as date,
+			sum(po_item.base_amount) as total_cost,
+			count(po_item.base_amount) as total_shipments
+		from `tabPurchase Order Item` po_item, `tabPurchase Order` po
+		where po.supplier in %(suppliers)s
+			and po_item.schedule_date between %(from_date)s and %(to_date)s
+			and po_item.docstatus = 1
+			and po_item.parent = po.name
+		group by po.supplier, po_item.schedule_date""",
+	"open_order_items": """
+		select
+			po.supplier, po_item.schedule_date as date,
+			sum(po_item.qty) as ordered_qty,
+			sum(po_item.qty - po_item.received_qty) as missing_qty
+		from `tabPurchase Order Item` po_item, `tabPurchase Order` po
+		where po.supplier in %(suppliers)s
+			and po_item.received_qty < po_item.qty
+			and po_item.schedule_date between %(from_date)s and %(to_date)s
+			and po_item.parent = po.name
+		group by po.supplier, po_item.schedule_date""",
+	"received_order_items": """
+		select
+			po.supplier, po_item.schedule_date as date,
+			sum(case when po_item.schedule_date >= pr.posting_date then pr_item.base_amount end)
+				as on_time_cost,
+			count(case when po_item.schedule_date <= pr.posting_date and po_item.qty = pr_item.qty
+				then pr_item.qty end) as on_time_shipments,
+			sum(case when po_item.schedule_date < pr.posting_date
+				then datediff(pr.posting_date, po_item.schedule_date) * pr_item.qty end) as days_late
+		from
+			`tabPurchase Order Item` po_item,
+			`tabPurchase Receipt Item` pr_item,
+			`tabPurchase Order` po,
+			`tabPurchase Receipt` pr
+		where po.supplier in %(suppliers)s
+			and po_item.schedule_date between %(from_date)s and %(to_date)s
+			and pr_item.docstatus = 1
+			and pr_item.purchase_order_item = po_item.name
+			and po_item.parent = po.name
+			and pr_item.parent = pr.name
+		group by po.supplier, po_item.schedule_date""",
+	"purchase_orders": """
+		select supplier, transaction_date as date, sum(total_qty) as ordered_qty
+		from `tabPurchase Order`
+		where supplier in %(suppliers)s
+			and docstatus = 1
+			and transaction_date between %(from_date)s and %(to_date)s
+		group by supplier, transaction_date""",
+	"purchase_invoices": """
+		select supplier, posting_date as date, sum(total_qty) as invoiced_qty
+		from `tabPurchase Invoice`
+		where supplier in %(suppliers)s
+			and docstatus = 1
+			and posting_date between %(from_date)s and %(to_date)s
+		group by supplier, posting_date""",
+	"rfqs": """
+		select
+			rfq_sup.supplier, rfq.transaction_date as date,
+			count(rfq.name) as rfq_number,
+			count(rfq_item.name) as rfq_items
+		from
+			`tabRequest for Quotation Item` rfq_item,
+			`tabRequest for Quotation Supplier` rfq_sup,
+			`tabRequest for Quotation` rfq
+		where rfq_sup.supplier in %(suppliers)s
+			and rfq.transaction_date between %(from_date)s and %(to_date)s
+			and rfq_item.docstatus = 1
+			and rfq_item.parent = rfq.name
+			and rfq_sup.parent = rfq.name
+		group by rfq_sup.supplier, rfq.transaction_date""",
+	"supplier_quotations": """
+		select
+			rfq_sup.supplier, rfq.transaction_date as date,
+			count(sq.name) as sq_number,
+			count(sq_item.name) as sq_items,
+			sum(datediff(sq.transaction_date, rfq.transaction_date)) as response_days
+		from
+			`tabRequest for Quotation Item` rfq_item,
+			`tabSupplier Quotation Item` sq_item,
+			`tabSupplier Quotation` sq,
+			`tabRequest for Quotation Supplier` rfq_sup,
+			`tabRequest for Quotation` rfq
+		where rfq_sup.supplier in %(suppliers)s
+			and rfq.transaction_date between %(from_date)s and %(to_date)s
+			and sq_item.request_for_quotation_item = rfq_item.name
+			and sq_item.docstatus = 1
+			and sq.supplier = rfq_sup.supplier
+			and sq_item.parent = sq.name
+			and rfq_item.docstatus = 1
+			and rfq_item.parent = rfq.name
+			and rfq_sup.parent = rfq.name
+		group by rfq_sup.supplier, rfq.transaction_date""",
+}
+
+# queries whose amounts count once for every day from their date to the end of the period
+DAYS_LEFT_QUERIES = ("open_order_items",)
+
+# the standard variables as sums of amounts of the queries: (sign, query, column)
+BATCH_VARIABLES = {
+	"get_item_workdays": ((1, "open_order_items", "ordered_qty"),),
+	"get_total_cost_of_shipments": ((1, "order_items", "total_cost"),),
+	"get_cost_of_delayed_shipments": (
+		(1, "order_items", "total_cost"),
+		(-1, "received_order_items", "on_time_cost"),
+	),
+	"get_cost_of_on_time_shipments": ((1, "received_order_items", "on_time_cost"),),
+	"get_total_days_late": (
+		(1, "received_order_items", "days_late"),
+		(1, "open_order_items", "missing_qty"),
+	),
+	"get_on_time_shipments": ((1, "received_order_items", "on_time_shipments"),),
+	"get_late_shipments": (
+		(1, "order_items", "total_shipments"),
+		(-1, "received_order_items", "on_time_shipments"),
+	),
+	"get_total_received": ((1, "purchase_receipts", "received_count"),),
+	"get_total_received_amount": ((1, "purchase_receipts", "received_amount"),),
+	"get_total_received_items": ((1, "purchase_receipts", "received_items"),),
+	"get_total_rejected_amount": ((1, "purchase_receipts", "rejected_amount"),),
+	"get_total_rejected_items": ((1, "purchase_receipts", "rejected_items"),),
+	"get_total_accepted_amount": ((1, "purchase_receipts", "accepted_amount"),),
+	"get_total_accepted_items": ((1, "purchase_receipts", "accepted_items"),),
+	"get_total_shipments": ((1, "order_items", "total_shipments"),),
+	"get_ordered_qty": ((1, "purchase_orders", "ordered_qty"),),
+	"get_invoiced_qty": ((1, "purchase_invoices", "invoiced_qty"),),
+	"get_rfq_total_number": ((1, "rfqs", "rfq_number"),),
+	"get_rfq_total_items": ((1, "rfqs", "rfq_items"),),
+	"get_sq_total_number": ((1, "supplier_quotations", "sq_number"),),
+	"get_sq_total_items": ((1, "supplier_quotations", "sq_items"),),
+	"get_rfq_response_days": ((1, "supplier_quotations", "response_days"),),
+}
+
+
+def make_scorecard_periods(new_periods):
+	"""
+	Creates and submits the Scorecard Periods `new_periods`, the start and end dates of the
+	periods to create by Supplier Scorecard
+	"""
+	new_periods = {scorecard: periods for scorecard, periods in new_periods.items() if periods}
+	if new_periods:
+		ScorecardPeriodEvaluator(new_periods).make_periods()
+
+
+class ScorecardPeriodEvaluator:
+	def __init__(self, new_periods):
+		self.new_periods = new_periods
+		self.scorecards = {
+			scorecard.name: scorecard
+			for scorecard in frappe.get_all(
+				"Supplier Scorecard", filters={"name": ("in", list(new_periods))}, fields=["name", "supplier"]
+			)
+		}
+
+		self.criteria = {}
+		for row in frappe.get_all(
+			"Supplier Scorecard Scoring Criteria",
+			filters={"parenttype": "Supplier Scorecard", "parent": ("in", list(new_periods))},
+			fields=["parent", "criteria_name", "weight"],
+			order_by="idx",
+		):
+			self.criteria.setdefault(row.parent, []).append(row)
+
+		self.criteria_setup = {}
+		self.amounts = {}
+
+	def make_periods(self):
+		periods = []
+		for scorecard, dates in self.new_periods.items():
+			criteria = [self.get_criteria_setup(row) for row in self.criteria.get(scorecard, [])]
+			variables = []
+			for row in criteria:
+				for variable in row.variables:
+					if variable not in variables:
+						variables.append(variable)
+
+			for start_date, end_date in dates:
+				periods.append(
+					frappe._dict(
+						scorecard=scorecard,
+						supplier=self.scorecards[scorecard].supplier,
+						start_date=getdate(start_date),
+						end_date=getdate(end_date),
+						criteria=criteria,
+						variables=variables,
+					)
+				)
+
+		self.load_amounts(periods)
+		for period in periods:
+			self.evaluate(period)
+
+		self.insert_periods(periods)
+
+	def get_criteria_setup(self, row):
+		"""The scoring criteria of a scorecard, with the formula prepared for evaluation"""
+		if row.criteria_name not in self.criteria_setup:
+			max_score, formula = frappe.db.get_value(
+				"Supplier Scorecard Criteria", row.criteria_name, ["max_score", "formula"]
+			)
+			variables = get_variables(row.criteria_name)
+
+			# the variables of the formula become names, bound to their value in every period
+			expression = formula.replace("\r", "").replace("\n", "")
+			for i, variable in enumerate(variables):
+				expression = expression.replace("{" + variable.param_name + "}", f"scorecard_variable_{i}")
+
+			self.criteria_setup[row.criteria_name] = frappe._dict(
+				max_score=max_score, formula=formula, expression=expression, variables=variables
+			)
+
+		return frappe._dict(self.criteria_setup[row.criteria_name], weight=row.weight)
+
+	def load_amounts(self, periods):
+		"""Reads the amounts of the queries of the standard variables of the `periods`"""
+		queries = {
+			query
+			for period in periods
+			for variable in period.variables
+			if "." not in variable.path
+			for _sign, query, _column in BATCH_VARIABLES.get(variable.path, ())
+		}
+		if not queries:
+			return
+
+		suppliers = list({period.supplier for period in periods})
+		values = {
+			"from_date": min(period.start_date for period in periods),
+			"to_date": max(period.end_date for period in periods),
+		}
+
+		for query in queries:
+			rows = []
+			for i in range(0, len(suppliers), SUPPLIER_CHUNK_SIZE):
+				values["suppliers"] = suppliers[i : i + SUPPLIER_CHUNK_SIZE]
+				rows += frappe.db.sql(VARIABLE_QUERIES[query], values, as_dict=True)
+
+			by_supplier = {}
+			for row in sorted(rows, key=lambda row: row.date):
+				by_supplier.setdefault(row.supplier, []).append(row)
+
+			self.amounts[query] = {
+				supplier: DailyAmounts(supplier_rows) for supplier, supplier_rows in by_supplier.items()
+			}
+
+	def evaluate(self, period):
+		"""Sets the values of the variables, the scores of the criteria and the total score of `period`"""
+		period.values = [self.get_variable_value(variable, period) for variable in period.variables]
+
+		period.scores = []
+		total_score = 0
+		for criteria in period.criteria:
+			values = {
+				f"scorecard_variable_{i}": get_formula_value(period.values[period.variables.index(variable)])
+				for i, variable in enumerate(criteria.variables)
+			}
+			try:
+				score = min(
+					criteria.max_score,
+					max(0, frappe.safe_eval(criteria.expression, None, {"max": max, "min": min, **values})),
+				)
+			except Exception:
+				frappe.throw(
+					_(
+						"Could not solve criteria score function for {0}. Make sure the formula is valid."
+					).format(criteria.criteria_name),
+					frappe.ValidationError,
+				)
+
+			period.scores.append(score)
+			total_score += score * criteria.weight / 100.0
+
+		period.total_score = total_score
+
+	def get_variable_value(self, variable, period):
+		if "." in variable.path:
+			return import_string_path(variable.path)(self.get_period_doc(period))
+
+		if variable.path == "get_total_workdays":
+			return (period.end_date - period.start_date).days
+
+		if variable.path not in BATCH_VARIABLES:
+			return getattr(variable_functions, variable.path)(self.get_period_doc(period))
+
+		value = 0
+		for sign, query, column in BATCH_VARIABLES[variable.path]:
+			amounts = self.amounts[query].get(period.supplier)
+			if not amounts:
+				continue
+
+			if query in DAYS_LEFT_QUERIES:
+				value += sign * amounts.get_total_by_days_left(column, period.start_date, period.end_date)
+			else:
+				value += sign * amounts.get_total(column, period.start_date, period.end_date)
+
+		return value
+
+	def get_period_doc(self, period):
+		"""The unsaved Scorecard Period, for the variables computed from the document"""
+		if not period.get("doc"):
+			period.doc = frappe.get_doc(
+				{
+					"doctype": "Supplier Scorecard Period",
+					"scorecard": period.scorecard,
+					"supplier": period.supplier,
+					"start_date": period.start_date,
+					"end_date": period.end_date,
+					"criteria": [
+						{
+							"criteria_name": criteria.criteria_name,
+							"weight": criteria.weight,
+							"max_score": criteria.max_score,
+							"formula": criteria.formula,
+						}
+						for criteria in period.criteria
+					],
+					"variables": period.variables,
+				}
+			)
+
+		return period.doc
+
+	def insert_periods(self, periods):
+		naming_series = frappe.get_meta("Supplier Scorecard Period").get_field("naming_series").options
+		naming_series = cstr(naming_series).split("\n")[0]
+		names = reserve_names("Supplier Scorecard Period", naming_series, len(periods))
+		timestamp, user = now(), frappe.session.user
+		common_values = (timestamp, timestamp, user, user, 1)
+
+		period_rows, criteria_rows, variable_rows = [], [], []
+		for name, period in zip(names, periods, strict=True):
+			period_rows.append(
+				(
+					name,
+					*common_values,
+					naming_series,
+					period.supplier,
+					period.scorecard,
+					period.start_date,
+					period.end_date,
+					period.total_score,
+				)
+			)
+
+			for idx, (criteria, score) in enumerate(zip(period.criteria, period.scores, strict=True), 1):
+				criteria_rows.append(
+					(
+						make_autoname("hash", "Supplier Scorecard Scoring Criteria"),
+						*common_values,
+						name,
+						"Supplier Scorecard Period",
+						"criteria",
+						idx,
+						criteria.criteria_name,
+						criteria.weight,
+						criteria.max_score,
+						criteria.formula,
+						score,
+					)
+				)
+
+			for idx, (variable, value) in enumerate(zip(period.variables, period.values, strict=True), 1):
+				variable_rows.append(
+					(
+						make_autoname("hash", "Supplier Scorecard Scoring Variable"),
+						*common_values,
+						name,
+						"Supplier Scorecard Period",
+						"variables",
+						idx,
+						variable.variable_label,
+						variable.description,
+						variable.param_name,
+						variable.path,
+						flt(value),
+					)
+				)
+
+		common_fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+		child_fields = [*common_fields, "parent", "parenttype", "parentfield", "idx"]
+		frappe.db.bulk_insert(
+			"Supplier Scorecard Period",
+			fields=[
+				*common_fields,
+				"naming_series",
+				"supplier",
+				"scorecard",
+				"start_date",
+				"end_date",
+				"total_score",
+			],
+			values=period_rows,
+			chunk_size=1000,
+		)
+		frappe.db.bulk_insert(
+			"Supplier Scorecard Scoring Criteria",
+			fields=[*child_fields, "criteria_name", "weight", "max_score", "formula", "score"],
+			values=criteria_rows,
+			chunk_size=1000,
+		)
+		frappe.db.bulk_insert(
+			"Supplier Scorecard Scoring Variable",
+			fields=[*child_fields, "variable_label", "description", "param_name", "path", "value"],
+			values=variable_rows,
+			chunk_size=1000,
+		)
+
+
+class DailyAmounts:
+	"""The amounts of a supplier by date, with prefix sums to total them over any period"""
+
+	def __init__(self, rows):
+		self.dates = [getdate(row.date).toordinal() for row in rows]
+		self.totals = {}
+		self.day_totals = {}
+
+		for column in rows[0]:
+			if column in ("supplier", "date"):
+				continue
+
+			# running totals of the amounts, and of the amounts times their day
+			totals, day_totals = [0], [0]
+			for day, row in zip(self.dates, rows, strict=True):
+				totals.append(totals[-1] + flt(row[column]))
+				day_totals.append(day_totals[-1] + day * flt(row[column]))
+
+			self.totals[column] = totals
+			self.day_totals[column] = day_totals
+
+	def get_range(self, start_date, end_date):
+		return (
+			bisect_left(self.dates, start_date.toordinal()),
+			bisect_right(self.dates, end_date.toordinal()),
+		)
+
+	def get_total(self, column, start_date, end_date):
+		start, end = self.get_range(start_date, end_date)
+		return self.totals[column][end] - self.totals[column][start]
+
+	def get_total_by_days_left(self, column, start_date, end_date):
+		"""Total of the amounts times the days from their date to `end_date`"""
+		start, end = self.get_range(start_date, end_date)
+		total = self.totals[column][end] - self.totals[column][start]
+		day_total = self.day_totals[column][end] - self.day_totals[column][start]
+		return end_date.toordinal() * total - day_total
+
+
+def get_formula_value(value):
+	"""The value of a variable as `get_eval_statement` writes it in a formula"""
+	return float(f"{value:.2f}") if value else 0.0
@@ -2,10 +2,33 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import json
+from functools import partial
+
 import frappe
 from frappe import _
 from frappe.model.document import Document
-from frappe.utils import comma_or, flt, get_link_to_form, getdate, now, nowdate, safe_div
+from frappe.query_builder import Case
+from frappe.utils import cint, comma_or, flt, get_link_to_form, getdate, now, nowdate, safe_div
+
+# target rows updated by one statement
+TARGET_ROW_CHUNK_SIZE = 500
+
+# status updater keys that define the percent field of the target documents
+PERCENT_TARGET_KEYS = (
+	"target_dt",
+	"target_parent_dt",
+	"target_parent_field",
+	"target_ref_field",
+	"target_field",
+	"status_field",
+	"keyword",
+)
+
+DIRTY_PERCENT_FIELDS_KEY = "dirty_percent_fields"
+
+# percent fields that are always updated immediately, the setting in Stock Settings only covers stock
+BILLING_PERCENT_FIELDS = ("per_billed",)
 
 
 class OverAllowanceError(frappe.ValidationError):
@@ -439,62 +462,56 @@ class StatusUpdater(Document):
 
 	def _update_children(self, args, update_modified):
 		"""Update quantities or amount in child table"""
-		for d in self.get_all_children():
-			if d.doctype != args["source_dt"]:
-				continue
+		rows = [d for d in self.get_all_children() if d.doctype == args["source_dt"]]
+		if not rows:
+			return
+
+		subcontracting_requests = get_subcontracting_material_requests(
+			{d.get("material_request") for d in rows if d.get("material_request")}
+		)
 
-			if (
-				d.get("material_request")
-				and frappe.db.get_value("Material Request", d.material_request, "material_request_type")
-				== "Subcontracting"
-			):
+		# target rows by the source field they are summed from, which switches for good once a row
+		# comes from a subcontracting material request
+		detail_ids = {}
+		for d in rows:
+			if d.get("material_request") in subcontracting_requests:
 				args.update({"source_field": "fg_item_qty"})
 
-			self._update_modified(args, update_modified)
-
-			# updates qty in the child table
-			args["detail_id"] = d.get(args["join_field"])
-
-			args["second_source_condition"] = ""
-			if (
-				args.get("second_source_dt")
-				and args.get("second_source_field")
-				and args.get("second_join_field")
-			):
-				if not args.get("second_source_extra_cond"):
-					args["second_source_extra_cond"] = ""
-
-				args["second_source_condition"] = frappe.db.sql(
-					""" select ifnull((select sum({second_source_field})
-					from `tab{second_source_dt}`
-					where `{second_join_field}`='{detail_id}'
-					and (`tab{second_source_dt}`.docstatus=1)
-					{second_source_extra_cond}), 0) """.format(**args)
-				)[0][0]
-
-			if args["detail_id"]:
-				if not args.get("extra_cond"):
-					args["extra_cond"] = ""
-
-				args["source_dt_value"] = (
-					frappe.db.sql(
-						"""
-						(select ifnull(sum({source_field}), 0)
-							from `tab{source_dt}` where `{join_field}`='{detail_id}'
-							and (docstatus=1 {cond}) {extra_cond})
-				""".format(**args)
-					)[0][0]
-					or 0.0
-				)
+			if d.get(args["join_field"]):
+				detail_ids.setdefault(args["source_field"], set()).add(d.get(args["join_field"]))
 
-				if args["second_source_condition"]:
-					args["source_dt_value"] += flt(args["second_source_condition"])
+		if not detail_ids:
+			return
 
-				frappe.db.sql(
-					"""update `tab{target_dt}`
-					set {target_field} = {source_dt_value} {update_modified}
-					where name='{detail_id}'""".format(**args)
-				)
+		if not args.get("extra_cond"):
+			args["extra_cond"] = ""
+
+		second_source_values = {}
+		if args.get("second_source_dt") and args.get("second_source_field") and args.get("second_join_field"):
+			if not args.get("second_source_extra_cond"):
+				args["second_source_extra_cond"] = ""
+
+			second_source_values = get_summed_values(
+				args["second_source_dt"],
+				args["second_join_field"],
+				args["second_source_field"],
+				set().union(*detail_ids.values()),
+				"`tab{second_source_dt}`.docstatus=1 {second_source_extra_cond}".format(**args),
+			)
+
+		values = {}
+		for source_field, names in detail_ids.items():
+			source_values = get_summed_values(
+				args["source_dt"],
+				args["join_field"],
+				source_field,
+				names,
+				"(docstatus=1 {cond}) {extra_cond}".format(**args),
+			)
+			for name in names:
+				values[name] = flt(source_values.get(name)) + flt(second_source_values.get(name))
+
+		update_target_rows(args["target_dt"], args["target_field"], values, update_modified)
 
 	@staticmethod
 	def _calculate_target_parent_percentage(
@@ -534,17 +551,13 @@ class StatusUpdater(Document):
 		if args.get("percent_join_field_parent"):
 			# if reference to target doc where % is to be updated, is
 			# in source doc's parent form, consider percent_join_field_parent
-			args["name"] = self.get(args["percent_join_field_parent"])
-			self._update_percent_field(args, update_modified)
+			names = [self.get(args["percent_join_field_parent"])]
 		else:
-			distinct_transactions = set(
-				d.get(args["percent_join_field"]) for d in self.get_all_children(args["source_dt"])
-			)
+			names = [d.get(args["percent_join_field"]) for d in self.get_all_children(args["source_dt"])]
 
-			for name in distinct_transactions:
-				if name:
-					args["name"] = name
-					self._update_percent_field(args, update_modified)
+		names = [name for name in set(names) if name]
+		if names and args.get("target_parent_field"):
+			update_percent_fields(args, names, update_modified)
 
 	def _update_percent_field(self, args, update_modified=True):
 		"""Update percent field in parent transaction"""
@@ -573,15 +586,6 @@ class StatusUpdater(Document):
 				update_data.update(status)
 			target.db_set(update_data, update_modified=update_modified, notify=True)
 
-	def _update_modified(self, args, update_modified):
-		if not update_modified:
-			args["update_modified"] = ""
-			return
-
-		args["update_modified"] = ", modified = {}, modified_by = {}".format(
-			frappe.db.escape(now()), frappe.db.escape(frappe.session.user)
-		)
-
 	def update_billing_status_for_zero_amount_refdoc(self, ref_dt):
 		ref_fieldname = frappe.scrub(ref_dt)
 
@@ -607,41 +611,206 @@ class StatusUpdater(Document):
 			self.update_billing_status(zero_amount_refdocs, ref_dt, ref_fieldname)
 
 	def update_billing_status(self, zero_amount_refdoc, ref_dt, ref_fieldname):
-		for ref_dn in zero_amount_refdoc:
-			ref_doc_qty = flt(
-				frappe.db.sql(
-					"""select ifnull(sum(qty), 0) from `tab{} Item`
-				where parent={}""".format(ref_dt, "%s"),
-					(ref_dn),
-				)[0][0]
-			)
+		ref_doc_qty = get_summed_values(f"{ref_dt} Item", "parent", "qty", zero_amount_refdoc)
+		billed_qty = get_summed_values(
+			f"{self.doctype} Item", ref_fieldname, "qty", zero_amount_refdoc, "docstatus=1"
+		)
 
-			billed_qty = flt(
-				frappe.db.sql(
-					"""select ifnull(sum(qty), 0)
-				from `tab{} Item` where {}={} and docstatus=1""".format(self.doctype, ref_fieldname, "%s"),
-					(ref_dn),
-				)[0][0]
+		for ref_dn in zero_amount_refdoc:
+			per_billed = (
+				safe_div(
+					min(flt(ref_doc_qty.get(ref_dn)), flt(billed_qty.get(ref_dn))),
+					flt(ref_doc_qty.get(ref_dn)),
+				)
+				* 100
 			)
 
-			per_billed = safe_div(min(ref_doc_qty, billed_qty), ref_doc_qty) * 100
-
 			ref_doc = frappe.get_lazy_doc(ref_dt, ref_dn)
 
-			ref_doc.db_set("per_billed", per_billed)
-
+			update_data = {"per_billed": per_billed}
 			# set billling status
 			if hasattr(ref_doc, "billing_status"):
-				if ref_doc.per_billed < 0.001:
-					ref_doc.db_set("billing_status", "Not Billed")
-				elif ref_doc.per_billed > 99.999999:
-					ref_doc.db_set("billing_status", "Fully Billed")
+				if per_billed < 0.001:
+					update_data["billing_status"] = "Not Billed"
+				elif per_billed > 99.999999:
+					update_data["billing_status"] = "Fully Billed"
 				else:
-					ref_doc.db_set("billing_status", "Partly Billed")
+					update_data["billing_status"] = "Partly Billed"
 
+			ref_doc.db_set(update_data)
 			ref_doc.set_status(update=True)
 
 
+def get_summed_values(doctype, join_field, source_field, names, condition=None):
+	"""Returns {name: sum of `source_field`} of the rows of `doctype` whose `join_field` is in `names`"""
+	if not names:
+		return {}
+
+	return dict(
+		frappe.db.sql(
+			f"""select `{join_field}`, ifnull(sum({source_field}), 0)
+			from `tab{doctype}`
+			where `{join_field}` in %(names)s {"and " + condition if condition else ""}
+			group by `{join_field}`""",
+			{"names": list(names)},
+		)
+	)
+
+
+def update_target_rows(target_dt, target_field, values, update_modified=True):
+	"""Sets `target_field` of the rows of `target_dt` to their value in {name: value}"""
+	target = frappe.qb.DocType(target_dt)
+	names = sorted(values)
+
+	for i in range(0, len(names), TARGET_ROW_CHUNK_SIZE):
+		chunk = names[i : i + TARGET_ROW_CHUNK_SIZE]
+
+		new_value = Case()
+		for name in chunk:
+			new_value = new_value.when(target.name == name, values[name])
+
+		query = frappe.qb.update(target).set(target[target_field], new_value).where(target.name.isin(chunk))
+		if update_modified:
+			query = query.set(target.modified, now()).set(target.modified_by, frappe.session.user)
+
+		query.run()
+
+
+def get_subcontracting_material_requests(material_requests):
+	if not material_requests:
+		return set()
+
+	return set(
+		frappe.get_all(
+			"Material Request",
+			filters={"name": ["in", list(material_requests)], "material_request_type": "Subcontracting"},
+			pluck="name",
+		)
+	)
+
+
+def update_percent_fields(args, names, update_modified=True):
+	"""
+	Recalculates the percent field set by `args` of the target documents `names`, now, when the
+	transaction is committed or in a background job, as set in Stock Settings. Billed percentages
+	are always recalculated now.
+	"""
+	target = frappe._dict({key: args.get(key) for key in PERCENT_TARGET_KEYS})
+	mode = None
+	if target.target_parent_field not in BILLING_PERCENT_FIELDS:
+		mode = frappe.db.get_single_value(
+			"Stock Settings", "update_percentages_of_source_documents", cache=True
+		)
+
+	if mode == "On Commit":
+		defer_percent_fields(target, names, update_modified)
+	elif mode == "In Background":
+		frappe.db.after_commit.add(partial(mark_percent_fields_dirty, target, names, update_modified))
+	else:
+		set_percent_fields(target, names, update_modified)
+
+
+def defer_percent_fields(target, names, update_modified):
+	"""Collects the target documents of the transaction, to be recalculated once before it commits"""
+	if not getattr(frappe.local, "pending_percent_fields", None):
+		frappe.local.pending_percent_fields = {}
+		frappe.db.before_commit.add(flush_pending_percent_fields)
+		frappe.db.before_rollback.add(clear_pending_percent_fields)
+
+	key = (frappe.as_json(target), update_modified)
+	frappe.local.pending_percent_fields.setdefault(key, set()).update(names)
+
+
+def flush_pending_percent_fields():
+	pending = getattr(frappe.local, "pending_percent_fields", None) or {}
+	clear_pending_percent_fields()
+
+	for (target, update_modified), names in pending.items():
+		set_percent_fields(frappe._dict(json.loads(target)), names, update_modified)
+
+
+def clear_pending_percent_fields():
+	frappe.local.pending_percent_fields = {}
+
+
+def mark_percent_fields_dirty(target, names, update_modified):
+	"""Queues the target documents to be recalculated by `flush_dirty_percent_fields`"""
+	target = frappe.as_json(target)
+	for name in names:
+		frappe.cache.hset(
+			DIRTY_PERCENT_FIELDS_KEY,
+			f"{target}::{name}::{cint(update_modified)}",
+			(target, name, update_modified),
+		)
+
+	frappe.enqueue(
+		"erpnext.controllers.status_updater.flush_dirty_percent_fields",
+		queue="short",
+		job_id=DIRTY_PERCENT_FIELDS_KEY,
+		deduplicate=True,
+	)
+
+
+def flush_dirty_percent_fields():
+	"""Recalculates the target documents marked as dirty, until there are none left"""
+	while dirty := frappe.cache.hgetall(DIRTY_PERCENT_FIELDS_KEY):
+		# unmarked before they are recalculated, so that documents marked again meanwhile are not lost
+		frappe.cache.hdel(DIRTY_PERCENT_FIELDS_KEY, list(dirty))
+
+		targets = {}
+		for target, name, update_modified in dirty.values():
+			targets.setdefault((target, update_modified), set()).add(name)
+
+		for (target, update_modified), names in targets.items():
+			target = frappe._dict(json.loads(target))
+			# documents deleted since they were marked
+			names = frappe.get_all(
+				target.target_parent_dt, filters={"name": ["in", list(names)]}, pluck="name"
+			)
+			set_percent_fields(target, names, update_modified)
+
+		frappe.db.commit()  # nosemgrep
+
+
+def set_percent_fields(target, names, update_modified=True):
+	"""Sets the percent field, its status field and the status of the target documents `names`"""
+	percentages = get_target_parent_percentages(target, names)
+
+	for name in sorted(names):
+		update_data = {target.target_parent_field: percentages.get(name, 0)}
+		if target.status_field:
+			update_data[target.status_field] = StatusUpdater._determine_status(
+				update_data[target.target_parent_field], target.keyword
+			)
+
+		doc = frappe.get_lazy_doc(target.target_parent_dt, name)
+		doc.update(update_data)  # status calculus might depend on it
+		status = doc.get_status()
+		if status.get("status"):
+			update_data.update(status)
+		doc.db_set(update_data, update_modified=update_modified, notify=True)
+
+
+def get_target_parent_percentages(target, names):
+	"""
+	Returns {name: percentage} of the target documents `names`, with one query, like
+	`StatusUpdater._calculate_target_parent_percentage` does for one document
+	"""
+	percentages = {}
+	for name, sum_ref, sum_target in frappe.db.sql(
+		"""select parent, sum(abs({target_ref_field})),
+			sum(case when abs({target_field}) < abs({target_ref_field})
+				then abs({target_field}) else abs({target_ref_field}) end)
+		from `tab{target_dt}`
+		where parent in %(names)s and parenttype = %(parenttype)s
+		group by parent""".format(**target),
+		{"names": list(names), "parenttype": target.target_parent_dt},
+	):
+		percentages[name] = round(flt(sum_target) / flt(sum_ref) * 100, 6) if flt(sum_ref) > 0 else 0
+
+	return percentages
+
+
 @frappe.request_cache
 def get_allowance_for(
 	item_code,
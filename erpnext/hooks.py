@@ -333,6 +333,14 @@ doc_events = {
 	tuple(period_closing_doctypes): {
 		"validate": "erpnext.accounts.doctype.accounting_period.accounting_period.validate_accounting_period_on_doc_save",
 	},
+	("Quotation", "Sales Order", "Delivery Note", "Sales Invoice"): {
+		"on_submit": "erpnext.setup.doctype.company_daily_summary.company_daily_summary.mark_transaction_date_dirty",
+		"on_cancel": "erpnext.setup.doctype.company_daily_summary.company_daily_summary.mark_transaction_date_dirty",
+	},
+	("Issue", "Project"): {
+		"after_insert": "erpnext.setup.doctype.company_daily_summary.company_daily_summary.mark_transaction_date_dirty",
+		"on_trash": "erpnext.setup.doctype.company_daily_summary.company_daily_summary.mark_transaction_date_dirty",
+	},
 	"Stock Entry": {
 		"on_submit": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty",
 		"on_cancel": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty",
@@ -408,6 +416,9 @@ scheduler_events = {
 	"cron": {
 		"0/15 * * * *": [
 			"erpnext.manufacturing.doctype.bom_update_log.bom_update_log.resume_bom_cost_update_jobs",
+			"erpnext.stock.doctype.bin.reserved_qty.flush_dirty_bins",
+			"erpnext.setup.doctype.company_daily_summary.company_daily_summary.flush_dirty_dates",
+			"erpnext.controllers.status_updater.flush_dirty_percent_fields",
 		],
 		"0/30 * * * *": [],
 		# Hourly but offset by 30 minutes
@@ -430,7 +441,9 @@ scheduler_events = {
 		"erpnext.utilities.doctype.video.video.update_youtube_data",
 	],
 	"daily": [],
-	"daily_long": [],
+	"daily_long": [
+		"erpnext.manufacturing.doctype.work_order.work_order_qty.reconcile_work_order_qty",
+	],
 	"daily_maintenance": [
 		"erpnext.support.doctype.issue.issue.auto_close_tickets",
 		"erpnext.crm.doctype.opportunity.opportunity.auto_close_opportunity",
@@ -14,6 +14,12 @@ from frappe.utils import cint, cstr, flt, get_link_to_form, parse_json, today
 from frappe.website.website_generator import WebsiteGenerator
 
 import erpnext
+from erpnext.manufacturing.doctype.bom.bom_explosion import (
+	clear_bom_structure_cache,
+	get_bom_structure,
+	get_bom_structures,
+	get_bom_tree_structures,
+)
 from erpnext.setup.utils import get_exchange_rate
 from erpnext.stock.doctype.item.item import get_item_details
 from erpnext.stock.get_item_details import ItemDetailsCtx, get_conversion_factor, get_price_list_rate
@@ -32,7 +38,14 @@ class BOMTree:
 	# ref: https://docs.python.org/3/reference/datamodel.html#slots
 	__slots__ = ["name", "child_items", "is_bom", "item_code", "qty", "exploded_qty", "bom_qty"]
 
-	def __init__(self, name: str, is_bom: bool = True, exploded_qty: float = 1.0, qty: float = 1) -> None:
+	def __init__(
+		self,
+		name: str,
+		is_bom: bool = True,
+		exploded_qty: float = 1.0,
+		qty: float = 1,
+		structures: dict | None = None,
+	) -> None:
 		self.name = name  # name of node, BOM number if is_bom else item_code
 		self.child_items: list["BOMTree"] = []  # list of child items
 		self.is_bom = is_bom  # true if the node is a BOM and not a leaf item
@@ -42,18 +55,18 @@ class BOMTree:
 		if not self.is_bom:
 			self.item_code = self.name
 		else:
-			self.__create_tree()
+			self.__create_tree(structures or get_bom_tree_structures(self.name))
 
-	def __create_tree(self):
-		bom = frappe.get_cached_doc("BOM", self.name)
+	def __create_tree(self, structures: dict):
+		bom = structures[self.name]
 		self.item_code = bom.item
 		self.bom_qty = bom.quantity
 
-		for item in bom.get("items", []):
-			qty = item.stock_qty / bom.quantity  # quantity per unit
+		for item in bom.bom_items:
+			qty = item.qty_per_unit
 			exploded_qty = self.exploded_qty * qty
 			if item.bom_no:
-				child = BOMTree(item.bom_no, exploded_qty=exploded_qty, qty=qty)
+				child = BOMTree(item.bom_no, exploded_qty=exploded_qty, qty=qty, structures=structures)
 				self.child_items.append(child)
 			else:
 				self.child_items.append(
@@ -303,14 +316,16 @@ class BOM(WebsiteGenerator):
 		context.parents = [{"name": "boms", "title": _("All BOMs")}]
 
 	def on_update(self):
-		frappe.cache().hdel("bom_children", self.name)
+		clear_bom_structure_cache([self.name])
 		self.check_recursion()
 
 	def on_submit(self):
+		clear_bom_structure_cache([self.name])
 		self.manage_default_bom()
 		self.update_bom_creator_status()
 
 	def on_cancel(self):
+		clear_bom_structure_cache([self.name])
 		self.db_set("is_active", 0)
 		self.db_set("is_default", 0)
 
@@ -319,6 +334,9 @@ class BOM(WebsiteGenerator):
 		self.manage_default_bom()
 		self.update_bom_creator_status()
 
+	def on_trash(self):
+		clear_bom_structure_cache([self.name])
+
 	def update_bom_creator_status(self):
 		if not self.bom_creator:
 			return
@@ -336,6 +354,7 @@ class BOM(WebsiteGenerator):
 		doc.set_status(save=True)
 
 	def on_update_after_submit(self):
+		clear_bom_structure_cache([self.name])
 		self.validate_bom_links()
 		self.manage_default_bom()
 
@@ -470,36 +489,14 @@ class BOM(WebsiteGenerator):
 
 	def get_rm_rate(self, arg):
 		"""Get raw material rate as per selected method, if bom exists takes bom cost"""
-		rate = 0
 		if not self.rm_cost_as_per:
 			self.rm_cost_as_per = "Valuation Rate"
 
 		if arg.get("scrap_items"):
 			rate = get_valuation_rate(arg)
-		elif arg:
-			# Customer Provided parts and Supplier sourced parts will have zero rate
-			if not frappe.db.get_value("Item", arg["item_code"], "is_customer_provided_item") and not arg.get(
-				"sourced_by_supplier"
-			):
-				if arg.get("bom_no") and self.set_rate_of_sub_assembly_item_based_on_bom:
-					rate = flt(self.get_bom_unitcost(arg["bom_no"])) * (arg.get("conversion_factor") or 1)
-				else:
-					rate = get_bom_item_rate(arg, self)
-
-					if not rate:
-						if self.rm_cost_as_per == "Price List":
-							frappe.msgprint(
-								_("Price not found for item {0} in price list {1}").format(
-									arg["item_code"], self.buying_price_list
-								),
-								alert=True,
-							)
-						else:
-							frappe.msgprint(
-								_("{0} not found for item {1}").format(self.rm_cost_as_per, arg["item_code"]),
-								alert=True,
-							)
-		return flt(rate) * flt(self.plc_conversion_rate or 1) / (self.conversion_rate or 1)
+			return flt(rate) * flt(self.plc_conversion_rate or 1) / (self.conversion_rate or 1)
+
+		return get_rm_rate(arg, self)
 
 	@frappe.whitelist()
 	def update_cost(self, update_parent=True, from_child_bom=False, update_hour_rate=True, save=True):
@@ -546,13 +543,7 @@ class BOM(WebsiteGenerator):
 			)
 
 	def get_bom_unitcost(self, bom_no):
-		bom = frappe.db.sql(
-			"""select name, base_total_cost/quantity as unit_cost from `tabBOM`
-			where is_active = 1 and name = %s""",
-			bom_no,
-			as_dict=1,
-		)
-		return bom and bom[0]["unit_cost"] or 0
+		return get_bom_unitcost(bom_no)
 
 	def manage_default_bom(self):
 		"""Uncheck others if current one is selected as default or
@@ -785,17 +776,6 @@ class BOM(WebsiteGenerator):
 			self.append("items", row)
 
 	def traverse_tree(self, bom_list=None):
-		def _get_children(bom_no):
-			children = frappe.cache().hget("bom_children", bom_no)
-			if children is None:
-				children = frappe.db.sql_list(
-					"""SELECT `bom_no` FROM `tabBOM Item`
-					WHERE `parent`=%s AND `bom_no`!='' AND `parenttype`='BOM'""",
-					bom_no,
-				)
-				frappe.cache().hset("bom_children", bom_no, children)
-			return children
-
 		count = 0
 		if not bom_list:
 			bom_list = []
@@ -803,11 +783,19 @@ class BOM(WebsiteGenerator):
 		if self.name not in bom_list:
 			bom_list.append(self.name)
 
+		seen = set(bom_list)
 		while count < len(bom_list):
-			for child_bom in _get_children(bom_list[count]):
-				if child_bom not in bom_list:
-					bom_list.append(child_bom)
-			count += 1
+			# load the whole level at once
+			level = bom_list[count:]
+			structures = get_bom_structures(level)
+			for bom_no in level:
+				for child_bom in structures[bom_no].child_boms if bom_no in structures else []:
+					if child_bom not in seen:
+						seen.add(child_bom)
+						bom_list.append(child_bom)
+
+			count += len(level)
+
 		bom_list.reverse()
 		return bom_list
 
@@ -819,6 +807,7 @@ class BOM(WebsiteGenerator):
 		if save_updates:
 			# not via doc event, table is not regenerated and needs updation
 			self.calculate_exploded_cost()
+			clear_bom_structure_cache([self.name])
 
 		old_cost = self.total_cost
 
@@ -973,6 +962,10 @@ class BOM(WebsiteGenerator):
 	def get_exploded_items(self):
 		"""Get all raw materials including items from child bom"""
 		self.cur_exploded_items = {}
+
+		# load the child BOMs at once
+		get_bom_structures([d.bom_no for d in self.get("items") if d.bom_no])
+
 		for d in self.get("items"):
 			if d.bom_no:
 				self.get_child_exploded_items(d.bom_no, d.stock_qty, d.operation)
@@ -1007,33 +1000,11 @@ class BOM(WebsiteGenerator):
 
 	def get_child_exploded_items(self, bom_no, stock_qty, operation=None):
 		"""Add all items from Flat BOM of child BOM"""
-		# Did not use qty_consumed_per_unit in the query, as it leads to rounding loss
-		child_fb_items = frappe.db.sql(
-			"""
-			SELECT
-				bom_item.item_code,
-				bom_item.item_name,
-				bom_item.description,
-				bom_item.source_warehouse,
-				bom_item.operation,
-				bom_item.is_sub_assembly_item,
-				bom_item.stock_uom,
-				bom_item.stock_qty,
-				bom_item.rate,
-				bom_item.include_item_in_manufacturing,
-				bom_item.sourced_by_supplier,
-				bom_item.stock_qty / ifnull(bom.quantity, 1) AS qty_consumed_per_unit
-			FROM `tabBOM Explosion Item` bom_item, `tabBOM` bom
-			WHERE
-				bom_item.parent = bom.name
-				AND bom.name = %s
-				AND bom.docstatus = 1
-		""",
-			bom_no,
-			as_dict=1,
-		)
+		child_bom = get_bom_structure(bom_no)
+		if not child_bom or child_bom.docstatus != 1:
+			return
 
-		for d in child_fb_items:
+		for d in child_bom.exploded_items:
 			self.add_to_cur_exploded_items(
 				frappe._dict(
 					{
@@ -1043,7 +1014,7 @@ class BOM(WebsiteGenerator):
 						"operation": d["operation"] or operation,
 						"description": d["description"],
 						"stock_uom": d["stock_uom"],
-						"stock_qty": d["qty_consumed_per_unit"] * stock_qty,
+						"stock_qty": d["qty_per_unit"] * stock_qty,
 						"rate": flt(d["rate"]),
 						"include_item_in_manufacturing": d.get("include_item_in_manufacturing", 0),
 						"sourced_by_supplier": d.get("sourced_by_supplier", 0),
@@ -1133,9 +1104,65 @@ class BOM(WebsiteGenerator):
 			frappe.throw(msg, title=_("Invalid Process Loss Configuration"))
 
 
+def get_rm_rate(args, bom_doc):
+	"""
+	Returns the rate of a raw material of the BOM as per its `rm_cost_as_per`, or the unit cost of its
+	BOM if set so. The is_customer_provided_item, bom_unit_cost, valuation_rate and last_purchase_rate
+	of the item can be passed in `args` if already known.
+	"""
+	rate = 0
+	if args:
+		is_customer_provided_item = args.get("is_customer_provided_item")
+		if is_customer_provided_item is None:
+			is_customer_provided_item = frappe.db.get_value(
+				"Item", args["item_code"], "is_customer_provided_item"
+			)
+
+		# Customer Provided parts and Supplier sourced parts will have zero rate
+		if not is_customer_provided_item and not args.get("sourced_by_supplier"):
+			if args.get("bom_no") and bom_doc.set_rate_of_sub_assembly_item_based_on_bom:
+				bom_unit_cost = args.get("bom_unit_cost")
+				if bom_unit_cost is None:
+					bom_unit_cost = get_bom_unitcost(args["bom_no"])
+
+				rate = flt(bom_unit_cost) * (args.get("conversion_factor") or 1)
+			else:
+				rate = get_bom_item_rate(args, bom_doc)
+
+				if not rate:
+					if bom_doc.rm_cost_as_per == "Price List":
+						frappe.msgprint(
+							_("Price not found for item {0} in price list {1}").format(
+								args["item_code"], bom_doc.buying_price_list
+							),
+							alert=True,
+						)
+					else:
+						frappe.msgprint(
+							_("{0} not found for item {1}").format(bom_doc.rm_cost_as_per, args["item_code"]),
+							alert=True,
+						)
+
+	return flt(rate) * flt(bom_doc.plc_conversion_rate or 1) / (bom_doc.conversion_rate or 1)
+
+
+def get_bom_unitcost(bom_no):
+	bom = frappe.db.sql(
+		"""select name, base_total_cost/quantity as unit_cost from `tabBOM`
+		where is_active = 1 and name = %s""",
+		bom_no,
+		as_dict=1,
+	)
+	return bom and bom[0]["unit_cost"] or 0
+
+
 def get_bom_item_rate(args, bom_doc):
 	if bom_doc.rm_cost_as_per == "Valuation Rate":
-		rate = get_valuation_rate(args) * (args.get("conversion_factor") or 1)
+		valuation_rate = args.get("valuation_rate")
+		if valuation_rate is None:
+			valuation_rate = get_valuation_rate(args)
+
+		rate = flt(valuation_rate) * (args.get("conversion_factor") or 1)
 	elif bom_doc.rm_cost_as_per == "Last Purchase Rate":
 		rate = (
 			flt(args.get("last_purchase_rate"))
@@ -1174,11 +1201,20 @@ def get_valuation_rate(data):
 	2) If no value, get last valuation rate from SLE
 	3) If no value, get valuation rate from Item
 	"""
-	from frappe.query_builder.functions import Count, IfNull, Sum
-	from pypika import Case
-
 	item_code, company = data.get("item_code"), data.get("company")
-	valuation_rate = 0.0
+
+	warehouse = None
+	if data.get("set_rate_based_on_warehouse") and data.get("warehouse"):
+		warehouse = data.get("warehouse")
+
+	valuation_rate = get_average_valuation_rates([item_code], company, warehouse).get(item_code)
+
+	return get_valuation_rate_with_fallback(item_code, valuation_rate)
+
+
+def get_average_valuation_rates(item_codes, company, warehouse=None):
+	"""Returns {item_code: average valuation rate of its Bins in the company}, of the items that have Bins"""
+	from frappe.query_builder.functions import IfNull, Sum
 
 	bin_table = frappe.qb.DocType("Bin")
 	wh_table = frappe.qb.DocType("Warehouse")
@@ -1187,23 +1223,21 @@ def get_valuation_rate(data):
 		.join(wh_table)
 		.on(bin_table.warehouse == wh_table.name)
 		.select(
-			Case()
-			.when(
-				Count(bin_table.name) > 0, IfNull(Sum(bin_table.stock_value) / Sum(bin_table.actual_qty), 0.0)
-			)
-			.else_(None)
-			.as_("valuation_rate")
+			bin_table.item_code,
+			IfNull(Sum(bin_table.stock_value) / Sum(bin_table.actual_qty), 0.0).as_("valuation_rate"),
 		)
-		.where((bin_table.item_code == item_code) & (wh_table.company == company))
+		.where((bin_table.item_code.isin(item_codes)) & (wh_table.company == company))
+		.groupby(bin_table.item_code)
 	)
 
-	if data.get("set_rate_based_on_warehouse") and data.get("warehouse"):
-		item_valuation = item_valuation.where(bin_table.warehouse == data.get("warehouse"))
+	if warehouse:
+		item_valuation = item_valuation.where(bin_table.warehouse == warehouse)
 
-	item_valuation = item_valuation.run(as_dict=True)[0]
+	return dict(item_valuation.run())
 
-	valuation_rate = item_valuation.get("valuation_rate")
 
+def get_valuation_rate_with_fallback(item_code, valuation_rate):
+	"""Falls back to the last valuation rate of the item if its Bins have no value, else to the Item's rate"""
 	if (valuation_rate is not None) and valuation_rate <= 0:
 		# Explicit null value check. If None, Bins don't exist, neither does SLE
 		sle = frappe.qb.DocType("Stock Ledger Entry")
@@ -0,0 +1,411 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Cost rollup of many BOMs at once.
+
+Recalculates the operating, raw material, scrap and exploded item costs of a list of BOMs the same way
+as `BOM.calculate_cost(save_updates=True, update_hour_rate=True)`, but loads the BOMs, their child
+rows and the rates they need in bulk and writes back only the changed values in bulk, instead of
+loading, pricing and saving every BOM and row one by one. The raw material rates come from `get_rm_rate`
+of the BOM, with the item details, valuation rates and BOM unit costs passed in preloaded.
+
+BOMs must be rolled up bottom up, one level at a time, as the rates of sub-assemblies are read from
+the child BOMs as they are in the database.
+"""
+
+from collections import defaultdict
+
+import frappe
+from frappe.model.meta import get_field_precision
+from frappe.utils import flt
+
+from erpnext.manufacturing.doctype.bom.bom import (
+	get_average_valuation_rates,
+	get_rm_rate,
+	get_valuation_rate_with_fallback,
+)
+from erpnext.manufacturing.doctype.bom.bom_explosion import clear_bom_structure_cache
+
+BOM_FIELDS = (
+	"name",
+	"company",
+	"currency",
+	"quantity",
+	"conversion_rate",
+	"plc_conversion_rate",
+	"buying_price_list",
+	"rm_cost_as_per",
+	"set_rate_of_sub_assembly_item_based_on_bom",
+	"bom_creator",
+	"with_operations",
+	"fg_based_operating_cost",
+	"operating_cost_per_bom_quantity",
+	"operating_cost",
+	"base_operating_cost",
+	"raw_material_cost",
+	"base_raw_material_cost",
+	"scrap_material_cost",
+	"base_scrap_material_cost",
+	"total_cost",
+	"base_total_cost",
+)
+
+CHILD_FIELDS = {
+	"BOM Item": (
+		"item_code",
+		"bom_no",
+		"qty",
+		"uom",
+		"stock_qty",
+		"stock_uom",
+		"conversion_factor",
+		"sourced_by_supplier",
+		"is_stock_item",
+		"rate",
+		"base_rate",
+		"amount",
+		"base_amount",
+		"qty_consumed_per_unit",
+	),
+	"BOM Operation": (
+		"workstation",
+		"hour_rate",
+		"base_hour_rate",
+		"time_in_mins",
+		"batch_size",
+		"set_cost_based_on_bom_qty",
+		"operating_cost",
+		"base_operating_cost",
+		"cost_per_unit",
+		"base_cost_per_unit",
+	),
+	"BOM Scrap Item": ("stock_qty", "rate", "base_rate", "amount", "base_amount"),
+	"BOM Explosion Item": ("item_code", "stock_qty", "rate", "amount"),
+}
+
+TABLES = {
+	"items": "BOM Item",
+	"operations": "BOM Operation",
+	"scrap_items": "BOM Scrap Item",
+	"exploded_items": "BOM Explosion Item",
+}
+
+
+class BOMCostRollup:
+	def __init__(self):
+		self.precisions = {}
+		self.item_details = {}
+		self.valuation_rates = {}
+		self.hour_rates = {}
+
+	def update_cost(self, bom_list):
+		"""Recalculates and saves the cost of the submitted or draft BOMs, returns the BOMs whose cost changed"""
+		boms = self.load_boms(bom_list)
+		if not boms:
+			return []
+
+		self.load_rates(boms)
+		self.updates = defaultdict(dict)
+
+		cost_changed = []
+		for bom in boms.values():
+			old_cost = bom.total_cost
+			self.calculate_cost(bom)
+
+			self.set_values(
+				"BOM",
+				bom,
+				{
+					"total_cost": bom.operating_cost + bom.raw_material_cost - bom.scrap_material_cost,
+					"base_total_cost": (
+						bom.base_operating_cost + bom.base_raw_material_cost - bom.base_scrap_material_cost
+					),
+				},
+			)
+
+			if bom.total_cost != old_cost:
+				cost_changed.append(bom.name)
+
+		for doctype, doc_updates in self.updates.items():
+			frappe.db.bulk_update(doctype, doc_updates, update_modified=False)
+
+		clear_bom_structure_cache(list(boms))
+
+		return cost_changed
+
+	def load_boms(self, bom_list):
+		bom = frappe.qb.DocType("BOM")
+		boms = {
+			d.name: frappe._dict(
+				d, rm_cost_as_per=d.rm_cost_as_per or "Valuation Rate", **{table: [] for table in TABLES}
+			)
+			for d in (
+				frappe.qb.from_(bom)
+				.select(*BOM_FIELDS)
+				.where((bom.name.isin(bom_list)) & (bom.docstatus < 2))
+				.for_update()
+			).run(as_dict=True)
+		}
+
+		if not boms:
+			return boms
+
+		for table, doctype in TABLES.items():
+			child = frappe.qb.DocType(doctype)
+			for row in (
+				frappe.qb.from_(child)
+				.select(child.name, child.parent, *CHILD_FIELDS[doctype])
+				.where((child.parent.isin(list(boms))) & (child.parenttype == "BOM"))
+				.orderby(child.parent)
+				.orderby(child.idx)
+			).run(as_dict=True):
+				boms[row.parent][table].append(row)
+
+		return boms
+
+	def load_rates(self, boms):
+		"""Loads the item details, valuation rates, child BOM costs and workstation rates of all the BOMs"""
+		items = [
+			(bom, d) for bom in boms.values() if not bom.bom_creator for d in bom.items if d.is_stock_item
+		]
+
+		self.load_item_details({d.item_code for _bom, d in items})
+		self.load_valuation_rates(
+			{(d.item_code, bom.company) for bom, d in items if bom.rm_cost_as_per == "Valuation Rate"}
+		)
+
+		child_boms = list({d.bom_no for bom in boms.values() for d in bom.items if d.bom_no})
+		self.unit_costs = get_bom_unit_costs(child_boms)
+		self.explosion_rates = get_explosion_rates(child_boms)
+
+		self.load_hour_rates(
+			{d.workstation for bom in boms.values() if bom.with_operations for d in bom.operations}
+		)
+
+	def load_item_details(self, item_codes):
+		if missing := [d for d in item_codes if d not in self.item_details]:
+			for row in frappe.get_all(
+				"Item",
+				filters={"name": ["in", missing]},
+				fields=["name", "is_customer_provided_item", "last_purchase_rate"],
+				order_by=None,
+			):
+				self.item_details[row.name] = row
+
+	def load_valuation_rates(self, item_companies):
+		"""Loads the valuation rates like `get_valuation_rate`, with a query for the Bins of every company"""
+		missing = defaultdict(list)
+		for item_code, company in item_companies:
+			if (item_code, company) not in self.valuation_rates:
+				missing[company].append(item_code)
+
+		for company, item_codes in missing.items():
+			bin_rates = get_average_valuation_rates(item_codes, company)
+			for item_code in item_codes:
+				self.valuation_rates[(item_code, company)] = get_valuation_rate_with_fallback(
+					item_code, bin_rates.get(item_code)
+				)
+
+	def load_hour_rates(self, workstations):
+		if missing := [d for d in workstations if d and d not in self.hour_rates]:
+			self.hour_rates.update(
+				frappe.get_all(
+					"Workstation",
+					filters={"name": ["in", missing]},
+					fields=["name", "hour_rate"],
+					as_list=True,
+					order_by=None,
+				)
+			)
+
+	def calculate_cost(self, bom):
+		self.calculate_op_cost(bom)
+		self.calculate_rm_cost(bom)
+		self.calculate_sm_cost(bom)
+		self.calculate_exploded_cost(bom)
+
+	def calculate_op_cost(self, bom):
+		operating_cost = base_operating_cost = 0
+
+		if bom.with_operations:
+			for d in bom.operations:
+				if d.workstation:
+					self.update_rate_and_time(bom, d)
+
+				row_cost, base_row_cost = d.operating_cost, d.base_operating_cost
+				if d.set_cost_based_on_bom_qty:
+					row_cost = flt(d.cost_per_unit) * flt(bom.quantity)
+					base_row_cost = flt(d.base_cost_per_unit) * flt(bom.quantity)
+
+				operating_cost += flt(row_cost)
+				base_operating_cost += flt(base_row_cost)
+
+		elif bom.fg_based_operating_cost:
+			operating_cost = flt(bom.quantity) * flt(bom.operating_cost_per_bom_quantity)
+			base_operating_cost = flt(operating_cost * bom.conversion_rate, 2)
+
+		self.set_values(
+			"BOM", bom, {"operating_cost": operating_cost, "base_operating_cost": base_operating_cost}
+		)
+
+	def update_rate_and_time(self, bom, row):
+		values = {}
+		if hour_rate := flt(self.hour_rates.get(row.workstation)):
+			values["hour_rate"] = hour_rate / flt(bom.conversion_rate) if bom.conversion_rate else hour_rate
+
+		hour_rate = values.get("hour_rate", row.hour_rate)
+		if hour_rate and row.time_in_mins:
+			operating_cost = flt(hour_rate) * flt(row.time_in_mins) / 60.0
+			base_operating_cost = flt(operating_cost) * flt(bom.conversion_rate)
+			values.update(
+				{
+					"base_hour_rate": flt(hour_rate) * flt(bom.conversion_rate),
+					"operating_cost": operating_cost,
+					"base_operating_cost": base_operating_cost,
+					"cost_per_unit": operating_cost / (row.batch_size or 1.0),
+					"base_cost_per_unit": base_operating_cost / (row.batch_size or 1.0),
+				}
+			)
+
+		self.set_values("BOM Operation", row, values)
+
+	def calculate_rm_cost(self, bom):
+		total_rm_cost = base_total_rm_cost = 0
+
+		for d in bom.items:
+			rate = d.rate
+			if not bom.bom_creator and d.is_stock_item:
+				rate = self.get_rm_rate(bom, d)
+
+			amount = flt(rate, self.precision("BOM Item", "rate")) * flt(
+				d.qty, self.precision("BOM Item", "qty")
+			)
+			values = {
+				"rate": rate,
+				"base_rate": flt(rate) * flt(bom.conversion_rate),
+				"amount": amount,
+				"base_amount": amount * flt(bom.conversion_rate),
+				"qty_consumed_per_unit": flt(d.stock_qty, self.precision("BOM Item", "stock_qty"))
+				/ flt(bom.quantity, self.precision("BOM", "quantity")),
+			}
+
+			if rate != d.rate:
+				self.set_values("BOM Item", d, values)
+			else:
+				# like `calculate_rm_cost`, rows are only saved when their rate changes
+				d.update(values)
+
+			total_rm_cost += amount
+			base_total_rm_cost += values["base_amount"]
+
+		self.set_values(
+			"BOM", bom, {"raw_material_cost": total_rm_cost, "base_raw_material_cost": base_total_rm_cost}
+		)
+
+	def calculate_sm_cost(self, bom):
+		total_sm_cost = base_total_sm_cost = 0
+		conversion_rate = flt(bom.conversion_rate, self.precision("BOM", "conversion_rate"))
+
+		for d in bom.scrap_items:
+			rate = flt(d.rate, self.precision("BOM Scrap Item", "rate"))
+			amount = rate * flt(d.stock_qty, self.precision("BOM Scrap Item", "stock_qty"))
+			base_amount = flt(amount, self.precision("BOM Scrap Item", "amount")) * conversion_rate
+
+			self.set_values(
+				"BOM Scrap Item",
+				d,
+				{"base_rate": rate * conversion_rate, "amount": amount, "base_amount": base_amount},
+			)
+
+			total_sm_cost += amount
+			base_total_sm_cost += base_amount
+
+		self.set_values(
+			"BOM",
+			bom,
+			{"scrap_material_cost": total_sm_cost, "base_scrap_material_cost": base_total_sm_cost},
+		)
+
+	def calculate_exploded_cost(self, bom):
+		rm_rate_map = {}
+		for d in bom.items:
+			if d.bom_no:
+				rm_rate_map.update(self.explosion_rates.get(d.bom_no, {}))
+			else:
+				rm_rate_map[d.item_code] = flt(d.base_rate) / flt(d.conversion_factor or 1.0)
+
+		for row in bom.exploded_items:
+			rate = rm_rate_map.get(row.item_code)
+			if flt(row.rate) != rate:
+				self.set_values(
+					"BOM Explosion Item", row, {"rate": rate, "amount": flt(row.stock_qty) * flt(rate)}
+				)
+
+	def get_rm_rate(self, bom, row):
+		"""Returns the rate of a raw material from `get_rm_rate` of the BOM, with the preloaded rates"""
+		item = self.item_details.get(row.item_code) or frappe._dict()
+
+		return get_rm_rate(
+			{
+				"company": bom.company,
+				"item_code": row.item_code,
+				"bom_no": row.bom_no,
+				"qty": row.qty,
+				"uom": row.uom,
+				"stock_uom": row.stock_uom,
+				"conversion_factor": row.conversion_factor,
+				"sourced_by_supplier": row.sourced_by_supplier,
+				"is_customer_provided_item": item.get("is_customer_provided_item"),
+				"last_purchase_rate": item.get("last_purchase_rate"),
+				"valuation_rate": self.valuation_rates.get((row.item_code, bom.company)),
+				"bom_unit_cost": flt(self.unit_costs.get(row.bom_no)) if row.bom_no else None,
+			},
+			bom,
+		)
+
+	def precision(self, doctype, fieldname):
+		if (doctype, fieldname) not in self.precisions:
+			self.precisions[(doctype, fieldname)] = get_field_precision(
+				frappe.get_meta(doctype).get_field(fieldname)
+			)
+
+		return self.precisions[(doctype, fieldname)]
+
+	def set_values(self, doctype, row, values):
+		"""Sets the values on the loaded row and queues the changed ones to be saved"""
+		if changed := {key: value for key, value in values.items() if row.get(key) != value}:
+			row.update(changed)
+			self.updates[doctype].setdefault(row.name, {}).update(changed)
+
+
+def get_bom_unit_costs(bom_nos):
+	"""Returns {bom_no: unit cost} of the active BOMs among `bom_nos`, like `BOM.get_bom_unitcost`"""
+	if not bom_nos:
+		return {}
+
+	bom = frappe.qb.DocType("BOM")
+	return dict(
+		(
+			frappe.qb.from_(bom)
+			.select(bom.name, bom.base_total_cost / bom.quantity)
+			.where((bom.name.isin(bom_nos)) & (bom.is_active == 1))
+		).run()
+	)
+
+
+def get_explosion_rates(bom_nos):
+	"""Returns {bom_no: {item_code: rate}} from the exploded items of `bom_nos`"""
+	if not bom_nos:
+		return {}
+
+	rates = defaultdict(dict)
+	for row in frappe.get_all(
+		"BOM Explosion Item",
+		filters={"parent": ["in", bom_nos]},
+		fields=["parent", "item_code", "rate"],
+		order_by=None,
+	):
+		rates[row.parent][row.item_code] = flt(row.rate)
+
+	return rates
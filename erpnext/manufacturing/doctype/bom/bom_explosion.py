@@ -0,0 +1,198 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Cached structure of BOMs, shared by production planning, BOM trees and reports.
+
+For every BOM the cache holds its header, its items and scrap items with the qty per unit of the
+BOM, and its flattened explosion (BOM Explosion Item). Trees are loaded level by level, so walking
+a multi-level BOM takes one set of queries per level on a cache miss and none on a hit.
+
+A BOM is dropped from the cache when it is saved, submitted, cancelled or its cost is
+updated, and the whole cache is dropped when a BOM is replaced in its parent BOMs. The structures
+are shared between callers and must not be modified.
+"""
+
+from functools import partial
+
+import frappe
+from frappe.utils import flt
+
+CACHE_KEY = "bom_structure"
+
+
+def get_bom_structure(bom_no):
+	"""Returns the cached structure of `bom_no`, None if the BOM does not exist"""
+	return get_bom_structures([bom_no]).get(bom_no)
+
+
+def get_bom_structures(bom_nos):
+	"""Returns {bom_no: structure}, loading the cache misses in bulk"""
+	structures, missing = {}, []
+	for bom_no in dict.fromkeys(bom_nos):
+		if not bom_no:
+			continue
+
+		if (structure := frappe.cache.hget(CACHE_KEY, bom_no)) is not None:
+			structures[bom_no] = structure
+		else:
+			missing.append(bom_no)
+
+	if missing:
+		for bom_no, structure in load_bom_structures(missing).items():
+			frappe.cache.hset(CACHE_KEY, bom_no, structure)
+			structures[bom_no] = structure
+
+	return structures
+
+
+def get_bom_tree_structures(bom_nos):
+	"""Returns the structures of `bom_nos` and all their child BOMs, loading one level at a time"""
+	if isinstance(bom_nos, str):
+		bom_nos = [bom_nos]
+
+	structures = {}
+	level = list(bom_nos)
+	while level:
+		loaded = get_bom_structures(level)
+		structures.update(loaded)
+
+		level = [
+			bom_no
+			for structure in loaded.values()
+			for bom_no in structure.child_boms
+			if bom_no not in structures
+		]
+
+	return structures
+
+
+def load_bom_structures(bom_nos):
+	bom = frappe.qb.DocType("BOM")
+	bom_item = frappe.qb.DocType("BOM Item")
+	explosion_item = frappe.qb.DocType("BOM Explosion Item")
+	scrap_item = frappe.qb.DocType("BOM Scrap Item")
+
+	structures = {}
+	for row in (
+		frappe.qb.from_(bom)
+		.select(
+			bom.name,
+			bom.item,
+			bom.quantity,
+			bom.docstatus,
+			bom.company,
+			bom.process_loss_percentage,
+			bom.process_loss_qty,
+		)
+		.where(bom.name.isin(bom_nos))
+	).run(as_dict=True):
+		quantity = flt(row.quantity) or 1.0
+		structures[row.name] = frappe._dict(
+			row,
+			quantity=quantity,
+			process_loss_per_unit=flt(row.process_loss_qty) / quantity,
+			bom_items=[],
+			exploded_items=[],
+			scrap_items=[],
+			child_boms=[],
+		)
+
+	if not structures:
+		return structures
+
+	for row in (
+		frappe.qb.from_(bom_item)
+		.select(
+			bom_item.parent,
+			bom_item.item_code,
+			bom_item.item_name,
+			bom_item.bom_no,
+			bom_item.stock_qty,
+			bom_item.stock_uom,
+			bom_item.description,
+			bom_item.source_warehouse,
+			bom_item.operation,
+			bom_item.is_sub_assembly_item,
+			bom_item.include_item_in_manufacturing,
+			bom_item.sourced_by_supplier,
+		)
+		.where((bom_item.parent.isin(list(structures))) & (bom_item.parenttype == "BOM"))
+		.orderby(bom_item.parent)
+		.orderby(bom_item.idx)
+	).run(as_dict=True):
+		structure = structures[row.pop("parent")]
+		row.qty_per_unit = flt(row.stock_qty) / structure.quantity
+		structure.bom_items.append(row)
+
+		if row.bom_no and row.bom_no not in structure.child_boms:
+			structure.child_boms.append(row.bom_no)
+
+	for row in (
+		frappe.qb.from_(explosion_item)
+		.select(
+			explosion_item.parent,
+			explosion_item.item_code,
+			explosion_item.item_name,
+			explosion_item.stock_qty,
+			explosion_item.stock_uom,
+			explosion_item.rate,
+			explosion_item.description,
+			explosion_item.source_warehouse,
+			explosion_item.operation,
+			explosion_item.is_sub_assembly_item,
+			explosion_item.include_item_in_manufacturing,
+			explosion_item.sourced_by_supplier,
+		)
+		.where((explosion_item.parent.isin(list(structures))) & (explosion_item.parenttype == "BOM"))
+		.orderby(explosion_item.parent)
+		.orderby(explosion_item.idx)
+	).run(as_dict=True):
+		structure = structures[row.pop("parent")]
+		row.qty_per_unit = flt(row.stock_qty) / structure.quantity
+		structure.exploded_items.append(row)
+
+	for row in (
+		frappe.qb.from_(scrap_item)
+		.select(
+			scrap_item.parent,
+			scrap_item.item_code,
+			scrap_item.item_name,
+			scrap_item.stock_qty,
+			scrap_item.stock_uom,
+		)
+		.where((scrap_item.parent.isin(list(structures))) & (scrap_item.parenttype == "BOM"))
+		.orderby(scrap_item.parent)
+		.orderby(scrap_item.idx)
+	).run(as_dict=True):
+		structure = structures[row.pop("parent")]
+		row.qty_per_unit = flt(row.stock_qty) / structure.quantity
+		structure.scrap_items.append(row)
+
+	return structures
+
+
+def clear_bom_structure_cache(bom_nos=None):
+	"""
+	Drops the cached structure of the given BOMs, or of all BOMs if none are given.
+
+	The entries are dropped right away and once more after commit or rollback, so that
+	structures read by other sessions in between are not kept.
+	"""
+	if bom_nos is not None:
+		bom_nos = tuple(bom_nos)
+
+	_clear(bom_nos)
+
+	callback = partial(_clear, bom_nos)
+	frappe.db.after_commit.add(callback)
+	frappe.db.after_rollback.add(callback)
+
+
+def _clear(bom_nos):
+	if bom_nos is None:
+		frappe.cache.delete_value(CACHE_KEY)
+		return
+
+	for bom_no in bom_nos:
+		frappe.cache.hdel(CACHE_KEY, bom_no)
@@ -0,0 +1,94 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Database side traversal of multi-level BOMs.
+
+`get_bom_tree` walks all the levels of a BOM with one recursive query, returning every row of the
+BOM and of its submitted child BOMs in tree order, with its level and the qty it takes to make the
+quantity of the top BOM.
+"""
+
+import frappe
+from frappe.utils import flt
+
+# levels walked at most, in case of recursive BOMs
+MAX_BOM_DEPTH = 50
+
+
+def get_bom_tree(bom_no, max_depth=MAX_BOM_DEPTH):
+	"""
+	Returns the rows of `bom_no` and of its child BOMs depth first, in the order of their idx.
+
+	Every row has its `level` (0 for the items of `bom_no`), its `qty` and `stock_qty` per quantity of
+	its own BOM and its `cumulative_qty` and `cumulative_stock_qty` per quantity of `bom_no`.
+	"""
+	# the path orders the rows depth first, its type has to be wide enough for the deepest row
+	text_type = "varchar(4000)" if frappe.db.db_type == "postgres" else "char(4000)"
+
+	rows = frappe.db.sql(
+		f"""
+		with recursive bom_tree as (
+			select
+				bom_item.name, bom_item.parent, bom_item.idx, bom_item.item_code, bom_item.item_name,
+				bom_item.description, bom_item.bom_no, bom_item.uom, bom_item.stock_uom,
+				bom_item.qty, bom_item.stock_qty,
+				cast(bom_item.qty as decimal(36, 9)) as cumulative_qty,
+				cast(bom_item.stock_qty as decimal(36, 9)) as cumulative_stock_qty,
+				0 as level,
+				cast(lpad(cast(bom_item.idx as {text_type}), 6, '0') as {text_type}) as path
+			from `tabBOM Item` bom_item
+			where bom_item.parent = %(bom_no)s and bom_item.parenttype = 'BOM'
+
+			union all
+
+			select
+				child.name, child.parent, child.idx, child.item_code, child.item_name,
+				child.description, child.bom_no, child.uom, child.stock_uom,
+				child.qty, child.stock_qty,
+				cast(tree.cumulative_stock_qty * child.qty / sub_bom.quantity as decimal(36, 9)),
+				cast(tree.cumulative_stock_qty * child.stock_qty / sub_bom.quantity as decimal(36, 9)),
+				tree.level + 1,
+				cast(concat(tree.path, '.', lpad(cast(child.idx as {text_type}), 6, '0')) as {text_type})
+			from bom_tree tree
+			inner join `tabBOM` sub_bom
+				on sub_bom.name = tree.bom_no and sub_bom.docstatus = 1 and sub_bom.quantity > 0
+			inner join `tabBOM Item` child
+				on child.parent = sub_bom.name and child.parenttype = 'BOM'
+			where tree.level < %(max_depth)s
+		)
+		select * from bom_tree order by path
+		""",
+		{"bom_no": bom_no, "max_depth": max_depth},
+		as_dict=True,
+	)
+
+	for row in rows:
+		row.cumulative_qty = flt(row.cumulative_qty)
+		row.cumulative_stock_qty = flt(row.cumulative_stock_qty)
+
+	return rows
+
+
+def get_exploded_bom_items(bom_no):
+	"""
+	Returns {item_code: row} of the raw materials of all the levels of `bom_no`, like its BOM Explosion
+	Items, with the `stock_qty` it takes to make the quantity of `bom_no`
+	"""
+	items = {}
+	for row in get_bom_tree(bom_no):
+		if row.bom_no:
+			continue
+
+		if row.item_code in items:
+			items[row.item_code].stock_qty += row.cumulative_stock_qty
+		else:
+			items[row.item_code] = frappe._dict(
+				item_code=row.item_code,
+				item_name=row.item_name,
+				description=row.description,
+				stock_uom=row.stock_uom,
+				stock_qty=row.cumulative_stock_qty,
+			)
+
+	return items
@@ -343,6 +343,63 @@ class TestBOM(IntegrationTestCase):
 		for reqd_item, created_item in zip(reqd_order, created_order, strict=False):
 			self.assertEqual(reqd_item, created_item.item_code)
 
+	def test_bom_structure_cache(self):
+		from erpnext.manufacturing.doctype.bom.bom_explosion import (
+			get_bom_structure,
+			get_bom_tree_structures,
+		)
+
+		bom_tree = {"Cached Assembly": {"Cached SubAssembly": {"Cached Part1": {}}, "Cached Part2": {}}}
+		parent_bom = create_nested_bom(bom_tree, prefix="_Test ")
+		child_bom = parent_bom.items[0].bom_no or parent_bom.items[1].bom_no
+
+		structures = get_bom_tree_structures(parent_bom.name)
+		self.assertEqual(set(structures), {parent_bom.name, child_bom})
+		self.assertEqual(parent_bom.traverse_tree(), [child_bom, parent_bom.name])
+		self.assertEqual(
+			sorted(row.item_code for row in structures[parent_bom.name].exploded_items),
+			["_Test Cached Part1", "_Test Cached Part2"],
+		)
+
+		# served from the cache
+		with self.assertQueryCount(0):
+			get_bom_tree_structures(parent_bom.name)
+
+		parent_bom.cancel()
+		self.assertEqual(get_bom_structure(parent_bom.name).docstatus, 2)
+
+	def test_bom_tree_query(self):
+		from erpnext.manufacturing.doctype.bom.bom_traversal import get_bom_tree, get_exploded_bom_items
+
+		bom_tree = {
+			"Walked Assembly": {
+				"Walked SubAssembly1": {"Walked Part1": {}, "Walked Part2": {}},
+				"Walked SubAssembly2": {"Walked SubSubAssy": {"Walked Part1": {}}},
+				"Walked Part3": {},
+			}
+		}
+		parent_bom = create_nested_bom(bom_tree, prefix="_Test ")
+
+		rows = get_bom_tree(parent_bom.name)
+		self.assertEqual(
+			[(row.item_code, row.level) for row in rows],
+			[
+				("_Test Walked SubAssembly1", 0),
+				("_Test Walked Part1", 1),
+				("_Test Walked Part2", 1),
+				("_Test Walked SubAssembly2", 0),
+				("_Test Walked SubSubAssy", 1),
+				("_Test Walked Part1", 2),
+				("_Test Walked Part3", 0),
+			],
+		)
+
+		exploded_items = get_exploded_bom_items(parent_bom.name)
+		self.assertEqual(
+			{item_code: flt(item.stock_qty, 6) for item_code, item in exploded_items.items()},
+			{row.item_code: flt(row.stock_qty, 6) for row in parent_bom.exploded_items},
+		)
+
 	@timeout
 	def test_generated_variant_bom(self):
 		from erpnext.controllers.item_variant import create_variant
@@ -12,6 +12,12 @@ if TYPE_CHECKING:
 import frappe
 from frappe import _
 
+from erpnext.manufacturing.doctype.bom.bom_cost_rollup import BOMCostRollup
+from erpnext.manufacturing.doctype.bom.bom_explosion import clear_bom_structure_cache
+
+# BOMs whose cost is updated and committed together
+COST_UPDATE_CHUNK_SIZE = 500
+
 
 def replace_bom(boms: dict, log_name: str) -> None:
 	"Replace current BOM with new BOM in parent BOMs."
@@ -22,7 +28,7 @@ def replace_bom(boms: dict, log_name: str) -> None:
 	unit_cost = get_bom_unit_cost(new_bom)
 	update_new_bom_in_bom_items(unit_cost, current_bom, new_bom)
 
-	frappe.cache().delete_key("bom_children")
+	clear_bom_structure_cache()
 	parent_boms = get_ancestor_boms(new_bom)
 
 	for bom in parent_boms:
@@ -115,12 +121,11 @@ def get_bom_unit_cost(bom_name: str) -> float:
 def update_cost_in_boms(bom_list: list[str]) -> None:
 	"Updates cost in given BOMs. Returns current and total updated BOMs."
 
-	for index, bom in enumerate(bom_list):
-		bom_doc = frappe.get_doc("BOM", bom, for_update=True)
-		bom_doc.calculate_cost(save_updates=True, update_hour_rate=True)
-		bom_doc.db_update()
+	rollup = BOMCostRollup()
+	for index in range(0, len(bom_list), COST_UPDATE_CHUNK_SIZE):
+		rollup.update_cost(bom_list[index : index + COST_UPDATE_CHUNK_SIZE])
 
-		if (index % 50 == 0) and not frappe.in_test:
+		if not frappe.in_test:
 			frappe.db.commit()  # nosemgrep
 
 
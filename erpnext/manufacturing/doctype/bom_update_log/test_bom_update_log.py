@@ -8,10 +8,13 @@ from erpnext.manufacturing.doctype.bom_update_log.bom_update_log import (
 	BOMMissingError,
 	resume_bom_cost_update_jobs,
 )
+from erpnext.manufacturing.doctype.bom_update_log.bom_updation_utils import update_cost_in_boms
 from erpnext.manufacturing.doctype.bom_update_tool.bom_update_tool import (
 	enqueue_replace_bom,
 	enqueue_update_cost,
 )
+from erpnext.manufacturing.doctype.production_plan.test_production_plan import make_bom
+from erpnext.stock.doctype.item.test_item import create_item
 
 EXTRA_TEST_RECORD_DEPENDENCIES = ["BOM"]
 
@@ -107,6 +110,62 @@ class TestBOMUpdateLog(IntegrationTestCase):
 		expected_exploded_items = ["B-Item C", "B-Item G"]
 		self.assertEqual(sorted(exploded_items), sorted(expected_exploded_items))
 
+	def test_bulk_cost_update_matches_bom_cost(self):
+		"Test if the bulk cost update sets the same costs as the BOM's own cost calculation."
+		for item_code, valuation_rate in (
+			("Cost Rollup FG", 0),
+			("Cost Rollup SA", 0),
+			("Cost Rollup RM 1", 100),
+			("Cost Rollup RM 2", 30),
+		):
+			create_item(item_code, valuation_rate=valuation_rate)
+			frappe.db.set_value("Item", item_code, "valuation_rate", valuation_rate)
+
+		sub_assembly_bom = make_bom(
+			item="Cost Rollup SA",
+			raw_materials=["Cost Rollup RM 1", "Cost Rollup RM 2"],
+			rm_qty=2,
+			currency="INR",
+		)
+		fg_bom = make_bom(
+			item="Cost Rollup FG", raw_materials=["Cost Rollup SA", "Cost Rollup RM 2"], currency="INR"
+		)
+		self.assertEqual(fg_bom.items[0].bom_no, sub_assembly_bom.name)
+		frappe.db.set_value("BOM", fg_bom.name, "set_rate_of_sub_assembly_item_based_on_bom", 1)
+
+		frappe.db.set_value("Item", "Cost Rollup RM 1", "valuation_rate", 150)
+		update_cost_in_boms([sub_assembly_bom.name])
+		update_cost_in_boms([fg_bom.name])
+
+		for bom_no, total_cost in ((sub_assembly_bom.name, 360), (fg_bom.name, 390)):
+			bom = frappe.get_doc("BOM", bom_no)
+			self.assertEqual(bom.total_cost, total_cost)
+
+			saved_rates = [(d.rate, d.amount) for d in bom.items]
+			saved_exploded_rates = [(d.rate, d.amount) for d in bom.exploded_items]
+
+			bom.calculate_cost()
+			bom.calculate_exploded_cost()
+			self.assertEqual(bom.total_cost, total_cost)
+			self.assertEqual([(d.rate, d.amount) for d in bom.items], saved_rates)
+			self.assertEqual([(d.rate, d.amount) for d in bom.exploded_items], saved_exploded_rates)
+
+	def test_bulk_cost_update_warns_about_missing_rates(self):
+		"Test if the bulk cost update warns about raw materials without a rate, like the BOM does."
+		for item_code, valuation_rate in (("Cost Rollup FG 2", 0), ("Cost Rollup RM 3", 0)):
+			create_item(item_code, valuation_rate=valuation_rate)
+			frappe.db.set_value("Item", item_code, "valuation_rate", valuation_rate)
+
+		bom = make_bom(item="Cost Rollup FG 2", raw_materials=["Cost Rollup RM 3"], currency="INR")
+
+		messages_before = len(frappe.get_message_log())
+		update_cost_in_boms([bom.name])
+
+		new_messages = [str(msg) for msg in frappe.get_message_log()[messages_before:]]
+		self.assertTrue(
+			any("Valuation Rate not found for item Cost Rollup RM 3" in msg for msg in new_messages)
+		)
+
 
 def remove_bom(item_code):
 	boms = frappe.get_all("BOM", fields=["docstatus", "name"], filters={"item": item_code})
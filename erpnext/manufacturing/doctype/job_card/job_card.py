@@ -1,6 +1,6 @@
 # Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and contributors
 # For license information, please see license.txt
-import datetime
+import heapq
 import json
 from collections import OrderedDict
 
@@ -11,22 +11,16 @@ from frappe.model.mapper import get_mapped_doc
 from frappe.query_builder import Criterion
 from frappe.query_builder.functions import IfNull, Max, Min, Sum
 from frappe.utils import (
-	add_days,
 	add_to_date,
 	cint,
 	flt,
 	get_datetime,
 	get_link_to_form,
-	get_time,
-	getdate,
 	time_diff,
 	time_diff_in_hours,
 )
 
 from erpnext.manufacturing.doctype.bom.bom import add_additional_cost
-from erpnext.manufacturing.doctype.manufacturing_settings.manufacturing_settings import (
-	get_mins_between_operations,
-)
 from erpnext.manufacturing.doctype.workstation_type.workstation_type import get_workstations
 from erpnext.subcontracting.doctype.subcontracting_bom.subcontracting_bom import (
 	get_subcontracting_boms_for_finished_goods,
@@ -310,7 +304,7 @@ class JobCard(Document):
 				frappe.get_cached_value("Workstation", self.workstation, "production_capacity") or 1
 			)
 
-		if self.get_open_job_cards(args.get("employee")):
+		if args.get("employee") and self.get_open_job_cards(args.get("employee")):
 			frappe.throw(
 				_(
 					"Employee {0} is currently working on another workstation. Please assign another employee."
@@ -329,41 +323,25 @@ class JobCard(Document):
 		return time_logs[0]
 
 	def has_overlap(self, production_capacity, time_logs):
-		overlap = False
-		if production_capacity == 1 and len(time_logs) >= 1:
-			return True
-		if not len(time_logs):
+		"""Returns True if the overlapping `time_logs` already use all of the production capacity"""
+		if not time_logs:
 			return False
 
-		# sorting overlapping job cards as per from_time
-		time_logs = sorted(time_logs, key=lambda x: x.get("from_time"))
-		# alloted_capacity has key number starting from 1. Key number will increment by 1 if non sequential job card found
-		# if key number reaches/crosses to production_capacity means capacity is full and overlap error generated
-		# this will store last to_time of sequential job cards
-		alloted_capacity = {1: time_logs[0]["to_time"]}
-		# flag for sequential Job card found
-		sequential_job_card_found = False
-		for i in range(1, len(time_logs)):
-			# scanning for all Existing keys
-			for key in alloted_capacity.keys():
-				# if current Job Card from time is greater than last to_time in that key means these job card are sequential
-				if alloted_capacity[key] <= time_logs[i]["from_time"]:
-					# So update key's value with last to_time
-					alloted_capacity[key] = time_logs[i]["to_time"]
-					# flag is true as we get sequential Job Card for that key
-					sequential_job_card_found = True
-					# Immediately break so that job card to time is not added with any other key except this
-					break
-			# if sequential job card not found above means it is overlapping  so increment key number to alloted_capacity
-			if not sequential_job_card_found:
-				# increment key number
-				key = key + 1
-				# for that key last to time is assigned.
-				alloted_capacity[key] = time_logs[i]["to_time"]
-		if len(alloted_capacity) >= production_capacity:
-			# if number of keys greater or equal to production caoacity means full capacity is utilized and we should throw overlap error
+		if production_capacity == 1:
 			return True
-		return overlap
+
+		# the number of time logs running in parallel at the busiest moment is the capacity they need
+		running = []
+		used_capacity = 0
+		for row in sorted(time_logs, key=lambda x: get_datetime(x.get("from_time"))):
+			from_time = get_datetime(row.get("from_time"))
+			while running and running[0] <= from_time:
+				heapq.heappop(running)
+
+			heapq.heappush(running, get_datetime(row.get("to_time")))
+			used_capacity = max(used_capacity, len(running))
+
+		return used_capacity >= production_capacity
 
 	def get_time_logs(self, args, doctype, open_job_cards=None):
 		if args.get("remaining_time_in_mins") and get_datetime(args.from_time) >= get_datetime(args.to_time):
@@ -473,104 +451,11 @@ class JobCard(Document):
 
 		return time_slot
 
-	def schedule_time_logs(self, row):
-		row.remaining_time_in_mins = row.time_in_mins
-		while row.remaining_time_in_mins > 0:
-			args = frappe._dict(
-				{
-					"from_time": row.planned_start_time,
-					"to_time": row.planned_end_time,
-					"remaining_time_in_mins": row.remaining_time_in_mins,
-				}
-			)
-
-			self.validate_overlap_for_workstation(args, row)
-			self.check_workstation_time(row)
-
-	def validate_overlap_for_workstation(self, args, row):
-		# get the last record based on the to time from the job card
-		data = self.get_overlap_for(args)
-
-		if not self.workstation:
-			workstations = get_workstations(self.workstation_type)
-			if workstations:
-				# Get the first workstation
-				self.workstation = workstations[0]
-
-		if not data:
-			row.planned_start_time = args.from_time
-			return
-
-		if data:
-			if data.get("planned_start_time"):
-				args.planned_start_time = get_datetime(data.planned_start_time)
-			else:
-				args.planned_start_time = get_datetime(data.to_time + get_mins_between_operations())
-
-			args.from_time = args.planned_start_time
-			args.to_time = add_to_date(args.planned_start_time, minutes=row.remaining_time_in_mins)
-
-			self.validate_overlap_for_workstation(args, row)
-
-	def check_workstation_time(self, row):
-		workstation_doc = frappe.get_cached_doc("Workstation", self.workstation)
-		if not workstation_doc.working_hours or cint(
-			frappe.db.get_single_value("Manufacturing Settings", "allow_overtime")
-		):
-			if get_datetime(row.planned_end_time) <= get_datetime(row.planned_start_time):
-				row.planned_end_time = add_to_date(row.planned_start_time, minutes=row.time_in_mins)
-				row.remaining_time_in_mins = 0.0
-			else:
-				row.remaining_time_in_mins -= time_diff_in_minutes(
-					row.planned_end_time, row.planned_start_time
-				)
-
-			self.update_time_logs(row)
-			return
-
-		start_date = getdate(row.planned_start_time)
-		start_time = get_time(row.planned_start_time)
-
-		new_start_date = workstation_doc.validate_workstation_holiday(start_date)
+	def schedule_time_logs(self, row, scheduler=None):
+		"""Adds scheduled time logs for the operation `row` at the first slot with free capacity"""
+		from erpnext.manufacturing.doctype.job_card.job_card_scheduler import JobCardScheduler
 
-		if new_start_date != start_date:
-			row.planned_start_time = datetime.datetime.combine(new_start_date, start_time)
-			start_date = new_start_date
-
-		total_idx = len(workstation_doc.working_hours)
-
-		for i, time_slot in enumerate(workstation_doc.working_hours):
-			workstation_start_time = datetime.datetime.combine(start_date, get_time(time_slot.start_time))
-			workstation_end_time = datetime.datetime.combine(start_date, get_time(time_slot.end_time))
-
-			if (
-				get_datetime(row.planned_start_time) >= workstation_start_time
-				and get_datetime(row.planned_start_time) <= workstation_end_time
-			):
-				time_in_mins = time_diff_in_minutes(workstation_end_time, row.planned_start_time)
-
-				# If remaining time fit in workstation time logs else split hours as per workstation time
-				if time_in_mins > row.remaining_time_in_mins:
-					row.planned_end_time = add_to_date(
-						row.planned_start_time, minutes=row.remaining_time_in_mins
-					)
-					row.remaining_time_in_mins = 0
-				else:
-					row.planned_end_time = add_to_date(row.planned_start_time, minutes=time_in_mins)
-					row.remaining_time_in_mins -= time_in_mins
-
-				self.update_time_logs(row)
-
-				if total_idx != (i + 1) and row.remaining_time_in_mins > 0:
-					row.planned_start_time = datetime.datetime.combine(
-						start_date, get_time(workstation_doc.working_hours[i + 1].start_time)
-					)
-
-		if row.remaining_time_in_mins > 0:
-			start_date = add_days(start_date, 1)
-			row.planned_start_time = datetime.datetime.combine(
-				start_date, get_time(workstation_doc.working_hours[0].start_time)
-			)
+		(scheduler or JobCardScheduler()).schedule(self, row)
 
 	def add_time_log(self, args):
 		last_row = []
@@ -664,17 +549,6 @@ class JobCard(Document):
 				row.completed_time = 0.0
 				row.completed_qty = 0.0
 
-	def update_time_logs(self, row):
-		self.append(
-			"scheduled_time_logs",
-			{
-				"from_time": row.planned_start_time,
-				"to_time": row.planned_end_time,
-				"completed_qty": 0,
-				"time_in_mins": time_diff_in_minutes(row.planned_end_time, row.planned_start_time),
-			},
-		)
-
 	@frappe.whitelist()
 	def get_required_items(self):
 		if not self.get("work_order"):
@@ -998,27 +872,35 @@ class JobCard(Document):
 
 			frappe.db.set_value("Job Card Item", row.job_card_item, "transferred_qty", flt(transferred_qty))
 
-	def set_transferred_qty(self, update_status=False):
+	def set_transferred_qty(self, update_status=False, ste_doc=None):
 		from frappe.query_builder.functions import Sum
 
-		stock_entry = frappe.qb.DocType("Stock Entry")
+		from erpnext.manufacturing.doctype.work_order.work_order_qty import get_stock_entry_sign
 
-		query = (
-			frappe.qb.from_(stock_entry)
-			.select(Sum(stock_entry.fg_completed_qty))
-			.where(
-				(stock_entry.job_card == self.name)
-				& (stock_entry.docstatus == 1)
-				& (stock_entry.purpose == "Material Transfer for Manufacture")
+		if ste_doc:
+			# only the qty of the stock entry being submitted or cancelled is added or removed
+			qty = flt(frappe.db.get_value(self.doctype, self.name, "transferred_qty", for_update=True))
+			if ste_doc.purpose == "Material Transfer for Manufacture":
+				qty += get_stock_entry_sign(ste_doc) * flt(ste_doc.fg_completed_qty)
+		else:
+			stock_entry = frappe.qb.DocType("Stock Entry")
+
+			query = (
+				frappe.qb.from_(stock_entry)
+				.select(Sum(stock_entry.fg_completed_qty))
+				.where(
+					(stock_entry.job_card == self.name)
+					& (stock_entry.docstatus == 1)
+					& (stock_entry.purpose == "Material Transfer for Manufacture")
+				)
+				.groupby(stock_entry.job_card)
 			)
-			.groupby(stock_entry.job_card)
-		)
 
-		query = query.run()
-		qty = 0
+			query = query.run()
+			qty = 0
 
-		if query and query[0][0]:
-			qty = flt(query[0][0])
+			if query and query[0][0]:
+				qty = flt(query[0][0])
 
 		self.db_set("transferred_qty", qty)
 		self.set_status(update_status)
@@ -1048,6 +930,7 @@ class JobCard(Document):
 			doc.db_set("material_transferred_for_manufacturing", qty)
 
 	def set_status(self, update_status=False):
+		previous_status = self.status
 		self.status = {0: "Open", 1: "Submitted", 2: "Cancelled"}[self.docstatus or 0]
 		if self.finished_good and self.docstatus == 1:
 			if self.manufactured_qty >= self.for_quantity:
@@ -1077,7 +960,7 @@ class JobCard(Document):
 			self.db_set("status", self.status)
 
 		if self.workstation:
-			self.update_workstation_status()
+			self.update_workstation_status(previous_status)
 
 	def set_wip_warehouse(self):
 		if not self.wip_warehouse:
@@ -1237,27 +1120,10 @@ class JobCard(Document):
 
 		self.validate_time_logs(save=True)
 
-	def update_workstation_status(self):
-		status_map = {
-			"Open": "Off",
-			"Work In Progress": "Production",
-			"Completed": "Off",
-			"On Hold": "Idle",
-		}
+	def update_workstation_status(self, previous_status=None):
+		from erpnext.manufacturing.doctype.plant_floor.plant_floor_status import update_workstation_status
 
-		job_cards = frappe.get_all(
-			"Job Card",
-			fields=["name", "status"],
-			filters={"workstation": self.workstation, "docstatus": 0, "status": ("!=", "Completed")},
-			order_by="status desc",
-		)
-
-		if not job_cards:
-			frappe.db.set_value("Workstation", self.workstation, "status", "Off")
-
-		for row in job_cards:
-			frappe.db.set_value("Workstation", self.workstation, "status", status_map.get(row.status))
-			return
+		update_workstation_status(self, previous_status)
 
 	@frappe.whitelist()
 	def start_timer(self, **kwargs):
@@ -0,0 +1,319 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Finite capacity scheduling of job cards.
+
+For every workstation the scheduler keeps one timeline per unit of production capacity with the busy
+intervals of the existing job cards, loaded once, and the intervals it books itself. An operation is
+placed at the earliest time a timeline is free within the working hours of the workstation, so
+scheduling many operations needs a couple of queries per workstation instead of a few queries for
+every slot that is tried.
+
+A scheduler can be shared by all the work orders submitted in a request with
+`shared_job_card_scheduler`.
+"""
+
+import datetime
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint, flt, get_datetime, to_timedelta
+
+from erpnext.manufacturing.doctype.manufacturing_settings.manufacturing_settings import (
+	get_mins_between_operations,
+)
+from erpnext.manufacturing.doctype.workstation_type.workstation_type import get_workstations
+from erpnext.support.doctype.issue.issue import get_holidays
+
+# working hours are looked up for at most this many days from the start of an operation
+MAX_PLANNING_DAYS = 366
+
+
+class Timeline:
+	"""Sorted, non overlapping busy intervals of one unit of capacity of a workstation"""
+
+	def __init__(self):
+		self.starts = []
+		self.ends = []
+
+	def is_free(self, from_time, to_time):
+		return bisect_right(self.ends, from_time) >= bisect_left(self.starts, to_time)
+
+	def add(self, from_time, to_time):
+		"""Marks the interval as busy, merging it with the busy intervals it overlaps"""
+		lo = bisect_right(self.ends, from_time)
+		hi = bisect_left(self.starts, to_time)
+		if lo < hi:
+			from_time = min(from_time, self.starts[lo])
+			to_time = max(to_time, self.ends[hi - 1])
+
+		self.starts[lo:hi] = [from_time]
+		self.ends[lo:hi] = [to_time]
+
+	def get_free_time(self, from_time, mins, until, gap):
+		"""
+		Returns the earliest time from `from_time` at which the timeline is free for `mins` minutes,
+		or up to `until` if that comes first. Returns None if there is no such time before `until`.
+		"""
+		while until is None or from_time < until:
+			to_time = from_time + datetime.timedelta(minutes=mins)
+			if until is not None:
+				to_time = min(to_time, until)
+
+			i = bisect_right(self.ends, from_time)
+			if i == len(self.starts) or self.starts[i] >= to_time:
+				return from_time
+
+			from_time = self.ends[i] + gap
+
+		return None
+
+
+class WorkstationCapacity:
+	def __init__(self, name, production_capacity=1, working_hours=None, holidays=None):
+		self.name = name
+		self.timelines = [Timeline() for _i in range(cint(production_capacity) or 1)]
+		self.working_hours = working_hours or []
+		self.holidays = holidays or set()
+		self.loaded_from = None
+
+	def add_busy_time(self, from_time, to_time):
+		for timeline in self.timelines:
+			if timeline.is_free(from_time, to_time):
+				timeline.add(from_time, to_time)
+				return
+
+		# already overbooked, keep it busy on the first timeline
+		self.timelines[0].add(from_time, to_time)
+
+	def get_working_windows(self, from_time):
+		"""Yields the (start, end) of the working windows from `from_time`, end is None if unlimited"""
+		if not self.working_hours:
+			yield from_time, None
+			return
+
+		day = from_time.date()
+		for _i in range(MAX_PLANNING_DAYS):
+			if day not in self.holidays:
+				day_start = datetime.datetime.combine(day, datetime.time.min)
+				for start_time, end_time in self.working_hours:
+					if day_start + end_time > from_time:
+						yield max(day_start + start_time, from_time), day_start + end_time
+
+			day += datetime.timedelta(days=1)
+
+		yield max(datetime.datetime.combine(day, datetime.time.min), from_time), None
+
+	def get_slots(self, from_time, mins, gap):
+		"""Returns [(timeline, from_time, to_time)] covering `mins` minutes of work from `from_time`"""
+		slots = []
+		remaining = flt(mins)
+		cursor = from_time
+
+		for window_start, window_end in self.get_working_windows(from_time):
+			if remaining <= 0:
+				break
+
+			cursor = max(cursor, window_start)
+			while remaining > 0 and (window_end is None or cursor < window_end):
+				timeline, start = self.find_free_time(cursor, remaining, window_end, gap)
+				if timeline is None:
+					break
+
+				end = start + datetime.timedelta(minutes=remaining)
+				if window_end is not None:
+					end = min(end, window_end)
+
+				slots.append((timeline, start, end))
+				remaining -= (end - start).total_seconds() / 60
+				cursor = end
+
+		return slots
+
+	def find_free_time(self, from_time, mins, until, gap):
+		"""Returns the timeline free the earliest from `from_time` and the time it is free at"""
+		free_timeline, free_time = None, None
+		for timeline in self.timelines:
+			start = timeline.get_free_time(from_time, mins, until, gap)
+			if start is not None and (free_time is None or start < free_time):
+				free_timeline, free_time = timeline, start
+				if start == from_time:
+					break
+
+		return free_timeline, free_time
+
+
+class JobCardScheduler:
+	def __init__(self):
+		self.gap = get_mins_between_operations()
+		self.allow_overtime = cint(frappe.db.get_single_value("Manufacturing Settings", "allow_overtime"))
+		self.allow_production_on_holidays = cint(
+			frappe.db.get_single_value("Manufacturing Settings", "allow_production_on_holidays")
+		)
+
+		self.workstations = {}
+		self.workstations_by_type = {}
+
+	def schedule(self, job_card, row):
+		"""
+		Appends the scheduled time logs of the operation `row` to `job_card` at the earliest
+		time from `row.planned_start_time` a workstation has free capacity in its working hours.
+
+		If the job card only has a workstation type, the workstation of that type that can
+		finish the operation first is set on the job card.
+		"""
+		from_time = get_datetime(row.planned_start_time)
+		mins = flt(row.time_in_mins)
+
+		if job_card.workstation:
+			workstations = [job_card.workstation]
+		elif job_card.workstation_type:
+			workstations = self.get_workstations_of_type(job_card.workstation_type)
+		else:
+			workstations = []
+
+		workstation, slots = None, []
+		if mins > 0:
+			self.load_workstations(workstations, from_time)
+			for name in workstations:
+				if not (capacity := self.workstations.get(name)):
+					continue
+
+				capacity_slots = capacity.get_slots(from_time, mins, self.gap)
+				if capacity_slots and (not slots or capacity_slots[-1][2] < slots[-1][2]):
+					workstation, slots = capacity, capacity_slots
+
+		if workstation:
+			job_card.workstation = workstation.name
+			for timeline, start, end in slots:
+				timeline.add(start, end)
+		else:
+			slots = [(None, from_time, from_time + datetime.timedelta(minutes=mins))]
+
+		for _timeline, start, end in slots:
+			job_card.append(
+				"scheduled_time_logs",
+				{
+					"from_time": start,
+					"to_time": end,
+					"completed_qty": 0,
+					"time_in_mins": (end - start).total_seconds() / 60,
+				},
+			)
+
+		row.planned_start_time = slots[0][1]
+		row.planned_end_time = slots[-1][2]
+
+	def get_workstations_of_type(self, workstation_type):
+		if workstation_type not in self.workstations_by_type:
+			self.workstations_by_type[workstation_type] = get_workstations(workstation_type)
+
+		return self.workstations_by_type[workstation_type]
+
+	def load_workstations(self, workstations, from_time):
+		"""Loads the capacity of the workstations and their busy time from `from_time` in bulk"""
+		if missing := [name for name in workstations if name not in self.workstations]:
+			self.workstations.update(self.get_workstation_capacities(missing))
+
+		to_load = {}
+		for name in workstations:
+			if not (capacity := self.workstations.get(name)):
+				continue
+
+			if capacity.loaded_from is None or from_time < capacity.loaded_from:
+				to_load[name] = capacity.loaded_from
+				capacity.loaded_from = from_time
+
+		if not to_load:
+			return
+
+		for row in self.get_busy_time(list(to_load), from_time):
+			loaded_upto = to_load[row.workstation]
+			if loaded_upto is None or get_datetime(row.to_time) <= loaded_upto:
+				self.workstations[row.workstation].add_busy_time(
+					get_datetime(row.from_time), get_datetime(row.to_time)
+				)
+
+	def get_workstation_capacities(self, workstations):
+		working_hours = {}
+		if not self.allow_overtime:
+			for row in frappe.get_all(
+				"Workstation Working Hour",
+				filters={"parent": ["in", workstations], "parenttype": "Workstation"},
+				fields=["parent", "start_time", "end_time"],
+				order_by="start_time",
+			):
+				if not (row.start_time and row.end_time):
+					continue
+
+				start_time, end_time = to_timedelta(row.start_time), to_timedelta(row.end_time)
+				if end_time <= start_time:
+					end_time += datetime.timedelta(days=1)
+
+				working_hours.setdefault(row.parent, []).append((start_time, end_time))
+
+		capacities = {}
+		for row in frappe.get_all(
+			"Workstation",
+			filters={"name": ["in", workstations]},
+			fields=["name", "production_capacity", "holiday_list"],
+		):
+			holidays = set()
+			if row.holiday_list and not self.allow_production_on_holidays:
+				holidays = set(get_holidays(row.holiday_list))
+
+			capacities[row.name] = WorkstationCapacity(
+				row.name,
+				production_capacity=row.production_capacity,
+				working_hours=working_hours.get(row.name),
+				holidays=holidays,
+			)
+
+		return capacities
+
+	def get_busy_time(self, workstations, from_time):
+		"""Returns the time logs and scheduled time logs of the job cards on the workstations"""
+		jc = frappe.qb.DocType("Job Card")
+
+		busy_time = []
+		for doctype in ("Job Card Time Log", "Job Card Scheduled Time"):
+			jctl = frappe.qb.DocType(doctype)
+
+			query = (
+				frappe.qb.from_(jctl)
+				.inner_join(jc)
+				.on(jctl.parent == jc.name)
+				.select(jc.workstation, jctl.from_time, jctl.to_time)
+				.where(
+					(jc.workstation.isin(workstations))
+					& (jctl.from_time.isnotnull())
+					& (jctl.to_time > from_time)
+				)
+				.orderby(jctl.from_time)
+			)
+
+			if doctype == "Job Card Time Log":
+				query = query.where(jc.docstatus < 2)
+			else:
+				query = query.where((jc.docstatus == 0) & (jc.total_time_in_mins == 0))
+
+			busy_time.extend(query.run(as_dict=True))
+
+		return sorted(busy_time, key=lambda d: get_datetime(d.from_time))
+
+
+@contextmanager
+def shared_job_card_scheduler():
+	"""Schedules the job cards of all the work orders submitted within the block with one scheduler"""
+	previous = frappe.flags.job_card_scheduler
+	frappe.flags.job_card_scheduler = JobCardScheduler()
+	try:
+		yield frappe.flags.job_card_scheduler
+	finally:
+		frappe.flags.job_card_scheduler = previous
+
+
+def get_job_card_scheduler():
+	return frappe.flags.job_card_scheduler or JobCardScheduler()
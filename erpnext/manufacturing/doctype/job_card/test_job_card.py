@@ -87,6 +87,35 @@ class TestJobCard(ERPNextTestSuite):
 			doc.operation_id = "Test Data"
 			self.assertRaises(OperationMismatchError, doc.save)
 
+	def test_workstation_status_feed(self):
+		from erpnext.manufacturing.doctype.plant_floor.plant_floor_status import get_plant_floor_status
+
+		plant_floor = frappe.get_doc(doctype="Plant Floor", floor_name=random_string(10)).insert()
+		workstation = make_workstation(workstation_name=random_string(10))
+		workstation.db_set("plant_floor", plant_floor.name)
+
+		job_card = frappe.get_last_doc("Job Card", {"work_order": self.work_order.name})
+		job_card.workstation = workstation.name
+		job_card.save()
+
+		snapshot = get_plant_floor_status(plant_floor.name)
+		self.assertEqual([d.name for d in snapshot.workstations], [workstation.name])
+		self.assertEqual([d.name for d in snapshot.workstations[0].job_cards], [job_card.name])
+		self.assertEqual(frappe.db.get_value("Workstation", workstation.name, "status"), "Off")
+
+		# start
+		job_card.append("time_logs", {"from_time": now(), "employee": self.employees[0].name})
+		job_card.save()
+		self.assertEqual(frappe.db.get_value("Workstation", workstation.name, "status"), "Production")
+
+		# pause
+		job_card.is_paused = 1
+		job_card.save()
+		self.assertEqual(frappe.db.get_value("Workstation", workstation.name, "status"), "Idle")
+
+		snapshot = get_plant_floor_status(plant_floor.name, workstation_status="Idle")
+		self.assertEqual([d.is_paused for d in snapshot.workstations[0].job_cards], [1])
+
 	def test_job_card_with_different_work_station(self):
 		job_cards = frappe.get_all(
 			"Job Card",
@@ -708,6 +737,42 @@ class TestJobCard(ERPNextTestSuite):
 		self.assertEqual(wo_doc.process_loss_qty, 2)
 		self.assertEqual(wo_doc.status, "Completed")
 
+	def test_job_card_scheduler_with_working_hours(self):
+		from erpnext.manufacturing.doctype.job_card.job_card_scheduler import JobCardScheduler
+
+		frappe.db.set_single_value(
+			"Manufacturing Settings", {"allow_overtime": 0, "mins_between_operations": 10}
+		)
+
+		workstation = make_workstation(workstation_name=random_string(5))
+		workstation.production_capacity = 1
+		workstation.append("working_hours", {"start_time": "09:00:00", "end_time": "13:00:00"})
+		workstation.save()
+
+		scheduler = JobCardScheduler()
+		job_cards = []
+		for _i in range(2):
+			job_card = frappe.new_doc("Job Card")
+			job_card.workstation = workstation.name
+			job_card.schedule_time_logs(
+				frappe._dict(planned_start_time="2030-01-07 09:00:00", time_in_mins=180), scheduler=scheduler
+			)
+			job_cards.append(job_card)
+
+		def get_slots(job_card):
+			return [(str(d.from_time), str(d.to_time)) for d in job_card.scheduled_time_logs]
+
+		self.assertEqual(get_slots(job_cards[0]), [("2030-01-07 09:00:00", "2030-01-07 12:00:00")])
+
+		# starts after the first one and continues in the working hours of the next day
+		self.assertEqual(
+			get_slots(job_cards[1]),
+			[
+				("2030-01-07 12:10:00", "2030-01-07 13:00:00"),
+				("2030-01-08 09:00:00", "2030-01-08 11:10:00"),
+			],
+		)
+
 
 def create_bom_with_multiple_operations():
 	"Create a BOM with multiple operations and Material Transfer against Job Card"
@@ -0,0 +1,180 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Realtime status feed of Plant Floors.
+
+When a job card is started, paused, resumed or completed, its new state and the status of its
+workstation are published after commit to the rooms of its Plant Floor and Workstation, so that the
+plant floor and workstation dashboards update themselves instead of fetching all the workstations
+and job cards again.
+
+`get_plant_floor_status` is the snapshot the dashboards load, with two queries for all the
+workstations of the floor. It is not cached, the job cards in it depend on the permissions of the user.
+"""
+
+import frappe
+from frappe.query_builder.functions import Max
+
+from erpnext.manufacturing.doctype.workstation.workstation import get_color_map, get_workstations
+
+JOB_CARD_STATUS_EVENT = "job_card_status"
+WORKSTATION_STATUS_EVENT = "update_workstation_status"
+
+# job card status: the status it puts its workstation in
+WORKSTATION_STATUS_MAP = {
+	"Open": "Off",
+	"Work In Progress": "Production",
+	"Completed": "Off",
+	"On Hold": "Idle",
+}
+
+
+def update_workstation_status(job_card, previous_status=None):
+	"""
+	Sets the status of the workstation of `job_card` from its open job cards, including `job_card`
+	as it is being saved, and publishes the changes of both
+	"""
+	job_card_table = frappe.qb.DocType("Job Card")
+
+	# like ordering the open job cards by status desc, "Work In Progress" wins over the others
+	statuses = [
+		status
+		for status in (
+			frappe.qb.from_(job_card_table)
+			.select(Max(job_card_table.status))
+			.where(
+				(job_card_table.workstation == job_card.workstation)
+				& (job_card_table.docstatus == 0)
+				& (job_card_table.status != "Completed")
+				& (job_card_table.name != job_card.name)
+			)
+		).run(pluck=True)
+		if status
+	]
+
+	if job_card.docstatus == 0 and job_card.status != "Completed":
+		statuses.append(job_card.status)
+
+	status = WORKSTATION_STATUS_MAP.get(max(statuses)) if statuses else "Off"
+
+	workstation = frappe.db.get_value(
+		"Workstation", job_card.workstation, ["status", "plant_floor"], as_dict=True
+	)
+	if not workstation:
+		return
+
+	if workstation.status != status:
+		frappe.db.set_value("Workstation", job_card.workstation, "status", status)
+		if workstation.plant_floor:
+			publish_workstation_status(job_card.workstation, workstation.plant_floor, workstation.status)
+
+	if job_card.status != previous_status:
+		publish_job_card_status(job_card, previous_status, workstation.plant_floor, status)
+
+
+def publish_workstation_status(workstation, plant_floor, old_status):
+	"""Publishes the new status of `workstation` to the room of its Plant Floor"""
+	data = get_workstations(plant_floor=plant_floor, workstation_name=workstation)
+	if not data:
+		return
+
+	data = data[0]
+	data["old_color"] = get_color_map().get(old_status, "red")
+
+	frappe.publish_realtime(
+		WORKSTATION_STATUS_EVENT, data, doctype="Plant Floor", docname=plant_floor, after_commit=True
+	)
+
+
+def publish_job_card_status(job_card, previous_status, plant_floor, workstation_status):
+	"""Publishes the state of `job_card` to the rooms of its Workstation and Plant Floor"""
+	data = get_job_card_status(job_card)
+	data.update(
+		{
+			"previous_status": previous_status,
+			"plant_floor": plant_floor,
+			"workstation_status": workstation_status,
+		}
+	)
+
+	frappe.publish_realtime(
+		JOB_CARD_STATUS_EVENT, data, doctype="Workstation", docname=job_card.workstation, after_commit=True
+	)
+
+	if plant_floor:
+		frappe.publish_realtime(
+			JOB_CARD_STATUS_EVENT, data, doctype="Plant Floor", docname=plant_floor, after_commit=True
+		)
+
+
+def get_job_card_status(job_card):
+	return frappe._dict(
+		name=job_card.name,
+		workstation=job_card.workstation,
+		status=job_card.status,
+		is_paused=job_card.is_paused,
+		work_order=job_card.work_order,
+		operation=job_card.operation,
+		for_quantity=job_card.for_quantity,
+		total_completed_qty=job_card.total_completed_qty,
+		docstatus=job_card.docstatus,
+	)
+
+
+@frappe.whitelist()
+def get_plant_floor_status(plant_floor, workstation_type=None, workstation=None, workstation_status=None):
+	"""
+	Returns the workstations of `plant_floor` with their status and the open job cards the user can
+	read, for the dashboards to start from before they follow the realtime events
+	"""
+	frappe.has_permission("Plant Floor", "read", plant_floor, throw=True)
+
+	workstations = get_workstations(
+		plant_floor=plant_floor,
+		workstation_type=workstation_type,
+		workstation=workstation,
+		workstation_status=workstation_status,
+	)
+
+	job_cards = {}
+	if frappe.has_permission("Job Card", "read"):
+		job_cards = get_open_job_cards([d.name for d in workstations])
+
+	for d in workstations:
+		d.job_cards = job_cards.get(d.name, [])
+		d.job_card_count = len(d.job_cards)
+
+	return frappe._dict(plant_floor=plant_floor, workstations=workstations)
+
+
+def get_open_job_cards(workstations):
+	"""Returns {workstation: [job card]} of the open job cards of the `workstations` the user can read"""
+	if not workstations:
+		return {}
+
+	job_cards = {}
+	for row in frappe.get_list(
+		"Job Card",
+		filters={
+			"workstation": ["in", workstations],
+			"is_subcontracted": 0,
+			"docstatus": ["<", 2],
+			"status": ["not in", ["Completed", "Stopped"]],
+		},
+		fields=[
+			"name",
+			"workstation",
+			"status",
+			"is_paused",
+			"work_order",
+			"operation",
+			"for_quantity",
+			"total_completed_qty",
+			"docstatus",
+		],
+		order_by="expected_start_date, expected_end_date",
+	):
+		job_cards.setdefault(row.workstation, []).append(row)
+
+	return job_cards
@@ -146,6 +146,12 @@ frappe.ui.form.on("Production Plan", {
 					);
 				}
 
+				if (frm.doc.__onload?.has_draft_work_orders && frm.doc.status !== "Closed") {
+					frm.add_custom_button(__("Submit Work Orders"), () => {
+						frm.trigger("submit_work_orders");
+					});
+				}
+
 				if (
 					frm.doc.mr_items &&
 					frm.doc.mr_items.length &&
@@ -324,6 +330,17 @@ frappe.ui.form.on("Production Plan", {
 		});
 	},
 
+	submit_work_orders(frm) {
+		frappe.call({
+			method: "submit_work_orders",
+			freeze: true,
+			doc: frm.doc,
+			callback: function () {
+				frm.reload_doc();
+			},
+		});
+	},
+
 	make_material_request(frm) {
 		frappe.confirm(
 			__("Do you want to submit the material request"),
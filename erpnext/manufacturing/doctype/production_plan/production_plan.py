@@ -24,18 +24,26 @@ from frappe.utils import (
 	nowdate,
 	parse_json,
 )
+from frappe.utils.background_jobs import is_job_enqueued
 from frappe.utils.csvutils import build_csv_response
 from pypika.terms import ExistsCriterion
 
-from erpnext.manufacturing.doctype.bom.bom import get_children as get_bom_children
 from erpnext.manufacturing.doctype.bom.bom import validate_bom_no
+from erpnext.manufacturing.doctype.bom.bom_explosion import (
+	get_bom_structure,
+	get_bom_structures,
+	get_bom_tree_structures,
+)
 from erpnext.manufacturing.doctype.work_order.work_order import get_item_details
 from erpnext.setup.doctype.item_group.item_group import get_item_group_defaults
+from erpnext.stock.doctype.bin.reserved_qty import update_reserved_qty
 from erpnext.stock.doctype.stock_reservation_entry.stock_reservation_entry import StockReservation
 from erpnext.stock.get_item_details import get_conversion_factor
-from erpnext.stock.utils import get_or_make_bin
 from erpnext.utilities.transaction_base import validate_uom_is_integer
 
+# Work Orders and Material Requests beyond this many are created in a background job
+MAX_DOCS_IN_REQUEST = 50
+
 
 class ProductionPlan(Document):
 	# begin: auto-generated types
@@ -119,6 +127,12 @@ class ProductionPlan(Document):
 			frappe.db.get_single_value("Stock Settings", "enable_stock_reservation"),
 		)
 
+		if self.docstatus == 1:
+			self.set_onload(
+				"has_draft_work_orders",
+				frappe.db.exists("Work Order", {"production_plan": self.name, "docstatus": 0}),
+			)
+
 	def validate(self):
 		self.set_pending_qty_in_row_without_reference()
 		self.calculate_total_planned_qty()
@@ -621,17 +635,17 @@ class ProductionPlan(Document):
 		return so_wise_planned_qty
 
 	def update_bin_qty(self):
-		for d in self.mr_items:
-			if d.warehouse:
-				bin_name = get_or_make_bin(d.item_code, d.warehouse)
-				bin = frappe.get_doc("Bin", bin_name, for_update=True)
-				bin.update_reserved_qty_for_production_plan()
-
-		for d in self.sub_assembly_items:
-			if d.fg_warehouse and d.type_of_manufacturing == "In House":
-				bin_name = get_or_make_bin(d.production_item, d.fg_warehouse)
-				bin = frappe.get_doc("Bin", bin_name, for_update=True)
-				bin.update_reserved_qty_for_for_sub_assembly()
+		update_reserved_qty(
+			[(d.item_code, d.warehouse) for d in self.mr_items if d.warehouse], "Production Plan"
+		)
+		update_reserved_qty(
+			[
+				(d.production_item, d.fg_warehouse)
+				for d in self.sub_assembly_items
+				if d.fg_warehouse and d.type_of_manufacturing == "In House"
+			],
+			"Sub Assembly",
+		)
 
 	def delete_draft_work_order(self):
 		for d in frappe.get_all(
@@ -735,12 +749,47 @@ class ProductionPlan(Document):
 	def make_work_order(self):
 		from erpnext.manufacturing.doctype.work_order.work_order import get_default_warehouse
 
-		wo_list, po_list = [], []
 		subcontracted_po = {}
 		default_warehouses = get_default_warehouse()
 
-		self.make_work_order_for_finished_goods(wo_list, default_warehouses)
-		self.make_work_order_for_subassembly_items(wo_list, subcontracted_po, default_warehouses)
+		work_orders = [
+			*self.get_work_orders_for_finished_goods(default_warehouses),
+			*self.get_work_orders_for_subassembly_items(subcontracted_po, default_warehouses),
+		]
+
+		if len(work_orders) > MAX_DOCS_IN_REQUEST:
+			job_id = f"production_plan_work_orders::{self.name}"
+			if is_job_enqueued(job_id):
+				frappe.msgprint(
+					_("Work Orders for {0} are already being created in the background").format(self.name)
+				)
+				return
+
+			frappe.enqueue_doc(
+				self.doctype,
+				self.name,
+				"create_work_orders_and_purchase_orders",
+				queue="long",
+				timeout=3600,
+				job_id=job_id,
+				work_orders=work_orders,
+				subcontracted_po=subcontracted_po,
+				publish_progress=True,
+				now=frappe.in_test,
+				enqueue_after_commit=True,
+			)
+
+			frappe.msgprint(
+				_("{0} Work Orders are being created in the background").format(len(work_orders)), alert=True
+			)
+			return
+
+		self.create_work_orders_and_purchase_orders(work_orders, subcontracted_po)
+
+	def create_work_orders_and_purchase_orders(self, work_orders, subcontracted_po, publish_progress=False):
+		po_list = []
+
+		wo_list = self.create_work_orders(work_orders, publish_progress=publish_progress)
 		self.make_subcontracted_purchase_order(subcontracted_po, po_list)
 		self.show_list_created_message("Work Order", wo_list)
 		self.show_list_created_message("Purchase Order", po_list)
@@ -751,19 +800,48 @@ class ProductionPlan(Document):
 		if not po_list:
 			frappe.msgprint(_("No Purchase Orders were created"))
 
-	def make_work_order_for_finished_goods(self, wo_list, default_warehouses):
-		items_data = self.get_production_items()
+		if publish_progress:
+			publish_messages()
 
-		for _key, item in items_data.items():
+	@frappe.whitelist()
+	def submit_work_orders(self):
+		"""Submits the draft Work Orders of the plan, scheduling the job cards of all of them in one pass"""
+		from erpnext.manufacturing.doctype.job_card.job_card_scheduler import shared_job_card_scheduler
+
+		work_orders = frappe.get_all(
+			"Work Order",
+			filters={"production_plan": self.name, "docstatus": 0},
+			pluck="name",
+			order_by="planned_start_date asc, creation asc",
+		)
+
+		reserved_qty_bins = set()
+		with shared_job_card_scheduler():
+			for work_order in work_orders:
+				doc = frappe.get_doc("Work Order", work_order)
+				doc.flags.reserved_qty_bins = reserved_qty_bins
+				doc.submit()
+
+		update_reserved_qty(reserved_qty_bins, "Production")
+
+		if not work_orders:
+			frappe.msgprint(_("No draft Work Orders to submit"))
+
+		return work_orders
+
+	def get_work_orders_for_finished_goods(self, default_warehouses):
+		work_orders = []
+		for _key, item in self.get_production_items().items():
 			if self.sub_assembly_items:
 				item["use_multi_level_bom"] = 0
 
 			set_default_warehouses(item, default_warehouses)
-			work_order = self.create_work_order(item)
-			if work_order:
-				wo_list.append(work_order)
+			work_orders.append(item)
 
-	def make_work_order_for_subassembly_items(self, wo_list, subcontracted_po, default_warehouses):
+		return work_orders
+
+	def get_work_orders_for_subassembly_items(self, subcontracted_po, default_warehouses):
+		work_orders = []
 		for row in self.sub_assembly_items:
 			if row.type_of_manufacturing == "Subcontract":
 				subcontracted_po.setdefault(row.supplier, []).append(row)
@@ -786,9 +864,9 @@ class ProductionPlan(Document):
 			if work_order_data.get("qty") <= 0:
 				continue
 
-			work_order = self.create_work_order(work_order_data)
-			if work_order:
-				wo_list.append(work_order)
+			work_orders.append(work_order_data)
+
+		return work_orders
 
 	def prepare_data_for_sub_assembly_items(self, row, wo_data):
 		for field in [
@@ -876,13 +954,55 @@ class ProductionPlan(Document):
 			doc_list = [get_link_to_form(doctype, p) for p in doc_list]
 			msgprint(_("{0} created").format(comma_and(doc_list)))
 
-	def create_work_order(self, item):
+	def create_work_orders(self, items, publish_progress=False):
+		"""
+		Creates the Work Orders of `items`, reading the BOM operations, BOM items and stock qty
+		they need once for all of them. Returns the names of the Work Orders created.
+		"""
+		from erpnext.manufacturing.doctype.work_order.work_order import WorkOrderPrefetch
+
+		items = [item for item in items if flt(item.get("qty")) > 0]
+
+		prefetch = WorkOrderPrefetch()
+		prefetch.load_operations([item.get("bom_no") for item in items])
+
+		item_codes, warehouses = set(), set()
+		for item in items:
+			if item.get("bom_no"):
+				bom_items = prefetch.get_bom_items(
+					item["bom_no"], self.company, 1, item.get("use_multi_level_bom")
+				)
+				item_codes.update(d.item_code for d in bom_items.values())
+
+			warehouses.update(
+				item.get(field) for field in ("fg_warehouse", "wip_warehouse", "warehouse") if item.get(field)
+			)
+
+		prefetch.load_stock_qty(item_codes, warehouses)
+
+		wo_list = []
+		for count, item in enumerate(items, start=1):
+			if work_order := self.create_work_order(item, prefetch=prefetch):
+				wo_list.append(work_order)
+
+			if publish_progress:
+				frappe.publish_progress(
+					count * 100 / len(items),
+					title=_("Creating Work Orders..."),
+					doctype=self.doctype,
+					docname=self.name,
+				)
+
+		return wo_list
+
+	def create_work_order(self, item, prefetch=None):
 		from erpnext.manufacturing.doctype.work_order.work_order import OverProductionError
 
 		if flt(item.get("qty")) <= 0:
 			return
 
 		wo = frappe.new_doc("Work Order")
+		wo.flags.prefetch = prefetch
 		wo.update(item)
 		if not wo.source_warehouse:
 			wo.source_warehouse = item.get("fg_warehouse")
@@ -906,26 +1026,86 @@ class ProductionPlan(Document):
 			pass
 
 	def validate_mr_subcontracted(self):
-		for row in self.mr_items:
-			if row.material_request_type == "Subcontracting":
-				if not frappe.db.get_value("Item", row.item_code, "is_sub_contracted_item"):
-					frappe.throw(
-						_("Item {0} is not a subcontracted item").format(row.item_code),
-						title=_("Invalid Item"),
-					)
+		item_codes = [row.item_code for row in self.mr_items if row.material_request_type == "Subcontracting"]
+		if not item_codes:
+			return
+
+		subcontracted_items = frappe.get_all(
+			"Item",
+			filters={"name": ["in", item_codes], "is_sub_contracted_item": 1},
+			pluck="name",
+			order_by=None,
+		)
+
+		for item_code in item_codes:
+			if item_code not in subcontracted_items:
+				frappe.throw(
+					_("Item {0} is not a subcontracted item").format(item_code),
+					title=_("Invalid Item"),
+				)
 
 	@frappe.whitelist()
 	def make_material_request(self):
-		self.validate_mr_subcontracted()
-
 		"""Create Material Requests grouped by Sales Order and Material Request Type"""
-		material_request_list = []
-		material_request_map = {}
+		self.validate_mr_subcontracted()
 
 		if all([item.requested_qty == item.quantity for item in self.mr_items]):
 			msgprint(_("All items are already requested"))
 			return
 
+		material_request_list = self.get_material_requests()
+
+		if len(material_request_list) > MAX_DOCS_IN_REQUEST:
+			job_id = f"production_plan_material_requests::{self.name}"
+			if is_job_enqueued(job_id):
+				frappe.msgprint(
+					_("Material Requests for {0} are already being created in the background").format(
+						self.name
+					)
+				)
+				return
+
+			frappe.enqueue_doc(
+				self.doctype,
+				self.name,
+				"create_material_requests",
+				queue="long",
+				timeout=3600,
+				job_id=job_id,
+				material_request_list=material_request_list,
+				publish_progress=True,
+				submit=self.get("submit_material_request"),
+				now=frappe.in_test,
+				enqueue_after_commit=True,
+			)
+
+			frappe.msgprint(
+				_("{0} Material Requests are being created in the background").format(
+					len(material_request_list)
+				),
+				alert=True,
+			)
+			return
+
+		self.create_material_requests(material_request_list, submit=self.get("submit_material_request"))
+
+	def get_material_requests(self):
+		"""Returns the unsaved Material Requests for the items not requested yet"""
+		material_request_list = []
+		material_request_map = {}
+
+		sales_order_projects = dict(
+			frappe.get_all(
+				"Sales Order",
+				filters={
+					"name": ["in", list({item.sales_order for item in self.mr_items if item.sales_order})]
+				},
+				fields=["name", "project"],
+				as_list=True,
+				order_by=None,
+			)
+		)
+
 		for item in self.mr_items:
 			if item.quantity == item.requested_qty:
 				continue
@@ -969,21 +1149,30 @@ class ProductionPlan(Document):
 					"sales_order": item.sales_order,
 					"production_plan": self.name,
 					"material_request_plan_item": item.name,
-					"project": frappe.db.get_value("Sales Order", item.sales_order, "project")
-					if item.sales_order
-					else None,
+					"project": sales_order_projects.get(item.sales_order) if item.sales_order else None,
 				},
 			)
 
-		for material_request in material_request_list:
+		return material_request_list
+
+	def create_material_requests(self, material_request_list, publish_progress=False, submit=False):
+		for count, material_request in enumerate(material_request_list, start=1):
 			# submit
 			material_request.flags.ignore_permissions = 1
 			material_request.run_method("set_missing_values")
 
 			material_request.save()
-			if self.get("submit_material_request"):
+			if submit:
 				material_request.submit()
 
+			if publish_progress:
+				frappe.publish_progress(
+					count * 100 / len(material_request_list),
+					title=_("Creating Material Requests..."),
+					doctype=self.doctype,
+					docname=self.name,
+				)
+
 		frappe.flags.mute_messages = False
 
 		if material_request_list:
@@ -994,12 +1183,19 @@ class ProductionPlan(Document):
 		else:
 			msgprint(_("No material request created"))
 
+		if publish_progress:
+			publish_messages()
+
 	@frappe.whitelist()
 	def get_sub_assembly_items(self, manufacturing_type=None):
 		"Fetch sub assembly items and optionally combine them."
 		self.sub_assembly_items = []
 		sub_assembly_items_store = []  # temporary store to process all subassembly items
 		bin_details = frappe._dict()
+		item_cache = {}
+
+		# load all the BOM trees level by level instead of one BOM at a time
+		get_bom_tree_structures([row.bom_no for row in self.po_items if row.bom_no])
 
 		track_semi_finished_goods = True
 		for row in self.po_items:
@@ -1033,6 +1229,7 @@ class ProductionPlan(Document):
 				self.company,
 				warehouse=self.sub_assembly_warehouse,
 				skip_available_sub_assembly_item=self.skip_available_sub_assembly_item,
+				item_cache=item_cache,
 			)
 			self.set_sub_assembly_items_based_on_level(row, bom_data, manufacturing_type)
 			sub_assembly_items_store.extend(bom_data)
@@ -1233,56 +1430,107 @@ def download_raw_materials(doc, warehouses=None):
 	build_csv_response(item_list, doc.name)
 
 
-def get_exploded_items(item_details, company, bom_no, include_non_stock_items, planned_qty=1, doc=None):
-	bei = frappe.qb.DocType("BOM Explosion Item")
-	bom = frappe.qb.DocType("BOM")
-	item = frappe.qb.DocType("Item")
-	item_default = frappe.qb.DocType("Item Default")
-	item_uom = frappe.qb.DocType("UOM Conversion Detail")
-
-	data = (
-		frappe.qb.from_(bei)
-		.join(bom)
-		.on(bom.name == bei.parent)
-		.join(item)
-		.on(item.name == bei.item_code)
-		.left_join(item_default)
-		.on((item_default.parent == item.name) & (item_default.company == company))
-		.left_join(item_uom)
-		.on((item.name == item_uom.parent) & (item_uom.uom == item.purchase_uom))
-		.select(
-			(IfNull(Sum(bei.stock_qty / IfNull(bom.quantity, 1)), 0) * planned_qty).as_("qty"),
-			item.item_name,
-			item.name.as_("item_code"),
-			bei.description,
-			bei.stock_uom,
-			item.min_order_qty,
-			bei.source_warehouse,
-			item.default_material_request_type,
-			item.min_order_qty,
-			item_default.default_warehouse,
-			item.purchase_uom,
-			item_uom.conversion_factor,
-			item.safety_stock,
-			bom.item.as_("main_bom_item"),
-		)
-		.where(
-			(bei.docstatus < 2)
-			& (bei.is_sub_assembly_item == 0)
-			& (bom.name == bom_no)
-			& (item.is_stock_item.isin([0, 1]) if include_non_stock_items else item.is_stock_item == 1)
-		)
-		.groupby(bei.item_code, bei.stock_uom)
-	).run(as_dict=True)
-
-	for d in data:
-		if not d.conversion_factor and d.purchase_uom:
-			d.conversion_factor = get_uom_conversion_factor(d.item_code, d.purchase_uom)
+def get_exploded_items(
+	item_details, company, bom_no, include_non_stock_items, planned_qty=1, doc=None, item_cache=None
+):
+	for d in get_planning_bom_items(
+		bom_no, company, include_non_stock_items, exploded=True, item_cache=item_cache
+	):
+		d.qty *= planned_qty
 		item_details.setdefault(d.get("item_code"), d)
 
 	return item_details
 
 
+def get_planning_bom_items(
+	bom_no, company, include_non_stock_items, exploded=False, submitted_only=False, item_cache=None
+):
+	"""
+	Returns the items (or the exploded items) of the BOM, except sub assembly items, grouped by item and
+	stock UOM with the qty per unit of the BOM and the planning details of the item.
+	"""
+	bom = get_bom_structure(bom_no)
+	if not bom or bom.docstatus == 2 or (submitted_only and bom.docstatus != 1):
+		return []
+
+	rows = bom.exploded_items if exploded else bom.bom_items
+	item_details = get_planning_item_details([row.item_code for row in rows], company, item_cache)
+
+	items = {}
+	for row in rows:
+		item = item_details.get(row.item_code)
+		if row.is_sub_assembly_item or not item or not (include_non_stock_items or item.is_stock_item):
+			continue
+
+		key = (row.item_code, row.stock_uom)
+		if key in items:
+			items[key].qty += row.qty_per_unit
+			continue
+
+		items[key] = frappe._dict(
+			{
+				"item_code": row.item_code,
+				"item_name": item.item_name,
+				"qty": row.qty_per_unit,
+				"description": row.description,
+				"stock_uom": row.stock_uom,
+				"source_warehouse": row.source_warehouse,
+				"bom_no": row.get("bom_no"),
+				"default_bom": item.default_bom,
+				"default_material_request_type": item.default_material_request_type,
+				"is_sub_contracted": item.is_sub_contracted_item,
+				"min_order_qty": item.min_order_qty,
+				"safety_stock": item.safety_stock,
+				"default_warehouse": item.default_warehouse,
+				"purchase_uom": item.purchase_uom,
+				"conversion_factor": item.conversion_factor,
+				"main_bom_item": bom.item,
+			}
+		)
+
+	return list(items.values())
+
+
+def get_planning_item_details(item_codes, company, item_cache=None):
+	"""
+	Returns {item_code: details} used for planning. Pass the same `item_cache` dict while walking
+	several BOMs to load every item only once.
+	"""
+	details = item_cache if item_cache is not None else {}
+
+	if missing := list({item_code for item_code in item_codes if item_code not in details}):
+		item = frappe.qb.DocType("Item")
+		item_default = frappe.qb.DocType("Item Default")
+		item_uom = frappe.qb.DocType("UOM Conversion Detail")
+
+		for row in (
+			frappe.qb.from_(item)
+			.left_join(item_default)
+			.on((item_default.parent == item.name) & (item_default.company == company))
+			.left_join(item_uom)
+			.on((item.name == item_uom.parent) & (item_uom.uom == item.purchase_uom))
+			.select(
+				item.name.as_("item_code"),
+				item.item_name,
+				item.description,
+				item.stock_uom,
+				item.is_stock_item,
+				item.is_sub_contracted_item,
+				item.default_bom,
+				item.default_material_request_type,
+				item.min_order_qty,
+				item.safety_stock,
+				item.purchase_uom,
+				item_uom.conversion_factor,
+				item_default.default_warehouse,
+			)
+			.where(item.name.isin(missing))
+		).run(as_dict=True):
+			details[row.item_code] = row
+
+	return {item_code: details[item_code] for item_code in item_codes if item_code in details}
+
+
 def get_uom_conversion_factor(item_code, uom):
 	return frappe.db.get_value(
 		"UOM Conversion Detail", {"parent": item_code, "uom": uom}, "conversion_factor"
@@ -1299,59 +1547,20 @@ def get_subitems(
 	include_subcontracted_items,
 	parent_qty,
 	planned_qty=1,
+	item_cache=None,
 ):
-	bom_item = frappe.qb.DocType("BOM Item")
-	bom = frappe.qb.DocType("BOM")
-	item = frappe.qb.DocType("Item")
-	item_default = frappe.qb.DocType("Item Default")
-	item_uom = frappe.qb.DocType("UOM Conversion Detail")
-
-	items = (
-		frappe.qb.from_(bom_item)
-		.join(bom)
-		.on(bom.name == bom_item.parent)
-		.join(item)
-		.on(bom_item.item_code == item.name)
-		.left_join(item_default)
-		.on((item.name == item_default.parent) & (item_default.company == company))
-		.left_join(item_uom)
-		.on((item.name == item_uom.parent) & (item_uom.uom == item.purchase_uom))
-		.select(
-			bom_item.item_code,
-			item.default_material_request_type,
-			item.item_name,
-			IfNull(parent_qty * Sum(bom_item.stock_qty / IfNull(bom.quantity, 1)) * planned_qty, 0).as_(
-				"qty"
-			),
-			item.is_sub_contracted_item.as_("is_sub_contracted"),
-			bom_item.source_warehouse,
-			item.default_bom.as_("default_bom"),
-			bom_item.description.as_("description"),
-			bom_item.stock_uom.as_("stock_uom"),
-			item.min_order_qty.as_("min_order_qty"),
-			item.safety_stock.as_("safety_stock"),
-			item_default.default_warehouse,
-			item.purchase_uom,
-			item_uom.conversion_factor,
-			bom.item.as_("main_bom_item"),
-		)
-		.where(
-			(bom.name == bom_no)
-			& (bom_item.is_sub_assembly_item == 0)
-			& (bom_item.docstatus < 2)
-			& (item.is_stock_item.isin([0, 1]) if include_non_stock_items else item.is_stock_item == 1)
-		)
-		.groupby(bom_item.item_code)
-	).run(as_dict=True)
+	if item_cache is None:
+		item_cache = {}
+
+	items = get_planning_bom_items(bom_no, company, include_non_stock_items, item_cache=item_cache)
+	for d in items:
+		d.qty *= flt(parent_qty) * flt(planned_qty)
 
 	for d in items:
 		if not data.get("include_exploded_items") or not d.default_bom:
 			if d.item_code in item_details:
 				item_details[d.item_code].qty = item_details[d.item_code].qty + d.qty
 			else:
-				if not d.conversion_factor and d.purchase_uom:
-					d.conversion_factor = get_uom_conversion_factor(d.item_code, d.purchase_uom)
-
 				item_details[d.item_code] = d
 
 		if data.get("include_exploded_items") and d.default_bom:
@@ -1368,6 +1577,7 @@ def get_subitems(
 						include_non_stock_items,
 						include_subcontracted_items,
 						d.qty,
+						item_cache=item_cache,
 					)
 	return item_details
 
@@ -1623,6 +1833,9 @@ def get_items_for_material_requests(doc, warehouses=None, get_parent_warehouse_d
 	include_safety_stock = doc.get("include_safety_stock")
 
 	so_item_details = frappe._dict()
+	item_cache = {}
+
+	get_bom_structures([data.get("bom") or data.get("bom_no") for data in po_items])
 
 	sub_assembly_items = defaultdict(int)
 	if doc.get("skip_available_sub_assembly_item") and doc.get("sub_assembly_items"):
@@ -1665,6 +1878,7 @@ def get_items_for_material_requests(doc, warehouses=None, get_parent_warehouse_d
 						include_non_stock_items,
 						sub_assembly_items,
 						planned_qty=planned_qty,
+						item_cache=item_cache,
 					)
 
 				elif data.get("include_exploded_items") and include_subcontracted_items:
@@ -1676,6 +1890,7 @@ def get_items_for_material_requests(doc, warehouses=None, get_parent_warehouse_d
 						include_non_stock_items,
 						planned_qty=planned_qty,
 						doc=doc,
+						item_cache=item_cache,
 					)
 				else:
 					item_details = get_subitems(
@@ -1688,6 +1903,7 @@ def get_items_for_material_requests(doc, warehouses=None, get_parent_warehouse_d
 						include_subcontracted_items,
 						1,
 						planned_qty=planned_qty,
+						item_cache=item_cache,
 					)
 		elif data.get("item_code"):
 			item_master = frappe.get_doc("Item", data["item_code"]).as_dict()
@@ -1835,6 +2051,12 @@ def get_item_data(item_code):
 	}
 
 
+def publish_messages():
+	"""Shows the messages of a background job to the user who enqueued it, once it is committed"""
+	for message in frappe.get_message_log():
+		frappe.publish_realtime("msgprint", message.message, user=frappe.session.user, after_commit=True)
+
+
 def get_sub_assembly_items(
 	sub_assembly_items,
 	bin_details,
@@ -1845,12 +2067,35 @@ def get_sub_assembly_items(
 	warehouse=None,
 	indent=0,
 	skip_available_sub_assembly_item=False,
+	item_cache=None,
 ):
-	data = get_bom_children(parent=bom_no)
-	for d in data:
-		if d.expandable:
-			parent_item_code = frappe.get_cached_value("BOM", bom_no, "item")
-			stock_qty = (d.stock_qty / d.parent_bom_qty) * flt(to_produce_qty)
+	if not indent:
+		# the BOM structure is read without permission checks, check the BOM it starts from like the BOM tree
+		frappe.has_permission("BOM", doc=frappe.get_cached_doc("BOM", bom_no), throw=True)
+
+	bom = get_bom_structure(bom_no)
+	if not bom:
+		return
+
+	if item_cache is None:
+		item_cache = {}
+
+	item_details = get_planning_item_details([row.item_code for row in bom.bom_items], company, item_cache)
+	for row in bom.bom_items:
+		if row.bom_no:
+			item = item_details.get(row.item_code) or frappe._dict()
+			d = frappe._dict(
+				{
+					"item_code": row.item_code,
+					"item_name": item.item_name,
+					"description": item.description,
+					"stock_uom": item.stock_uom,
+					"is_sub_contracted_item": item.is_sub_contracted_item,
+					"value": row.bom_no,
+				}
+			)
+			parent_item_code = bom.item
+			stock_qty = row.qty_per_unit * flt(to_produce_qty)
 			required_qty = stock_qty
 
 			if skip_available_sub_assembly_item and d.item_code not in sub_assembly_items:
@@ -1905,6 +2150,7 @@ def get_sub_assembly_items(
 					warehouse,
 					indent=indent + 1,
 					skip_available_sub_assembly_item=skip_available_sub_assembly_item,
+					item_cache=item_cache,
 				)
 
 
@@ -1915,7 +2161,19 @@ def set_default_warehouses(row, default_warehouses):
 
 
 def get_reserved_qty_for_production_plan(item_code, warehouse):
-	from erpnext.manufacturing.doctype.work_order.work_order import get_reserved_qty_for_production
+	return get_reserved_qty_for_production_plan_map([(item_code, warehouse)]).get((item_code, warehouse))
+
+
+def get_reserved_qty_for_production_plan_map(item_warehouses):
+	"""
+	Returns {(item_code, warehouse): qty} reserved by the material requests planned in open production
+	plans, less the qty already reserved by their work orders. Pairs not in any plan are left out.
+	"""
+	from erpnext.manufacturing.doctype.work_order.work_order import get_reserved_qty_for_production_map
+
+	item_warehouses = set(item_warehouses)
+	if not item_warehouses:
+		return {}
 
 	table = frappe.qb.DocType("Production Plan")
 	child = frappe.qb.DocType("Material Request Plan Item")
@@ -1926,35 +2184,35 @@ def get_reserved_qty_for_production_plan(item_code, warehouse):
 		frappe.qb.from_(table)
 		.inner_join(child)
 		.on(table.name == child.parent)
-		.select(Sum(child.required_bom_qty))
+		.select(child.item_code, child.warehouse, Sum(child.required_bom_qty))
 		.where(
 			(table.docstatus == 1)
-			& (child.item_code == item_code)
-			& (child.warehouse == warehouse)
+			& (child.item_code.isin(list({item_code for item_code, _warehouse in item_warehouses})))
+			& (child.warehouse.isin(list({warehouse for _item_code, warehouse in item_warehouses})))
 			& (table.status.notin(["Completed", "Closed"]))
 		)
+		.groupby(child.item_code, child.warehouse)
 	)
 
 	if non_completed_production_plans:
 		query = query.where(table.name.isin(non_completed_production_plans))
 
-	query = query.run()
-
-	if not query or query[0][0] is None:
-		return None
+	planned_qty = {
+		(item_code, warehouse): flt(qty)
+		for item_code, warehouse, qty in query.run()
+		if qty is not None and (item_code, warehouse) in item_warehouses
+	}
 
-	reserved_qty_for_production_plan = flt(query[0][0])
+	if not planned_qty:
+		return {}
 
-	reserved_qty_for_production = flt(
-		get_reserved_qty_for_production(
-			item_code, warehouse, non_completed_production_plans, check_production_plan=True
-		)
+	reserved_qty_for_production = get_reserved_qty_for_production_map(
+		planned_qty, non_completed_production_plans, check_production_plan=True
 	)
 
-	if reserved_qty_for_production > reserved_qty_for_production_plan:
-		return 0.0
-
-	return reserved_qty_for_production_plan - reserved_qty_for_production
+	return {
+		key: max(qty - flt(reserved_qty_for_production.get(key)), 0.0) for key, qty in planned_qty.items()
+	}
 
 
 @frappe.request_cache
@@ -1984,48 +2242,16 @@ def get_raw_materials_of_sub_assembly_items(
 	include_non_stock_items,
 	sub_assembly_items,
 	planned_qty=1,
+	item_cache=None,
 ):
-	bei = frappe.qb.DocType("BOM Item")
-	bom = frappe.qb.DocType("BOM")
-	item = frappe.qb.DocType("Item")
-	item_default = frappe.qb.DocType("Item Default")
-	item_uom = frappe.qb.DocType("UOM Conversion Detail")
-
-	items = (
-		frappe.qb.from_(bei)
-		.join(bom)
-		.on(bom.name == bei.parent)
-		.join(item)
-		.on(item.name == bei.item_code)
-		.left_join(item_default)
-		.on((item_default.parent == item.name) & (item_default.company == company))
-		.left_join(item_uom)
-		.on((item.name == item_uom.parent) & (item_uom.uom == item.purchase_uom))
-		.select(
-			(IfNull(Sum(bei.stock_qty / IfNull(bom.quantity, 1)), 0) * planned_qty).as_("qty"),
-			item.item_name,
-			item.name.as_("item_code"),
-			bei.description,
-			bei.stock_uom,
-			bei.bom_no,
-			item.min_order_qty,
-			bei.source_warehouse,
-			item.default_material_request_type,
-			item.min_order_qty,
-			item_default.default_warehouse,
-			item.purchase_uom,
-			item_uom.conversion_factor,
-			item.safety_stock,
-			bom.item.as_("main_bom_item"),
-		)
-		.where(
-			(bei.docstatus == 1)
-			& (bei.is_sub_assembly_item == 0)
-			& (bom.name == bom_no)
-			& (item.is_stock_item.isin([0, 1]) if include_non_stock_items else item.is_stock_item == 1)
-		)
-		.groupby(bei.item_code, bei.stock_uom)
-	).run(as_dict=True)
+	if item_cache is None:
+		item_cache = {}
+
+	items = get_planning_bom_items(
+		bom_no, company, include_non_stock_items, submitted_only=True, item_cache=item_cache
+	)
+	for item in items:
+		item.qty *= flt(planned_qty)
 
 	for item in items:
 		key = (item.item_code, item.bom_no)
@@ -2042,11 +2268,9 @@ def get_raw_materials_of_sub_assembly_items(
 				include_non_stock_items,
 				sub_assembly_items,
 				planned_qty=planned_qty,
+				item_cache=item_cache,
 			)
 		else:
-			if not item.conversion_factor and item.purchase_uom:
-				item.conversion_factor = get_uom_conversion_factor(item.item_code, item.purchase_uom)
-
 			if details := item_details.get(item.get("item_code")):
 				details.qty += item.get("qty")
 			else:
@@ -2093,6 +2317,18 @@ def sales_order_query(doctype=None, txt=None, searchfield=None, start=None, page
 
 
 def get_reserved_qty_for_sub_assembly(item_code, warehouse):
+	return get_reserved_qty_for_sub_assembly_map([(item_code, warehouse)]).get((item_code, warehouse))
+
+
+def get_reserved_qty_for_sub_assembly_map(item_warehouses):
+	"""
+	Returns {(item_code, warehouse): qty} of the sub assemblies planned in open production plans and
+	not produced yet. Pairs not in any plan are left out.
+	"""
+	item_warehouses = set(item_warehouses)
+	if not item_warehouses:
+		return {}
+
 	table = frappe.qb.DocType("Production Plan")
 	child = frappe.qb.DocType("Production Plan Sub Assembly Item")
 
@@ -2101,26 +2337,27 @@ def get_reserved_qty_for_sub_assembly(item_code, warehouse):
 		.inner_join(child)
 		.on(table.name == child.parent)
 		.select(
+			child.production_item,
+			child.fg_warehouse,
 			Sum(
 				Case().when(child.qty > 0, child.qty).else_(child.required_qty)
 				- IfNull(child.wo_produced_qty, 0)
-			)
+			),
 		)
 		.where(
 			(table.docstatus == 1)
-			& (child.production_item == item_code)
-			& (child.fg_warehouse == warehouse)
+			& (child.production_item.isin(list({item_code for item_code, _warehouse in item_warehouses})))
+			& (child.fg_warehouse.isin(list({warehouse for _item_code, warehouse in item_warehouses})))
 			& (table.status.notin(["Completed", "Closed"]))
 		)
+		.groupby(child.production_item, child.fg_warehouse)
 	)
 
-	query = query.run()
-
-	if not query or query[0][0] is None:
-		return None
-
-	qty = flt(query[0][0])
-	return qty if qty > 0 else 0.0
+	return {
+		(item_code, warehouse): max(flt(qty), 0.0)
+		for item_code, warehouse, qty in query.run()
+		if qty is not None and (item_code, warehouse) in item_warehouses
+	}
 
 
 @frappe.whitelist()
@@ -1,5 +1,7 @@
 # Copyright (c) 2017, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
+from unittest.mock import patch
+
 import frappe
 from frappe.tests import IntegrationTestCase
 from frappe.utils import add_to_date, flt, getdate, now_datetime, nowdate
@@ -9,6 +11,7 @@ from erpnext.manufacturing.doctype.production_plan.production_plan import (
 	get_items_for_material_requests,
 	get_non_completed_production_plans,
 	get_sales_orders,
+	get_sub_assembly_items,
 	get_warehouse_list,
 )
 from erpnext.manufacturing.doctype.work_order.work_order import OverProductionError
@@ -112,6 +115,83 @@ class TestProductionPlan(IntegrationTestCase):
 		pln = frappe.get_doc("Production Plan", pln.name)
 		pln.cancel()
 
+	def test_work_orders_created_together(self):
+		"Test if Work Orders created together from shared BOM data match the BOM."
+		from erpnext.manufacturing.doctype.bom.bom import get_bom_items_as_dict
+
+		pln = create_production_plan(
+			item_code="Test Production Item 1", planned_qty=3, skip_getting_mr_items=True, do_not_save=True
+		)
+		row = pln.po_items[0]
+		pln.append(
+			"po_items",
+			{
+				"use_multi_level_bom": row.use_multi_level_bom,
+				"item_code": row.item_code,
+				"bom_no": row.bom_no,
+				"planned_qty": 2,
+				"planned_start_date": row.planned_start_date,
+				"stock_uom": row.stock_uom,
+			},
+		)
+		pln.insert()
+		pln.submit()
+		pln.make_work_order()
+
+		work_orders = frappe.get_all(
+			"Work Order", filters={"production_plan": pln.name}, fields=["name", "qty"], order_by="qty"
+		)
+		self.assertEqual([d.qty for d in work_orders], [2, 3])
+
+		for d in work_orders:
+			wo = frappe.get_doc("Work Order", d.name)
+			bom_items = get_bom_items_as_dict(
+				wo.bom_no, wo.company, qty=wo.qty, fetch_exploded=wo.use_multi_level_bom
+			)
+			self.assertEqual(
+				{row.item_code: row.required_qty for row in wo.required_items},
+				{row.item_code: row.qty for row in bom_items.values()},
+			)
+
+	def test_submit_work_orders(self):
+		"Test if the draft Work Orders of the plan are submitted and reserve their raw materials."
+		pln = create_production_plan(
+			item_code="Test Production Item 1", planned_qty=2, skip_getting_mr_items=True
+		)
+		pln.make_work_order()
+
+		work_order = frappe.get_doc("Work Order", {"production_plan": pln.name})
+		work_order.db_set("wip_warehouse", "Work In Progress - _TC")
+
+		row = work_order.required_items[0]
+		bin_filters = {"item_code": row.item_code, "warehouse": row.source_warehouse}
+		reserved_qty = flt(frappe.db.get_value("Bin", bin_filters, "reserved_qty_for_production"))
+
+		self.assertEqual(pln.submit_work_orders(), [work_order.name])
+		self.assertEqual(frappe.db.get_value("Work Order", work_order.name, "docstatus"), 1)
+		self.assertEqual(
+			flt(frappe.db.get_value("Bin", bin_filters, "reserved_qty_for_production")),
+			reserved_qty + flt(row.required_qty),
+		)
+
+		# nothing is left to submit
+		self.assertEqual(pln.submit_work_orders(), [])
+
+	def test_background_work_orders_are_not_enqueued_twice(self):
+		"Test if Work Orders are not created again while the background job of the plan is queued."
+		pln = create_production_plan(
+			item_code="Test Production Item 1", planned_qty=2, skip_getting_mr_items=True
+		)
+
+		module = "erpnext.manufacturing.doctype.production_plan.production_plan"
+		with (
+			patch(f"{module}.MAX_DOCS_IN_REQUEST", 0),
+			patch(f"{module}.is_job_enqueued", return_value=True),
+		):
+			pln.make_work_order()
+
+		self.assertFalse(frappe.db.exists("Work Order", {"production_plan": pln.name}))
+
 	def test_production_plan_start_date(self):
 		"Test if Work Order has same Planned Start Date as Prod Plan."
 		planned_date = add_to_date(date=None, days=3)
@@ -741,6 +821,30 @@ class TestProductionPlan(IntegrationTestCase):
 		pln.cancel()
 		frappe.delete_doc("Production Plan", pln.name)
 
+	def test_sub_assembly_items_check_bom_permission(self):
+		"Check that the sub assembly items are not fetched for a BOM the user cannot read."
+		for item_code in ["Test BOM Perm FG", "Test BOM Perm RM"]:
+			create_item(item_code, is_stock_item=1)
+
+		bom_no = frappe.db.get_value("BOM", {"item": "Test BOM Perm FG"})
+		if not bom_no:
+			bom_no = make_bom(item="Test BOM Perm FG", raw_materials=["Test BOM Perm RM"]).name
+
+		frappe.set_user("Guest")
+		try:
+			self.assertRaises(
+				frappe.PermissionError,
+				get_sub_assembly_items,
+				[],
+				frappe._dict(),
+				bom_no,
+				[],
+				1,
+				"_Test Company",
+			)
+		finally:
+			frappe.set_user("Administrator")
+
 	def test_get_warehouse_list_group(self):
 		"Check if required child warehouses are returned."
 		warehouse_json = '[{"warehouse":"_Test Warehouse Group - _TC"}]'
@@ -0,0 +1,199 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Demand forecasting for Sales Forecasts.
+
+Every item gets a Holt-Winters model (additive trend, multiplicative seasonality) when its sales
+history covers at least two seasons of positive sales, fitted in a process pool when there are many
+of them. Short, sparse or unfittable series fall back to simple exponential smoothing, fitted for all
+such items at once over arrays.
+
+A fitted model is kept as the state it forecasts from, with a fingerprint of the series it was
+fitted on, so that forecasting again only refits the items whose sales history changed.
+"""
+
+import hashlib
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# series are fitted in a process pool when there are at least this many of them
+MIN_SERIES_FOR_POOL = 50
+
+# smoothing levels tried by the simple exponential smoothing fallback
+SMOOTHING_LEVELS = np.linspace(0.05, 0.95, 19)
+
+# bumped when the models change, so that cached models are refitted
+MODEL_VERSION = 1
+
+RESAMPLE_RULES = {"Monthly": "ME", "Weekly": "W"}
+
+
+def get_sales_series(sales_data, frequency):
+	"""
+	Returns {item_code: pd.Series of qty per period}, from the first to the last period the item was
+	sold in, with zero for the periods it was not sold in.
+	"""
+	if not sales_data:
+		return {}
+
+	df = pd.DataFrame.from_records(sales_data, columns=["item_code", "qty", "transaction_date"])
+	df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+	df["qty"] = df["qty"].astype(float)
+
+	periods = (
+		df.pivot_table(index="transaction_date", columns="item_code", values="qty", aggfunc="sum")
+		.resample(RESAMPLE_RULES[frequency])
+		.sum(min_count=1)
+	)
+
+	series = {}
+	for item_code in periods.columns:
+		column = periods[item_code]
+		series[item_code] = column.loc[column.first_valid_index() : column.last_valid_index()].fillna(0.0)
+
+	return series
+
+
+def get_seasonal_periods(series, frequency):
+	"""Half the periods between the first and the last sale, at most a year"""
+	days = (series.index[-1] - series.index[0]).days
+	if frequency == "Monthly":
+		return min(int(days / 365 * 12 / 2), 12)
+
+	return min(int(days / 7 / 2), 52)
+
+
+def forecast_demand(series, frequency, periods, models=None, processes=None):
+	"""
+	Returns {item_code: pd.Series of forecast qty for the next `periods` periods} and the fitted models
+	{item_code: model} of the `series` from `get_sales_series`.
+
+	:param models: previously fitted models, the ones whose series did not change are not refitted
+	:param processes: max processes to fit Holt-Winters models in, defaults to the CPU count
+	"""
+	models = dict(models or {})
+
+	holt_winters, simple = {}, {}
+	for item_code, data in series.items():
+		values = data.to_numpy(dtype=float)
+		seasonal_periods = get_seasonal_periods(data, frequency)
+		fingerprint = get_fingerprint(values, seasonal_periods)
+
+		if (model := models.get(item_code)) and model.get("fingerprint") == fingerprint:
+			continue
+
+		if seasonal_periods >= 2 and len(values) >= 2 * seasonal_periods and (values > 0).all():
+			holt_winters[item_code] = (values, seasonal_periods, fingerprint)
+		else:
+			simple[item_code] = (values, fingerprint)
+
+	for item_code, model in zip(
+		holt_winters, fit_holt_winters_models(list(holt_winters.values()), processes), strict=True
+	):
+		values, _seasonal_periods, fingerprint = holt_winters[item_code]
+		if model is None:
+			simple[item_code] = (values, fingerprint)
+		else:
+			models[item_code] = model
+
+	if simple:
+		levels = fit_simple_smoothing([values for values, _fingerprint in simple.values()])
+		for (item_code, (_values, fingerprint)), level in zip(simple.items(), levels, strict=True):
+			models[item_code] = {"method": "Simple", "level": float(level), "fingerprint": fingerprint}
+
+	forecast = {}
+	for item_code, data in series.items():
+		dates = pd.date_range(data.index[-1], periods=periods + 1, freq=RESAMPLE_RULES[frequency])[1:]
+		forecast[item_code] = pd.Series(get_forecast(models[item_code], periods), index=dates)
+
+	return forecast, {item_code: models[item_code] for item_code in series}
+
+
+def get_fingerprint(values, seasonal_periods):
+	digest = hashlib.sha1(values.tobytes(), usedforsecurity=False)
+	digest.update(f"{seasonal_periods}:{MODEL_VERSION}".encode())
+	return digest.hexdigest()
+
+
+def get_forecast(model, periods):
+	"""Returns the forecast of the next `periods` periods from the state of a fitted model"""
+	steps = np.arange(1, periods + 1)
+	if model["method"] == "Holt-Winters":
+		season = np.asarray(model["season"])
+		return (model["level"] + steps * model["trend"]) * season[(steps - 1) % len(season)]
+
+	return np.full(periods, model["level"])
+
+
+def fit_holt_winters_models(series, processes=None):
+	"""Returns the models of [(values, seasonal_periods, fingerprint)], None for the ones that did not fit"""
+	processes = min(processes or os.cpu_count() or 1, len(series) // MIN_SERIES_FOR_POOL)
+	if processes <= 1:
+		return [fit_holt_winters(*args) for args in series]
+
+	with ProcessPoolExecutor(max_workers=processes) as executor:
+		return list(
+			executor.map(
+				fit_holt_winters,
+				*zip(*series, strict=True),
+				chunksize=max(len(series) // (processes * 4), 1),
+			)
+		)
+
+
+def fit_holt_winters(values, seasonal_periods, fingerprint):
+	from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+	try:
+		with warnings.catch_warnings():
+			warnings.simplefilter("ignore")
+			fit = ExponentialSmoothing(
+				values, trend="add", seasonal="mul", seasonal_periods=seasonal_periods
+			).fit()
+	except (ValueError, np.linalg.LinAlgError):
+		return None
+
+	model = {
+		"method": "Holt-Winters",
+		"level": float(fit.level[-1]),
+		"trend": float(fit.trend[-1]),
+		"season": [float(d) for d in fit.season[-seasonal_periods:]],
+		"fingerprint": fingerprint,
+	}
+
+	if not np.isfinite([model["level"], model["trend"], *model["season"]]).all():
+		return None
+
+	return model
+
+
+def fit_simple_smoothing(series):
+	"""
+	Returns the last smoothed level of every series in `series`, with the smoothing level out of
+	SMOOTHING_LEVELS that has the least one step ahead squared error for the series.
+	"""
+	length = max(len(values) for values in series)
+
+	# right aligned, so that all the series end in the last column
+	values = np.full((len(series), length), np.nan)
+	for i, row in enumerate(series):
+		values[i, length - len(row) :] = row
+
+	alpha = SMOOTHING_LEVELS[:, None]
+	level = np.full((len(SMOOTHING_LEVELS), len(series)), np.nan)
+	squared_error = np.zeros_like(level)
+
+	for column in values.T:
+		observed = ~np.isnan(column)
+		started = observed & ~np.isnan(level)
+
+		squared_error += np.where(started, (column - level) ** 2, 0.0)
+		level = np.where(started, alpha * column + (1 - alpha) * level, np.where(observed, column, level))
+
+	best = squared_error.argmin(axis=0)
+	return level[best, np.arange(len(series))]
@@ -1,4 +1,12 @@
 frappe.ui.form.on("Sales Forecast", {
+	setup(frm) {
+		frappe.realtime.on("sales_forecast_generated", ({ sales_forecast }) => {
+			if (sales_forecast === frm.doc.name) {
+				frm.reload_doc();
+			}
+		});
+	},
+
 	refresh(frm) {
 		frm.trigger("set_query_filters");
 		frm.trigger("set_custom_buttons");
@@ -30,7 +38,10 @@ frappe.ui.form.on("Sales Forecast", {
 			doc: frm.doc,
 			freeze: true,
 			callback: function (r) {
-				frm.reload_doc();
+				// the forecast is reloaded when the background job is done
+				if (!r.message) {
+					frm.reload_doc();
+				}
 			},
 		});
 	},
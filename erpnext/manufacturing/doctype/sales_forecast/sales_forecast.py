@@ -2,14 +2,18 @@
 # For license information, please see license.txt
 
 import frappe
-import pandas as pd
 from frappe import _
 from frappe.model.document import Document
 from frappe.model.mapper import get_mapped_doc
 from frappe.query_builder.functions import DateFormat, Sum, YearWeek
-from frappe.utils import add_to_date, cint, date_diff, flt
+from frappe.utils import add_to_date, flt
 from frappe.utils.nestedset import get_descendants_of
 
+from erpnext.manufacturing.doctype.sales_forecast.forecasting import forecast_demand, get_sales_series
+
+# fitted models of the items, per frequency, so that unchanged sales history is not refitted
+FORECAST_MODELS_KEY = "sales_forecast_models"
+
 
 class SalesForecast(Document):
 	# begin: auto-generated types
@@ -49,6 +53,12 @@ class SalesForecast(Document):
 				row.demand_qty = demand_qty
 
 	def get_sales_data(self):
+		return self.get_sales_data_query().run(as_dict=True)
+
+	def has_sales_data(self):
+		return bool(self.get_sales_data_query().limit(1).run())
+
+	def get_sales_data_query(self):
 		to_date = self.from_date
 		from_date = add_to_date(to_date, years=-3)
 
@@ -72,9 +82,7 @@ class SalesForecast(Document):
 			warehouses = get_descendants_of("Warehouse", self.parent_warehouse)
 			query = query.where(child_doctype.warehouse.isin(warehouses))
 
-		query = query.groupby(doctype.transaction_date)
-
-		return query.run(as_dict=True)
+		return query.groupby(doctype.transaction_date)
 
 	def generate_manual_demand(self):
 		forecast_demand = []
@@ -84,7 +92,7 @@ class SalesForecast(Document):
 			)
 
 			for index in range(self.demand_number):
-				if self.horizon_type == "Monthly":
+				if self.frequency == "Monthly":
 					delivery_date = add_to_date(self.from_date, months=index + 1)
 				else:
 					delivery_date = add_to_date(self.from_date, weeks=index + 1)
@@ -106,101 +114,105 @@ class SalesForecast(Document):
 
 	@frappe.whitelist()
 	def generate_demand(self):
-		from statsmodels.tsa.holtwinters import ExponentialSmoothing
-
-		self.set("items", [])
-
 		if self.forecasting_method == "Manual":
+			self.set("items", [])
 			self.generate_manual_demand()
 			return
 
-		sales_data = self.get_sales_data()
-		if not sales_data:
+		if not self.has_sales_data():
 			frappe.throw(_("No sales data found for the selected items."))
 
-		itemwise_data = self.group_sales_data_by_item(sales_data)
+		# the job forecasts from the saved document
+		self.save()
 
-		for item_code, data in itemwise_data.items():
-			seasonal_periods = self.get_seasonal_periods(data)
-			pd_sales_data = pd.DataFrame({"item": data.item, "date": data.date, "qty": data.qty})
+		frappe.enqueue_doc(
+			self.doctype,
+			self.name,
+			"forecast_demand",
+			queue="long",
+			timeout=3600,
+			now=frappe.in_test,
+		)
 
-			resample_val = "M" if self.horizon_type == "Monthly" else "W"
-			_sales_data = pd_sales_data.set_index("date").resample(resample_val).sum()["qty"]
+		frappe.msgprint(_("Demand is being forecast in the background."), alert=True)
+		return True
 
-			model = ExponentialSmoothing(
-				_sales_data, trend="add", seasonal="mul", seasonal_periods=seasonal_periods
-			)
+	def forecast_demand(self):
+		"""Sets the items to the demand forecast from the sales of the last 3 years"""
+		self.set("items", [])
+
+		sales_data = self.get_sales_data()
+		if not sales_data:
+			frappe.throw(_("No sales data found for the selected items."))
+
+		series = get_sales_series(sales_data, self.frequency)
+		self.publish_progress(10)
 
-			fit = model.fit()
-			forecast = fit.forecast(self.demand_number)
+		cache_key = f"{FORECAST_MODELS_KEY}::{self.frequency}"
+		models = frappe.cache.hgetall(cache_key)
+		forecast, fitted_models = forecast_demand(
+			series, self.frequency, self.demand_number, models={d: models.get(d) for d in series}
+		)
 
-			forecast_data = forecast.to_dict()
-			if forecast_data:
-				self.add_sales_forecast_item(item_code, forecast_data)
+		for item_code, model in fitted_models.items():
+			if models.get(item_code) is not model:
+				frappe.cache.hset(cache_key, item_code, model)
 
-		self.save()
+		self.publish_progress(80)
 
-	def add_sales_forecast_item(self, item_code, forecast_data):
-		item_details = frappe.db.get_value(
-			"Item", item_code, ["item_name", "stock_uom as uom", "name as item_code"], as_dict=True
+		self.add_sales_forecast_items(forecast)
+		self.save()
+		self.publish_progress(100)
+
+		frappe.publish_realtime(
+			"sales_forecast_generated",
+			{"sales_forecast": self.name},
+			doctype=self.doctype,
+			docname=self.name,
+			after_commit=True,
 		)
 
-		uom_whole_number = frappe.get_cached_value("UOM", item_details.uom, "must_be_whole_number")
+	def publish_progress(self, percent):
+		frappe.publish_progress(
+			percent, title=_("Forecasting Demand"), doctype=self.doctype, docname=self.name
+		)
 
-		for date, qty in forecast_data.items():
-			if uom_whole_number:
-				qty = round(qty)
+	def add_sales_forecast_items(self, forecast):
+		items = {
+			d.item_code: d
+			for d in frappe.get_all(
+				"Item",
+				filters={"name": ["in", list(forecast)]},
+				fields=["name as item_code", "item_name", "stock_uom as uom"],
+			)
+		}
 
-			item_details.update(
-				{
-					"delivery_date": date,
-					"forecast_qty": qty,
-					"demand_qty": qty,
-					"warehouse": self.parent_warehouse,
-				}
+		whole_number_uoms = set(
+			frappe.get_all(
+				"UOM",
+				filters={"name": ["in", list({d.uom for d in items.values()})], "must_be_whole_number": 1},
+				pluck="name",
 			)
+		)
 
-			self.append("items", item_details)
-
-	def get_seasonal_periods(self, data):
-		days = date_diff(data["end_date"], data["start_date"])
-		if self.horizon_type == "Monthly":
-			months = (days / 365) * 12
-			seasonal_periods = cint(months / 2)
-			if seasonal_periods > 12:
-				seasonal_periods = 12
-		else:
-			weeks = days / 7
-			seasonal_periods = cint(weeks / 2)
-			if seasonal_periods > 52:
-				seasonal_periods = 52
-
-		return seasonal_periods
-
-	def group_sales_data_by_item(self, sales_data):
-		"""
-		Group sales data by item code and calculate total quantity sold.
-		"""
-		itemwise_data = frappe._dict({})
-		for row in sales_data:
-			if row.item_code not in itemwise_data:
-				itemwise_data[row.item_code] = frappe._dict(
-					{
-						"start_date": row.transaction_date,
-						"item": [],
-						"date": [],
-						"qty": [],
-						"end_date": "",
-					}
-				)
+		for item_code, data in forecast.items():
+			if not (item_details := items.get(item_code)):
+				continue
 
-			item_data = itemwise_data[row.item_code]
-			item_data["item"].append(row.item_code)
-			item_data["date"].append(pd.to_datetime(row.transaction_date))
-			item_data["qty"].append(row.qty)
-			item_data["end_date"] = row.transaction_date
+			for date, qty in data.items():
+				if item_details.uom in whole_number_uoms:
+					qty = round(qty)
 
-		return itemwise_data
+				self.append(
+					"items",
+					{
+						**item_details,
+						"delivery_date": date,
+						"forecast_qty": qty,
+						"demand_qty": qty,
+						"warehouse": self.parent_warehouse,
+					},
+				)
 
 
 @frappe.whitelist()
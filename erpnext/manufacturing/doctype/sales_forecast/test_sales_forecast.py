@@ -1,8 +1,17 @@
 # Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-# import frappe
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate, nowdate
+
+from erpnext.manufacturing.doctype.sales_forecast.forecasting import (
+	fit_holt_winters,
+	forecast_demand,
+	get_forecast,
+	get_sales_series,
+)
+from erpnext.stock.doctype.item.test_item import make_item
 
 # On IntegrationTestCase, the doctype test records and all
 # link-field test record dependencies are recursively loaded
@@ -17,4 +26,58 @@ class IntegrationTestSalesForecast(IntegrationTestCase):
 	Use this class for testing interactions between multiple components.
 	"""
 
-	pass
+	def test_forecast_demand(self):
+		from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+		start = getdate("2023-01-01")
+		sales_data = [
+			{
+				"item_code": "_Test Item",
+				"qty": 10 + (day // 7) % 4 * 2,
+				"transaction_date": add_days(start, day),
+			}
+			for day in range(0, 364, 7)
+		]
+		sales_data.append({"item_code": "_Test Item 2", "qty": 5, "transaction_date": start})
+
+		series = get_sales_series(sales_data, "Weekly")
+		forecast, models = forecast_demand(series, "Weekly", 4)
+
+		self.assertEqual(models["_Test Item"]["method"], "Holt-Winters")
+		expected = (
+			ExponentialSmoothing(
+				series["_Test Item"].to_numpy(), trend="add", seasonal="mul", seasonal_periods=25
+			)
+			.fit()
+			.forecast(4)
+		)
+		for qty, expected_qty in zip(forecast["_Test Item"], expected, strict=True):
+			self.assertAlmostEqual(qty, expected_qty)
+
+		# a single sale is too short for seasonality
+		self.assertEqual(models["_Test Item 2"]["method"], "Simple")
+		self.assertEqual(list(forecast["_Test Item 2"]), [5.0] * 4)
+
+		# unchanged series reuse their models
+		_forecast, refreshed_models = forecast_demand(series, "Weekly", 4, models=models)
+		self.assertIs(refreshed_models["_Test Item"], models["_Test Item"])
+
+		model = fit_holt_winters(series["_Test Item"].to_numpy(), 25, None)
+		self.assertEqual(len(get_forecast(model, 60)), 60)
+
+	def test_generate_demand_without_sales_data(self):
+		item = make_item("_Test Sales Forecast Item Without Sales", {"is_stock_item": 1})
+		sales_forecast = frappe.get_doc(
+			{
+				"doctype": "Sales Forecast",
+				"company": "_Test Company",
+				"parent_warehouse": "_Test Warehouse Group - _TC",
+				"from_date": nowdate(),
+				"frequency": "Monthly",
+				"forecasting_method": "Holt-Winters",
+				"selected_items": [{"item_code": item.name}],
+			}
+		).insert()
+
+		self.assertRaises(frappe.ValidationError, sales_forecast.generate_demand)
+		self.assertFalse(frappe.get_all("Sales Forecast Item", {"parent": sales_forecast.name}))
@@ -106,6 +106,36 @@ class TestWorkOrder(IntegrationTestCase):
 
 		self.assertRaises(StockOverProductionError, s.submit)
 
+	def test_incremental_qty_matches_reconciliation(self):
+		from erpnext.manufacturing.doctype.work_order.work_order_qty import reconcile_work_order_qty
+
+		wo_order = self.check_planned_qty()
+
+		s = frappe.get_doc(make_stock_entry(wo_order.name, "Material Transfer for Manufacture", 2))
+		for d in s.get("items"):
+			d.s_warehouse = "Stores - _TC"
+		s.insert()
+		s.submit()
+		s.cancel()
+
+		def get_qty():
+			wo_order.reload()
+			return (
+				wo_order.produced_qty,
+				wo_order.material_transferred_for_manufacturing,
+				[(d.item_code, d.transferred_qty, d.consumed_qty) for d in wo_order.required_items],
+			)
+
+		qty = get_qty()
+		self.assertEqual(qty[1], 4)
+
+		reconcile_work_order_qty([wo_order.name], [])
+		self.assertEqual(get_qty(), qty)
+
+		frappe.db.set_value("Work Order", wo_order.name, "produced_qty", 1)
+		reconcile_work_order_qty([wo_order.name], [])
+		self.assertEqual(get_qty(), qty)
+
 	def test_planned_operating_cost(self):
 		wo_order = make_wo_order_test_record(
 			item="_Test FG Item 2", planned_start_date=now(), qty=1, do_not_save=True
@@ -33,12 +33,17 @@ from erpnext.manufacturing.doctype.bom.bom import (
 from erpnext.manufacturing.doctype.manufacturing_settings.manufacturing_settings import (
 	get_mins_between_operations,
 )
+from erpnext.manufacturing.doctype.work_order.work_order_qty import (
+	get_required_items_qty_changes,
+	get_stock_entry_sign,
+)
 from erpnext.stock.doctype.batch.batch import make_batch
+from erpnext.stock.doctype.bin.reserved_qty import update_reserved_qty
 from erpnext.stock.doctype.item.item import get_item_defaults, validate_end_of_life
 from erpnext.stock.doctype.serial_no.serial_no import get_available_serial_nos, get_serial_nos
 from erpnext.stock.doctype.stock_reservation_entry.stock_reservation_entry import StockReservation
 from erpnext.stock.stock_balance import get_planned_qty, update_bin_qty
-from erpnext.stock.utils import get_bin, get_latest_stock_qty, validate_warehouse_company
+from erpnext.stock.utils import get_latest_stock_qty, validate_warehouse_company
 from erpnext.utilities.transaction_base import validate_uom_is_integer
 
 
@@ -478,6 +483,9 @@ class WorkOrder(Document):
 			frappe.db.get_single_value("Manufacturing Settings", "overproduction_percentage_for_work_order")
 		)
 
+		# set by the stock entry being submitted or cancelled, whose qty alone is added or removed
+		stock_entry = self.flags.stock_entry
+
 		for purpose, fieldname in (
 			("Manufacture", "produced_qty"),
 			("Material Transfer for Manufacture", "material_transferred_for_manufacturing"),
@@ -489,7 +497,12 @@ class WorkOrder(Document):
 			):
 				continue
 
-			qty = self.get_transferred_or_manufactured_qty(purpose)
+			if not stock_entry:
+				qty = self.get_transferred_or_manufactured_qty(purpose)
+			elif stock_entry.purpose == purpose:
+				qty = self.get_qty_with_stock_entry(fieldname, stock_entry)
+			else:
+				continue
 
 			if not allowance_percentage and purpose == "Material Transfer for Manufacture":
 				allowance_percentage = flt(
@@ -531,6 +544,17 @@ class WorkOrder(Document):
 
 		self.db_set("disassembled_qty", self.disassembled_qty)
 
+	def get_qty_with_stock_entry(self, fieldname, stock_entry):
+		"""Returns `fieldname` with the qty of the stock entry being submitted added (or cancelled removed)"""
+		qty = flt(stock_entry.fg_completed_qty)
+		if fieldname == "produced_qty":
+			qty -= flt(stock_entry.process_loss_qty)
+
+		# the row lock keeps concurrent stock entries from adding to the same stale qty
+		current_qty = frappe.db.get_value(self.doctype, self.name, fieldname, for_update=True)
+
+		return flt(current_qty) + get_stock_entry_sign(stock_entry) * qty
+
 	def get_transferred_or_manufactured_qty(self, purpose):
 		table = frappe.qb.DocType("Stock Entry")
 		query = frappe.qb.from_(table).where(
@@ -545,6 +569,15 @@ class WorkOrder(Document):
 		return flt(query.run()[0][0])
 
 	def set_process_loss_qty(self):
+		if stock_entry := self.flags.stock_entry:
+			if stock_entry.purpose == "Manufacture":
+				process_loss_qty = flt(
+					frappe.db.get_value(self.doctype, self.name, "process_loss_qty", for_update=True)
+				) + get_stock_entry_sign(stock_entry) * flt(stock_entry.process_loss_qty)
+				self.db_set("process_loss_qty", process_loss_qty)
+
+			return
+
 		table = frappe.qb.DocType("Stock Entry")
 		process_loss_qty = (
 			frappe.qb.from_(table)
@@ -764,22 +797,32 @@ class WorkOrder(Document):
 		enable_capacity_planning = not cint(manufacturing_settings_doc.disable_capacity_planning)
 		plan_days = cint(manufacturing_settings_doc.capacity_planning_for_days) or 30
 
+		scheduler = None
+		if enable_capacity_planning and self.operations:
+			from erpnext.manufacturing.doctype.job_card.job_card_scheduler import get_job_card_scheduler
+
+			scheduler = get_job_card_scheduler()
+
 		for idx, row in enumerate(self.operations):
 			qty = self.qty
 			while qty > 0:
 				qty = split_qty_based_on_batch_size(self, row, qty)
 				if row.job_card_qty > 0:
-					self.prepare_data_for_job_card(row, idx, plan_days, enable_capacity_planning)
+					self.prepare_data_for_job_card(row, idx, plan_days, enable_capacity_planning, scheduler)
 
 		planned_end_date = self.operations and self.operations[-1].planned_end_time
 		if planned_end_date:
 			self.db_set("planned_end_date", planned_end_date)
 
-	def prepare_data_for_job_card(self, row, idx, plan_days, enable_capacity_planning):
+	def prepare_data_for_job_card(self, row, idx, plan_days, enable_capacity_planning, scheduler=None):
 		self.set_operation_start_end_time(row, idx)
 
 		job_card_doc = create_job_card(
-			self, row, auto_create=True, enable_capacity_planning=enable_capacity_planning
+			self,
+			row,
+			auto_create=True,
+			enable_capacity_planning=enable_capacity_planning,
+			scheduler=scheduler,
 		)
 
 		if enable_capacity_planning and job_card_doc:
@@ -997,33 +1040,10 @@ class WorkOrder(Document):
 	def set_work_order_operations(self):
 		"""Fetch operations from BOM and set in 'Work Order'"""
 
+		prefetch = self.flags.prefetch or WorkOrderPrefetch()
+
 		def _get_operations(bom_no, qty=1):
-			data = frappe.get_all(
-				"BOM Operation",
-				filters={"parent": bom_no},
-				fields=[
-					"operation",
-					"description",
-					"workstation",
-					"idx",
-					"finished_good",
-					"is_subcontracted",
-					"wip_warehouse",
-					"source_warehouse",
-					"fg_warehouse",
-					"workstation_type",
-					"base_hour_rate as hour_rate",
-					"time_in_mins",
-					"parent as bom",
-					"bom_no",
-					"batch_size",
-					"sequence_id",
-					"fixed_time",
-					"skip_material_transfer",
-					"backflush_from_wip_warehouse",
-				],
-				order_by="idx",
-			)
+			data = prefetch.get_operations(bom_no)
 
 			for d in data:
 				if not d.fixed_time:
@@ -1221,6 +1241,9 @@ class WorkOrder(Document):
 		update bin reserved_qty_for_production
 		called from Stock Entry for production, after submit, cancel
 		"""
+		if self.flags.stock_entry and not self.flags.required_items_qty_updated:
+			self.update_required_items_qty_from_stock_entry(self.flags.stock_entry)
+
 		# calculate consumed qty based on submitted stock entries
 		self.update_consumed_qty_for_required_items()
 
@@ -1236,10 +1259,16 @@ class WorkOrder(Document):
 
 	def update_reserved_qty_for_production(self, items=None):
 		"""update reserved_qty_for_production in bins"""
-		for d in self.required_items:
-			if d.source_warehouse:
-				stock_bin = get_bin(d.item_code, d.source_warehouse)
-				stock_bin.update_reserved_qty_for_production()
+		item_warehouses = {
+			(d.item_code, d.source_warehouse) for d in self.required_items if d.source_warehouse
+		}
+
+		if self.flags.reserved_qty_bins is not None:
+			# bins are updated once by the caller after all the work orders are processed
+			self.flags.reserved_qty_bins.update(item_warehouses)
+			return
+
+		update_reserved_qty(item_warehouses, "Production")
 
 	@frappe.whitelist()
 	def get_items_and_operations_from_bom(self):
@@ -1249,12 +1278,14 @@ class WorkOrder(Document):
 		return check_if_scrap_warehouse_mandatory(self.bom_no)
 
 	def set_available_qty(self):
+		get_stock_qty = self.flags.prefetch.get_stock_qty if self.flags.prefetch else get_latest_stock_qty
+
 		for d in self.get("required_items"):
 			if d.source_warehouse:
-				d.available_qty_at_source_warehouse = get_latest_stock_qty(d.item_code, d.source_warehouse)
+				d.available_qty_at_source_warehouse = get_stock_qty(d.item_code, d.source_warehouse)
 
 			if self.wip_warehouse:
-				d.available_qty_at_wip_warehouse = get_latest_stock_qty(d.item_code, self.wip_warehouse)
+				d.available_qty_at_wip_warehouse = get_stock_qty(d.item_code, self.wip_warehouse)
 
 	def set_required_items(self, reset_only_qty=False, reset_source_warehouse=False):
 		"""set required_items for production to keep track of reserved qty"""
@@ -1266,9 +1297,14 @@ class WorkOrder(Document):
 			operation = self.operations[0].operation
 
 		if self.bom_no and self.qty:
-			item_dict = get_bom_items_as_dict(
-				self.bom_no, self.company, qty=self.qty, fetch_exploded=self.use_multi_level_bom
-			)
+			if self.flags.prefetch:
+				item_dict = self.flags.prefetch.get_bom_items(
+					self.bom_no, self.company, self.qty, self.use_multi_level_bom
+				)
+			else:
+				item_dict = get_bom_items_as_dict(
+					self.bom_no, self.company, qty=self.qty, fetch_exploded=self.use_multi_level_bom
+				)
 
 			if reset_only_qty:
 				for d in self.get("required_items"):
@@ -1305,7 +1341,61 @@ class WorkOrder(Document):
 
 			self.set_available_qty()
 
+	def update_required_items_qty_from_stock_entry(self, stock_entry):
+		"""
+		Adds the qty the stock entry being submitted (or cancelled) transfers, returns and consumes
+		to the required items, instead of adding up all the stock entries of the work order again
+		"""
+		self.flags.required_items_qty_updated = True
+
+		if not (changes := get_required_items_qty_changes(stock_entry)):
+			return
+
+		wo_item = frappe.qb.DocType("Work Order Item")
+		current = {
+			d.name: d
+			for d in (
+				frappe.qb.from_(wo_item)
+				.select(wo_item.name, *(wo_item[fieldname] for fieldname in changes))
+				.where((wo_item.parent == self.name) & (wo_item.parenttype == self.doctype))
+				.for_update()
+			).run(as_dict=True)
+		}
+
+		# all the rows of an item hold the total of the item, additional item rows just added for
+		# this stock entry start from the total of the other rows of their item
+		new_rows = {d.name for d in stock_entry.items}
+		values = {}
+		for fieldname, item_changes in changes.items():
+			totals = {}
+			for row in self.required_items:
+				if (
+					row.name in current
+					and row.item_code in item_changes
+					and row.voucher_detail_reference not in new_rows
+				):
+					totals.setdefault(row.item_code, flt(current[row.name][fieldname]))
+
+			for row in self.required_items:
+				if row.name in current and row.item_code in item_changes:
+					values.setdefault(row.name, {})[fieldname] = (
+						totals.get(row.item_code, 0.0) + item_changes[row.item_code]
+					)
+
+		for row in self.required_items:
+			if row.name in values:
+				row.update(values[row.name])
+				frappe.db.set_value(row.doctype, row.name, values[row.name], update_modified=False)
+
 	def update_transferred_qty_for_required_items(self):
+		if self.flags.required_items_qty_updated:
+			if self.reserve_stock:
+				row_wise_serial_batch = get_row_wise_serial_batch(self.name)
+				for row in self.required_items:
+					self.update_qty_in_stock_reservation(row, flt(row.transferred_qty), row_wise_serial_batch)
+
+			return
+
 		ste = frappe.qb.DocType("Stock Entry")
 		ste_child = frappe.qb.DocType("Stock Entry Detail")
 
@@ -1378,6 +1468,9 @@ class WorkOrder(Document):
 				doc.update_reserved_stock_in_bin()
 
 	def update_returned_qty(self):
+		if self.flags.required_items_qty_updated:
+			return
+
 		ste = frappe.qb.DocType("Stock Entry")
 		ste_child = frappe.qb.DocType("Stock Entry Detail")
 
@@ -1415,8 +1508,11 @@ class WorkOrder(Document):
 			wip_warehouse = None
 
 		for item in self.required_items:
-			consumed_qty = get_consumed_qty(self.name, item.item_code)
-			item.db_set("consumed_qty", flt(consumed_qty), update_modified=False)
+			if self.flags.required_items_qty_updated:
+				consumed_qty = flt(item.consumed_qty)
+			else:
+				consumed_qty = get_consumed_qty(self.name, item.item_code)
+				item.db_set("consumed_qty", flt(consumed_qty), update_modified=False)
 
 			if not self.reserve_stock:
 				continue
@@ -2038,6 +2134,95 @@ def make_stock_entry(work_order_id, purpose, qty=None, target_warehouse=None):
 	return stock_entry.as_dict()
 
 
+class WorkOrderPrefetch:
+	"""
+	BOM operations, BOM items and stock qty shared by Work Orders built together, so that
+	each BOM and stock balance is read once instead of once per Work Order.
+	"""
+
+	def __init__(self):
+		self.operations = {}
+		self.bom_items = {}
+		self.stock_qty = {}
+
+	def load_operations(self, bom_nos):
+		if missing := [d for d in set(bom_nos) if d and d not in self.operations]:
+			for bom_no in missing:
+				self.operations[bom_no] = []
+
+			for d in frappe.get_all(
+				"BOM Operation",
+				filters={"parent": ["in", missing]},
+				fields=[
+					"operation",
+					"description",
+					"workstation",
+					"idx",
+					"finished_good",
+					"is_subcontracted",
+					"wip_warehouse",
+					"source_warehouse",
+					"fg_warehouse",
+					"workstation_type",
+					"base_hour_rate as hour_rate",
+					"time_in_mins",
+					"parent as bom",
+					"bom_no",
+					"batch_size",
+					"sequence_id",
+					"fixed_time",
+					"skip_material_transfer",
+					"backflush_from_wip_warehouse",
+				],
+				order_by="idx",
+			):
+				self.operations[d.bom].append(d)
+
+	def get_operations(self, bom_no):
+		"""Returns copies of the operations of the BOM, in the order of the BOM"""
+		self.load_operations([bom_no])
+		return [frappe._dict(d) for d in self.operations[bom_no]]
+
+	def get_bom_items(self, bom_no, company, qty, fetch_exploded):
+		"""Returns `get_bom_items_as_dict` for `qty`, read once per BOM for a qty of 1"""
+		key = (bom_no, company, cint(fetch_exploded))
+		if key not in self.bom_items:
+			self.bom_items[key] = get_bom_items_as_dict(bom_no, company, qty=1, fetch_exploded=fetch_exploded)
+
+		return {
+			item_key: frappe._dict(d, qty=flt(d.qty) * flt(qty), amount=flt(d.amount) * flt(qty))
+			for item_key, d in self.bom_items[key].items()
+		}
+
+	def load_stock_qty(self, item_codes, warehouses):
+		"""Loads the actual qty of the items in the (non group) warehouses with one query"""
+		warehouses = frappe.get_all(
+			"Warehouse", filters={"name": ["in", list(set(warehouses))], "is_group": 0}, pluck="name"
+		)
+		item_codes = list(set(item_codes))
+		if not (item_codes and warehouses):
+			return
+
+		for item_code in item_codes:
+			for warehouse in warehouses:
+				# like get_latest_stock_qty, None if there is no bin
+				self.stock_qty.setdefault((item_code, warehouse), None)
+
+		bin = frappe.qb.DocType("Bin")
+		for d in (
+			frappe.qb.from_(bin)
+			.select(bin.item_code, bin.warehouse, bin.actual_qty)
+			.where((bin.item_code.isin(item_codes)) & (bin.warehouse.isin(warehouses)))
+		).run(as_dict=True):
+			self.stock_qty[(d.item_code, d.warehouse)] = d.actual_qty
+
+	def get_stock_qty(self, item_code, warehouse):
+		if (item_code, warehouse) not in self.stock_qty:
+			self.stock_qty[(item_code, warehouse)] = get_latest_stock_qty(item_code, warehouse)
+
+		return self.stock_qty[(item_code, warehouse)]
+
+
 @frappe.whitelist()
 def get_default_warehouse():
 	doc = frappe.get_cached_doc("Manufacturing Settings")
@@ -2214,7 +2399,7 @@ def validate_operation_data(row):
 		)
 
 
-def create_job_card(work_order, row, enable_capacity_planning=False, auto_create=False):
+def create_job_card(work_order, row, enable_capacity_planning=False, auto_create=False, scheduler=None):
 	doc = frappe.new_doc("Job Card")
 	doc.update(
 		{
@@ -2254,7 +2439,7 @@ def create_job_card(work_order, row, enable_capacity_planning=False, auto_create
 	if auto_create:
 		doc.flags.ignore_mandatory = True
 		if enable_capacity_planning:
-			doc.schedule_time_logs(row)
+			doc.schedule_time_logs(row, scheduler=scheduler)
 
 		doc.insert()
 		frappe.msgprint(_("Job card {0} created").format(get_link_to_form("Job Card", doc.name)), alert=True)
@@ -2324,6 +2509,21 @@ def get_reserved_qty_for_production(
 	check_production_plan: bool = False,
 ) -> float:
 	"""Get total reserved quantity for any item in specified warehouse"""
+	return get_reserved_qty_for_production_map(
+		[(item_code, warehouse)], non_completed_production_plans, check_production_plan
+	).get((item_code, warehouse), 0.0)
+
+
+def get_reserved_qty_for_production_map(
+	item_warehouses,
+	non_completed_production_plans: list | None = None,
+	check_production_plan: bool = False,
+) -> dict:
+	"""Returns {(item_code, warehouse): reserved qty} of the pairs reserved by work orders"""
+	item_warehouses = set(item_warehouses)
+	if not item_warehouses:
+		return {}
+
 	wo = frappe.qb.DocType("Work Order")
 	wo_item = frappe.qb.DocType("Work Order Item")
 
@@ -2337,13 +2537,14 @@ def get_reserved_qty_for_production(
 	query = (
 		frappe.qb.from_(wo)
 		.from_(wo_item)
-		.select(Sum(qty_field))
+		.select(wo_item.item_code, wo_item.source_warehouse, Sum(qty_field))
 		.where(
-			(wo_item.item_code == item_code)
+			(wo_item.item_code.isin(list({item_code for item_code, _warehouse in item_warehouses})))
 			& (wo_item.parent == wo.name)
 			& (wo.docstatus == 1)
-			& (wo_item.source_warehouse == warehouse)
+			& (wo_item.source_warehouse.isin(list({warehouse for _item_code, warehouse in item_warehouses})))
 		)
+		.groupby(wo_item.item_code, wo_item.source_warehouse)
 	)
 
 	if check_production_plan:
@@ -2360,7 +2561,11 @@ def get_reserved_qty_for_production(
 	if non_completed_production_plans:
 		query = query.where(wo.production_plan.isin(non_completed_production_plans))
 
-	return query.run()[0][0] or 0.0
+	return {
+		(item_code, warehouse): flt(qty)
+		for item_code, warehouse, qty in query.run()
+		if (item_code, warehouse) in item_warehouses
+	}
 
 
 @frappe.whitelist()
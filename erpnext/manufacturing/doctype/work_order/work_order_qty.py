@@ -0,0 +1,227 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Incremental material transfer and consumption counters of Work Orders and Job Cards.
+
+When a Stock Entry against a work order is submitted or cancelled, the transferred, produced,
+consumed and returned quantities are updated by the quantities of that entry alone, instead of by
+adding up all the stock entries of the work order again, which gets slower with every backflush.
+
+`reconcile_work_order_qty` runs daily and recalculates the counters of the recently changed work
+orders and job cards from their stock entries, fixing any that drifted.
+"""
+
+import frappe
+from frappe.query_builder import Case
+from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import add_days, flt, now_datetime
+
+CONSUMPTION_PURPOSES = ("Manufacture", "Material Consumption for Manufacture")
+
+# work orders and job cards modified in these many days are reconciled
+RECONCILE_DAYS = 2
+
+
+def get_stock_entry_sign(stock_entry):
+	return -1 if stock_entry.docstatus == 2 else 1
+
+
+def get_required_items_qty_changes(stock_entry):
+	"""
+	Returns {fieldname: {item_code: qty}} of the required item quantities the stock entry being
+	submitted (negative if cancelled) adds to its work order
+	"""
+	sign = get_stock_entry_sign(stock_entry)
+	changes = {"transferred_qty": {}, "returned_qty": {}, "consumed_qty": {}}
+
+	for row in stock_entry.items:
+		if stock_entry.purpose == "Material Transfer for Manufacture":
+			fieldname = "returned_qty" if stock_entry.is_return else "transferred_qty"
+			item_codes = [row.original_item or row.item_code]
+		elif stock_entry.purpose in CONSUMPTION_PURPOSES and row.s_warehouse:
+			# consumption counts for the item and for the item it is an alternative of
+			fieldname = "consumed_qty"
+			item_codes = {row.item_code, row.original_item} - {None, ""}
+		else:
+			continue
+
+		for item_code in item_codes:
+			changes[fieldname][item_code] = changes[fieldname].get(item_code, 0.0) + sign * flt(row.qty)
+
+	return {fieldname: item_changes for fieldname, item_changes in changes.items() if item_changes}
+
+
+def reconcile_work_order_qty(work_orders=None, job_cards=None):
+	"""
+	Recalculates the counters of the work orders and job cards (by default the ones modified in the
+	last RECONCILE_DAYS days) from their stock entries and fixes the ones that differ
+	"""
+	since = add_days(now_datetime(), -RECONCILE_DAYS)
+
+	if work_orders is None:
+		work_orders = frappe.get_all(
+			"Work Order",
+			filters={"docstatus": 1, "modified": [">=", since], "track_semi_finished_goods": 0},
+			pluck="name",
+			order_by=None,
+		)
+
+	if job_cards is None:
+		job_cards = frappe.get_all(
+			"Job Card",
+			filters={"docstatus": ["<", 2], "modified": [">=", since], "work_order": ["is", "set"]},
+			pluck="name",
+			order_by=None,
+		)
+
+	if work_orders:
+		reconcile_work_orders(work_orders)
+		reconcile_required_items(work_orders)
+
+	if job_cards:
+		reconcile_job_cards(job_cards)
+
+
+def reconcile_work_orders(work_orders):
+	se = frappe.qb.DocType("Stock Entry")
+
+	totals = {}
+	for work_order, purpose, fg_completed_qty, process_loss_qty in (
+		frappe.qb.from_(se)
+		.select(se.work_order, se.purpose, Sum(se.fg_completed_qty), Sum(se.process_loss_qty))
+		.where(
+			(se.work_order.isin(work_orders))
+			& (se.docstatus == 1)
+			& (se.purpose.isin(["Manufacture", "Material Transfer for Manufacture"]))
+		)
+		.groupby(se.work_order, se.purpose)
+	).run():
+		values = totals.setdefault(work_order, {})
+		if purpose == "Manufacture":
+			values["produced_qty"] = flt(fg_completed_qty) - flt(process_loss_qty)
+			values["process_loss_qty"] = flt(process_loss_qty)
+		else:
+			values["material_transferred_for_manufacturing"] = flt(fg_completed_qty)
+
+	# transferred qty of work orders against job cards is set from their operations
+	transfer_against_job_card = set(
+		frappe.get_all(
+			"Work Order",
+			filters={"name": ["in", work_orders], "transfer_material_against": "Job Card"},
+			pluck="name",
+			order_by=None,
+		)
+	).intersection(
+		frappe.get_all(
+			"Work Order Operation",
+			filters={"parent": ["in", work_orders], "parenttype": "Work Order"},
+			pluck="parent",
+			order_by=None,
+		)
+	)
+
+	fields = ["produced_qty", "process_loss_qty", "material_transferred_for_manufacturing"]
+	for row in frappe.get_all(
+		"Work Order", filters={"name": ["in", work_orders]}, fields=["name", *fields], order_by=None
+	):
+		values = {fieldname: totals.get(row.name, {}).get(fieldname, 0.0) for fieldname in fields}
+		if row.name in transfer_against_job_card:
+			del values["material_transferred_for_manufacturing"]
+
+		if changed := get_changed_values(row, values):
+			frappe.db.set_value("Work Order", row.name, changed, update_modified=False)
+
+
+def reconcile_required_items(work_orders):
+	se = frappe.qb.DocType("Stock Entry")
+	se_item = frappe.qb.DocType("Stock Entry Detail")
+
+	totals = {}
+
+	def add_totals(fieldname, query):
+		for work_order, item_code, qty in query.run():
+			key = (work_order, item_code)
+			totals.setdefault(key, {}).setdefault(fieldname, 0.0)
+			totals[key][fieldname] += flt(qty)
+
+	transfer_item = (
+		Case().when(IfNull(se_item.original_item, "") != "", se_item.original_item).else_(se_item.item_code)
+	)
+	for fieldname, is_return in (("transferred_qty", 0), ("returned_qty", 1)):
+		add_totals(
+			fieldname,
+			frappe.qb.from_(se)
+			.inner_join(se_item)
+			.on(se_item.parent == se.name)
+			.select(se.work_order, transfer_item, Sum(se_item.qty))
+			.where(
+				(se.work_order.isin(work_orders))
+				& (se.docstatus == 1)
+				& (se.purpose == "Material Transfer for Manufacture")
+				& (se.is_return == is_return)
+			)
+			.groupby(se.work_order, transfer_item),
+		)
+
+	for item_field, condition in (
+		(se_item.item_code, se_item.item_code.isnotnull()),
+		(se_item.original_item, IfNull(se_item.original_item, "").notin(["", se_item.item_code])),
+	):
+		add_totals(
+			"consumed_qty",
+			frappe.qb.from_(se)
+			.inner_join(se_item)
+			.on(se_item.parent == se.name)
+			.select(se.work_order, item_field, Sum(se_item.qty))
+			.where(
+				(se.work_order.isin(work_orders))
+				& (se.docstatus == 1)
+				& (se.purpose.isin(CONSUMPTION_PURPOSES))
+				& (se_item.s_warehouse.isnotnull())
+				& condition
+			)
+			.groupby(se.work_order, item_field),
+		)
+
+	fields = ["transferred_qty", "returned_qty", "consumed_qty"]
+	for row in frappe.get_all(
+		"Work Order Item",
+		filters={"parent": ["in", work_orders], "parenttype": "Work Order"},
+		fields=["name", "parent", "item_code", *fields],
+		order_by=None,
+	):
+		item_totals = totals.get((row.parent, row.item_code), {})
+		values = {fieldname: item_totals.get(fieldname, 0.0) for fieldname in fields}
+
+		if changed := get_changed_values(row, values):
+			frappe.db.set_value("Work Order Item", row.name, changed, update_modified=False)
+
+
+def reconcile_job_cards(job_cards):
+	se = frappe.qb.DocType("Stock Entry")
+
+	transferred_qty = dict(
+		(
+			frappe.qb.from_(se)
+			.select(se.job_card, Sum(se.fg_completed_qty))
+			.where(
+				(se.job_card.isin(job_cards))
+				& (se.docstatus == 1)
+				& (se.purpose == "Material Transfer for Manufacture")
+			)
+			.groupby(se.job_card)
+		).run()
+	)
+
+	for row in frappe.get_all(
+		"Job Card", filters={"name": ["in", job_cards]}, fields=["name", "transferred_qty"], order_by=None
+	):
+		if changed := get_changed_values(row, {"transferred_qty": flt(transferred_qty.get(row.name))}):
+			frappe.db.set_value("Job Card", row.name, changed, update_modified=False)
+
+
+def get_changed_values(row, values):
+	return {
+		fieldname: value for fieldname, value in values.items() if flt(row.get(fieldname), 6) != flt(value, 6)
+	}
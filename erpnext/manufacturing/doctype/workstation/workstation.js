@@ -23,6 +23,13 @@ frappe.ui.form.on("Workstation", {
 			wrapper: $parent,
 			frm: frm,
 		});
+
+		frappe.realtime.off("job_card_status");
+		frappe.realtime.on("job_card_status", (data) => {
+			if (data.workstation === frm.doc.name) {
+				workstation_dashboard.prepapre_dashboard();
+			}
+		});
 	},
 
 	onload(frm) {
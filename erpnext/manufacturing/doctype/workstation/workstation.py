@@ -144,23 +144,15 @@ class Workstation(Document):
 			self.publish_workstation_status()
 
 	def publish_workstation_status(self):
+		from erpnext.manufacturing.doctype.plant_floor.plant_floor_status import publish_workstation_status
+
 		if not self._doc_before_save:
 			return
 
 		if self._doc_before_save.get("status") == self.status:
 			return
 
-		data = get_workstations(plant_floor=self.plant_floor, workstation_name=self.name)[0]
-
-		color_map = get_color_map()
-		data["old_color"] = color_map.get(self._doc_before_save.get("status"), "red")
-
-		frappe.publish_realtime(
-			"update_workstation_status",
-			data,
-			doctype="Plant Floor",
-			docname=self.plant_floor,
-		)
+		publish_workstation_status(self.name, self.plant_floor, self._doc_before_save.get("status"))
 
 	def validate_overlap_for_operation_timings(self):
 		"""Check if there is no overlap in setting Workstation Operating Hours"""
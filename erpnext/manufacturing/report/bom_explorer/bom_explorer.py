@@ -2,9 +2,10 @@
 # For license information, please see license.txt
 
 
-import frappe
 from frappe import _
 
+from erpnext.manufacturing.doctype.bom.bom_traversal import get_bom_tree
+
 
 def execute(filters=None):
 	data = []
@@ -14,34 +15,19 @@ def execute(filters=None):
 
 
 def get_data(filters, data):
-	get_exploded_items(filters.bom, data)
-
-
-def get_exploded_items(bom, data, indent=0, qty=1):
-	exploded_items = frappe.get_all(
-		"BOM Item",
-		filters={"parent": bom},
-		fields=["qty", "bom_no", "qty", "item_code", "item_name", "description", "uom", "idx"],
-		order_by="idx ASC",
-	)
-
-	for item in exploded_items:
-		print(item.bom_no, indent)
-		item["indent"] = indent
+	for row in get_bom_tree(filters.bom):
 		data.append(
 			{
-				"item_code": item.item_code,
-				"item_name": item.item_name,
-				"indent": indent,
-				"bom_level": indent,
-				"bom": item.bom_no,
-				"qty": item.qty * qty,
-				"uom": item.uom,
-				"description": item.description,
+				"item_code": row.item_code,
+				"item_name": row.item_name,
+				"indent": row.level,
+				"bom_level": row.level,
+				"bom": row.bom_no,
+				"qty": row.cumulative_qty,
+				"uom": row.uom,
+				"description": row.description,
 			}
 		)
-		if item.bom_no:
-			get_exploded_items(item.bom_no, data, indent=indent + 1, qty=item.qty)
 
 
 def get_columns():
@@ -5,9 +5,12 @@
 import frappe
 from frappe import _
 from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import flt
 from frappe.utils.data import comma_and
 from pypika.terms import ExistsCriterion
 
+from erpnext.manufacturing.doctype.bom.bom_traversal import get_exploded_bom_items
+
 
 def execute(filters=None):
 	columns = get_columns()
@@ -104,11 +107,9 @@ def get_columns():
 
 def get_bom_data(filters):
 	if filters.get("show_exploded_view"):
-		bom_item_table = "BOM Explosion Item"
-	else:
-		bom_item_table = "BOM Item"
+		return get_exploded_bom_data(filters)
 
-	bom_item = frappe.qb.DocType(bom_item_table)
+	bom_item = frappe.qb.DocType("BOM Item")
 	bin = frappe.qb.DocType("Bin")
 
 	query = (
@@ -149,6 +150,56 @@ def get_bom_data(filters):
 	return query.run(as_dict=True)
 
 
+def get_exploded_bom_data(filters):
+	"""Returns the rows of the raw materials of all the levels of the BOM, with their stock"""
+	items = get_exploded_bom_items(filters.get("bom"))
+	if not items:
+		return []
+
+	bom_qty = frappe.db.get_value("BOM", filters.get("bom"), "quantity")
+	bin = frappe.qb.DocType("Bin")
+
+	query = (
+		frappe.qb.from_(bin)
+		.select(bin.item_code, Sum(bin.actual_qty))
+		.where(bin.item_code.isin(list(items)))
+		.groupby(bin.item_code)
+	)
+
+	if warehouse := filters.get("warehouse"):
+		warehouse_details = frappe.db.get_value("Warehouse", warehouse, ["lft", "rgt"], as_dict=1)
+		if warehouse_details:
+			wh = frappe.qb.DocType("Warehouse")
+			query = query.where(
+				bin.warehouse.isin(
+					frappe.qb.from_(wh)
+					.select(wh.name)
+					.where((wh.lft >= warehouse_details.lft) & (wh.rgt <= warehouse_details.rgt))
+				)
+			)
+		else:
+			query = query.where(bin.warehouse == warehouse)
+
+	actual_qty = dict(query.run())
+
+	data = []
+	for item in items.values():
+		# like the BOM Item rows, items without stock in the warehouse are left out
+		if filters.get("warehouse") and item.item_code not in actual_qty:
+			continue
+
+		data.append(
+			frappe._dict(
+				item_code=item.item_code,
+				description=item.description,
+				qty_per_unit=flt(item.stock_qty) / flt(bom_qty) if flt(bom_qty) else 0.0,
+				actual_qty=flt(actual_qty.get(item.item_code)),
+			)
+		)
+
+	return data
+
+
 def get_manufacturer_records():
 	details = frappe.get_all(
 		"Item Manufacturer", fields=["manufacturer", "manufacturer_part_no", "item_code"]
@@ -4,7 +4,9 @@
 import frappe
 from frappe import _
 from frappe.query_builder.functions import Floor, Sum
-from frappe.utils import cint
+from frappe.utils import cint, floor, flt
+
+from erpnext.manufacturing.doctype.bom.bom_traversal import get_exploded_bom_items
 
 
 def execute(filters=None):
@@ -35,13 +37,11 @@ def get_bom_stock(filters):
 	if cint(qty_to_produce) <= 0:
 		frappe.throw(_("Quantity to Produce should be greater than zero."))
 
-	bom_item_table = "BOM Explosion Item" if filters.get("show_exploded_view") else "BOM Item"
-
 	warehouse = filters.get("warehouse")
 	warehouse_details = frappe.db.get_value("Warehouse", warehouse, ["lft", "rgt"], as_dict=1)
 
 	BOM = frappe.qb.DocType("BOM")
-	BOM_ITEM = frappe.qb.DocType(bom_item_table)
+	BOM_ITEM = frappe.qb.DocType("BOM Item")
 	BIN = frappe.qb.DocType("Bin")
 	WH = frappe.qb.DocType("Warehouse")
 
@@ -62,6 +62,9 @@ def get_bom_stock(filters):
 			.groupby(BIN.item_code)
 		)
 
+	if filters.get("show_exploded_view"):
+		return get_exploded_bom_stock(filters.get("bom"), qty_to_produce, bin_subquery)
+
 	QUERY = (
 		frappe.qb.from_(BOM)
 		.join(BOM_ITEM)
@@ -83,3 +86,42 @@ def get_bom_stock(filters):
 	)
 
 	return QUERY.run()
+
+
+def get_exploded_bom_stock(bom, qty_to_produce, bin_subquery):
+	"""Returns the report rows of the raw materials of all the levels of `bom`"""
+	items = get_exploded_bom_items(bom)
+	if not items:
+		return []
+
+	bom_qty = frappe.db.get_value("BOM", bom, "quantity")
+	actual_qty = dict(
+		frappe.qb.from_(bin_subquery)
+		.select(bin_subquery.item_code, bin_subquery.actual_qty)
+		.where(bin_subquery.item_code.isin(list(items)))
+		.run()
+	)
+
+	data = []
+	for item in items.values():
+		required_qty = item.stock_qty * flt(qty_to_produce) / bom_qty
+		in_stock_qty = actual_qty.get(item.item_code)
+
+		enough_parts = None
+		if in_stock_qty is not None and required_qty:
+			enough_parts = floor(in_stock_qty / required_qty)
+
+		data.append(
+			(
+				item.item_code,
+				item.item_name,
+				item.description,
+				item.stock_qty,
+				item.stock_uom,
+				required_qty,
+				in_stock_qty,
+				enough_parts,
+			)
+		)
+
+	return data
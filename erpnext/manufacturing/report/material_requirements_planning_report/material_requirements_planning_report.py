@@ -6,7 +6,6 @@ from datetime import datetime, timedelta
 
 import frappe
 from frappe import _
-from frappe.query_builder import Case
 from frappe.query_builder.functions import Sum
 from frappe.utils import (
 	add_days,
@@ -23,6 +22,9 @@ from frappe.utils import (
 )
 from frappe.utils.nestedset import get_descendants_of
 
+from erpnext.manufacturing.doctype.bom.bom_explosion import get_bom_tree_structures
+from erpnext.manufacturing.report.material_requirements_planning_report.mrp_engine import MRPEngine
+
 
 def execute(filters: dict | None = None):
 	obj = MaterialRequirementsPlanningReport(filters)
@@ -37,26 +39,167 @@ class MaterialRequirementsPlanningReport:
 		self.filters = filters
 
 	def generate_mrp(self):
-		self.fg_items = []
-		self.rm_items = []
 		self.dates = self.get_dates()
-		self.mps_data = self.get_mps_data()
+		if not self.dates:
+			return [], {}
 
-		items = self.get_items_from_mps(self.mps_data)
-		self.item_rm_details = self.get_raw_materials_data(items)
+		self.mps_data = self.get_mps_data()
 
-		self._bin_details = self.get_item_wise_bin_details()
-		self.add_non_planned_orders(items)
+		self.add_non_planned_orders(self.get_items_from_mps(self.mps_data))
+		self.update_sales_forecast_data()
 
-		self._wo_details = self.get_work_order_data()
-		self._po_details = self.get_purchase_order_data()
-		self._so_details = self.get_sales_order_data()
+		self.fg_items = self.get_items_from_mps(self.mps_data)
+		self.engine = self.get_mrp_engine()
 
-		self.update_sales_forecast_data()
 		data, chart = self.get_mrp_data()
 
 		return data, chart
 
+	def get_mrp_engine(self):
+		"""Loads demand, supply, lead times and BOMs of all the planned items in bulk and nets them"""
+		self.item_details = self.get_item_details(self.fg_items)
+		bom_structures = get_bom_tree_structures(
+			[d.default_bom for d in self.item_details.values() if d.default_bom]
+		)
+
+		boms = {
+			bom.name: [(row.item_code, row.qty_per_unit) for row in bom.bom_items]
+			for bom in bom_structures.values()
+			if bom.docstatus == 1
+		}
+
+		fg_items = set(self.fg_items)
+		component_boms = {}
+		for bom_no in boms:
+			for row in bom_structures[bom_no].bom_items:
+				if row.item_code not in fg_items:
+					component_boms.setdefault(row.item_code, row.bom_no if row.bom_no in boms else None)
+
+		self.rm_items = list(component_boms)
+		self.item_details.update(self.get_item_details(self.rm_items))
+		for item_code, bom_no in component_boms.items():
+			if item_code in self.item_details:
+				self.item_details[item_code].bom_no = bom_no
+
+		for item_code in self.fg_items:
+			if details := self.item_details.get(item_code):
+				details.bom_no = details.default_bom if details.default_bom in boms else None
+
+		self.set_lead_time_and_capacity(self.item_details)
+
+		engine = MRPEngine(
+			[d["from_date"] for d in self.dates],
+			self.dates[-1]["to_date"],
+			{
+				item_code: {
+					"bom_no": details.bom_no,
+					"lead_time": details.lead_time,
+					"safety_stock": flt(details.safety_stock),
+				}
+				for item_code, details in self.item_details.items()
+			},
+			boms,
+		)
+
+		self.demand_qty, self.adhoc_qty = {}, {}
+		for row in self.mps_data:
+			demand_qty = max(flt(row.planned_qty), flt(row.sales_forecast_qty))
+			self.add_demand(engine, row.item_code, row.delivery_date, demand_qty, flt(row.adhoc_qty))
+
+		for (item_code, delivery_date), row in self.get_sales_order_data().items():
+			self.add_demand(engine, item_code, delivery_date, 0.0, flt(row.qty))
+
+		for item_code, row in self.get_item_wise_bin_details().items():
+			engine.add_on_hand(item_code, flt(row.actual_qty) - flt(row.reserved_stock))
+
+		for (item_code, delivery_date), row in self.get_purchase_order_data().items():
+			engine.add_purchase_receipt(item_code, delivery_date, flt(row.qty))
+
+		for (item_code, delivery_date), row in self.get_work_order_data().items():
+			engine.add_production_receipt(item_code, delivery_date, flt(row.qty))
+
+		engine.run(include_safety_stock=cint(self.filters.add_safety_stock))
+
+		return engine
+
+	def add_demand(self, engine, item_code, delivery_date, demand_qty, adhoc_qty):
+		if (bucket := engine.get_bucket(delivery_date)) < 0:
+			return
+
+		key = (item_code, bucket)
+		self.demand_qty[key] = self.demand_qty.get(key, 0.0) + demand_qty
+		self.adhoc_qty[key] = self.adhoc_qty.get(key, 0.0) + adhoc_qty
+		engine.add_demand(item_code, delivery_date, demand_qty + adhoc_qty)
+
+	def get_item_details(self, item_codes):
+		if not item_codes:
+			return {}
+
+		item = frappe.qb.DocType("Item")
+		item_default = frappe.qb.DocType("Item Default")
+
+		data = (
+			frappe.qb.from_(item)
+			.left_join(item_default)
+			.on(
+				(item_default.parent == item.name)
+				& (item_default.parenttype == "Item")
+				& (item_default.company == self.filters.get("company"))
+			)
+			.select(
+				item.name.as_("item_code"),
+				item.item_name,
+				item.stock_uom,
+				item.default_bom,
+				item.safety_stock,
+				item.min_order_qty,
+				item.purchase_uom,
+				item_default.default_warehouse,
+				item_default.default_supplier,
+			)
+			.where(item.name.isin(item_codes))
+		).run(as_dict=True)
+
+		return {row.item_code: row for row in data}
+
+	def set_lead_time_and_capacity(self, item_details):
+		if not item_details:
+			return
+
+		lead_times = frappe.get_all(
+			"Item Lead Time",
+			filters={"item_code": ["in", list(item_details)]},
+			fields=[
+				"item_code",
+				"manufacturing_time_in_mins",
+				"purchase_time",
+				"buffer_time",
+				"capacity_per_day",
+			],
+			order_by=None,
+		)
+		lead_times = {row.item_code: row for row in lead_times}
+
+		no_of_days = {"Daily": 1, "Weekly": 7}.get(self.filters.bucket_size, 30)
+		for item_code, details in item_details.items():
+			details.lead_time = 0
+			details.capacity = 0
+
+			if not (lead_time := lead_times.get(item_code)):
+				continue
+
+			if details.bom_no:
+				if lead_time.manufacturing_time_in_mins is not None:
+					details.lead_time = flt(lead_time.manufacturing_time_in_mins) / 1440 + flt(
+						lead_time.buffer_time
+					)
+
+				details.capacity = math.ceil(cint(lead_time.capacity_per_day) * no_of_days)
+			elif lead_time.purchase_time is not None:
+				details.lead_time = flt(lead_time.purchase_time) + flt(lead_time.buffer_time)
+
+			details.lead_time = math.ceil(details.lead_time)
+
 	def add_non_planned_orders(self, items):
 		_adhoc_so_details = frappe._dict({})
 
@@ -159,64 +302,26 @@ class MaterialRequirementsPlanningReport:
 			if row.item_code not in _bin_details:
 				_bin_details[row.item_code] = row
 
-		self.update_mps_data_with_bin_details(_bin_details)
-
 		return _bin_details
 
-	def update_mps_data_with_bin_details(self, bin_details):
-		if not self.filters.mps:
-			return
-
-		items = self.fg_items + self.rm_items
-
-		if not items:
-			return
-
-		sales_orders = frappe.get_all(
-			"Production Plan Sales Order",
-			filters={"parent": self.filters.mps},
-			pluck="sales_order",
-		)
-
-		if not sales_orders:
-			return
-
-		sales_order_items = frappe.get_all(
-			"Sales Order Item",
-			filters={"parent": ["in", sales_orders], "docstatus": 1, "item_code": ["in", items]},
-			fields=["item_code", "qty", "delivered_qty", "conversion_factor"],
-		)
-
-		if not sales_order_items:
-			return
-
-		for row in sales_order_items:
-			reserved_qty = flt(flt(row.qty) - flt(row.delivered_qty)) * flt(row.conversion_factor)
-			if reserved_qty <= 0:
-				continue
-
-			if details := bin_details.get(row.item_code, {}):
-				details.reserved_qty -= reserved_qty
-				details.projected_qty += reserved_qty
-
 	def update_sales_forecast_data(self):
 		sales_forecast_data = self.get_sales_forecast_data()
 
 		if not sales_forecast_data:
 			return
 
-		for row in sales_forecast_data:
-			record_exists = False
-			for d in self.mps_data:
-				if not d.sales_forecast_qty:
-					d.sales_forecast_qty = 0
+		mps_rows = {}
+		for d in self.mps_data:
+			d.sales_forecast_qty = flt(d.sales_forecast_qty)
+			mps_rows.setdefault((d.item_code, getdate(d.delivery_date)), []).append(d)
 
-				if row.item_code == d.item_code and getdate(row.delivery_date) == getdate(d.delivery_date):
+		for row in sales_forecast_data:
+			key = (row.item_code, getdate(row.delivery_date))
+			if key in mps_rows:
+				for d in mps_rows[key]:
 					d.sales_forecast_qty += row.qty
-					record_exists = True
-
-			if not record_exists:
-				self.mps_data.append(
+			else:
+				mps_rows[key] = [
 					frappe._dict(
 						{
 							"item_code": row.item_code,
@@ -227,7 +332,8 @@ class MaterialRequirementsPlanningReport:
 							"warehouse": self.filters.get("warehouse"),
 						}
 					)
-				)
+				]
+				self.mps_data.extend(mps_rows[key])
 
 	def get_mrp_data(self):
 		data = self.get_detailed_view_data()
@@ -430,130 +536,52 @@ class MaterialRequirementsPlanningReport:
 		return new_data
 
 	def get_detailed_view_data(self):
+		"""Returns a row for every item and bucket with requirements or planned orders"""
+		engine = self.engine
 		data = []
-		i = 0
-
-		sorted_data = sorted(self.mps_data, key=lambda x: getdate(x["delivery_date"]))
 
-		for row in sorted_data:
-			rm_details = self.item_rm_details.get(row.item_code) or frappe._dict({})
-
-			row.indent = 0
-			row.bom_no = rm_details.get("bom_no")
-			row.lead_time = math.ceil(rm_details.get("lead_time", 0))
-			if not row.sales_forecast_qty:
-				row.sales_forecast_qty = 0
-
-			row.demand_qty = max(flt(row.planned_qty), flt(row.sales_forecast_qty))
-			row.planned_qty = max(flt(row.planned_qty), flt(row.sales_forecast_qty))
-			if row.get("is_adhoc"):
-				row.planned_qty += row.adhoc_qty
-
-			for field in ["min_order_qty", "purchase_uom", "safety_stock"]:
-				if rm_details.get(field):
-					row[field] = rm_details.get(field)
-
-			self.update_required_qty(row)
-			row.release_date = add_days(row.delivery_date, row.lead_time * -1)
-			if i != 0:
+		for item_code, bucket in engine.get_active_buckets():
+			row = engine.index[item_code]
+			details = self.item_details.get(item_code) or frappe._dict(item_name=item_code)
+			if data and data[-1].item_code != item_code:
 				data.append(frappe._dict({}))
 
-			i += 1
-			row.capacity = 0
-			if rm_details.raw_materials:
-				row.capacity = get_item_capacity(row.item_code, self.filters.bucket_size)
-				row.type_of_material = "Manufacture"
+			delivery_date = self.dates[bucket]["from_date"]
+			lead_time = cint(details.lead_time)
 
-			data.append(row)
-			if rm_details.raw_materials:
-				self.update_rm_details(
-					rm_details.raw_materials, row.release_date, row.required_qty, rm_details.bom_no, data
+			data.append(
+				frappe._dict(
+					{
+						"item_code": item_code,
+						"item_name": details.item_name,
+						"type_of_material": "Manufacture" if details.bom_no else "Purchase",
+						"warehouse": self.filters.get("warehouse"),
+						"demand_qty": self.demand_qty.get((item_code, bucket), 0.0),
+						"adhoc_qty": self.adhoc_qty.get((item_code, bucket), 0.0),
+						"planned_qty": flt(engine.gross[row, bucket]),
+						"in_hand_qty": flt(engine.in_hand[row, bucket]),
+						"po_ordered_qty": flt(engine.purchase_used[row, bucket]),
+						"wo_ordered_qty": flt(engine.production_used[row, bucket]),
+						"safety_stock": flt(details.safety_stock),
+						"required_qty": flt(engine.planned_orders[row, bucket]),
+						"min_order_qty": flt(details.min_order_qty),
+						"delivery_date": delivery_date,
+						"lead_time": lead_time,
+						"release_date": add_days(delivery_date, lead_time * -1),
+						"bom_no": details.bom_no,
+						"parent_bom": engine.parent_bom.get(item_code),
+						"indent": engine.levels[item_code],
+						"capacity": cint(details.capacity),
+						"default_warehouse": details.default_warehouse,
+						"default_supplier": details.default_supplier,
+						"purchase_uom": details.purchase_uom,
+						"uom": details.stock_uom,
+					}
 				)
+			)
 
 		return data
 
-	def add_non_planned_so(self, row):
-		if so_details := self._so_details.get((row.item_code, row.delivery_date)):
-			row.adhoc_qty = so_details.qty
-			row.planned_qty += so_details.qty
-			del self._so_details[(row.item_code, row.delivery_date)]
-
-	def add_bin_details(self, row):
-		if bin_details := self._bin_details.get(row.item_code):
-			current_qty = bin_details.get("actual_qty", 0.0) - flt(bin_details.get("reserved_stock", 0.0))
-			if current_qty > 0:
-				if row.required_qty > current_qty:
-					row.in_hand_qty = current_qty
-					row.required_qty -= current_qty
-					bin_details["actual_qty"] = 0.0
-				else:
-					row.in_hand_qty = row.required_qty
-					bin_details["actual_qty"] -= row.required_qty
-					row.required_qty = 0.0
-
-	def add_po_details(self, row):
-		if row.required_qty > 0 and self._po_details:
-			dict_update = {}
-			for (item_code, delivery_date), po_data in self._po_details.items():
-				if row.item_code == item_code and getdate(delivery_date) <= getdate(row.delivery_date):
-					po_ordered_qty = po_data.qty
-					if row.required_qty > po_ordered_qty:
-						row.po_ordered_qty = po_ordered_qty
-						row.required_qty -= po_ordered_qty
-						dict_update[(item_code, delivery_date)] = 0.0
-					else:
-						row.po_ordered_qty = row.required_qty
-						dict_update[(item_code, delivery_date)] = flt(po_data.qty) - flt(row.required_qty)
-						row.required_qty = 0.0
-
-					if row.required_qty <= 0.0:
-						break
-
-			for key, qty in dict_update.items():
-				if qty <= 0.0 and key in self._po_details:
-					del self._po_details[key]
-				elif key in self._po_details:
-					self._po_details[key].qty = qty
-
-	def add_wo_details(self, row):
-		if row.required_qty > 0 and self._wo_details:
-			dict_update = {}
-			for (item_code, delivery_date), wo_data in self._wo_details.items():
-				if row.item_code == item_code and getdate(delivery_date) <= getdate(row.delivery_date):
-					wo_ordered_qty = wo_data.qty
-					if row.required_qty > wo_ordered_qty:
-						row.wo_ordered_qty = wo_ordered_qty
-						row.required_qty -= wo_ordered_qty
-						dict_update[(item_code, delivery_date)] = 0.0
-					else:
-						row.wo_ordered_qty = row.required_qty
-						dict_update[(item_code, delivery_date)] = flt(wo_data.qty) - flt(row.required_qty)
-						row.required_qty = 0.0
-
-					if row.required_qty <= 0.0:
-						break
-
-			if dict_update:
-				for key, qty in dict_update.items():
-					if qty <= 0.0 and key in self._wo_details:
-						del self._wo_details[key]
-					elif key in self._wo_details:
-						self._wo_details[key].qty = qty
-
-	def update_required_qty(self, row):
-		row.required_qty = flt(row.planned_qty)
-		row.in_hand_qty = 0.0
-
-		self.add_non_planned_so(row)
-		self.add_bin_details(row)
-		self.add_po_details(row)
-		self.add_wo_details(row)
-		self.add_safety_stock(row)
-
-	def add_safety_stock(self, row):
-		if self.filters.add_safety_stock:
-			row.required_qty += flt(row.safety_stock)
-
 	def get_work_order_data(self):
 		wo_details = frappe._dict({})
 
@@ -762,46 +790,6 @@ class MaterialRequirementsPlanningReport:
 
 		return query.run(as_dict=True)
 
-	def update_rm_details(self, raw_materials, delivery_date, planned_qty, bom_no, data):
-		for material in raw_materials:
-			lead_time = math.ceil(material.lead_time)
-			row = frappe._dict(
-				{
-					"item_code": material.item_code,
-					"item_name": material.item_name,
-					"default_warehouse": material.default_warehouse,
-					"default_supplier": material.default_supplier,
-					"planned_qty": material.stock_qty * planned_qty,
-					"projected_qty": 0,
-					"delivery_date": delivery_date,
-					"lead_time": lead_time,
-					"release_date": add_days(delivery_date, lead_time * -1),
-					"indent": material.indent + 1,
-					"parent_bom": bom_no,
-					"bom_no": material.bom_no,
-					"warehouse": self.filters.get("warehouse"),
-					"min_order_qty": flt(material.get("min_order_qty", 0)),
-					"purchase_uom": material.get("purchase_uom"),
-					"safety_stock": flt(material.get("safety_stock", 0)),
-				}
-			)
-
-			row.capacity = 0
-			if material.raw_materials:
-				row.capacity = get_item_capacity(material.item_code, self.filters.bucket_size)
-				row.type_of_material = "Manufacture"
-			else:
-				row.type_of_material = "Purchase"
-
-			self.update_required_qty(row)
-
-			data.append(row)
-
-			if material.raw_materials:
-				self.update_rm_details(
-					material.raw_materials, row.release_date, row.required_qty, material.bom_no, data
-				)
-
 	def get_mps_data(self):
 		doctype = frappe.qb.DocType("Master Production Schedule")
 		child_doctype = frappe.qb.DocType("Master Production Schedule Item")
@@ -852,64 +840,6 @@ class MaterialRequirementsPlanningReport:
 
 		return items
 
-	def get_raw_materials_data(self, items):
-		item_wise_rm_details = frappe._dict()
-		for item_code in items:
-			if item_code not in item_wise_rm_details:
-				item_wise_rm_details[item_code] = frappe.db.get_value(
-					"Item",
-					item_code,
-					["default_bom as bom_no", "safety_stock", "min_order_qty", "purchase_uom"],
-					as_dict=True,
-				)
-
-			item_data = item_wise_rm_details[item_code]
-			item_data.lead_time = get_item_lead_time(
-				item_code, "Manufacture" if item_data.bom_no else "Purchase"
-			)
-
-			if item_code not in self.fg_items:
-				self.fg_items.append(item_code)
-
-			if item_data.bom_no:
-				item_data.raw_materials = self.get_raw_materials(item_data.bom_no, indent=0)
-
-		return item_wise_rm_details
-
-	def get_raw_materials(self, bom_no, indent=0):
-		company = self.filters.get("company")
-		raw_materials = frappe.get_all(
-			"BOM",
-			filters=[["BOM Item", "parent", "=", bom_no], ["BOM", "docstatus", "=", 1]],
-			fields=[
-				"`tabBOM Item`.`item_code`",
-				"`tabBOM Item`.`stock_qty`",
-				"`tabBOM`.quantity as parent_qty",
-				"`tabBOM Item`.`bom_no`",
-				"`tabBOM`.`name` as parent_bom",
-				"`tabBOM Item`.`item_name`",
-				"`tabBOM Item`.`stock_uom` as uom",
-			],
-		)
-
-		for material in raw_materials:
-			material.indent = indent
-			material.qty = flt(material.stock_qty / material.parent_qty)
-
-			if details := get_item_details(material.item_code, company):
-				material.update(details)
-
-			if material.item_code not in self.rm_items:
-				self.rm_items.append(material.item_code)
-
-			if material.bom_no:
-				material.raw_materials = self.get_raw_materials(material.bom_no, indent + 1)
-				material.lead_time = get_item_lead_time(material.item_code, "Manufacture")
-			else:
-				material.lead_time = get_item_lead_time(material.item_code, "Purchase")
-
-		return raw_materials
-
 	def get_columns(self):
 		if self.filters.show_in_bucket_view:
 			columns = [
@@ -1149,51 +1079,6 @@ class MaterialRequirementsPlanningReport:
 		return convert_to_daily_bucket_data(sales_data)
 
 
-@frappe.request_cache
-def get_item_details(item_code, company):
-	data = frappe.db.get_value(
-		"Item", item_code, ["safety_stock", "min_order_qty", "purchase_uom"], as_dict=True
-	) or frappe._dict({"safety_stock": 0})
-
-	default_data = frappe.db.get_value(
-		"Item Default",
-		{"parent": item_code, "company": company},
-		["default_warehouse", "default_supplier"],
-		as_dict=True,
-	)
-
-	if default_data:
-		data.update(default_data)
-
-	return data
-
-
-@frappe.request_cache
-def get_item_lead_time(item_code, type_of_material):
-	doctype = frappe.qb.DocType("Item Lead Time")
-
-	query = frappe.qb.from_(doctype).where(doctype.item_code == item_code)
-
-	if type_of_material == "Manufacture":
-		query = query.select(
-			Case()
-			.when(doctype.manufacturing_time_in_mins.isnull(), 0)
-			.else_(doctype.manufacturing_time_in_mins / 1440 + doctype.buffer_time)
-			.as_("lead_time")
-		)
-	else:
-		query = query.select(
-			Case()
-			.when(doctype.purchase_time.isnull(), 0)
-			.else_(doctype.purchase_time + doctype.buffer_time)
-			.as_("lead_time")
-		)
-
-	time = query.run(pluck="lead_time")
-
-	return time[0] if time else 0
-
-
 def convert_to_daily_bucket_data(data):
 	bucketed_data = []
 
@@ -1237,24 +1122,6 @@ def convert_to_daily_bucket_data(data):
 	return bucketed_data
 
 
-@frappe.request_cache
-def get_item_capacity(item_code, bucket_size):
-	capacity = frappe.db.get_value(
-		"Item Lead Time",
-		item_code,
-		"capacity_per_day",
-	)
-
-	if not capacity:
-		return 0.0
-
-	no_of_days = 7 if bucket_size == "Weekly" else 30
-	if bucket_size == "Daily":
-		no_of_days = 1
-
-	return math.ceil(cint(capacity) * no_of_days)
-
-
 @frappe.whitelist()
 def make_order(selected_rows, company, warehouse=None, mps=None):
 	if not frappe.has_permission("Purchase Order", "create"):
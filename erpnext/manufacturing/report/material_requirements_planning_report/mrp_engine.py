@@ -0,0 +1,184 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+"""
+Time bucketed MRP netting over arrays.
+
+Items are netted one low level code at a time with arrays of shape (items, buckets): gross
+requirements are covered by stock in hand, purchase receipts and work orders in that order, the
+remaining shortage (plus safety stock) becomes planned orders lot for lot, and the planned orders of
+a level are offset by lead time and exploded into the gross requirements of the next level.
+
+The engine does no database access, the report loads all its inputs in bulk.
+"""
+
+import numpy as np
+from frappe.utils import getdate
+
+
+class MRPEngine:
+	def __init__(self, bucket_dates, horizon_end, items, boms):
+		"""
+		:param bucket_dates: start date of every bucket, ascending
+		:param horizon_end: last date of the last bucket
+		:param items: {item_code: {"bom_no", "lead_time", "safety_stock"}}, lead time in days
+		:param boms: {bom_no: [(item_code, qty_per_unit), ...]}
+		"""
+		self.bucket_dates = [getdate(d) for d in bucket_dates]
+		self.bucket_starts = np.array([d.toordinal() for d in self.bucket_dates])
+		self.horizon_end = getdate(horizon_end).toordinal()
+		self.boms = boms
+
+		self.items = dict(items)
+		self.set_levels()
+
+		self.item_codes = sorted(self.items, key=lambda item_code: self.levels[item_code])
+		self.index = {item_code: i for i, item_code in enumerate(self.item_codes)}
+
+		shape = (len(self.item_codes), len(self.bucket_dates))
+		self.independent_demand = np.zeros(shape)
+		self.gross = np.zeros(shape)
+		self.on_hand = np.zeros(shape[0])
+		self.purchase_receipts = np.zeros(shape)
+		self.production_receipts = np.zeros(shape)
+
+		self.safety_stock = np.array([float(self.items[d].get("safety_stock") or 0) for d in self.item_codes])
+		self.lead_time = np.array([int(self.items[d].get("lead_time") or 0) for d in self.item_codes])
+
+	def set_levels(self):
+		"""Sets the low level code of every item, adding the components of the BOMs to the items"""
+		self.levels = dict.fromkeys(self.items, 0)
+		self.parent_bom = {}
+
+		queue = list(self.items)
+		while queue:
+			item_code = queue.pop()
+			bom_no = self.items[item_code].get("bom_no")
+			if not bom_no:
+				continue
+
+			for component, _qty in self.boms.get(bom_no, []):
+				if component not in self.items:
+					self.items[component] = {"bom_no": None, "lead_time": 0, "safety_stock": 0}
+					self.levels[component] = 0
+
+				self.parent_bom.setdefault(component, bom_no)
+				if self.levels[component] <= self.levels[item_code]:
+					if self.levels[item_code] + 1 > len(self.items):
+						# BOM recursion, levels would grow forever
+						continue
+
+					self.levels[component] = self.levels[item_code] + 1
+					queue.append(component)
+
+	def get_bucket(self, date):
+		"""Returns the index of the bucket containing `date`, -1 if it is after the horizon"""
+		date = getdate(date).toordinal()
+		if date > self.horizon_end:
+			return -1
+
+		return max(int(np.searchsorted(self.bucket_starts, date, side="right")) - 1, 0)
+
+	def add_demand(self, item_code, date, qty):
+		if (bucket := self.get_bucket(date)) >= 0 and item_code in self.index:
+			self.independent_demand[self.index[item_code], bucket] += qty
+
+	def add_on_hand(self, item_code, qty):
+		if item_code in self.index:
+			self.on_hand[self.index[item_code]] += qty
+
+	def add_purchase_receipt(self, item_code, date, qty):
+		if (bucket := self.get_bucket(date)) >= 0 and item_code in self.index:
+			self.purchase_receipts[self.index[item_code], bucket] += qty
+
+	def add_production_receipt(self, item_code, date, qty):
+		if (bucket := self.get_bucket(date)) >= 0 and item_code in self.index:
+			self.production_receipts[self.index[item_code], bucket] += qty
+
+	def run(self, include_safety_stock=True):
+		shape = self.gross.shape
+		self.gross = self.independent_demand.copy()
+		self.in_hand = np.zeros(shape)
+		self.purchase_used = np.zeros(shape)
+		self.production_used = np.zeros(shape)
+		self.planned_orders = np.zeros(shape)
+
+		# release date of the orders due in every bucket, as the bucket holding it
+		release_dates = self.bucket_starts[None, :] - self.lead_time[:, None]
+		self.release_buckets = np.maximum(
+			np.searchsorted(self.bucket_starts, release_dates, side="right") - 1, 0
+		)
+
+		levels = np.array([self.levels[d] for d in self.item_codes])
+		edges = self.get_bom_edges()
+
+		for level in range(int(levels.max()) + 1 if len(levels) else 0):
+			rows = np.flatnonzero(levels == level)
+			self.net(rows, include_safety_stock)
+
+			if level in edges:
+				self.explode(*edges[level])
+
+	def net(self, rows, include_safety_stock):
+		gross = self.gross[rows]
+		cum_gross = gross.cumsum(axis=1)
+		on_hand = np.maximum(self.on_hand[rows], 0)[:, None]
+
+		in_hand = np.diff(np.minimum(cum_gross, on_hand), axis=1, prepend=0)
+		remaining = gross - in_hand
+		purchase_used = allocate(remaining, self.purchase_receipts[rows])
+		remaining -= purchase_used
+		production_used = allocate(remaining, self.production_receipts[rows])
+
+		safety_stock = self.safety_stock[rows][:, None] if include_safety_stock else 0
+		shortage = (
+			safety_stock
+			+ cum_gross
+			- on_hand
+			- self.purchase_receipts[rows].cumsum(axis=1)
+			- self.production_receipts[rows].cumsum(axis=1)
+		)
+		required = np.maximum.accumulate(np.maximum(shortage, 0), axis=1)
+
+		self.in_hand[rows] = in_hand
+		self.purchase_used[rows] = purchase_used
+		self.production_used[rows] = production_used
+		self.planned_orders[rows] = np.diff(required, axis=1, prepend=0)
+
+	def explode(self, parents, children, qtys):
+		"""Adds the planned orders of the parents to the gross requirements of the children at release"""
+		requirements = self.planned_orders[parents] * qtys[:, None]
+		buckets = self.release_buckets[parents]
+		np.add.at(self.gross, (np.broadcast_to(children[:, None], buckets.shape), buckets), requirements)
+
+	def get_bom_edges(self):
+		"""Returns {level: (parent rows, child rows, qty per unit)} for the BOMs of the items"""
+		edges = {}
+		for item_code in self.item_codes:
+			bom_no = self.items[item_code].get("bom_no")
+			for component, qty in self.boms.get(bom_no, []) if bom_no else []:
+				level_edges = edges.setdefault(self.levels[item_code], ([], [], []))
+				level_edges[0].append(self.index[item_code])
+				level_edges[1].append(self.index[component])
+				level_edges[2].append(qty)
+
+		return {
+			level: (np.array(parents), np.array(children), np.array(qtys, dtype=float))
+			for level, (parents, children, qtys) in edges.items()
+		}
+
+	def get_active_buckets(self):
+		"""Yields (item_code, bucket) for every bucket with requirements or planned orders"""
+		active = (self.gross > 0) | (self.planned_orders > 0)
+		for row, bucket in zip(*np.nonzero(active), strict=True):
+			yield self.item_codes[row], int(bucket)
+
+
+def allocate(requirements, receipts):
+	"""
+	Allocates receipts to requirements in date order, receipts can only cover requirements of
+	their own or a later bucket. Returns the allocated qty per bucket.
+	"""
+	cum_requirements = requirements.cumsum(axis=1)
+	gap = np.minimum.accumulate(receipts.cumsum(axis=1) - cum_requirements, axis=1)
+	return np.diff(cum_requirements + np.minimum(gap, 0), axis=1, prepend=0)
@@ -0,0 +1,67 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days
+
+from erpnext.manufacturing.report.material_requirements_planning_report.mrp_engine import MRPEngine
+
+
+class TestMRPEngine(IntegrationTestCase):
+	def get_engine(self, items, boms, no_of_buckets=4):
+		start = "2025-01-06"
+		buckets = [add_days(start, 7 * i) for i in range(no_of_buckets)]
+		return MRPEngine(buckets, add_days(buckets[-1], 6), items, boms), buckets
+
+	def test_netting_and_explosion(self):
+		engine, buckets = self.get_engine(
+			{
+				"_Test MRP FG": {"bom_no": "BOM-FG", "lead_time": 7, "safety_stock": 0},
+				"_Test MRP SA": {"bom_no": "BOM-SA", "lead_time": 7, "safety_stock": 0},
+			},
+			{
+				"BOM-FG": [("_Test MRP SA", 1), ("_Test MRP RM", 3)],
+				"BOM-SA": [("_Test MRP RM", 2)],
+			},
+		)
+		engine.add_demand("_Test MRP FG", buckets[2], 10)
+		engine.add_demand("_Test MRP FG", buckets[3], 5)
+		engine.add_on_hand("_Test MRP FG", 4)
+		engine.add_purchase_receipt("_Test MRP RM", buckets[0], 20)
+		engine.run()
+
+		def get(field, item_code):
+			return list(getattr(engine, field)[engine.index[item_code]])
+
+		# RM is used by both levels, so it is netted after the sub assembly
+		self.assertEqual(engine.levels, {"_Test MRP FG": 0, "_Test MRP SA": 1, "_Test MRP RM": 2})
+
+		self.assertEqual(get("in_hand", "_Test MRP FG"), [0, 0, 4, 0])
+		self.assertEqual(get("planned_orders", "_Test MRP FG"), [0, 0, 6, 5])
+
+		# released one week earlier
+		self.assertEqual(get("gross", "_Test MRP SA"), [0, 6, 5, 0])
+		self.assertEqual(get("planned_orders", "_Test MRP SA"), [0, 6, 5, 0])
+
+		# 3 per FG released in weeks 2 and 3, 2 per SA released in weeks 1 and 2
+		self.assertEqual(get("gross", "_Test MRP RM"), [12, 28, 15, 0])
+		self.assertEqual(get("purchase_used", "_Test MRP RM"), [12, 8, 0, 0])
+		self.assertEqual(get("planned_orders", "_Test MRP RM"), [0, 20, 15, 0])
+
+	def test_safety_stock_and_late_receipts(self):
+		engine, buckets = self.get_engine(
+			{"_Test MRP RM": {"bom_no": None, "lead_time": 0, "safety_stock": 5}}, {}
+		)
+		engine.add_demand("_Test MRP RM", buckets[0], 10)
+		engine.add_production_receipt("_Test MRP RM", buckets[1], 10)
+		engine.add_demand("_Test MRP RM", add_days(buckets[-1], 30), 100)
+		engine.run()
+
+		row = engine.index["_Test MRP RM"]
+
+		# a receipt can not cover the requirement of an earlier bucket
+		self.assertEqual(list(engine.production_used[row]), [0, 0, 0, 0])
+		self.assertEqual(list(engine.planned_orders[row]), [15, 0, 0, 0])
+
+		engine.run(include_safety_stock=False)
+		self.assertEqual(list(engine.planned_orders[row]), [10, 0, 0, 0])
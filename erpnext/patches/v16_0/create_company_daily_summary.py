@@ -0,0 +1,6 @@
+from erpnext.setup.doctype.company_daily_summary.company_daily_summary import verify_company_daily_summary
+
+
+def execute():
+	# count the existing transactions, later ones are counted as they are saved
+	verify_company_daily_summary()
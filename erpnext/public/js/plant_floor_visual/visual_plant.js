@@ -33,17 +33,32 @@ class VisualPlantFloor {
 
 	prepare_data() {
 		frappe.call({
-			method: "erpnext.manufacturing.doctype.workstation.workstation.get_workstations",
+			method: "erpnext.manufacturing.doctype.plant_floor.plant_floor_status.get_plant_floor_status",
 			args: {
 				plant_floor: this.plant_floor,
 			},
 			callback: (r) => {
-				this.workstations = r.message;
+				this.workstations = r.message.workstations;
 				this.render_workstations();
 			},
 		});
 	}
 
+	subscribe(plant_floor) {
+		// status changes are pushed to the room of the plant floor
+		if (this.subscribed_plant_floor) {
+			frappe.realtime.doc_unsubscribe("Plant Floor", this.subscribed_plant_floor);
+		}
+
+		this.subscribed_plant_floor = plant_floor;
+		frappe.realtime.doc_subscribe("Plant Floor", plant_floor);
+
+		frappe.realtime.off("update_workstation_status");
+		frappe.realtime.on("update_workstation_status", (data) => {
+			this.update_status(data);
+		});
+	}
+
 	add_filter() {
 		this.plant_floor = frappe.ui.form.make_control({
 			df: {
@@ -122,8 +137,12 @@ class VisualPlantFloor {
 		let plant_floor = this.plant_floor.get_value();
 
 		if (plant_floor) {
+			if (plant_floor !== this.subscribed_plant_floor) {
+				this.subscribe(plant_floor);
+			}
+
 			frappe.call({
-				method: "erpnext.manufacturing.doctype.workstation.workstation.get_workstations",
+				method: "erpnext.manufacturing.doctype.plant_floor.plant_floor_status.get_plant_floor_status",
 				args: {
 					plant_floor: plant_floor,
 					workstation_type: this.workstation_type.get_value(),
@@ -131,7 +150,7 @@ class VisualPlantFloor {
 					workstation_status: this.workstation_status.get_value(),
 				},
 				callback: (r) => {
-					this.workstations = r.message;
+					this.workstations = r.message.workstations;
 					this.render_workstations();
 				},
 			});
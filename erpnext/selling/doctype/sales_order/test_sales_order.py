@@ -232,6 +232,32 @@ class TestSalesOrder(AccountsTestMixin, IntegrationTestCase):
 		so.load_from_db()
 		self.assertEqual(so.get("items")[0].delivered_qty, 9)
 
+	@IntegrationTestCase.change_settings(
+		"Stock Settings", {"update_percentages_of_source_documents": "On Commit"}
+	)
+	def test_update_percentages_on_commit(self):
+		from erpnext.controllers.status_updater import flush_pending_percent_fields
+
+		so = make_sales_order()
+
+		create_dn_against_so(so.name, 4)
+		create_dn_against_so(so.name, 2)
+		make_sales_invoice(so.name).submit()
+
+		# row quantities and billed percentages are updated right away, the stock percentages once
+		# before the transaction commits
+		so.load_from_db()
+		self.assertEqual(so.get("items")[0].delivered_qty, 6)
+		self.assertEqual(so.per_delivered, 0)
+		self.assertEqual(so.per_billed, 100)
+
+		flush_pending_percent_fields()
+
+		so.load_from_db()
+		self.assertEqual(so.per_delivered, 60)
+		self.assertEqual(so.delivery_status, "Partly Delivered")
+		self.assertEqual(so.status, "To Deliver")
+
 	def test_return_against_sales_order(self):
 		so = make_sales_order()
 
@@ -11,6 +11,7 @@ from frappe.utils.nestedset import get_root_of
 from erpnext.accounts.doctype.pos_invoice.pos_invoice import get_item_group, get_stock_availability
 from erpnext.accounts.doctype.pos_profile.pos_profile import get_child_nodes, get_item_groups
 from erpnext.stock.get_item_details import get_conversion_factor
+from erpnext.stock.stock_availability import get_stock_availability_map
 from erpnext.stock.utils import scan_barcode
 
 
@@ -196,9 +197,10 @@ def get_items(start, page_length, price_list, item_group, pos_profile, search_te
 		return result
 
 	current_date = frappe.utils.today()
+	stock_availability = get_stock_availability_map([d.item_code for d in items_data], warehouse)
 
 	for item in items_data:
-		item.actual_qty, _ = get_stock_availability(item.item_code, warehouse)
+		item.actual_qty, _ = stock_availability[item.item_code]
 
 		item_prices = frappe.get_all(
 			"Item Price",
@@ -11,10 +11,25 @@ from frappe.cache_manager import clear_defaults_cache
 from frappe.contacts.address_and_contact import load_address_and_contact
 from frappe.custom.doctype.property_setter.property_setter import make_property_setter
 from frappe.desk.page.setup_wizard.setup_wizard import make_records
-from frappe.utils import cint, formatdate, get_link_to_form, get_timestamp, today
+from frappe.utils import (
+	add_days,
+	add_years,
+	cint,
+	get_first_day,
+	get_last_day,
+	get_link_to_form,
+	get_timestamp,
+	getdate,
+	today,
+)
 from frappe.utils.nestedset import NestedSet, rebuild_tree
 
 from erpnext.accounts.doctype.account.account import get_account_currency
+from erpnext.setup.doctype.company_daily_summary.company_daily_summary import (
+	get_daily_summary,
+	get_sales_amount,
+	verify_company_daily_summary,
+)
 from erpnext.setup.setup_wizard.operations.taxes_setup import setup_taxes_and_charges
 
 
@@ -657,7 +672,7 @@ class Company(NestedSet):
 			frappe.db.sql("""delete from `tabWarehouse` where company=%s""", self.name)
 
 		frappe.defaults.clear_default("company", value=self.name)
-		for doctype in ["Mode of Payment Account", "Item Default"]:
+		for doctype in ["Mode of Payment Account", "Item Default", "Company Daily Summary"]:
 			frappe.db.sql(f"delete from `tab{doctype}` where company = %s", self.name)
 
 		# clear default accounts, warehouses from item
@@ -744,40 +759,17 @@ def install_country_fixtures(company, country):
 
 
 def update_company_current_month_sales(company):
-	current_month_year = formatdate(today(), "MM-yyyy")
-
-	results = frappe.db.sql(
-		f"""
-		SELECT
-			SUM(base_grand_total) AS total,
-			DATE_FORMAT(`posting_date`, '%m-%Y') AS month_year
-		FROM
-			`tabSales Invoice`
-		WHERE
-			DATE_FORMAT(`posting_date`, '%m-%Y') = '{current_month_year}'
-			AND docstatus = 1
-			AND company = {frappe.db.escape(company)}
-		GROUP BY
-			month_year
-	""",
-		as_dict=True,
-	)
-
-	monthly_total = results[0]["total"] if len(results) > 0 else 0
-
+	monthly_total = get_sales_amount(company, get_first_day(today()), get_last_day(today()))
 	frappe.db.set_value("Company", company, "total_monthly_sales", monthly_total)
 
 
 def update_company_monthly_sales(company):
-	"""Cache past year monthly sales of every company based on sales invoices"""
-	import json
-
-	from frappe.utils.goal import get_monthly_results
-
-	filter_str = f"company = {frappe.db.escape(company)} and status != 'Draft' and docstatus=1"
-	month_to_value_dict = get_monthly_results(
-		"Sales Invoice", "base_grand_total", "posting_date", filter_str, "sum"
-	)
+	"""Cache monthly sales of every company based on its daily summary of sales invoices"""
+	month_to_value_dict = {}
+	for row in get_daily_summary(company, fields=["sales_amount"]):
+		if row.sales_amount:
+			month_year = getdate(row.date).strftime("%m-%Y")
+			month_to_value_dict[month_year] = month_to_value_dict.get(month_year, 0.0) + row.sales_amount
 
 	frappe.db.set_value("Company", company, "sales_monthly_history", json.dumps(month_to_value_dict))
 
@@ -791,6 +783,9 @@ def update_transactions_annual_history(company, commit=False):
 
 
 def cache_companies_monthly_sales_history():
+	# the daily summary is recounted after submit and cancel, only the last month is verified
+	verify_company_daily_summary(get_first_day(add_days(today(), -1)))
+
 	companies = [d["name"] for d in frappe.get_list("Company")]
 	for company in companies:
 		update_company_monthly_sales(company)
@@ -833,55 +828,9 @@ def add_node():
 def get_all_transactions_annual_history(company):
 	out = {}
 
-	items = frappe.db.sql(
-		"""
-		select transaction_date, count(*) as count
-
-		from (
-			select name, transaction_date, company
-			from `tabQuotation`
-
-			UNION ALL
-
-			select name, transaction_date, company
-			from `tabSales Order`
-
-			UNION ALL
-
-			select name, posting_date as transaction_date, company
-			from `tabDelivery Note`
-
-			UNION ALL
-
-			select name, posting_date as transaction_date, company
-			from `tabSales Invoice`
-
-			UNION ALL
-
-			select name, creation as transaction_date, company
-			from `tabIssue`
-
-			UNION ALL
-
-			select name, creation as transaction_date, company
-			from `tabProject`
-		) t
-
-		where
-			company=%s
-			and
-			transaction_date > date_sub(curdate(), interval 1 year)
-
-		group by
-			transaction_date
-			""",
-		(company),
-		as_dict=True,
-	)
-
-	for d in items:
-		timestamp = get_timestamp(d["transaction_date"])
-		out.update({timestamp: d["count"]})
+	for d in get_daily_summary(company, from_date=add_years(today(), -1), fields=["transaction_count"]):
+		if d.transaction_count:
+			out.update({get_timestamp(d.date): d.transaction_count})
 
 	return out
 
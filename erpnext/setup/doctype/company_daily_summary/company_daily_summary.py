@@ -0,0 +1,211 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from functools import partial
+
+import frappe
+from frappe.model.document import Document
+from frappe.model.naming import make_autoname
+from frappe.query_builder.functions import Sum
+from frappe.utils import add_days, flt, getdate, now, today
+
+DIRTY_DATES_KEY = "dirty_company_daily_summary_dates"
+
+# transactions counted in the transaction heatmap of the company dashboard, with their date field,
+# once they are submitted for the submittable ones
+TRANSACTION_DATE_FIELDS = {
+	"Quotation": "transaction_date",
+	"Sales Order": "transaction_date",
+	"Delivery Note": "posting_date",
+	"Sales Invoice": "posting_date",
+	"Issue": "creation",
+	"Project": "creation",
+}
+
+
+class CompanyDailySummary(Document):
+	# begin: auto-generated types
+	# This code is auto-generated. Do not modify anything in this block.
+
+	from typing import TYPE_CHECKING
+
+	if TYPE_CHECKING:
+		from frappe.types import DF
+
+		company: DF.Link
+		date: DF.Date
+		sales_amount: DF.Currency
+		transaction_count: DF.Int
+	# end: auto-generated types
+
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_unique("Company Daily Summary", ["company", "date"], constraint_name="unique_company_date")
+
+
+def mark_transaction_date_dirty(doc, method=None):
+	"""Queues the day of a transaction to be recounted, once it is submitted, cancelled or created"""
+	date = get_transaction_date(doc)
+	if doc.company and date:
+		# recounted off the request, the saves of a company do not wait on the row of its day
+		frappe.db.after_commit.add(partial(mark_dates_dirty, [(doc.company, date)]))
+
+
+def get_transaction_date(doc):
+	date = doc.get(TRANSACTION_DATE_FIELDS[doc.doctype])
+	return getdate(date) if date else None
+
+
+def mark_dates_dirty(company_dates):
+	"""Queues the (company, date) days to be recounted by `flush_dirty_dates` in a background job"""
+	for company, date in company_dates:
+		frappe.cache.hset(DIRTY_DATES_KEY, f"{company}::{date}", (company, getdate(date)))
+
+	frappe.enqueue(
+		"erpnext.setup.doctype.company_daily_summary.company_daily_summary.flush_dirty_dates",
+		queue="short",
+		job_id=DIRTY_DATES_KEY,
+		deduplicate=True,
+	)
+
+
+def flush_dirty_dates():
+	"""Recounts the days marked as dirty, until there are none left"""
+	from erpnext.setup.doctype.company.company import update_company_current_month_sales
+
+	while dirty := frappe.cache.hgetall(DIRTY_DATES_KEY):
+		# unmarked before they are recounted, so that days marked again meanwhile are not lost
+		frappe.cache.hdel(DIRTY_DATES_KEY, list(dirty))
+
+		company_dates = set(dirty.values())
+		update_summary(company_dates)
+
+		if frappe.get_single_value("Selling Settings", "sales_update_frequency") == "Each Transaction":
+			for company in {company for company, _date in company_dates}:
+				update_company_current_month_sales(company)
+
+		frappe.db.commit()  # nosemgrep
+
+
+def update_summary(company_dates):
+	"""Recounts the transactions and sales of the (company, date) days"""
+	dates = {date for _company, date in company_dates}
+
+	expected = {}
+	for date in dates:
+		expected.update(get_expected_summary(date, date))
+
+	current = get_current_summary({"date": ("in", list(dates))})
+	set_summary(expected, current, company_dates)
+
+
+def get_sales_amount(company, from_date, to_date):
+	summary = frappe.qb.DocType("Company Daily Summary")
+	result = (
+		frappe.qb.from_(summary)
+		.select(Sum(summary.sales_amount))
+		.where(summary.company == company)
+		.where(summary.date.between(from_date, to_date))
+	).run()
+
+	return flt(result[0][0]) if result else 0.0
+
+
+def get_daily_summary(company, from_date=None, fields=None):
+	filters = {"company": company}
+	if from_date:
+		filters["date"] = (">", from_date)
+
+	return frappe.get_all(
+		"Company Daily Summary",
+		filters=filters,
+		fields=["date", *(fields or ["transaction_count", "sales_amount"])],
+		order_by="date",
+	)
+
+
+def verify_company_daily_summary(from_date=None, to_date=None):
+	"""
+	Recounts the transactions and sales of all the companies from `from_date` (since the first
+	transaction if not set) to `to_date` and corrects the summary where it differs, for the
+	transactions submitted without their hooks, like the ones inserted in bulk.
+	"""
+	to_date = getdate(to_date or today())
+	expected = get_expected_summary(from_date, to_date)
+
+	filters = {"date": ("<=", to_date)}
+	if from_date:
+		filters["date"] = ("between", [from_date, to_date])
+
+	current = get_current_summary(filters)
+	set_summary(expected, current, set(expected) | set(current))
+
+
+def get_current_summary(filters):
+	return {
+		(row.company, getdate(row.date)): row
+		for row in frappe.get_all(
+			"Company Daily Summary",
+			filters=filters,
+			fields=["name", "company", "date", "transaction_count", "sales_amount"],
+		)
+	}
+
+
+def set_summary(expected, current, company_dates):
+	"""Corrects the summary of the `company_dates` where the `current` rows differ from `expected`"""
+	new_rows = []
+	timestamp, user = now(), frappe.session.user
+	for key in company_dates:
+		transaction_count, sales_amount = expected.get(key, (0, 0.0))
+
+		if row := current.get(key):
+			if (row.transaction_count, flt(row.sales_amount, 2)) != (transaction_count, flt(sales_amount, 2)):
+				frappe.db.set_value(
+					"Company Daily Summary",
+					row.name,
+					{"transaction_count": transaction_count, "sales_amount": sales_amount},
+					update_modified=False,
+				)
+		elif transaction_count or sales_amount:
+			name = make_autoname("hash", "Company Daily Summary")
+			new_rows.append((name, timestamp, timestamp, user, user, *key, transaction_count, sales_amount))
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "company", "date"]
+	fields += ["transaction_count", "sales_amount"]
+	frappe.db.bulk_insert("Company Daily Summary", fields=fields, values=new_rows, chunk_size=1000)
+
+
+def get_expected_summary(from_date, to_date):
+	"""Returns the transaction count and sales amount of the days, by company and date"""
+	expected = {}
+	params = {"from_date": from_date or "1900-01-01", "to_date": add_days(to_date, 1)}
+
+	for doctype, date_field in TRANSACTION_DATE_FIELDS.items():
+		docstatus_condition = "and docstatus = 1" if frappe.get_meta(doctype).is_submittable else ""
+		for company, date, count in frappe.db.sql(
+			f"""
+			select company, date(`{date_field}`), count(*)
+			from `tab{doctype}`
+			where `{date_field}` >= %(from_date)s and `{date_field}` < %(to_date)s
+				and company is not null {docstatus_condition}
+			group by company, date(`{date_field}`)
+			""",
+			params,
+		):
+			expected.setdefault((company, getdate(date)), [0, 0.0])[0] += count
+
+	for company, date, sales_amount in frappe.db.sql(
+		"""
+		select company, posting_date, sum(base_grand_total)
+		from `tabSales Invoice`
+		where posting_date >= %(from_date)s and posting_date < %(to_date)s and docstatus = 1
+		group by company, posting_date
+		""",
+		params,
+	):
+		expected.setdefault((company, getdate(date)), [0, 0.0])[1] += flt(sales_amount)
+
+	return {key: tuple(value) for key, value in expected.items()}
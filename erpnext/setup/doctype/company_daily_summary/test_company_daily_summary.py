@@ -0,0 +1,63 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, getdate, nowdate
+
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.setup.doctype.company_daily_summary.company_daily_summary import (
+	update_summary,
+	verify_company_daily_summary,
+)
+
+
+class TestCompanyDailySummary(IntegrationTestCase):
+	def get_summary(self, date):
+		return frappe.db.get_value(
+			"Company Daily Summary",
+			{"company": "_Test Company", "date": date},
+			["transaction_count", "sales_amount"],
+			as_dict=True,
+		) or frappe._dict(transaction_count=0, sales_amount=0.0)
+
+	def test_summary_is_updated_on_submit_and_cancel(self):
+		posting_date = add_days(nowdate(), -3)
+		update_summary({("_Test Company", getdate(posting_date))})
+		before = self.get_summary(posting_date)
+
+		# drafts are not counted
+		si = create_sales_invoice(posting_date=posting_date, rate=300, do_not_submit=True)
+		update_summary({("_Test Company", getdate(posting_date))})
+		self.assertEqual(self.get_summary(posting_date), before)
+
+		si.submit()
+		# the day is recounted in the background, off the request
+		self.assertEqual(self.get_summary(posting_date), before)
+
+		update_summary({("_Test Company", getdate(posting_date))})
+		summary = self.get_summary(posting_date)
+		self.assertEqual(summary.transaction_count, before.transaction_count + 1)
+		self.assertEqual(summary.sales_amount, before.sales_amount + si.base_grand_total)
+
+		si.cancel()
+		update_summary({("_Test Company", getdate(posting_date))})
+		self.assertEqual(self.get_summary(posting_date), before)
+
+	def test_verify_company_daily_summary(self):
+		posting_date = add_days(nowdate(), -2)
+		si = create_sales_invoice(posting_date=posting_date, rate=500)
+		verify_company_daily_summary(posting_date)
+		expected = self.get_summary(posting_date)
+
+		frappe.db.set_value(
+			"Company Daily Summary",
+			{"company": "_Test Company", "date": posting_date},
+			{"transaction_count": 0, "sales_amount": 0},
+		)
+
+		verify_company_daily_summary(posting_date)
+		summary = self.get_summary(posting_date)
+		self.assertEqual(summary.transaction_count, expected.transaction_count)
+		self.assertEqual(summary.sales_amount, expected.sales_amount)
+		self.assertGreaterEqual(summary.sales_amount, si.base_grand_total)
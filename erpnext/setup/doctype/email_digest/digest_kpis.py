@@ -0,0 +1,366 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Metrics of the cards of the email digests of a company, computed for all its digests at once.
+
+An email digest used to compute every card with its own queries, for every account of the card and
+for every recipient. `DigestKPIs` computes the metrics of all the digests of a company due on a day
+together instead: the dates and periods of the digests are registered first with `add_digest`, then
+the balances and counts of all the accounts on all the dates are read with one pass over the
+General Ledger, and the totals of the documents of all the periods with one query per document type.
+The results are kept by date and period, so that digests of the same company and period share them.
+
+The metrics are the same as the ones `get_balance_on` and `get_count_on` return for the accounts of
+the cards, the root accounts being in company currency.
+"""
+
+from datetime import timedelta
+
+import frappe
+from frappe.utils import flt, get_currency_precision, getdate, nowdate
+
+from erpnext.accounts.utils import FiscalYearError, get_fiscal_year
+
+
+class DigestKPIs:
+	def __init__(self, company):
+		self.company = company
+		self.precision = get_currency_precision() or 2
+
+		# dates and periods registered by the digests, computed together on first use
+		self.pending_dates = set()
+		self.pending_periods = set()
+
+		# cumulative balance in company and account currency and count of entries of every account, by date
+		self.balances = {}
+		self.document_totals = {}
+		self.open_orders = {}
+		self.pending_quotations = {}
+		self.outstanding_counts = {}
+		self.year_start_dates = {}
+
+		self.accounts = frappe.get_all(
+			"Account",
+			filters={"company": company, "is_group": 0},
+			fields=["name", "root_type", "account_type"],
+		)
+
+	def add_digest(self, digest):
+		"""Registers the dates and periods of the cards of `digest`"""
+		for from_date, to_date in (
+			(digest.future_from_date, digest.future_to_date),
+			(digest.past_from_date, digest.past_to_date),
+		):
+			from_date, to_date = getdate(from_date), getdate(to_date)
+			self.pending_periods.add((from_date, to_date))
+			self.pending_dates.update((to_date, from_date - timedelta(days=1)))
+
+			try:
+				self.pending_dates.add(get_fiscal_year(to_date)[1] - timedelta(days=1))
+			except FiscalYearError:
+				pass
+
+	def get_balances(self, date):
+		date = getdate(date)
+		if date not in self.balances:
+			self.load_balances({date} | self.pending_dates)
+
+		return self.balances[date]
+
+	def load_balances(self, dates):
+		"""Reads the balances of the accounts of the company on the `dates` with one query"""
+		dates = sorted(set(dates) - set(self.balances))
+		self.pending_dates.clear()
+
+		columns, values = [], {"company": self.company, "precision": self.precision, "to_date": dates[-1]}
+		for i, date in enumerate(dates):
+			values[f"date_{i}"] = date
+			columns.append(
+				f"""sum(case when posting_date <= %(date_{i})s
+					then round(debit, %(precision)s) - round(credit, %(precision)s) else 0 end)"""
+			)
+			columns.append(
+				f"""sum(case when posting_date <= %(date_{i})s
+					then round(debit_in_account_currency, %(precision)s)
+						- round(credit_in_account_currency, %(precision)s)
+					else 0 end)"""
+			)
+
+			# entries counted by `get_count_on` for profit and loss accounts
+			if year_start_date := self.get_year_start_date(date):
+				values[f"year_start_date_{i}"] = year_start_date
+				columns.append(
+					f"""sum(case when posting_date <= %(date_{i})s and posting_date >= %(year_start_date_{i})s
+						and voucher_type != 'Period Closing Voucher' then 1 else 0 end)"""
+				)
+			else:
+				columns.append("0")
+
+		rows = frappe.db.sql(
+			"""
+			select account, {}
+			from `tabGL Entry`
+			where company = %(company)s and is_cancelled = 0 and posting_date <= %(to_date)s
+			group by account""".format(", ".join(columns)),
+			values,
+		)
+
+		for i, date in enumerate(dates):
+			self.balances[date] = {
+				row[0]: (flt(row[3 * i + 1]), flt(row[3 * i + 2]), flt(row[3 * i + 3])) for row in rows
+			}
+
+	def get_year_start_date(self, date):
+		"""
+		Returns the start of the fiscal year of `date` the way `get_balance_on` and `get_count_on` find it,
+		or None if they return 0 for it
+		"""
+		if date not in self.year_start_dates:
+			try:
+				self.year_start_dates[date] = get_fiscal_year(date, verbose=0)[1]
+			except FiscalYearError:
+				if getdate(date) > getdate(nowdate()):
+					self.year_start_dates[date] = get_fiscal_year(nowdate(), verbose=1)[1]
+				else:
+					self.year_start_dates[date] = None
+
+		return self.year_start_dates[date]
+
+	def get_accounts(self, root_type=None, account_type=None):
+		return [
+			account.name
+			for account in self.accounts
+			if (not root_type or account.root_type == root_type)
+			and (not account_type or account.account_type == account_type)
+		]
+
+	def get_balance(self, accounts, date, in_account_currency=False):
+		"""Total of `get_balance_on` for the `accounts` on `date`"""
+		date = getdate(date)
+		if not self.get_year_start_date(date):
+			return 0.0
+
+		balances = self.get_balances(date)
+		column = 1 if in_account_currency else 0
+		return sum(balances[account][column] for account in accounts if account in balances)
+
+	def get_count(self, accounts, date):
+		"""Total of `get_count_on` for the profit and loss `accounts` on `date`"""
+		balances = self.get_balances(getdate(date))
+		return sum(balances[account][2] for account in accounts if account in balances)
+
+	def get_type_balance(self, account_type, date, root_type=None):
+		return self.get_balance(self.get_accounts(root_type, account_type), date)
+
+	def get_period_amount(self, root_type, from_date, to_date):
+		"""The income or expense of a period, as `get_incomes_expenses_for_period` of the root accounts"""
+		accounts = self.get_accounts(root_type.title())
+		return get_value_for_period(lambda date: self.get_balance(accounts, date), from_date, to_date)
+
+	def get_period_count(self, root_type, from_date, to_date):
+		accounts = self.get_accounts(root_type.title())
+		return get_value_for_period(lambda date: self.get_count(accounts, date), from_date, to_date)
+
+	def get_year_to_date_balance(self, root_type, date):
+		"""Balance and count of the accounts of `root_type` from the start of the fiscal year of `date`"""
+		accounts = self.get_accounts(root_type.title())
+		fy_start_date = get_fiscal_year(date)[1]
+
+		balance = 0.0
+		if self.get_year_start_date(getdate(date)):
+			opening_balances = self.get_balances(fy_start_date - timedelta(days=1))
+			balance = self.get_balance(accounts, date, in_account_currency=True) - sum(
+				opening_balances[account][1] for account in accounts if account in opening_balances
+			)
+
+		return balance, self.get_count(accounts, date)
+
+	def get_outstanding_count(self, account_type, fieldname, date):
+		"""
+		Number of the entries of the accounts of `account_type` on `date` with an outstanding amount, like
+		`get_count_on` counts them for "invoiced_amount" and "payables"
+		"""
+		date = getdate(date)
+		key = (account_type, fieldname, date)
+		if key in self.outstanding_counts:
+			return self.outstanding_counts[key]
+
+		accounts = self.get_accounts(account_type=account_type)
+		if not (accounts and self.get_year_start_date(date)):
+			return 0
+
+		gl_entries = frappe.db.sql(
+			"""
+			select name, party, debit, credit, voucher_no, against_voucher_type, against_voucher
+			from `tabGL Entry`
+			where is_cancelled = 0 and posting_date <= %(date)s and account in %(accounts)s""",
+			{"date": date, "accounts": accounts},
+			as_dict=True,
+		)
+
+		dr_or_cr = "debit" if fieldname == "invoiced_amount" else "credit"
+		cr_or_dr = "credit" if fieldname == "invoiced_amount" else "debit"
+
+		gl_entries = [
+			gle
+			for gle in gl_entries
+			if (not gle.against_voucher)
+			or (gle.against_voucher_type in ["Sales Order", "Purchase Order"])
+			or (gle.against_voucher == gle.voucher_no and gle.get(dr_or_cr) > 0)
+		]
+
+		payments = self.get_payment_amounts({gle.voucher_no for gle in gl_entries}, date, cr_or_dr, dr_or_cr)
+
+		count = 0
+		for gle in gl_entries:
+			payment_amount = 0.0
+			if gle.party is not None:
+				payment_amount = payments.get((gle.voucher_no, gle.party), 0.0)
+				if gle.against_voucher == gle.voucher_no:
+					# the entry itself is not a payment
+					payment_amount -= flt(gle.get(cr_or_dr)) - flt(gle.get(dr_or_cr))
+
+			outstanding_amount = flt(gle.get(dr_or_cr)) - flt(gle.get(cr_or_dr)) - payment_amount
+			if abs(flt(outstanding_amount)) > 0.1 / 10**self.precision:
+				count += 1
+
+		self.outstanding_counts[key] = count
+		return count
+
+	def get_payment_amounts(self, vouchers, date, cr_or_dr, dr_or_cr):
+		"""Amounts of the entries against the `vouchers` on `date`, by voucher and party"""
+		vouchers = list(vouchers)
+		payments = {}
+
+		for i in range(0, len(vouchers), 1000):
+			for against_voucher, party, amount in frappe.db.sql(
+				f"""
+				select against_voucher, party, sum({cr_or_dr} - {dr_or_cr})
+				from `tabGL Entry`
+				where docstatus < 2 and posting_date <= %(date)s and against_voucher in %(vouchers)s
+				group by against_voucher, party""",
+				{"date": date, "vouchers": vouchers[i : i + 1000]},
+			):
+				payments[(against_voucher, party)] = flt(amount)
+
+		return payments
+
+	def get_document_total(self, doctype, from_date, to_date):
+		"""Total and count of the documents of `doctype` of a period that are not cancelled"""
+		period = (getdate(from_date), getdate(to_date))
+		if (doctype, period) not in self.document_totals:
+			self.load_document_totals(doctype, {period} | self.pending_periods)
+
+		return self.document_totals[(doctype, period)]
+
+	def load_document_totals(self, doctype, periods):
+		periods = sorted(period for period in periods if (doctype, period) not in self.document_totals)
+		date_field = (
+			"posting_date" if doctype in ["Sales Invoice", "Purchase Invoice"] else "transaction_date"
+		)
+
+		columns, values = [], {"company": self.company}
+		for i, (from_date, to_date) in enumerate(periods):
+			values.update({f"from_date_{i}": from_date, f"to_date_{i}": to_date})
+			condition = f"`{date_field}` between %(from_date_{i})s and %(to_date_{i})s"
+			columns.append(f"sum(case when {condition} then grand_total end)")
+			columns.append(f"sum(case when {condition} then 1 else 0 end)")
+
+		values["from_date"] = min(period[0] for period in periods)
+		values["to_date"] = max(period[1] for period in periods)
+		row = frappe.db.sql(
+			"""
+			select {columns}
+			from `tab{doctype}`
+			where company = %(company)s and ifnull(status, '') != 'Cancelled'
+				and `{date_field}` between %(from_date)s and %(to_date)s""".format(
+				columns=", ".join(columns), doctype=doctype, date_field=date_field
+			),
+			values,
+		)[0]
+
+		for i, period in enumerate(periods):
+			self.document_totals[(doctype, period)] = (flt(row[2 * i]), int(row[2 * i + 1] or 0))
+
+	def get_open_orders(self, doctype, date):
+		"""
+		Totals of the open Sales or Purchase Orders on `date`: pending, to bill and to deliver or receive
+		"""
+		date = getdate(date)
+		if (doctype, date) in self.open_orders:
+			return self.open_orders[(doctype, date)]
+
+		if doctype == "Sales Order":
+			to_bill, to_deliver = "billing_status != 'Fully Billed'", "delivery_status != 'Fully Delivered'"
+			per_delivered = "per_delivered"
+		else:
+			to_bill, to_deliver, per_delivered = "per_billed < 100", "per_received < 100", "per_received"
+
+		row = frappe.db.sql(
+			f"""
+			select
+				sum(grand_total), count(*),
+				sum(grand_total*per_billed/100), sum(grand_total*{per_delivered}/100),
+				sum(case when {to_bill} then grand_total end)
+					- sum(case when {to_bill} then grand_total*per_billed/100 end),
+				sum(case when {to_bill} then 1 else 0 end),
+				sum(case when {to_deliver} then grand_total end)
+					- sum(case when {to_deliver} then grand_total*{per_delivered}/100 end),
+				sum(case when {to_deliver} then 1 else 0 end)
+			from `tab{doctype}`
+			where transaction_date <= %(to_date)s
+			and status not in ('Closed','Cancelled', 'Completed')
+			and company = %(company)s""",
+			{"to_date": date, "company": self.company},
+		)[0]
+
+		self.open_orders[(doctype, date)] = frappe._dict(
+			value=flt(row[0]),
+			count=row[1] or 0,
+			billed_value=flt(row[2]),
+			delivered_value=flt(row[3]),
+			to_bill=(flt(row[4]), int(row[5] or 0)),
+			to_deliver=(flt(row[6]), int(row[7] or 0)),
+		)
+		return self.open_orders[(doctype, date)]
+
+	def get_pending_quotations(self, date, past_date):
+		"""Total and count of the pending Quotations on `date`, and their total on `past_date`"""
+		key = (getdate(date), getdate(past_date))
+		if key not in self.pending_quotations:
+			row = frappe.db.sql(
+				"""
+				select
+					sum(case when transaction_date <= %(to_date)s then grand_total end),
+					sum(case when transaction_date <= %(to_date)s then 1 else 0 end),
+					sum(case when transaction_date <= %(past_to_date)s then grand_total end)
+				from `tabQuotation`
+				where transaction_date <= greatest(%(to_date)s, %(past_to_date)s)
+				and company = %(company)s
+				and status not in ('Ordered','Cancelled', 'Lost') """,
+				{"to_date": key[0], "past_to_date": key[1], "company": self.company},
+			)[0]
+			self.pending_quotations[key] = (flt(row[0]), int(row[1] or 0), flt(row[2]))
+
+		return self.pending_quotations[key]
+
+
+def get_value_for_period(get_value_on, from_date, to_date):
+	"""
+	The change of a cumulative value over a period, from its value on dates: the way the income and
+	expense of a period are computed from the balances of the profit and loss accounts
+	"""
+	from_date, to_date = getdate(from_date), getdate(to_date)
+	value_on_to_date = get_value_on(to_date)
+	value_before_from_date = get_value_on(from_date - timedelta(days=1))
+
+	fy_start_date = get_fiscal_year(to_date)[1]
+
+	if from_date == fy_start_date:
+		return value_on_to_date
+	elif from_date > fy_start_date:
+		return value_on_to_date - value_before_from_date
+	else:
+		last_year_closing_value = get_value_on(fy_start_date - timedelta(days=1))
+		return value_on_to_date + (last_year_closing_value - value_before_from_date)
@@ -22,7 +22,7 @@ from frappe.utils import (
 	today,
 )
 
-from erpnext.accounts.utils import get_balance_on, get_count_on, get_fiscal_year
+from erpnext.setup.doctype.email_digest.digest_kpis import DigestKPIs
 
 user_specific_content = ["calendar_events", "todo_list"]
 
@@ -79,7 +79,7 @@ class EmailDigest(Document):
 
 		self.from_date, self.to_date = self.get_from_to_date()
 		self.set_dates()
-		self._accounts = {}
+		self.kpis = None
 		self.currency = frappe.db.get_value("Company", self.company, "default_currency")
 
 	@frappe.whitelist()
@@ -116,13 +116,17 @@ class EmailDigest(Document):
 		]
 
 		if self.recipients:
+			# the digest is the same for all the recipients
+			msg = self.get_msg_html()
+			if not msg:
+				return
+
 			for row in self.recipients:
-				msg_for_this_recipient = self.get_msg_html()
-				if msg_for_this_recipient and row.recipient in valid_users:
+				if row.recipient in valid_users:
 					frappe.sendmail(
 						recipients=row.recipient,
 						subject=_("{0} Digest").format(_(self.frequency)),
-						message=msg_for_this_recipient,
+						message=msg,
 						reference_doctype=self.doctype,
 						reference_name=self.name,
 						unsubscribe_message=_("Unsubscribe from this Email Digest"),
@@ -385,7 +389,7 @@ class EmailDigest(Document):
 
 	def get_income(self):
 		"""Get income for given period"""
-		income, past_income, count = self.get_period_amounts(self.get_roots("income"), "income")
+		income, past_income, count = self.get_period_amounts("income")
 
 		income_account = frappe.db.get_all(
 			"Account",
@@ -415,13 +419,7 @@ class EmailDigest(Document):
 
 	def get_year_to_date_balance(self, root_type, fieldname):
 		"""Get income to date"""
-		balance = 0.0
-		count = 0
-		fy_start_date = get_fiscal_year(self.future_to_date)[1]
-
-		for account in self.get_root_type_accounts(root_type):
-			balance += get_balance_on(account, date=self.future_to_date, start_date=fy_start_date)
-			count += get_count_on(account, fieldname, date=self.future_to_date)
+		balance, count = self.get_kpis().get_year_to_date_balance(root_type, self.future_to_date)
 
 		if fieldname == "income":
 			filters = {"currency": self.currency}
@@ -456,7 +454,7 @@ class EmailDigest(Document):
 		return self.get_type_balance("invoiced_amount", "Receivable")
 
 	def get_expenses_booked(self):
-		expenses, past_expenses, count = self.get_period_amounts(self.get_roots("expense"), "expenses_booked")
+		expenses, past_expenses, count = self.get_period_amounts("expense")
 
 		expense_account = frappe.db.get_all(
 			"Account",
@@ -476,27 +474,26 @@ class EmailDigest(Document):
 		)
 		return {"label": label, "value": expenses, "last_value": past_expenses, "count": count}
 
-	def get_period_amounts(self, accounts, fieldname):
+	def get_period_amounts(self, root_type):
 		"""Get amounts for current and past periods"""
-		balance = past_balance = 0.0
-		count = 0
-		for account in accounts:
-			balance += get_incomes_expenses_for_period(account, self.future_from_date, self.future_to_date)
-			past_balance += get_incomes_expenses_for_period(account, self.past_from_date, self.past_to_date)
-			count += get_count_for_period(account, fieldname, self.future_from_date, self.future_to_date)
+		kpis = self.get_kpis()
+		balance = kpis.get_period_amount(root_type, self.future_from_date, self.future_to_date)
+		past_balance = kpis.get_period_amount(root_type, self.past_from_date, self.past_to_date)
+		count = kpis.get_period_count(root_type, self.future_from_date, self.future_to_date)
 
 		return balance, past_balance, count
 
+	def get_kpis(self):
+		"""Metrics of the cards, shared with the digests of the company sent at the same time"""
+		if not self.kpis:
+			self.kpis = DigestKPIs(self.company)
+			self.kpis.add_digest(self)
+
+		return self.kpis
+
 	def get_sales_orders_to_bill(self):
 		"""Get value not billed"""
-
-		value, count = frappe.db.sql(
-			"""select ifnull((sum(grand_total)) - (sum(grand_total*per_billed/100)),0),
-                    count(*) from `tabSales Order`
-					where (transaction_date <= %(to_date)s) and billing_status != "Fully Billed" and company = %(company)s
-					and status not in ('Closed','Cancelled', 'Completed') """,
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
+		value, count = self.get_kpis().get_open_orders("Sales Order", self.future_to_date).to_bill
 
 		label = get_link_to_report(
 			"Sales Order",
@@ -515,14 +512,7 @@ class EmailDigest(Document):
 
 	def get_sales_orders_to_deliver(self):
 		"""Get value not delivered"""
-
-		value, count = frappe.db.sql(
-			"""select ifnull((sum(grand_total)) - (sum(grand_total*per_delivered/100)),0),
-					count(*) from `tabSales Order`
-					where (transaction_date <= %(to_date)s) and delivery_status != "Fully Delivered" and company = %(company)s
-					and status not in ('Closed','Cancelled', 'Completed') """,
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
+		value, count = self.get_kpis().get_open_orders("Sales Order", self.future_to_date).to_deliver
 
 		label = get_link_to_report(
 			"Sales Order",
@@ -541,14 +531,7 @@ class EmailDigest(Document):
 
 	def get_purchase_orders_to_receive(self):
 		"""Get value not received"""
-
-		value, count = frappe.db.sql(
-			"""select ifnull((sum(grand_total))-(sum(grand_total*per_received/100)),0),
-                    count(*) from `tabPurchase Order`
-					where (transaction_date <= %(to_date)s) and per_received < 100 and company = %(company)s
-					and status not in ('Closed','Cancelled', 'Completed') """,
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
+		value, count = self.get_kpis().get_open_orders("Purchase Order", self.future_to_date).to_deliver
 
 		label = get_link_to_report(
 			"Purchase Order",
@@ -567,14 +550,7 @@ class EmailDigest(Document):
 
 	def get_purchase_orders_to_bill(self):
 		"""Get purchase not billed"""
-
-		value, count = frappe.db.sql(
-			"""select ifnull((sum(grand_total)) - (sum(grand_total*per_billed/100)),0),
-                    count(*) from `tabPurchase Order`
-					where (transaction_date <= %(to_date)s) and per_billed < 100 and company = %(company)s
-					and status not in ('Closed','Cancelled', 'Completed') """,
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
+		value, count = self.get_kpis().get_open_orders("Purchase Order", self.future_to_date).to_bill
 
 		label = get_link_to_report(
 			"Purchase Order",
@@ -592,33 +568,9 @@ class EmailDigest(Document):
 		return {"label": label, "value": value, "count": count}
 
 	def get_type_balance(self, fieldname, account_type, root_type=None):
-		if root_type:
-			accounts = [
-				d.name
-				for d in frappe.db.get_all(
-					"Account",
-					filters={
-						"account_type": account_type,
-						"company": self.company,
-						"is_group": 0,
-						"root_type": root_type,
-					},
-				)
-			]
-		else:
-			accounts = [
-				d.name
-				for d in frappe.db.get_all(
-					"Account", filters={"account_type": account_type, "company": self.company, "is_group": 0}
-				)
-			]
-
-		balance = prev_balance = 0.0
-		count = 0
-		for account in accounts:
-			balance += get_balance_on(account, date=self.future_to_date, in_account_currency=False)
-			count += get_count_on(account, fieldname, date=self.future_to_date)
-			prev_balance += get_balance_on(account, date=self.past_to_date, in_account_currency=False)
+		kpis = self.get_kpis()
+		balance = kpis.get_type_balance(account_type, self.future_to_date, root_type=root_type)
+		prev_balance = kpis.get_type_balance(account_type, self.past_to_date, root_type=root_type)
 
 		if fieldname in ("bank_balance", "credit_balance"):
 			label = ""
@@ -660,33 +612,9 @@ class EmailDigest(Document):
 			else:
 				label = _(self.meta.get_label(fieldname))
 
+			count = kpis.get_outstanding_count(account_type, fieldname, self.future_to_date)
 			return {"label": label, "value": balance, "last_value": prev_balance, "count": count}
 
-	def get_roots(self, root_type):
-		return [
-			d.name
-			for d in frappe.db.get_all(
-				"Account",
-				filters={
-					"root_type": root_type.title(),
-					"company": self.company,
-					"is_group": 1,
-					"parent_account": ["in", ("", None)],
-				},
-			)
-		]
-
-	def get_root_type_accounts(self, root_type):
-		if root_type not in self._accounts:
-			self._accounts[root_type] = [
-				d.name
-				for d in frappe.db.get_all(
-					"Account",
-					filters={"root_type": root_type.title(), "company": self.company, "is_group": 0},
-				)
-			]
-		return self._accounts[root_type]
-
 	def get_purchase_order(self):
 		return self.get_summary_of_doc("Purchase Order", "purchase_order")
 
@@ -712,39 +640,20 @@ class EmailDigest(Document):
 		return self.get_summary_of_pending_quotations("pending_quotations")
 
 	def get_summary_of_pending(self, doc_type, fieldname, getfield):
-		value, count, billed_value, delivered_value = frappe.db.sql(
-			"""select ifnull(sum(grand_total),0), count(*),
-			ifnull(sum(grand_total*per_billed/100),0), ifnull(sum(grand_total*{}/100),0)  from `tab{}`
-			where (transaction_date <= %(to_date)s)
-			and status not in ('Closed','Cancelled', 'Completed')
-			and company = %(company)s """.format(getfield, doc_type),
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
+		orders = self.get_kpis().get_open_orders(doc_type, self.future_to_date)
 
 		return {
 			"label": self.meta.get_label(fieldname),
-			"value": value,
-			"billed_value": billed_value,
-			"delivered_value": delivered_value,
-			"count": count,
+			"value": orders.value,
+			"billed_value": orders.billed_value,
+			"delivered_value": orders.delivered_value,
+			"count": orders.count,
 		}
 
 	def get_summary_of_pending_quotations(self, fieldname):
-		value, count = frappe.db.sql(
-			"""select ifnull(sum(grand_total),0), count(*) from `tabQuotation`
-			where (transaction_date <= %(to_date)s)
-			and company = %(company)s
-			and status not in ('Ordered','Cancelled', 'Lost') """,
-			{"to_date": self.future_to_date, "company": self.company},
-		)[0]
-
-		last_value = frappe.db.sql(
-			"""select ifnull(sum(grand_total),0) from `tabQuotation`
-			where (transaction_date <= %(to_date)s)
-			and company = %(company)s
-			and status not in ('Ordered','Cancelled', 'Lost') """,
-			{"to_date": self.past_to_date, "company": self.company},
-		)[0][0]
+		value, count, last_value = self.get_kpis().get_pending_quotations(
+			self.future_to_date, self.past_to_date
+		)
 
 		label = get_link_to_report(
 			"Quotation",
@@ -766,10 +675,9 @@ class EmailDigest(Document):
 			"posting_date" if doc_type in ["Sales Invoice", "Purchase Invoice"] else "transaction_date"
 		)
 
-		value = flt(self.get_total_on(doc_type, self.future_from_date, self.future_to_date)[0].grand_total)
-		count = self.get_total_on(doc_type, self.future_from_date, self.future_to_date)[0].count
-
-		last_value = flt(self.get_total_on(doc_type, self.past_from_date, self.past_to_date)[0].grand_total)
+		kpis = self.get_kpis()
+		value, count = kpis.get_document_total(doc_type, self.future_from_date, self.future_to_date)
+		last_value = kpis.get_document_total(doc_type, self.past_from_date, self.past_to_date)[0]
 
 		filters = {
 			date_field: [[">=", self.future_from_date], ["<=", self.future_to_date]],
@@ -787,21 +695,6 @@ class EmailDigest(Document):
 
 		return {"label": label, "value": value, "last_value": last_value, "count": count}
 
-	def get_total_on(self, doc_type, from_date, to_date):
-		date_field = (
-			"posting_date" if doc_type in ["Sales Invoice", "Purchase Invoice"] else "transaction_date"
-		)
-
-		return frappe.get_all(
-			doc_type,
-			filters={
-				date_field: ["between", (from_date, to_date)],
-				"status": ["not in", ("Cancelled")],
-				"company": self.company,
-			},
-			fields=["count(*) as count", "sum(grand_total) as grand_total"],
-		)
-
 	def get_from_to_date(self):
 		today = now_datetime().date()
 
@@ -891,6 +784,7 @@ class EmailDigest(Document):
 def send():
 	now_date = now_datetime().date()
 
+	digests = []
 	for ed in frappe.db.sql(
 		"""select name from `tabEmail Digest`
 			where enabled=1 and docstatus<2""",
@@ -898,49 +792,24 @@ def send():
 	):
 		ed_obj = frappe.get_doc("Email Digest", ed[0])
 		if now_date == ed_obj.get_next_sending():
-			ed_obj.send()
-
-
-@frappe.whitelist()
-def get_digest_msg(name):
-	return frappe.get_doc("Email Digest", name).get_msg_html()
-
-
-def get_incomes_expenses_for_period(account, from_date, to_date):
-	"""Get amounts for current and past periods"""
-
-	val = 0.0
-	balance_on_to_date = get_balance_on(account, date=to_date)
-	balance_before_from_date = get_balance_on(account, date=from_date - timedelta(days=1))
+			digests.append(ed_obj)
 
-	fy_start_date = get_fiscal_year(to_date)[1]
+	# the digests of a company compute the metrics of their cards together
+	kpis = {}
+	for ed_obj in digests:
+		if ed_obj.company not in kpis:
+			kpis[ed_obj.company] = DigestKPIs(ed_obj.company)
 
-	if from_date == fy_start_date:
-		val = balance_on_to_date
-	elif from_date > fy_start_date:
-		val = balance_on_to_date - balance_before_from_date
-	else:
-		last_year_closing_balance = get_balance_on(account, date=fy_start_date - timedelta(days=1))
-		val = balance_on_to_date + (last_year_closing_balance - balance_before_from_date)
+		ed_obj.kpis = kpis[ed_obj.company]
+		ed_obj.kpis.add_digest(ed_obj)
 
-	return val
+	for ed_obj in digests:
+		ed_obj.send()
 
 
-def get_count_for_period(account, fieldname, from_date, to_date):
-	count = 0.0
-	count_on_to_date = get_count_on(account, fieldname, to_date)
-	count_before_from_date = get_count_on(account, fieldname, from_date - timedelta(days=1))
-
-	fy_start_date = get_fiscal_year(to_date)[1]
-	if from_date == fy_start_date:
-		count = count_on_to_date
-	elif from_date > fy_start_date:
-		count = count_on_to_date - count_before_from_date
-	else:
-		last_year_closing_count = get_count_on(account, fieldname, fy_start_date - timedelta(days=1))
-		count = count_on_to_date + (last_year_closing_count - count_before_from_date)
-
-	return count
+@frappe.whitelist()
+def get_digest_msg(name):
+	return frappe.get_doc("Email Digest", name).get_msg_html()
 
 
 def get_future_date_for_calendaer_event(frequency):
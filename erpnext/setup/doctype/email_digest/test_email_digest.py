@@ -2,8 +2,42 @@
 # See license.txt
 import unittest
 
+import frappe
 from frappe.tests import IntegrationTestCase
+from frappe.utils import add_days, flt, nowdate
+
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.utils import get_balance_on, get_count_on
+from erpnext.setup.doctype.email_digest.digest_kpis import DigestKPIs
 
 
 class TestEmailDigest(IntegrationTestCase):
-	pass
+	def test_kpis_match_account_balances(self):
+		create_sales_invoice(posting_date=add_days(nowdate(), -1), rate=700)
+		frappe.flags.ignore_account_permission = True
+
+		kpis = DigestKPIs("_Test Company")
+		date = nowdate()
+
+		for account_type in ("Receivable", "Bank"):
+			accounts = frappe.get_all(
+				"Account",
+				filters={"company": "_Test Company", "account_type": account_type, "is_group": 0},
+				pluck="name",
+			)
+			expected = sum(
+				get_balance_on(account, date=date, in_account_currency=False) for account in accounts
+			)
+			self.assertEqual(flt(kpis.get_type_balance(account_type, date), 2), flt(expected, 2))
+
+		accounts = frappe.get_all(
+			"Account",
+			filters={"company": "_Test Company", "account_type": "Receivable", "is_group": 0},
+			pluck="name",
+		)
+		self.assertEqual(
+			kpis.get_outstanding_count("Receivable", "invoiced_amount", date),
+			sum(get_count_on(account, "invoiced_amount", date) for account in accounts),
+		)
+
+		frappe.flags.ignore_account_permission = False
@@ -4,10 +4,11 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.query_builder import Case, Order
-from frappe.query_builder.functions import Coalesce, CombineDatetime, Sum
+from frappe.query_builder import Order
 from frappe.utils import flt
 
+from erpnext.stock.stock_availability import invalidate_stock_availability
+
 
 class Bin(Document):
 	# begin: auto-generated types
@@ -141,80 +142,11 @@ class Bin(Document):
 	def update_reserved_qty_for_sub_contracting(
 		self, subcontract_doctype="Subcontracting Order", update_qty=True
 	):
-		# reserved qty
-
-		subcontract_order = frappe.qb.DocType(subcontract_doctype)
-		supplied_item = frappe.qb.DocType(
-			"Purchase Order Item Supplied"
-			if subcontract_doctype == "Purchase Order"
-			else "Subcontracting Order Supplied Item"
-		)
+		from erpnext.stock.doctype.bin.reserved_qty import get_reserved_qty_for_sub_contract_map
 
-		conditions = (
-			(supplied_item.rm_item_code == self.item_code)
-			& (subcontract_order.name == supplied_item.parent)
-			& (subcontract_order.per_received < 100)
-			& (supplied_item.reserve_warehouse == self.warehouse)
-			& (
-				(
-					(subcontract_order.is_old_subcontracting_flow == 1)
-					& (subcontract_order.status != "Closed")
-					& (subcontract_order.docstatus == 1)
-				)
-				if subcontract_doctype == "Purchase Order"
-				else (subcontract_order.docstatus == 1)
-			)
-		)
-
-		reserved_qty_for_sub_contract = (
-			frappe.qb.from_(subcontract_order)
-			.from_(supplied_item)
-			.select(Sum(Coalesce(supplied_item.required_qty, 0)))
-			.where(conditions)
-		).run()[0][0] or 0.0
-
-		se = frappe.qb.DocType("Stock Entry")
-		se_item = frappe.qb.DocType("Stock Entry Detail")
-
-		if frappe.db.field_exists("Stock Entry", "is_return"):
-			qty_field = Case().when(se.is_return == 1, se_item.transfer_qty * -1).else_(se_item.transfer_qty)
-		else:
-			qty_field = se_item.transfer_qty
-
-		conditions = (
-			(se.docstatus == 1)
-			& (se.purpose == "Send to Subcontractor")
-			& ((se_item.item_code == self.item_code) | (se_item.original_item == self.item_code))
-			& (se.name == se_item.parent)
-			& (subcontract_order.docstatus == 1)
-			& (subcontract_order.per_received < 100)
-			& (
-				(
-					(Coalesce(se.purchase_order, "") != "")
-					& (subcontract_order.name == se.purchase_order)
-					& (subcontract_order.is_old_subcontracting_flow == 1)
-					& (subcontract_order.status != "Closed")
-				)
-				if subcontract_doctype == "Purchase Order"
-				else (
-					(Coalesce(se.subcontracting_order, "") != "")
-					& (subcontract_order.name == se.subcontracting_order)
-				)
-			)
-		)
-
-		materials_transferred = (
-			frappe.qb.from_(se)
-			.from_(se_item)
-			.from_(subcontract_order)
-			.select(Sum(qty_field))
-			.where(conditions)
-		).run()[0][0] or 0.0
-
-		if reserved_qty_for_sub_contract > materials_transferred:
-			reserved_qty_for_sub_contract = reserved_qty_for_sub_contract - materials_transferred
-		else:
-			reserved_qty_for_sub_contract = 0
+		reserved_qty_for_sub_contract = get_reserved_qty_for_sub_contract_map(
+			[(self.item_code, self.warehouse)], subcontract_doctype
+		).get((self.item_code, self.warehouse), 0.0)
 
 		self.reserved_qty_for_sub_contract = reserved_qty_for_sub_contract
 		if update_qty:
@@ -298,6 +230,8 @@ def update_qty(bin_name, args):
 		update_modified=True,
 	)
 
+	invalidate_stock_availability([(args.get("item_code"), args.get("warehouse"))])
+
 
 def get_actual_qty(item_code, warehouse):
 	sle = frappe.qb.DocType("Stock Ledger Entry")
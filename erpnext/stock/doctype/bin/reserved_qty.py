@@ -0,0 +1,321 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Set based recalculation of the reserved quantities of Bins.
+
+`update_reserved_qty` recalculates one kind of reserved qty of many (item_code, warehouse) pairs with
+one grouped query per source table and one update of all the bins whose qty changed, taking the row
+locks of the bins in name order so that concurrent transactions lock them in the same order.
+
+With "Defer Reserved Qty Updates" in Stock Settings the bins are only marked as dirty when the
+transaction commits, and a short background job recalculates them, so that manufacturing and
+subcontracting transactions do not hold the locks of busy bins until they end.
+"""
+
+from functools import partial
+
+import frappe
+from frappe.query_builder import Case
+from frappe.query_builder.functions import Coalesce, IfNull, Sum
+from frappe.utils import cint, flt, now
+
+DIRTY_BINS_KEY = "dirty_reserved_qty_bins"
+
+# qty type: the Bin field it sets
+RESERVED_QTY_FIELDS = {
+	"Production": "reserved_qty_for_production",
+	"Production Plan": "reserved_qty_for_production_plan",
+	"Sub Assembly": "reserved_qty_for_production_plan",
+	"Subcontracting Order": "reserved_qty_for_sub_contract",
+	"Purchase Order": "reserved_qty_for_sub_contract",
+}
+
+PROJECTED_QTY_FIELDS = {
+	"actual_qty": 1,
+	"ordered_qty": 1,
+	"indented_qty": 1,
+	"planned_qty": 1,
+	"reserved_qty": -1,
+	"reserved_qty_for_production": -1,
+	"reserved_qty_for_sub_contract": -1,
+	"reserved_qty_for_production_plan": -1,
+}
+
+# bins updated by one statement
+BIN_CHUNK_SIZE = 500
+
+
+def update_reserved_qty(item_warehouses, qty_type):
+	"""
+	Recalculates the reserved qty of type `qty_type` (a key of RESERVED_QTY_FIELDS) and the projected
+	qty of the bins of the (item_code, warehouse) pairs, now or after commit if updates are deferred.
+	"""
+	item_warehouses = {
+		(item_code, warehouse) for item_code, warehouse in item_warehouses if item_code and warehouse
+	}
+	if not item_warehouses:
+		return
+
+	if cint(frappe.db.get_single_value("Stock Settings", "defer_reserved_qty_updates", cache=True)):
+		frappe.db.after_commit.add(partial(mark_bins_dirty, item_warehouses, qty_type))
+		return
+
+	recalculate_reserved_qty(item_warehouses, qty_type)
+
+
+def recalculate_reserved_qty(item_warehouses, qty_type):
+	from erpnext.manufacturing.doctype.production_plan.production_plan import (
+		get_reserved_qty_for_production_plan_map,
+		get_reserved_qty_for_sub_assembly_map,
+	)
+	from erpnext.manufacturing.doctype.work_order.work_order import get_reserved_qty_for_production_map
+
+	bins = get_bins(item_warehouses)
+
+	if qty_type == "Production":
+		set_reserved_qty(bins, "reserved_qty_for_production", get_reserved_qty_for_production_map(bins))
+		# like Bin.update_reserved_qty_for_production, the plan qty depends on the work orders
+		qty_type = "Production Plan"
+
+	if qty_type == "Production Plan":
+		set_reserved_qty(
+			bins, "reserved_qty_for_production_plan", get_reserved_qty_for_production_plan_map(bins), None
+		)
+	elif qty_type == "Sub Assembly":
+		set_reserved_qty(
+			bins, "reserved_qty_for_production_plan", get_reserved_qty_for_sub_assembly_map(bins), None
+		)
+	elif qty_type in ("Subcontracting Order", "Purchase Order"):
+		set_reserved_qty(
+			bins, "reserved_qty_for_sub_contract", get_reserved_qty_for_sub_contract_map(bins, qty_type)
+		)
+
+
+def get_bins(item_warehouses):
+	"""Returns {(item_code, warehouse): bin} of the pairs, creating the missing bins"""
+	from erpnext.stock.utils import get_or_make_bin
+
+	fields = ["name", "item_code", "warehouse", *RESERVED_QTY_FIELDS.values()]
+	filters = {
+		"item_code": ["in", list({item_code for item_code, _warehouse in item_warehouses})],
+		"warehouse": ["in", list({warehouse for _item_code, warehouse in item_warehouses})],
+	}
+
+	bins = {
+		(d.item_code, d.warehouse): d
+		for d in frappe.get_all("Bin", filters=filters, fields=fields, order_by=None)
+		if (d.item_code, d.warehouse) in item_warehouses
+	}
+
+	for item_code, warehouse in item_warehouses.difference(bins):
+		bins[(item_code, warehouse)] = frappe._dict(
+			name=get_or_make_bin(item_code, warehouse), item_code=item_code, warehouse=warehouse
+		)
+
+	return bins
+
+
+def set_reserved_qty(bins, fieldname, reserved_qty, default=0.0):
+	"""
+	Sets `fieldname` of the bins to their qty in `reserved_qty` and recalculates their projected qty.
+
+	Bins missing from `reserved_qty` get `default`, or keep their qty if `default` is None and they
+	have none, like the Bin methods do for the production plan qty.
+	"""
+	changed = {}
+	for key, bin in bins.items():
+		qty = reserved_qty.get(key, default)
+		if qty is None:
+			if not bin.get(fieldname):
+				continue
+
+			qty = 0.0
+
+		if flt(qty) != flt(bin.get(fieldname)) or fieldname not in bin:
+			changed[bin.name] = flt(qty)
+			bin[fieldname] = flt(qty)
+
+	if not changed:
+		return
+
+	names = sorted(changed)
+	for i in range(0, len(names), BIN_CHUNK_SIZE):
+		update_bins(fieldname, {name: changed[name] for name in names[i : i + BIN_CHUNK_SIZE]})
+
+
+def update_bins(fieldname, values):
+	"""Sets `fieldname` of the bins {name: qty} and their projected qty with one statement"""
+	bin = frappe.qb.DocType("Bin")
+
+	new_qty = Case()
+	for name, qty in values.items():
+		new_qty = new_qty.when(bin.name == name, qty)
+	new_qty = new_qty.else_(bin[fieldname])
+
+	# computed from the new qty, as databases differ in whether later assignments see earlier ones
+	projected_qty = 0
+	for field, sign in PROJECTED_QTY_FIELDS.items():
+		qty = new_qty if field == fieldname else IfNull(bin[field], 0)
+		projected_qty = projected_qty + qty if sign > 0 else projected_qty - qty
+
+	(
+		frappe.qb.update(bin)
+		.set(bin[fieldname], new_qty)
+		.set(bin.projected_qty, projected_qty)
+		.set(bin.modified, now())
+		.where(bin.name.isin(list(values)))
+	).run()
+
+
+def get_reserved_qty_for_sub_contract_map(item_warehouses, subcontract_doctype="Subcontracting Order"):
+	"""
+	Returns {(item_code, warehouse): qty} of the raw materials reserved by open subcontracting orders
+	(or old flow purchase orders) in their reserve warehouse, less the qty sent to the subcontractor.
+	"""
+	item_warehouses = set(item_warehouses)
+	if not item_warehouses:
+		return {}
+
+	item_codes = list({item_code for item_code, _warehouse in item_warehouses})
+
+	subcontract_order = frappe.qb.DocType(subcontract_doctype)
+	supplied_item = frappe.qb.DocType(
+		"Purchase Order Item Supplied"
+		if subcontract_doctype == "Purchase Order"
+		else "Subcontracting Order Supplied Item"
+	)
+
+	conditions = (
+		(supplied_item.rm_item_code.isin(item_codes))
+		& (subcontract_order.name == supplied_item.parent)
+		& (subcontract_order.per_received < 100)
+		& (
+			supplied_item.reserve_warehouse.isin(
+				list({warehouse for _item_code, warehouse in item_warehouses})
+			)
+		)
+		& (
+			(
+				(subcontract_order.is_old_subcontracting_flow == 1)
+				& (subcontract_order.status != "Closed")
+				& (subcontract_order.docstatus == 1)
+			)
+			if subcontract_doctype == "Purchase Order"
+			else (subcontract_order.docstatus == 1)
+		)
+	)
+
+	reserved_qty = {
+		(item_code, warehouse): flt(qty)
+		for item_code, warehouse, qty in (
+			frappe.qb.from_(subcontract_order)
+			.from_(supplied_item)
+			.select(
+				supplied_item.rm_item_code,
+				supplied_item.reserve_warehouse,
+				Sum(Coalesce(supplied_item.required_qty, 0)),
+			)
+			.where(conditions)
+			.groupby(supplied_item.rm_item_code, supplied_item.reserve_warehouse)
+		).run()
+		if (item_code, warehouse) in item_warehouses
+	}
+
+	if not reserved_qty:
+		return {}
+
+	materials_transferred = get_materials_transferred_to_subcontractor(
+		list({item_code for item_code, _warehouse in reserved_qty}), subcontract_doctype
+	)
+
+	return {
+		(item_code, warehouse): max(qty - materials_transferred.get(item_code, 0.0), 0.0)
+		for (item_code, warehouse), qty in reserved_qty.items()
+	}
+
+
+def get_materials_transferred_to_subcontractor(item_codes, subcontract_doctype):
+	"""Returns {item_code: qty} sent to the subcontractor against open orders, in any warehouse"""
+	subcontract_order = frappe.qb.DocType(subcontract_doctype)
+	se = frappe.qb.DocType("Stock Entry")
+	se_item = frappe.qb.DocType("Stock Entry Detail")
+
+	if frappe.db.field_exists("Stock Entry", "is_return"):
+		qty_field = Case().when(se.is_return == 1, se_item.transfer_qty * -1).else_(se_item.transfer_qty)
+	else:
+		qty_field = se_item.transfer_qty
+
+	conditions = (
+		(se.docstatus == 1)
+		& (se.purpose == "Send to Subcontractor")
+		& (se.name == se_item.parent)
+		& (subcontract_order.docstatus == 1)
+		& (subcontract_order.per_received < 100)
+		& (
+			(
+				(Coalesce(se.purchase_order, "") != "")
+				& (subcontract_order.name == se.purchase_order)
+				& (subcontract_order.is_old_subcontracting_flow == 1)
+				& (subcontract_order.status != "Closed")
+			)
+			if subcontract_doctype == "Purchase Order"
+			else (
+				(Coalesce(se.subcontracting_order, "") != "")
+				& (subcontract_order.name == se.subcontracting_order)
+			)
+		)
+	)
+
+	materials_transferred = {}
+
+	# a row counts for its item and, if it is a substitute, for the original item as well
+	for item_field, condition in (
+		(se_item.item_code, se_item.item_code.isin(item_codes)),
+		(
+			se_item.original_item,
+			se_item.original_item.isin(item_codes) & (se_item.original_item != se_item.item_code),
+		),
+	):
+		for item_code, qty in (
+			frappe.qb.from_(se)
+			.from_(se_item)
+			.from_(subcontract_order)
+			.select(item_field, Sum(qty_field))
+			.where(conditions & condition)
+			.groupby(item_field)
+		).run():
+			materials_transferred[item_code] = materials_transferred.get(item_code, 0.0) + flt(qty)
+
+	return materials_transferred
+
+
+def mark_bins_dirty(item_warehouses, qty_type):
+	"""Queues the bins to be recalculated by `flush_dirty_bins` in a background job"""
+	for item_code, warehouse in item_warehouses:
+		frappe.cache.hset(
+			DIRTY_BINS_KEY, f"{qty_type}::{item_code}::{warehouse}", (qty_type, item_code, warehouse)
+		)
+
+	frappe.enqueue(
+		"erpnext.stock.doctype.bin.reserved_qty.flush_dirty_bins",
+		queue="short",
+		job_id=DIRTY_BINS_KEY,
+		deduplicate=True,
+	)
+
+
+def flush_dirty_bins():
+	"""Recalculates the bins marked as dirty, until there are none left"""
+	while dirty := frappe.cache.hgetall(DIRTY_BINS_KEY):
+		# unmarked before they are recalculated, so that bins marked again meanwhile are not lost
+		frappe.cache.hdel(DIRTY_BINS_KEY, list(dirty))
+
+		item_warehouses = {}
+		for qty_type, item_code, warehouse in dirty.values():
+			item_warehouses.setdefault(qty_type, set()).add((item_code, warehouse))
+
+		for qty_type, pairs in item_warehouses.items():
+			recalculate_reserved_qty(pairs, qty_type)
+
+		frappe.db.commit()  # nosemgrep
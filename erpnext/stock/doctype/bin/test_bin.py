@@ -4,8 +4,9 @@
 import frappe
 from frappe.tests import IntegrationTestCase
 
+from erpnext.stock.doctype.bin.reserved_qty import update_reserved_qty
 from erpnext.stock.doctype.item.test_item import make_item
-from erpnext.stock.utils import _create_bin
+from erpnext.stock.utils import _create_bin, get_bin
 
 
 class TestBin(IntegrationTestCase):
@@ -32,3 +33,30 @@ class TestBin(IntegrationTestCase):
 		indexes = frappe.db.sql("show index from tabBin where Non_unique = 0", as_dict=1)
 		if not any(index.get("Key_name") == "unique_item_warehouse" for index in indexes):
 			self.fail("Expected unique index on item-warehouse")
+
+	def test_batch_reserved_qty_matches_bin(self):
+		from erpnext.manufacturing.doctype.work_order.test_work_order import make_wo_order_test_record
+
+		wo_order = make_wo_order_test_record(
+			item="_Test FG Item", qty=2, source_warehouse="_Test Warehouse - _TC"
+		)
+		item_warehouses = [(d.item_code, d.source_warehouse) for d in wo_order.required_items]
+
+		expected = {}
+		for item_code, warehouse in item_warehouses:
+			bin = get_bin(item_code, warehouse)
+			bin.update_reserved_qty_for_production()
+			bin.update_reserved_qty_for_sub_contracting()
+			expected[(item_code, warehouse)] = bin.projected_qty
+
+			# the batch update has to recalculate from scratch
+			bin.db_set(
+				{"reserved_qty_for_production": 0, "reserved_qty_for_sub_contract": 0, "projected_qty": 0}
+			)
+
+		update_reserved_qty(item_warehouses, "Production")
+		update_reserved_qty(item_warehouses, "Subcontracting Order")
+
+		for (item_code, warehouse), projected_qty in expected.items():
+			self.assertEqual(get_bin(item_code, warehouse).projected_qty, projected_qty)
+			self.assertGreater(get_bin(item_code, warehouse).reserved_qty_for_production, 0)
@@ -500,17 +500,16 @@ class PickList(TransactionBase):
 		for item_doc in items:
 			item_code = item_doc.item_code
 
-			self.item_location_map.setdefault(
-				item_code,
-				get_available_item_locations(
+			# the locations of an item are looked up once and consumed by all its rows
+			if item_code not in self.item_location_map:
+				self.item_location_map[item_code] = get_available_item_locations(
 					item_code,
 					from_warehouses,
 					self.item_count_map.get(item_code),
 					self.company,
 					picked_item_details=picked_items_details.get(item_code),
 					consider_rejected_warehouses=self.consider_rejected_warehouses,
-				),
-			)
+				)
 
 			locations = get_items_with_location_and_quantity(item_doc, self.item_location_map, self.docstatus)
 
@@ -901,9 +900,9 @@ def get_items_with_location_and_quantity(item_doc, item_location_map, docstatus)
 		# if extra quantity is available push current warehouse to available locations
 		if qty_diff > 0:
 			item_location.qty = qty_diff
-			if item_location.serial_no:
+			if item_location.serial_nos:
 				# set remaining serial numbers
-				item_location.serial_no = item_location.serial_no[-int(qty_diff) :]
+				item_location.serial_nos = item_location.serial_nos[-int(qty_diff) :]
 			available_locations = [item_location, *available_locations]
 
 	# update available locations for the item
@@ -1050,25 +1049,27 @@ def get_available_item_locations_for_serial_and_batched_item(
 
 	if locations:
 		sn = frappe.qb.DocType("Serial No")
-		conditions = (sn.item_code == item_code) & (sn.company == company)
 
-		for location in locations:
-			location.qty = (
-				required_qty if location.qty > required_qty else location.qty
-			)  # if extra qty in batch
+		# serial nos of all the batches in one query instead of one query per batch
+		serial_nos = (
+			frappe.qb.from_(sn)
+			.select(sn.name, sn.batch_no, sn.warehouse)
+			.where(
+				(sn.item_code == item_code)
+				& (sn.company == company)
+				& (sn.batch_no.isin(list({location.batch_no for location in locations})))
+				& (sn.warehouse.isin(list({location.warehouse for location in locations})))
+			)
+			.orderby(sn.creation)
+		).run(as_dict=True)
 
-			serial_nos = (
-				frappe.qb.from_(sn)
-				.select(sn.name)
-				.where(
-					(conditions) & (sn.batch_no == location.batch_no) & (sn.warehouse == location.warehouse)
-				)
-				.orderby(sn.creation)
-			).run(as_dict=True)
+		batch_wise_serial_nos = defaultdict(list)
+		for row in serial_nos:
+			batch_wise_serial_nos[(row.batch_no, row.warehouse)].append(row.name)
 
-			serial_nos = [sn.name for sn in serial_nos]
-			location.serial_nos = serial_nos
-			location.qty = len(serial_nos)
+		for location in locations:
+			location.serial_nos = batch_wise_serial_nos.get((location.batch_no, location.warehouse), [])
+			location.qty = len(location.serial_nos)
 
 	return locations
 
@@ -1312,9 +1313,9 @@ def create_dn_from_so(pick_list, sales_order_list, delivery_note=None, kwargs=No
 			"name": "so_detail",
 			"parent": "against_sales_order",
 		},
-		"condition": lambda doc: abs(doc.delivered_qty) < abs(doc.qty)
-		and doc.delivered_by_supplier != 1
-		and select_item(doc),
+		"condition": lambda doc: (
+			abs(doc.delivered_qty) < abs(doc.qty) and doc.delivered_by_supplier != 1 and select_item(doc)
+		),
 	}
 
 	kwargs = {"skip_item_mapping": True, "ignore_pricing_rule": pick_list.ignore_pricing_rule}
@@ -485,6 +485,7 @@ class SerialandBatchBundle(Document):
 				sle=sle,
 				item_code=self.item_code,
 				warehouse=self.warehouse,
+				batch_totals=self.flags.batch_totals,
 			)
 
 		stock_queue = []
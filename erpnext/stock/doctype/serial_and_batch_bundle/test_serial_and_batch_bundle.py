@@ -832,6 +832,139 @@ class TestSerialandBatchBundle(IntegrationTestCase):
 			"Stock Settings", "auto_create_serial_and_batch_bundle_for_outward", original_value
 		)
 
+	def test_bulk_allocation_for_outward(self):
+		from erpnext.stock.serial_batch_bundle import allocate_serial_batch_for_outward
+
+		serial_item = make_item(
+			"Test Bulk Allocation Serial Item",
+			properties={"is_stock_item": 1, "has_serial_no": 1, "serial_no_series": "TBA-SER-.#####"},
+		).name
+
+		batch_item = make_item(
+			"Test Bulk Allocation Batch Item",
+			properties={
+				"is_stock_item": 1,
+				"has_batch_no": 1,
+				"create_new_batch": 1,
+				"batch_number_series": "TBA-BATCH-.#####",
+			},
+		).name
+
+		warehouse = "_Test Warehouse - _TC"
+		make_stock_entry(item_code=serial_item, qty=5, target=warehouse, rate=500)
+		first_batch = get_batch_from_bundle(
+			make_stock_entry(item_code=batch_item, qty=4, target=warehouse, rate=500)
+			.items[0]
+			.serial_and_batch_bundle
+		)
+		second_batch = get_batch_from_bundle(
+			make_stock_entry(item_code=batch_item, qty=6, target=warehouse, rate=500)
+			.items[0]
+			.serial_and_batch_bundle
+		)
+
+		rows = [
+			frappe._dict(item_code=serial_item, warehouse=warehouse, qty=2),
+			frappe._dict(item_code=batch_item, warehouse=warehouse, qty=3),
+			frappe._dict(item_code=serial_item, warehouse=warehouse, qty=3),
+			frappe._dict(item_code=batch_item, warehouse=warehouse, qty=5),
+		]
+
+		allocations = allocate_serial_batch_for_outward(rows, based_on="FIFO")
+
+		self.assertEqual(len(allocations[0].serial_nos), 2)
+		self.assertEqual(len(allocations[2].serial_nos), 3)
+		self.assertFalse(set(allocations[0].serial_nos) & set(allocations[2].serial_nos))
+
+		self.assertEqual(allocations[1].batches, {first_batch: 3})
+		self.assertEqual(allocations[3].batches, {first_batch: 1, second_batch: 4})
+
+	def test_batch_valuation_on_backdated_inward(self):
+		from frappe.utils import add_days
+
+		item_code = make_item(
+			"Test Batch Running Totals Item",
+			properties={
+				"is_stock_item": 1,
+				"has_batch_no": 1,
+				"create_new_batch": 1,
+				"batch_number_series": "TBRT-.#####",
+			},
+		).name
+
+		warehouse = "_Test Warehouse - _TC"
+		se = make_stock_entry(
+			item_code=item_code, qty=10, target=warehouse, rate=100, posting_date=add_days(today(), -5)
+		)
+		batch_no = get_batch_from_bundle(se.items[0].serial_and_batch_bundle)
+
+		issues = [
+			make_stock_entry(
+				item_code=item_code,
+				qty=2,
+				source=warehouse,
+				batch_no=batch_no,
+				use_serial_batch_fields=True,
+				posting_date=add_days(today(), days),
+			)
+			for days in (-3, -2, -1)
+		]
+
+		# backdated inward to the same batch reposts all the issues at the new average rate
+		make_stock_entry(
+			item_code=item_code,
+			qty=4,
+			target=warehouse,
+			rate=310,
+			batch_no=batch_no,
+			use_serial_batch_fields=True,
+			posting_date=add_days(today(), -4),
+		)
+
+		for issue in issues:
+			stock_value_difference = frappe.db.get_value(
+				"Stock Ledger Entry",
+				{"voucher_no": issue.name, "is_cancelled": 0, "voucher_type": "Stock Entry"},
+				"stock_value_difference",
+			)
+			self.assertEqual(flt(stock_value_difference, 2), -320)
+
+	def test_bulk_allocation_for_stock_entry_rows(self):
+		from erpnext.stock.doctype.batch.batch import get_batch_no
+
+		batch_item = make_item(
+			"Test Bulk Allocation Stock Entry Batch Item",
+			properties={
+				"is_stock_item": 1,
+				"has_batch_no": 1,
+				"create_new_batch": 1,
+				"batch_number_series": "TBASE-BATCH-.#####",
+			},
+		).name
+
+		warehouse = "_Test Warehouse - _TC"
+		first_batch = get_batch_from_bundle(
+			make_stock_entry(item_code=batch_item, qty=4, target=warehouse, rate=500)
+			.items[0]
+			.serial_and_batch_bundle
+		)
+		second_batch = get_batch_from_bundle(
+			make_stock_entry(item_code=batch_item, qty=6, target=warehouse, rate=500)
+			.items[0]
+			.serial_and_batch_bundle
+		)
+
+		# rows of the same item share one availability index, so they do not pick the same batch qty
+		se = make_stock_entry(item_code=batch_item, qty=3, source=warehouse, do_not_save=True)
+		se.append("items", dict(se.items[0].as_dict(), name=None, idx=None, qty=5))
+		se.save()
+		se.submit()
+
+		self.assertEqual(dict(get_batch_no(se.items[0].serial_and_batch_bundle)), {first_batch: 3})
+		self.assertEqual(
+			dict(get_batch_no(se.items[1].serial_and_batch_bundle)), {first_batch: 1, second_batch: 4}
+		)
+
 	def test_voucher_detail_no(self):
 		item_code = make_item(
 			"Test Voucher Detail No 1",
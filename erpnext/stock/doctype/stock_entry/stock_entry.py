@@ -36,6 +36,7 @@ from erpnext.manufacturing.doctype.bom.bom import (
 from erpnext.setup.doctype.brand.brand import get_brand_defaults
 from erpnext.setup.doctype.item_group.item_group import get_item_group_defaults
 from erpnext.stock.doctype.batch.batch import get_batch_qty
+from erpnext.stock.doctype.bin.reserved_qty import update_reserved_qty
 from erpnext.stock.doctype.item.item import get_item_defaults
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
 from erpnext.stock.doctype.stock_reconciliation.stock_reconciliation import (
@@ -49,12 +50,13 @@ from erpnext.stock.get_item_details import (
 	get_default_cost_center,
 )
 from erpnext.stock.serial_batch_bundle import (
+	SerialBatchAvailability,
 	SerialBatchCreation,
 	get_empty_batches_based_work_order,
 	get_serial_or_batch_items,
 )
 from erpnext.stock.stock_ledger import NegativeStockError, get_previous_sle, get_valuation_rate
-from erpnext.stock.utils import get_bin, get_incoming_rate
+from erpnext.stock.utils import get_incoming_rate
 
 
 class FinishedGoodError(frappe.ValidationError):
@@ -1092,6 +1094,7 @@ class StockEntry(StockController):
 			return
 
 		already_picked_serial_nos = []
+		availability = {}
 
 		for row in self.items:
 			if row.use_serial_batch_fields:
@@ -1118,6 +1121,9 @@ class StockEntry(StockController):
 					}
 				).update_serial_and_batch_entries()
 			elif not row.serial_and_batch_bundle:
+				if row.item_code not in availability:
+					availability[row.item_code] = self.get_serial_batch_availability(row.item_code)
+
 				bundle_doc = SerialBatchCreation(
 					{
 						"item_code": row.item_code,
@@ -1131,6 +1137,7 @@ class StockEntry(StockController):
 						"type_of_transaction": "Outward",
 						"company": self.company,
 						"do_not_submit": True,
+						"availability": availability[row.item_code],
 					}
 				).make_serial_and_batch_bundle()
 
@@ -1145,6 +1152,16 @@ class StockEntry(StockController):
 
 			row.serial_and_batch_bundle = bundle_doc.name
 
+	def get_serial_batch_availability(self, item_code):
+		"""Serial / batch nos available to all the source rows of the item, looked up once"""
+		warehouses = [row.s_warehouse for row in self.items if row.item_code == item_code and row.s_warehouse]
+
+		kwargs = {}
+		if not frappe.get_cached_value("Item", item_code, "has_serial_no"):
+			kwargs = {"posting_date": self.posting_date, "posting_time": self.posting_time}
+
+		return SerialBatchAvailability(item_code, warehouses, **kwargs)
+
 	def validate_subcontract_order(self):
 		"""Throw exception if more raw material is transferred against Subcontract Order than in
 		the raw materials supplied table"""
@@ -1722,7 +1739,7 @@ class StockEntry(StockController):
 		if self.job_card:
 			job_doc = frappe.get_doc("Job Card", self.job_card)
 			if self.purpose != "Manufacture":
-				job_doc.set_transferred_qty(update_status=True)
+				job_doc.set_transferred_qty(update_status=True, ste_doc=self)
 				job_doc.set_transferred_qty_in_job_card_item(self)
 			else:
 				job_doc.set_manufactured_qty()
@@ -1731,6 +1748,9 @@ class StockEntry(StockController):
 			pro_doc = frappe.get_doc("Work Order", self.work_order)
 			_validate_work_order(pro_doc)
 
+			# the work order adds (or removes) only the qty of this entry to its counters
+			pro_doc.flags.stock_entry = self
+
 			if self.fg_completed_qty:
 				if self.docstatus == 1:
 					pro_doc.add_additional_items(self)
@@ -2901,14 +2921,13 @@ class StockEntry(StockController):
 			# RM Item-Reserve Warehouse Dict
 			item_wh = {x.get("rm_item_code"): x.get("reserve_warehouse") for x in order_supplied_items}
 
+			# Update reserved sub contracted quantity in bin based on Supplied Item Details
+			item_warehouses = []
 			for d in self.get("items"):
-				# Update reserved sub contracted quantity in bin based on Supplied Item Details and
 				item_code = d.get("original_item") or d.get("item_code")
-				reserve_warehouse = item_wh.get(item_code)
-				if not (reserve_warehouse and item_code):
-					continue
-				stock_bin = get_bin(item_code, reserve_warehouse)
-				stock_bin.update_reserved_qty_for_sub_contracting()
+				item_warehouses.append((item_code, item_wh.get(item_code)))
+
+			update_reserved_qty(item_warehouses, "Subcontracting Order")
 
 	def update_transferred_qty(self):
 		if self.purpose == "Material Transfer" and self.outgoing_stock_entry:
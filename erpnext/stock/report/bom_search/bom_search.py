@@ -4,6 +4,7 @@
 
 import frappe
 from frappe import _
+from frappe.query_builder.functions import Count
 
 
 def execute(filters=None):
@@ -14,23 +15,14 @@ def execute(filters=None):
 		"BOM Item": "BOM",
 	}
 
+	items = list({item for key, item in filters.items() if key != "search_sub_assemblies" and item})
+
 	for doctype in (
 		"Product Bundle Item",
 		"BOM Explosion Item" if filters.search_sub_assemblies else "BOM Item",
 	):
-		all_boms = {}
-		for d in frappe.get_all(doctype, fields=["parent", "item_code"]):
-			all_boms.setdefault(d.parent, []).append(d.item_code)
-
-		for parent, items in all_boms.items():
-			valid = True
-			for key, item in filters.items():
-				if key != "search_sub_assemblies":
-					if item and item not in items:
-						valid = False
-
-			if valid:
-				data.append((parent, parents[doctype]))
+		for parent in get_parents_with_items(doctype, items):
+			data.append((parent, parents[doctype]))
 
 	return [
 		{
@@ -42,3 +34,16 @@ def execute(filters=None):
 		},
 		{"fieldname": "doctype", "label": _("Type"), "width": 200, "fieldtype": "Data"},
 	], data
+
+
+def get_parents_with_items(doctype, items):
+	"""Returns the parents of `doctype` rows that have all of `items`"""
+	child = frappe.qb.DocType(doctype)
+	query = frappe.qb.from_(child).select(child.parent).groupby(child.parent)
+
+	if items:
+		query = query.where(child.item_code.isin(items)).having(
+			Count(child.item_code).distinct() == len(items)
+		)
+
+	return query.run(pluck=True)
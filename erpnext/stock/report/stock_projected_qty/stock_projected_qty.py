@@ -8,7 +8,7 @@ from frappe.utils import flt, today
 from frappe.utils.nestedset import get_descendants_of
 from pypika.terms import ExistsCriterion
 
-from erpnext.accounts.doctype.pos_invoice.pos_invoice import get_pos_reserved_qty
+from erpnext.stock.stock_availability import get_cached_availability
 from erpnext.stock.utils import (
 	is_reposting_item_valuation_in_progress,
 	update_included_uom_in_report,
@@ -30,6 +30,7 @@ def execute(filters=None):
 	warehouse_company = {}
 	data = []
 	conversion_factors = []
+	pos_availability = get_pos_availability(bin_list)
 	for bin in bin_list:
 		item = item_map.get(bin.item_code)
 
@@ -62,7 +63,7 @@ def execute(filters=None):
 		if (re_order_level or re_order_qty) and re_order_level > bin.projected_qty:
 			shortage_qty = re_order_level - flt(bin.projected_qty)
 
-		reserved_qty_for_pos = get_pos_reserved_qty(bin.item_code, bin.warehouse)
+		reserved_qty_for_pos = pos_availability[bin.warehouse][bin.item_code].pos_reserved_qty
 		if reserved_qty_for_pos:
 			bin.projected_qty -= reserved_qty_for_pos
 
@@ -98,6 +99,17 @@ def execute(filters=None):
 	return columns, data
 
 
+def get_pos_availability(bin_list):
+	items_by_warehouse = {}
+	for bin in bin_list:
+		items_by_warehouse.setdefault(bin.warehouse, []).append(bin.item_code)
+
+	return {
+		warehouse: get_cached_availability(item_codes, warehouse)
+		for warehouse, item_codes in items_by_warehouse.items()
+	}
+
+
 def get_columns():
 	return [
 		{
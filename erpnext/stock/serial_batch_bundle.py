@@ -4,8 +4,20 @@ import frappe
 from frappe import _, bold
 from frappe.model.naming import make_autoname
 from frappe.query_builder.functions import CombineDatetime, Sum, Timestamp
-from frappe.utils import add_days, cint, cstr, flt, get_link_to_form, now, nowtime, today
+from frappe.utils import (
+	add_days,
+	cint,
+	create_batch,
+	cstr,
+	flt,
+	get_link_to_form,
+	getdate,
+	now,
+	nowtime,
+	today,
+)
 from pypika import Order
+from pypika import analytics as an
 from pypika.terms import ExistsCriterion
 
 from erpnext.stock.deprecated_serial_batch import (
@@ -14,6 +26,9 @@ from erpnext.stock.deprecated_serial_batch import (
 )
 from erpnext.stock.valuation import round_off_if_near_zero
 
+# serial nos updated per statement when setting the status / warehouse of a bundle's serial nos
+SERIAL_NO_UPDATE_BATCH_SIZE = 5000
+
 
 class SerialBatchBundle:
 	def __init__(self, **kwargs):
@@ -457,7 +472,6 @@ class SerialBatchBundle:
 			)
 			.set(sn_table.company, sle.company)
 			.set(sn_table.customer, customer)
-			.where(sn_table.name.isin(serial_nos))
 		)
 
 		if status == "Delivered":
@@ -470,40 +484,21 @@ class SerialBatchBundle:
 			query = query.set(sn_table.warranty_expiry_date, None)
 			query = query.set(sn_table.warranty_period, 0)
 
-		query.run()
+		# bounded IN lists, a bundle can carry tens of thousands of serial nos
+		for batch in create_batch(serial_nos, SERIAL_NO_UPDATE_BATCH_SIZE):
+			query.where(sn_table.name.isin(batch)).run()
 
 	def update_serial_no_status_for_stock_reco(self, serial_nos):
-		for serial_no in serial_nos:
-			sle_doctype = frappe.qb.DocType("Stock Ledger Entry")
-			sn_table = frappe.qb.DocType("Serial and Batch Entry")
-
-			query = (
-				frappe.qb.from_(sle_doctype)
-				.inner_join(sn_table)
-				.on(sle_doctype.serial_and_batch_bundle == sn_table.parent)
-				.select(
-					sle_doctype.warehouse,
-					sle_doctype.actual_qty,
-					sle_doctype.voucher_type,
-					sle_doctype.voucher_no,
-					sle_doctype.is_cancelled,
-					sle_doctype.item_code,
-					sle_doctype.posting_date,
-					sle_doctype.company,
-				)
-				.where(
-					(sn_table.serial_no == serial_no)
-					& (sle_doctype.is_cancelled == 0)
-					& (sn_table.docstatus == 1)
-				)
-				.orderby(sle_doctype.posting_datetime, order=Order.desc)
-				.orderby(sle_doctype.creation, order=Order.desc)
-				.limit(1)
-			)
+		for batch in create_batch(serial_nos, SERIAL_NO_UPDATE_BATCH_SIZE):
+			# serial nos whose latest transaction is the same ledger entry are updated together
+			serial_nos_by_sle = defaultdict(list)
+			latest_sles = {}
+			for serial_no, sle in get_latest_sle_for_serial_nos(batch).items():
+				serial_nos_by_sle[sle.name].append(serial_no)
+				latest_sles[sle.name] = sle
 
-			sle = query.run(as_dict=1)
-			if sle:
-				self.update_serial_no_status_warehouse(sle[0], serial_no)
+			for sle_name, sle_serial_nos in serial_nos_by_sle.items():
+				self.update_serial_no_status_warehouse(latest_sles[sle_name], sle_serial_nos)
 
 	def set_batch_no_in_serial_nos(self):
 		entries = frappe.get_all(
@@ -516,13 +511,71 @@ class SerialBatchBundle:
 		for ledger in entries:
 			batch_serial_nos.setdefault(ledger.batch_no, []).append(ledger.serial_no)
 
+		sn_table = frappe.qb.DocType("Serial No")
 		for batch_no, serial_nos in batch_serial_nos.items():
-			sn_table = frappe.qb.DocType("Serial No")
-			(
-				frappe.qb.update(sn_table)
-				.set(sn_table.batch_no, batch_no)
-				.where(sn_table.name.isin(serial_nos))
-			).run()
+			for batch in create_batch(serial_nos, SERIAL_NO_UPDATE_BATCH_SIZE):
+				(
+					frappe.qb.update(sn_table)
+					.set(sn_table.batch_no, batch_no)
+					.where(sn_table.name.isin(batch))
+				).run()
+
+
+def get_latest_sle_for_serial_nos(serial_nos) -> dict:
+	"""Returns {serial_no: latest non cancelled stock ledger entry} for all `serial_nos` in one query"""
+	sle_doctype = frappe.qb.DocType("Stock Ledger Entry")
+	sn_table = frappe.qb.DocType("Serial and Batch Entry")
+
+	# numbers the entries of every serial no from the latest, only the first one is fetched
+	entry_rank = (
+		an.RowNumber()
+		.over(sn_table.serial_no)
+		.orderby(sle_doctype.posting_datetime, order=Order.desc)
+		.orderby(sle_doctype.creation, order=Order.desc)
+	)
+
+	ranked_entries = (
+		frappe.qb.from_(sle_doctype)
+		.inner_join(sn_table)
+		.on(sle_doctype.serial_and_batch_bundle == sn_table.parent)
+		.select(
+			sn_table.serial_no,
+			sle_doctype.name,
+			sle_doctype.warehouse,
+			sle_doctype.actual_qty,
+			sle_doctype.voucher_type,
+			sle_doctype.voucher_no,
+			sle_doctype.is_cancelled,
+			sle_doctype.item_code,
+			sle_doctype.posting_date,
+			sle_doctype.company,
+			entry_rank.as_("entry_rank"),
+		)
+		.where(
+			(sn_table.serial_no.isin(serial_nos))
+			& (sle_doctype.is_cancelled == 0)
+			& (sn_table.docstatus == 1)
+		)
+	)
+
+	query = (
+		frappe.qb.from_(ranked_entries)
+		.select(
+			ranked_entries.serial_no,
+			ranked_entries.name,
+			ranked_entries.warehouse,
+			ranked_entries.actual_qty,
+			ranked_entries.voucher_type,
+			ranked_entries.voucher_no,
+			ranked_entries.is_cancelled,
+			ranked_entries.item_code,
+			ranked_entries.posting_date,
+			ranked_entries.company,
+		)
+		.where(ranked_entries.entry_rank == 1)
+	)
+
+	return {row.pop("serial_no"): row for row in query.run(as_dict=True)}
 
 
 def get_serial_nos(serial_and_batch_bundle, serial_nos=None):
@@ -750,6 +803,13 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 		if not self.batchwise_valuation_batches:
 			return []
 
+		batch_totals = getattr(self, "batch_totals", None)
+		if batch_totals is not None and batch_totals.can_use_for(self.sle):
+			return batch_totals.get_ledgers(self.batchwise_valuation_batches, self.query_batch_no_ledgers)
+
+		return self.query_batch_no_ledgers(self.batchwise_valuation_batches)
+
+	def query_batch_no_ledgers(self, batches, of_current_voucher_detail_no=False) -> list[dict]:
 		parent = frappe.qb.DocType("Serial and Batch Bundle")
 		child = frappe.qb.DocType("Serial and Batch Entry")
 
@@ -778,7 +838,7 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 				Sum(child.qty).as_("qty"),
 			)
 			.where(
-				(child.batch_no.isin(self.batchwise_valuation_batches))
+				(child.batch_no.isin(batches))
 				& (parent.warehouse == self.sle.warehouse)
 				& (parent.item_code == self.sle.item_code)
 				& (parent.docstatus == 1)
@@ -790,7 +850,9 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 		)
 
 		# Important to exclude the current voucher detail no / voucher no to calculate the correct stock value difference
-		if self.sle.voucher_detail_no:
+		if of_current_voucher_detail_no:
+			query = query.where(parent.voucher_detail_no == self.sle.voucher_detail_no)
+		elif self.sle.voucher_detail_no:
 			query = query.where(parent.voucher_detail_no != self.sle.voucher_detail_no)
 		elif self.sle.voucher_no:
 			query = query.where(parent.voucher_no != self.sle.voucher_no)
@@ -875,6 +937,66 @@ class BatchNoValuation(DeprecatedBatchNoValuation):
 		return total_qty
 
 
+class BatchRunningTotals:
+	"""
+	Running qty and stock value per batch of an item in a warehouse, kept while reposting.
+
+	Outward bundles of batchwise valuation batches are valued at the average rate of all the
+	earlier entries of the batch. Instead of aggregating the whole history of the batch for every
+	outward bundle, the totals of a batch are read once, when the batch is first seen after the
+	repost checkpoint, and then moved forward by each bundle as it is reposted.
+
+	The totals live only as long as the repost of the item and warehouse, any change to an
+	earlier entry makes a new repost which starts again from the ledger.
+	"""
+
+	def __init__(self):
+		self.batches = {}
+		self.voucher_detail_nos = set()
+
+	def can_use_for(self, sle):
+		# a voucher row can have several bundles (e.g. Repack), all of which are excluded from
+		# each other's valuation and hence can not be served from the running totals
+		return bool(sle.voucher_detail_no) and sle.voucher_detail_no not in self.voucher_detail_nos
+
+	def get_ledgers(self, batches, query_batch_no_ledgers):
+		ledgers = {}
+		if missing_batches := [batch_no for batch_no in batches if batch_no not in self.batches]:
+			for batch_no in missing_batches:
+				ledgers[batch_no] = frappe._dict(batch_no=batch_no, incoming_rate=0.0, qty=0.0)
+
+			for row in query_batch_no_ledgers(missing_batches):
+				ledgers[row.batch_no].update(incoming_rate=flt(row.incoming_rate), qty=flt(row.qty))
+
+			for batch_no in missing_batches:
+				self.batches[batch_no] = frappe._dict(ledgers[batch_no])
+
+			# earlier bundles of the current voucher row are excluded for the current bundle only
+			for row in query_batch_no_ledgers(missing_batches, of_current_voucher_detail_no=True):
+				self.batches[row.batch_no].incoming_rate += flt(row.incoming_rate)
+				self.batches[row.batch_no].qty += flt(row.qty)
+
+		return [ledgers.get(batch_no) or frappe._dict(self.batches[batch_no]) for batch_no in batches]
+
+	def update(self, bundle):
+		"""Adds the entries of a reposted bundle to the totals of the batches already loaded"""
+		if bundle.voucher_detail_no:
+			self.voucher_detail_nos.add(bundle.voucher_detail_no)
+
+		if (
+			bundle.docstatus != 1
+			or bundle.is_cancelled
+			or bundle.voucher_type == "Pick List"
+			or bundle.type_of_transaction not in ("Inward", "Outward")
+		):
+			return
+
+		for row in bundle.entries:
+			if totals := self.batches.get(row.batch_no):
+				totals.incoming_rate += flt(row.stock_value_difference)
+				totals.qty += flt(row.qty)
+
+
 def get_batch_nos(serial_and_batch_bundle):
 	if not serial_and_batch_bundle:
 		return frappe._dict({})
@@ -1131,6 +1253,18 @@ class SerialBatchCreation:
 		if self.get("ignore_serial_nos"):
 			kwargs["ignore_serial_nos"] = self.ignore_serial_nos
 
+		if self.get("availability") and not self.get("serial_nos") and not self.get("batches"):
+			# allocate from an index shared by all the rows of a bulk operation
+			allocation = self.availability.allocate(
+				self.warehouse, kwargs.qty, ignore_serial_nos=kwargs.get("ignore_serial_nos")
+			)
+			if self.has_serial_no:
+				self.serial_nos = allocation.serial_nos
+			elif self.has_batch_no:
+				self.batches = allocation.batches
+
+			return
+
 		if (
 			self.has_serial_no
 			and self.has_batch_no
@@ -1352,6 +1486,138 @@ class SerialBatchCreation:
 		return sr_nos
 
 
+class SerialBatchAvailability:
+	"""
+	In-memory index of the serial and batch nos available for an item across warehouses.
+
+	The index is built with one availability lookup per warehouse (honouring POS, stock reservation and
+	`pick_serial_and_batch_based_on` ordering) and then consumed row by row through `allocate`, so that
+	many outward rows get distinct serial / batch nos without querying per row.
+	"""
+
+	def __init__(self, item_code, warehouses, based_on=None, **kwargs):
+		self.item_code = item_code
+		self.based_on = based_on or frappe.get_single_value(
+			"Stock Settings", "pick_serial_and_batch_based_on"
+		)
+		self.kwargs = kwargs
+
+		item_details = frappe.get_cached_value(
+			"Item", item_code, ["has_serial_no", "has_batch_no"], as_dict=True
+		)
+		self.has_serial_no = cint(item_details.has_serial_no)
+		self.has_batch_no = cint(item_details.has_batch_no)
+
+		# warehouse -> [serial_no, ...] / [[batch_no, qty], ...] in picking order
+		self.serial_nos = defaultdict(list)
+		self.batches = defaultdict(list)
+
+		for warehouse in set(warehouses):
+			if self.has_serial_no:
+				self.load_serial_nos(warehouse)
+			elif self.has_batch_no:
+				self.load_batches(warehouse)
+
+	def get_kwargs(self, warehouse):
+		return frappe._dict(
+			self.kwargs,
+			item_code=self.item_code,
+			warehouse=warehouse,
+			has_batch_no=self.has_batch_no,
+			based_on=self.based_on,
+			qty=0,
+		)
+
+	def load_serial_nos(self, warehouse):
+		from erpnext.stock.doctype.serial_and_batch_bundle.serial_and_batch_bundle import (
+			get_available_serial_nos,
+		)
+
+		serial_nos = get_available_serial_nos(self.get_kwargs(warehouse))
+		if self.has_batch_no and self.based_on == "Expiry":
+			# FEFO, serial nos of the batch expiring first are picked first
+			expiry_dates = get_batch_expiry_dates({d.batch_no for d in serial_nos if d.batch_no})
+			max_date = getdate("9999-12-31")
+			serial_nos = sorted(serial_nos, key=lambda d: expiry_dates.get(d.batch_no) or max_date)
+
+		self.serial_nos[warehouse] = serial_nos
+
+	def load_batches(self, warehouse):
+		from erpnext.stock.doctype.serial_and_batch_bundle.serial_and_batch_bundle import (
+			get_auto_batch_nos,
+		)
+
+		for batch in get_auto_batch_nos(self.get_kwargs(warehouse)):
+			self.batches[warehouse].append([batch.batch_no, flt(batch.qty)])
+
+	def allocate(self, warehouse, qty, ignore_serial_nos=None):
+		"""Takes `qty` out of the index for `warehouse` and returns the allocated serial nos / batches"""
+		allocation = frappe._dict(serial_nos=[], batches=frappe._dict())
+		qty = flt(qty)
+
+		if self.has_serial_no:
+			available = self.serial_nos[warehouse]
+			if ignore_serial_nos:
+				# picked outside the index, like by the rows that already have a bundle
+				ignore_serial_nos = set(ignore_serial_nos)
+				available = [d for d in available if d.serial_no not in ignore_serial_nos]
+
+			picked, self.serial_nos[warehouse] = available[: cint(qty)], available[cint(qty) :]
+
+			allocation.serial_nos = [d.serial_no for d in picked]
+			for d in picked:
+				if d.get("batch_no"):
+					allocation.batches[d.batch_no] = allocation.batches.get(d.batch_no, 0) + 1
+
+			return allocation
+
+		available = self.batches[warehouse]
+		while qty > 0 and available:
+			batch = available[0]
+			batch_qty = min(batch[1], qty)
+			allocation.batches[batch[0]] = allocation.batches.get(batch[0], 0) + batch_qty
+
+			qty -= batch_qty
+			batch[1] -= batch_qty
+			if batch[1] <= 0:
+				available.pop(0)
+
+		return allocation
+
+
+def allocate_serial_batch_for_outward(rows, based_on=None, **kwargs):
+	"""
+	Allocates serial / batch nos to many outward rows in one pass.
+
+	`rows` are dicts with `item_code`, `warehouse` and `qty`. Returns one allocation
+	(`serial_nos` and `batches`) per row, in the same order, with no serial / batch qty picked twice.
+	"""
+	warehouses = defaultdict(set)
+	for row in rows:
+		warehouses[row.get("item_code")].add(row.get("warehouse"))
+
+	availability = {
+		item_code: SerialBatchAvailability(item_code, item_warehouses, based_on=based_on, **kwargs)
+		for item_code, item_warehouses in warehouses.items()
+	}
+
+	return [
+		availability[row.get("item_code")].allocate(row.get("warehouse"), abs(flt(row.get("qty"))))
+		for row in rows
+	]
+
+
+def get_batch_expiry_dates(batches):
+	if not batches:
+		return {}
+
+	return frappe._dict(
+		frappe.get_all(
+			"Batch", filters={"name": ("in", list(batches))}, fields=["name", "expiry_date"], as_list=True
+		)
+	)
+
+
 def get_serial_or_batch_items(items):
 	serial_or_batch_items = frappe.get_all(
 		"Item",
@@ -0,0 +1,213 @@
+# Copyright (c) 2025, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""
+Per-warehouse cache of stock availability used by the POS and other item listings.
+
+For every (warehouse, item) the cache holds the Bin's actual qty and the qty reserved by submitted,
+unconsolidated POS Invoices, so that availability = actual qty - POS reserved qty can be answered for
+many items with a couple of queries on a cache miss and none on a hit.
+
+Entries are refreshed per (warehouse, item) whenever a POS Invoice is submitted, cancelled or
+consolidated and whenever the actual qty of a Bin changes. The cache of a warehouse expires
+CACHE_EXPIRY seconds after it is created, so that an entry missed by the invalidation is not served
+for longer than that.
+"""
+
+from functools import partial
+
+import frappe
+from frappe.query_builder.functions import IfNull, Sum
+from frappe.utils import flt
+
+CACHE_KEY = "stock_availability"
+CACHE_EXPIRY = 10 * 60
+
+# upper bound of bundles that can be made when none of the bundle items is a stock item
+MAX_BUNDLE_QTY = 1000000
+
+
+def get_stock_availability_map(item_codes, warehouse):
+	"""
+	Returns {item_code: (available_qty, is_stock_item)} for all `item_codes` in `warehouse`.
+
+	Product Bundles are available as many times as their scarcest stock item allows,
+	non stock items are returned as (0, False).
+	"""
+	item_codes = list(dict.fromkeys(item_codes))
+	if not item_codes:
+		return {}
+
+	stock_items = set(get_stock_items(item_codes))
+	bundle_items = get_bundle_items([d for d in item_codes if d not in stock_items])
+
+	components = {row.item_code for rows in bundle_items.values() for row in rows}
+	component_stock_items = set(get_stock_items(list(components)))
+	availability = get_cached_availability([*item_codes, *components.difference(item_codes)], warehouse)
+
+	out = {}
+	for item_code in item_codes:
+		if item_code in stock_items:
+			qty = availability[item_code]
+			out[item_code] = (flt(qty.actual_qty) - flt(qty.pos_reserved_qty), True)
+
+		elif item_code in bundle_items:
+			bundle_qty = MAX_BUNDLE_QTY
+			for row in bundle_items[item_code]:
+				max_available_bundles = flt(availability[row.item_code].actual_qty) / row.qty
+				if bundle_qty > max_available_bundles and row.item_code in component_stock_items:
+					bundle_qty = max_available_bundles
+
+			out[item_code] = (bundle_qty - flt(availability[item_code].pos_reserved_qty), True)
+
+		else:
+			# Is a service item or non_stock item
+			out[item_code] = (0, False)
+
+	return out
+
+
+def get_cached_availability(item_codes, warehouse):
+	"""Returns {item_code: {actual_qty, pos_reserved_qty}}, loading the cache misses in bulk"""
+	key = get_cache_key(warehouse)
+
+	availability, missing = {}, []
+	for item_code in item_codes:
+		if (cached := frappe.cache.hget(key, item_code)) is not None:
+			availability[item_code] = cached
+		else:
+			missing.append(item_code)
+
+	if missing:
+		actual_qty = get_actual_qty_map(missing, warehouse)
+		reserved_qty = get_pos_reserved_qty_map(missing, warehouse)
+
+		for item_code in missing:
+			availability[item_code] = frappe._dict(
+				actual_qty=actual_qty.get(item_code, 0.0),
+				pos_reserved_qty=reserved_qty.get(item_code, 0.0),
+			)
+			frappe.cache.hset(key, item_code, availability[item_code])
+
+		set_cache_expiry(key)
+
+	return availability
+
+
+def set_cache_expiry(key):
+	"""Sets the expiry of a new cache, later writes do not extend it"""
+	redis_key = frappe.cache.make_key(key)
+	if frappe.cache.ttl(redis_key) < 0:
+		frappe.cache.expire(redis_key, CACHE_EXPIRY)
+
+
+def get_actual_qty_map(item_codes, warehouse):
+	bin = frappe.qb.DocType("Bin")
+
+	data = (
+		frappe.qb.from_(bin)
+		.select(bin.item_code, bin.actual_qty)
+		.where((bin.warehouse == warehouse) & (bin.item_code.isin(item_codes)))
+	).run(as_dict=True)
+
+	return {d.item_code: flt(d.actual_qty) for d in data}
+
+
+def get_pos_reserved_qty_map(item_codes, warehouse):
+	"""
+	Returns {item_code: qty} reserved in submitted, unconsolidated POS Invoices, counting
+	both the items sold directly and the items sold as part of a Product Bundle.
+	"""
+	reserved_qty = {}
+	for child_table in ("POS Invoice Item", "Packed Item"):
+		p_inv = frappe.qb.DocType("POS Invoice")
+		p_item = frappe.qb.DocType(child_table)
+
+		qty_column = "qty" if child_table == "Packed Item" else "stock_qty"
+
+		data = (
+			frappe.qb.from_(p_inv)
+			.from_(p_item)
+			.select(p_item.item_code, Sum(p_item[qty_column]).as_("stock_qty"))
+			.where(
+				(p_inv.name == p_item.parent)
+				& (IfNull(p_inv.consolidated_invoice, "") == "")
+				& (p_item.docstatus == 1)
+				& (p_item.item_code.isin(item_codes))
+				& (p_item.warehouse == warehouse)
+			)
+			.groupby(p_item.item_code)
+		).run(as_dict=True)
+
+		for d in data:
+			reserved_qty[d.item_code] = reserved_qty.get(d.item_code, 0.0) + flt(d.stock_qty)
+
+	return reserved_qty
+
+
+def get_stock_items(item_codes):
+	if not item_codes:
+		return []
+
+	return frappe.get_all(
+		"Item", filters={"name": ["in", item_codes], "is_stock_item": 1}, pluck="name", order_by=None
+	)
+
+
+def get_bundle_items(item_codes):
+	"""Returns {bundle: [items]} for the enabled Product Bundles among `item_codes`"""
+	if not item_codes:
+		return {}
+
+	bundles = frappe.get_all(
+		"Product Bundle", filters={"name": ["in", item_codes], "disabled": 0}, pluck="name", order_by=None
+	)
+	if not bundles:
+		return {}
+
+	bundle_items = {bundle: [] for bundle in bundles}
+	for row in frappe.get_all(
+		"Product Bundle Item",
+		filters={"parent": ["in", bundles], "parenttype": "Product Bundle"},
+		fields=["parent", "item_code", "qty"],
+		order_by="idx",
+	):
+		bundle_items[row.parent].append(row)
+
+	return bundle_items
+
+
+def invalidate_stock_availability(item_warehouses):
+	"""
+	Drops the cached availability of the given (item_code, warehouse) pairs.
+
+	The entries are dropped right away, so that the current transaction reads its own changes, and once
+	more after commit or rollback, so that values read by other sessions in between are not kept.
+	"""
+	item_warehouses = {(item_code, warehouse) for item_code, warehouse in item_warehouses if warehouse}
+	if not item_warehouses:
+		return
+
+	_invalidate(item_warehouses)
+
+	callback = partial(_invalidate, item_warehouses)
+	frappe.db.after_commit.add(callback)
+	frappe.db.after_rollback.add(callback)
+
+
+def invalidate_stock_availability_for_pos_invoices(pos_invoices):
+	"""Drops the cached availability of the items and packed items of the given POS Invoice docs"""
+	invalidate_stock_availability(
+		(row.item_code, row.warehouse)
+		for doc in pos_invoices
+		for row in [*doc.get("items"), *doc.get("packed_items")]
+	)
+
+
+def _invalidate(item_warehouses):
+	for item_code, warehouse in item_warehouses:
+		frappe.cache.hdel(get_cache_key(warehouse), item_code)
+
+
+def get_cache_key(warehouse):
+	return f"{CACHE_KEY}::{warehouse}"
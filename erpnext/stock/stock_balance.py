@@ -6,6 +6,7 @@ import frappe
 from frappe.utils import cstr, flt, now, nowdate, nowtime
 
 from erpnext.controllers.stock_controller import create_repost_item_valuation_entry
+from erpnext.stock.stock_availability import invalidate_stock_availability
 
 
 def repost(only_actual=False, allow_negative_stock=False, allow_zero_rate=False, only_bin=False):
@@ -223,6 +224,7 @@ def update_bin_qty(item_code, warehouse, qty_dict=None):
 		bin.set_projected_qty()
 		bin.db_update()
 		bin.clear_cache()
+		invalidate_stock_availability([(item_code, warehouse)])
 
 
 def set_stock_balance_as_per_serial_no(
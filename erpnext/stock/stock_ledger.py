@@ -33,6 +33,7 @@ from erpnext.stock.doctype.stock_reservation_entry.stock_reservation_entry impor
 	get_sre_reserved_batch_nos_details,
 	get_sre_reserved_serial_nos_details,
 )
+from erpnext.stock.stock_availability import invalidate_stock_availability
 from erpnext.stock.utils import (
 	get_combine_datetime,
 	get_incoming_outgoing_rate_for_cancel,
@@ -1002,6 +1003,14 @@ class update_entries_after:
 		if sle.serial_and_batch_bundle and frappe.get_cached_value("Item", sle.item_code, "has_serial_no"):
 			self.update_serial_no_status(sle)
 
+	def get_batch_running_totals(self):
+		from erpnext.stock.serial_batch_bundle import BatchRunningTotals
+
+		if "batch_totals" not in self.wh_data:
+			self.wh_data.batch_totals = BatchRunningTotals()
+
+		return self.wh_data.batch_totals
+
 	def update_serial_no_status(self, sle):
 		from erpnext.stock.serial_batch_bundle import get_serial_nos
 
@@ -1040,9 +1049,15 @@ class update_entries_after:
 			)
 		else:
 			doc = frappe.get_doc("Serial and Batch Bundle", sle.serial_and_batch_bundle)
+			if not doc.has_serial_no:
+				doc.flags.batch_totals = self.get_batch_running_totals()
+
 			doc.set_incoming_rate(save=True, allow_negative_stock=self.allow_negative_stock)
 			doc.calculate_qty_and_amount(save=True)
 
+			if doc.flags.batch_totals:
+				doc.flags.batch_totals.update(doc)
+
 		if stock_queue := frappe.get_all(
 			"Serial and Batch Entry",
 			filters={"parent": sle.serial_and_batch_bundle, "stock_queue": ("is", "set")},
@@ -1612,6 +1627,7 @@ class update_entries_after:
 			values_to_update["valuation_rate"] = sle.valuation_rate
 
 		frappe.db.set_value("Bin", bin_name, values_to_update)
+		invalidate_stock_availability([(sle.item_code, sle.warehouse)])
 
 	def update_bin(self):
 		# update bin for each warehouse
@@ -1623,6 +1639,8 @@ class update_entries_after:
 				updated_values["valuation_rate"] = data.valuation_rate
 			frappe.db.set_value("Bin", bin_name, updated_values, update_modified=True)
 
+		invalidate_stock_availability((self.item_code, warehouse) for warehouse in self.data)
+
 
 def get_previous_sle_of_current_voucher(args, operator="<", exclude_current_voucher=False):
 	"""get stock ledger entries filtered by specific posting datetime conditions"""
@@ -8,8 +8,8 @@ from frappe.utils import flt
 
 from erpnext.buying.utils import check_on_hold_or_closed_status
 from erpnext.controllers.subcontracting_controller import SubcontractingController
+from erpnext.stock.doctype.bin.reserved_qty import update_reserved_qty
 from erpnext.stock.stock_balance import update_bin_qty
-from erpnext.stock.utils import get_bin
 
 
 class SubcontractingOrder(SubcontractingController):
@@ -237,13 +237,14 @@ class SubcontractingOrder(SubcontractingController):
 		return flt(query[0][0]) if query else 0
 
 	def update_reserved_qty_for_subcontracting(self, sco_item_rows=None):
-		for item in self.supplied_items:
-			if sco_item_rows and item.reference_name not in sco_item_rows:
-				continue
-
-			if item.rm_item_code:
-				stock_bin = get_bin(item.rm_item_code, item.reserve_warehouse)
-				stock_bin.update_reserved_qty_for_sub_contracting()
+		update_reserved_qty(
+			[
+				(item.rm_item_code, item.reserve_warehouse)
+				for item in self.supplied_items
+				if not sco_item_rows or item.reference_name in sco_item_rows
+			],
+			"Subcontracting Order",
+		)
 
 	def populate_items_table(self):
 		items = []
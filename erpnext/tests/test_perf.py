@@ -1,3 +1,7 @@
+import os
+import time
+import unittest
+
 import frappe
 from frappe.tests import IntegrationTestCase
 
@@ -7,6 +11,10 @@ INDEXED_FIELDS = {
 	"Purchase Order Item": ["item_code"],
 }
 
+# Benchmarks create large volumes of data and are only run on demand:
+# ERPNEXT_RUN_BENCHMARKS=1 bench --site test_site run-tests --module erpnext.tests.test_perf
+run_benchmarks = unittest.skipUnless(os.environ.get("ERPNEXT_RUN_BENCHMARKS"), "benchmarks not requested")
+
 
 class TestPerformance(IntegrationTestCase):
 	def test_ensure_indexes(self):
@@ -21,3 +29,126 @@ class TestPerformance(IntegrationTestCase):
 						WHERE Column_name = "{field}" AND Seq_in_index = 1"""
 					)
 				)
+
+
+class TestBenchmarks(IntegrationTestCase):
+	def assertFasterThan(self, seconds, func, *args, **kwargs):
+		start = time.perf_counter()
+		result = func(*args, **kwargs)
+		elapsed = time.perf_counter() - start
+
+		self.assertLess(elapsed, seconds)
+		return result
+
+	@run_benchmarks
+	def test_serial_no_status_update_for_large_bundle(self):
+		from erpnext.stock.doctype.item.test_item import make_item
+		from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+		from erpnext.stock.serial_batch_bundle import SerialBatchBundle, get_serial_nos
+
+		qty = 50000
+		warehouse = "_Test Warehouse - _TC"
+		item_code = make_item(
+			"_Test Benchmark Serial Item",
+			{"is_stock_item": 1, "has_serial_no": 1, "serial_no_series": "BENCH-SN-.######"},
+		).name
+
+		receipt = make_stock_entry(item_code=item_code, target=warehouse, qty=qty, rate=1)
+		serial_nos = get_serial_nos(receipt.items[0].serial_and_batch_bundle)
+		self.assertEqual(len(serial_nos), qty)
+
+		issue = self.assertFasterThan(
+			120, make_stock_entry, item_code=item_code, source=warehouse, qty=qty, rate=1
+		)
+		self.assertFalse(frappe.db.exists("Serial No", {"item_code": item_code, "warehouse": ("is", "set")}))
+
+		# status from the latest ledger entry of every serial no, as done for stock reconciliation
+		bundle = object.__new__(SerialBatchBundle)
+		self.assertFasterThan(60, bundle.update_serial_no_status_for_stock_reco, serial_nos)
+		self.assertFalse(frappe.db.exists("Serial No", {"item_code": item_code, "warehouse": ("is", "set")}))
+
+		issue.cancel()
+		self.assertEqual(frappe.db.count("Serial No", {"item_code": item_code, "warehouse": warehouse}), qty)
+
+	@run_benchmarks
+	def test_mrp_engine_for_large_plan(self):
+		from frappe.utils import add_days
+
+		from erpnext.manufacturing.report.material_requirements_planning_report.mrp_engine import MRPEngine
+
+		# 20k items in 4 levels (1k FG, 3k + 6k sub assemblies, 10k RM) over 52 weekly buckets
+		buckets = [add_days("2025-01-06", 7 * i) for i in range(52)]
+		sizes = [1000, 3000, 6000, 10000]
+		levels, start = [], 0
+		for size in sizes:
+			levels.append([f"ITEM-{i}" for i in range(start, start + size)])
+			start += size
+
+		items, boms = {}, {}
+		for level, item_codes in enumerate(levels):
+			for i, item_code in enumerate(item_codes):
+				bom_no = None
+				if level + 1 < len(levels):
+					components = levels[level + 1]
+					bom_no = f"BOM-{item_code}"
+					boms[bom_no] = [(components[(i * 3 + j) % len(components)], j + 1) for j in range(4)]
+
+				items[item_code] = {"bom_no": bom_no, "lead_time": 7 * (i % 4), "safety_stock": i % 10}
+
+		def plan():
+			engine = MRPEngine(buckets, add_days(buckets[-1], 6), items, boms)
+			for i, item_code in enumerate(levels[0]):
+				for bucket in range(i % 4, 52, 4):
+					engine.add_demand(item_code, buckets[bucket], 10)
+
+			for i, item_code in enumerate(items):
+				engine.add_on_hand(item_code, i % 50)
+				engine.add_purchase_receipt(item_code, buckets[i % 52], 5)
+
+			engine.run()
+			return engine
+
+		engine = self.assertFasterThan(10, plan)
+		self.assertEqual(engine.gross.shape, (20000, 52))
+		self.assertEqual(max(engine.levels.values()), 3)
+		self.assertTrue(engine.planned_orders[engine.index["ITEM-19999"]].any())
+
+	@run_benchmarks
+	def test_voucher_matcher_for_a_month_of_statement_lines(self):
+		from erpnext.accounts.doctype.bank_reconciliation_tool.voucher_matcher import VoucherMatcher
+
+		# 40k statement lines against 40k unreconciled payments, a tenth of them sharing references
+		lines = 40000
+		vouchers = [
+			frappe._dict(
+				doctype="Payment Entry",
+				name=f"PE-{i}",
+				direction="deposit" if i % 2 else "withdrawal",
+				paid_amount=100 + i % 500,
+				reference_no=f"REF-{i % (lines * 9 // 10)}",
+				party_type="Customer",
+				party=f"CUST-{i % 1000}",
+			)
+			for i in range(lines)
+		]
+		transactions = [
+			frappe._dict(
+				name=f"BT-{i}",
+				deposit=100 + i % 500 if i % 2 else 0,
+				withdrawal=0 if i % 2 else 100 + i % 500,
+				unallocated_amount=100 + i % 500,
+				reference_number=f"REF-{i}",
+				party_type="Customer",
+				party=f"CUST-{i % 1000}",
+			)
+			for i in range(lines)
+		]
+
+		def match():
+			matcher = VoucherMatcher(vouchers)
+			return [matcher.get_matching_vouchers(transaction) for transaction in transactions]
+
+		matches = self.assertFasterThan(5, match)
+		self.assertEqual(len(matches), lines)
+		self.assertEqual(matches[1][0].name, "PE-1")
+		self.assertEqual(matches[1][0].rank, 4)
@@ -1,5 +1,7 @@
 import frappe
-from frappe.model.naming import get_default_naming_series
+from frappe.model.naming import get_default_naming_series, make_autoname, parse_naming_series
+from frappe.query_builder import DocType
+from frappe.utils import cint, cstr
 
 
 class NamingSeriesNotSetError(frappe.ValidationError):
@@ -46,3 +48,27 @@ def set_by_naming_series(doctype, fieldname, naming_series, hide_name_field=True
 				f"""update `tab{doctype}` set `{fieldname}`=`name` where
 				ifnull({fieldname}, '')=''"""
 			)
+
+
+def reserve_names(doctype, naming_series, count):
+	"""Returns `count` consecutive names of the naming series, moving the series past them"""
+	if "#" not in naming_series:
+		naming_series = f"{naming_series}.#####"
+
+	prefix, _sep, hashes = naming_series.rpartition(".")
+	if not prefix or hashes.strip("#"):
+		# the number is not at the end of the name
+		return [make_autoname(naming_series, doctype) for _i in range(count)]
+
+	prefix = parse_naming_series(prefix)
+	series = DocType("Series")
+
+	current = (frappe.qb.from_(series).where(series.name == prefix).for_update().select(series.current)).run()
+	if current and current[0][0] is not None:
+		current = cint(current[0][0])
+		frappe.qb.update(series).set(series.current, current + count).where(series.name == prefix).run()
+	else:
+		current = 0
+		frappe.qb.into(series).insert(prefix, count).columns("name", "current").run()
+
+	return [f"{prefix}{cstr(current + i).zfill(len(hashes))}" for i in range(1, count + 1)]